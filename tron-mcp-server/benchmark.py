@@ -0,0 +1,448 @@
+"""端到端基准测试
+================
+
+启动 mock_tron_server.MockTronServer，把 TRONSCAN / TronGrid 地址指向它，
+然后在给定并发下逐个驱动 call_router 的全部动作，统计：
+
+- 延迟 p50 / p95 / p99 与平均值
+- 吞吐量 (次/秒)
+- 每次动作触发的上游请求数（来自 metrics.UPSTREAM_REQUESTS）
+
+每次调用的耗时包含结果的 JSON 序列化（与 MCP 工具返回时一致）。
+--compare-codecs 记录各动作实际经过 json_codec 的数据（上游响应、交易 JSON 输入、工具结果），
+之后在模拟服务停止后分别用标准库 json 与 orjson 重放编解码，对比每次调用的 JSON 耗时。
+
+用法::
+
+    python benchmark.py --concurrency 16 --requests 200 --latency-ms 30 --jitter-ms 20
+    python benchmark.py --actions get_balance,transfer --error-rate 0.05
+    python benchmark.py --json report.json --max-p95-ms 200    # CI: 超过阈值时退出码为 1
+    python benchmark.py --cassette flows.json.gz --cassette-mode record
+    python benchmark.py --cassette flows.json.gz --replay-timing 1   # 离线、按原始耗时回放
+    python benchmark.py --compare-codecs --actions get_transaction_history,get_account_tokens
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, List, Optional
+
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+from mock_tron_server import MOCK_TXID, MockTronServer, build_transaction
+from tron_mcp_server import call_router
+from tron_mcp_server import http_client
+from tron_mcp_server import json_codec
+from tron_mcp_server import metrics
+
+# 私钥 0x...01 对应的钱包地址，仅用于本地基准测试
+BENCH_PRIVATE_KEY = "0" * 63 + "1"
+ADDRESS = "TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7"
+RECIPIENT = "TKyPzHiXW4Zms4txUxfWjXBidGzZpiCchn"
+
+
+def _signed_transfer() -> dict:
+    """离线构造并签名一笔交易，供 sign_tx / broadcast_tx 使用（不占用上游请求）"""
+    from tron_mcp_server import key_manager
+    # 固定时间戳：交易与签名在每次运行中一致，cassette 回放时 broadcast_tx 才能命中
+    value = {"amount": 1_000_000, "owner_address": ADDRESS, "to_address": RECIPIENT}
+    tx = build_transaction("TransferContract", value, now_ms=1_700_000_000_000)
+    signed = dict(tx)
+    signed["signature"] = [key_manager.sign_transaction(tx["txID"], BENCH_PRIVATE_KEY)]
+    return signed
+
+
+def build_scenarios(work_dir: str) -> Dict[str, Callable[[int], dict]]:
+    """每个动作一个参数生成函数，入参为请求序号"""
+    signed = _signed_transfer()
+    unsigned = {k: v for k, v in signed.items() if k != "signature"}
+    address_params = lambda i: {"address": ADDRESS}
+    return {
+        "skills": lambda i: {},
+        "get_usdt_balance": address_params,
+        "get_balance": address_params,
+        "get_gas_parameters": lambda i: {},
+        "get_transaction_status": lambda i: {"txid": MOCK_TXID},
+        "get_network_status": lambda i: {},
+        "get_account_status": address_params,
+        "check_account_safety": address_params,
+        "build_tx": lambda i: {"from": ADDRESS, "to": RECIPIENT, "amount": 1, "token": "USDT" if i % 2 else "TRX"},
+        "estimate_fee": lambda i: {"from": ADDRESS, "to": RECIPIENT, "amount": 1, "token": "USDT" if i % 2 else "TRX"},
+        "sign_tx": lambda i: {"unsigned_tx_json": json.dumps(unsigned)},
+        "broadcast_tx": lambda i: {"signed_tx_json": json.dumps(signed)},
+        "transfer": lambda i: {"to": RECIPIENT, "amount": 1, "token": "USDT" if i % 2 else "TRX"},
+        "get_wallet_info": lambda i: {},
+        "get_transaction_history": lambda i: {"address": ADDRESS, "limit": 10},
+        "get_internal_transactions": lambda i: {"address": ADDRESS, "limit": 10},
+        "get_account_tokens": address_params,
+        "get_portfolio": lambda i: {"addresses": [ADDRESS, RECIPIENT, ADDRESS]},
+        "addressbook_add": lambda i: {"alias": f"bench-{i}", "address": RECIPIENT, "tags": ["bench"]},
+        "addressbook_lookup": lambda i: {"alias": f"bench-{i}"},
+        "addressbook_list": lambda i: {"limit": 20, "offset": i % 5},
+        "addressbook_search": lambda i: {"query": "bench", "limit": 20},
+        "addressbook_import": lambda i: {
+            "contacts": [{"alias": f"import-{i}-{j}", "address": RECIPIENT} for j in range(10)],
+            "dry_run": True,
+        },
+        "addressbook_resolve_batch": lambda i: {"aliases": [f"bench-{i}", f"bench-{i + 1}", RECIPIENT]},
+        "addressbook_remove": lambda i: {"alias": f"bench-{i}"},
+        "generate_qrcode": lambda i: {"address": ADDRESS, "output_dir": work_dir, "filename": f"bench_{i % 4}.png"},
+        "get_account_energy": address_params,
+        "get_account_bandwidth": address_params,
+        "get_account_resources": address_params,
+        "get_server_metrics": lambda i: {},
+        "get_slow_calls": lambda i: {},
+        "admin_profiler": lambda i: {"command": "status"},
+        "watch_address": address_params,
+        "get_watch_events": lambda i: {"address": ADDRESS, "since": 0},
+        "unwatch_address": address_params,
+        # 广播时间设在一小时后：只计登记（安全检查 + 构建 + 签名），随后取消
+        "queue_transfer": lambda i: {"to": RECIPIENT, "amount": 1, "token": "TRX", "id": f"bench-{i}",
+                                     "delay_seconds": 3600},
+        "get_tx_queue": lambda i: {"status": "pending"},
+        "cancel_queued_tx": lambda i: {"id": f"bench-{i}"},
+    }
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """最近秩法分位数，sorted_values 需已升序"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def _upstream_total() -> float:
+    return sum(value for _, value in metrics.UPSTREAM_REQUESTS.samples())
+
+
+@contextmanager
+def _patched_env(values: dict):
+    saved = {key: os.environ.get(key) for key in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+@contextmanager
+def _capture_json():
+    """记录经过 json_codec.loads / dumps 的数据，yield 记录列表 [(函数名, 参数), ...]"""
+    captured = []
+    lock = threading.Lock()
+    originals = {name: getattr(json_codec, name) for name in ("loads", "dumps")}
+
+    def recording(name, func):
+        def wrapper(value, *args, **kwargs):
+            with lock:
+                captured.append((name, value))
+            return func(value, *args, **kwargs)
+        return wrapper
+
+    for name, func in originals.items():
+        setattr(json_codec, name, recording(name, func))
+    try:
+        yield captured
+    finally:
+        for name, func in originals.items():
+            setattr(json_codec, name, func)
+
+
+def _maybe_cassette(path: Optional[str], mode: str, timing: float):
+    if not path:
+        return nullcontext()
+    return http_client.use_cassette(path, mode=mode, timing=timing)
+
+
+def _run_one(action: str, params: dict):
+    start = time.perf_counter()
+    try:
+        result = call_router.call(action, params)
+        json_codec.dumps(result)
+        error = result.get("error") if isinstance(result, dict) else None
+        if error is True:
+            # InsufficientBalanceError 等返回 error=True + error_type
+            error = result.get("error_type") or "error"
+        detail = result.get("summary") if error else None
+    except Exception as e:
+        error, detail = "exception", repr(e)
+    return time.perf_counter() - start, error, detail
+
+
+def bench_action(action: str, make_params: Callable[[int], dict], requests: int, concurrency: int) -> dict:
+    """在给定并发下执行同一动作 requests 次，返回统计"""
+    upstream_before = _upstream_total()
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(lambda i: _run_one(action, make_params(i)), range(requests)))
+    wall = time.perf_counter() - wall_start
+    upstream = _upstream_total() - upstream_before
+
+    latencies = sorted(elapsed for elapsed, _, _ in outcomes)
+    failures = [(error, detail) for _, error, detail in outcomes if error]
+    return {
+        "action": action,
+        "requests": requests,
+        "errors": len(failures),
+        "error_samples": sorted({f"{error}: {detail}" for error, detail in failures})[:3],
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        "throughput_rps": round(requests / wall, 2) if wall > 0 else 0.0,
+        "upstream_calls": int(upstream),
+        "upstream_per_call": round(upstream / requests, 2) if requests else 0.0,
+    }
+
+
+def run_benchmark(
+    actions: Optional[List[str]] = None,
+    concurrency: int = 8,
+    requests: int = 50,
+    latency_ms: float = 0.0,
+    jitter_ms: float = 0.0,
+    error_rate: float = 0.0,
+    seed: Optional[int] = 0,
+    cassette: Optional[str] = None,
+    cassette_mode: str = "replay",
+    replay_timing: float = 0.0,
+    capture_json: bool = False,
+) -> dict:
+    """启动模拟服务并对指定动作（默认全部）做基准测试，返回报告字典
+
+    指定 cassette 时：record 模式把上游交互录制到该文件；replay 模式完全离线，
+    按录制的响应回放（replay_timing=1 时按原始耗时等待）。
+    capture_json=True 时报告附带 json_payloads：每个动作经过 json_codec 的数据（见 compare_codecs）。
+    """
+    if concurrency < 1 or requests < 1:
+        raise ValueError("concurrency 与 requests 必须为正整数")
+
+    work_dir = tempfile.mkdtemp(prefix="tron-bench-")
+    try:
+        scenarios = build_scenarios(work_dir)
+        selected = list(actions) if actions else list(scenarios)
+        unknown = [a for a in selected if a not in scenarios]
+        if unknown:
+            raise ValueError(f"没有对应基准场景的动作: {', '.join(unknown)}")
+
+        with MockTronServer(latency_ms, jitter_ms, error_rate, seed=seed) as server:
+            env = dict(server.env())
+            env.update({
+                "TRON_PRIVATE_KEY": BENCH_PRIVATE_KEY,
+                "TRON_ADDRESSBOOK_PATH": os.path.join(work_dir, "address_book.json"),
+                "TRON_TX_QUEUE_PATH": os.path.join(work_dir, "tx_queue.json"),
+                "TRON_ADMIN_ACTIONS": "true",
+            })
+            was_enabled = metrics.is_enabled()
+            metrics.set_enabled(True)
+            try:
+                payloads = {}
+                with _patched_env(env), _maybe_cassette(cassette, cassette_mode, replay_timing):
+                    backend = json_codec.backend()
+                    results = []
+                    for action in selected:
+                        with _capture_json() if capture_json else nullcontext() as captured:
+                            results.append(bench_action(action, scenarios[action], requests, concurrency))
+                        payloads[action] = captured
+            finally:
+                metrics.set_enabled(was_enabled)
+            mock_requests = server.request_counts()
+    finally:
+        from tron_mcp_server import address_book, block_follower, signer, tx_queue, watcher
+        address_book._close_sqlite_books()
+        # watch_address 会启动区块跟随器线程、queue_transfer 会启动队列调度线程，随模拟服务一起停止
+        watcher._reset()
+        block_follower.stop()
+        tx_queue._reset()
+        signer.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    total_requests = sum(r["requests"] for r in results)
+    return {
+        "config": {
+            "concurrency": concurrency,
+            "requests": requests,
+            "latency_ms": latency_ms,
+            "jitter_ms": jitter_ms,
+            "error_rate": error_rate,
+            "cassette": cassette,
+            "cassette_mode": cassette_mode if cassette else None,
+            "replay_timing": replay_timing if cassette else None,
+            "json_codec": backend,
+        },
+        "actions": results,
+        "total_requests": total_requests,
+        "total_errors": sum(r["errors"] for r in results),
+        "mock_requests": mock_requests,
+        **({"json_payloads": payloads} if capture_json else {}),
+    }
+
+
+def _codec_seconds(payloads: list, codec: str, repeat: int) -> float:
+    """以指定编解码器重放记录的 loads / dumps，返回单轮耗时（秒，取 repeat 轮中最快的一轮）"""
+    best = float("inf")
+    json_codec.configure(codec)
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for name, value in payloads:
+                getattr(json_codec, name)(value)
+            best = min(best, time.perf_counter() - start)
+    finally:
+        json_codec.configure()
+    return best
+
+
+def compare_codecs(actions: Optional[List[str]] = None, repeat: int = 5, **kwargs) -> dict:
+    """
+    对比标准库 json 与 orjson：运行一次基准并记录各动作经过 json_codec 的数据，
+    再分别以两种编解码器重放，得到每次调用的 JSON 耗时（微秒）与加速比
+
+    重放在模拟服务停止后进行，不受网络与服务线程干扰。
+
+    Raises:
+        ValueError: 未安装 orjson
+    """
+    if json_codec.orjson is None:
+        raise ValueError("未安装 orjson，无法对比 JSON 编解码器")
+    report = run_benchmark(actions, capture_json=True, **kwargs)
+    payloads = report.pop("json_payloads")
+    rows = []
+    for row in report["actions"]:
+        captured = payloads[row["action"]]
+        stdlib_us = _codec_seconds(captured, "stdlib", repeat) / row["requests"] * 1e6
+        orjson_us = _codec_seconds(captured, "orjson", repeat) / row["requests"] * 1e6
+        rows.append({
+            "action": row["action"],
+            "mean_ms": row["mean_ms"],
+            "json_bytes": sum(len(v) for name, v in captured if name == "loads" and isinstance(v, (str, bytes))),
+            "stdlib_json_us": round(stdlib_us, 1),
+            "orjson_json_us": round(orjson_us, 1),
+            "speedup": round(stdlib_us / orjson_us, 2) if orjson_us else None,
+        })
+    return {"config": report["config"], "actions": rows}
+
+
+def format_codec_comparison(comparison: dict) -> str:
+    requests = comparison["config"]["requests"]
+    lines = [
+        f"{'action':<28}{'mean ms':>10}{'in KB':>10}{'stdlib us':>12}{'orjson us':>12}{'speedup':>10}",
+        "-" * 82,
+    ]
+    for row in comparison["actions"]:
+        speedup = f"{row['speedup']:.2f}x" if row["speedup"] else "-"
+        lines.append(
+            f"{row['action']:<28}{row['mean_ms']:>10.3f}{row['json_bytes'] / requests / 1024:>10.1f}"
+            f"{row['stdlib_json_us']:>12.1f}{row['orjson_json_us']:>12.1f}{speedup:>10}"
+        )
+    lines.append("-" * 82)
+    lines.append("in KB: 每次调用解析的 JSON 体积；us: 每次调用的 JSON 编解码耗时（上游响应 + 交易输入 + 结果序列化）")
+    return "\n".join(lines)
+
+
+def check_thresholds(report: dict, max_p95_ms: Optional[float] = None,
+                     max_error_rate: Optional[float] = None) -> List[str]:
+    """返回不满足阈值的描述列表，空列表表示通过"""
+    failures = []
+    for row in report["actions"]:
+        if max_p95_ms is not None and row["p95_ms"] > max_p95_ms:
+            failures.append(f"{row['action']}: p95 {row['p95_ms']}ms > {max_p95_ms}ms")
+        if max_error_rate is not None and row["errors"] / row["requests"] > max_error_rate:
+            failures.append(f"{row['action']}: 错误率 {row['errors']}/{row['requests']} > {max_error_rate}")
+    return failures
+
+
+def format_report(report: dict) -> str:
+    cfg = report["config"]
+    if cfg.get("cassette_mode") == "replay":
+        upstream = f"回放 {cfg['cassette']} (耗时倍率 {cfg['replay_timing']})"
+    else:
+        upstream = f"上游延迟 {cfg['latency_ms']}ms (+{cfg['jitter_ms']}ms 抖动) | 错误注入 {cfg['error_rate']:.0%}"
+        if cfg.get("cassette"):
+            upstream += f" | 录制到 {cfg['cassette']}"
+    lines = [
+        f"并发 {cfg['concurrency']} | 每动作 {cfg['requests']} 次 | {upstream}",
+        "",
+        f"{'action':<28}{'p50':>9}{'p95':>9}{'p99':>9}{'rps':>10}{'upstream':>10}{'errors':>8}",
+        "-" * 83,
+    ]
+    for row in report["actions"]:
+        lines.append(
+            f"{row['action']:<28}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}{row['p99_ms']:>9.2f}"
+            f"{row['throughput_rps']:>10.1f}{row['upstream_per_call']:>10.2f}{row['errors']:>8}"
+        )
+    lines.append("-" * 83)
+    lines.append(f"合计 {report['total_requests']} 次调用，{report['total_errors']} 次失败（延迟单位 ms）")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="TRON MCP Server 端到端基准测试")
+    parser.add_argument("--concurrency", type=int, default=8, help="并发线程数")
+    parser.add_argument("--requests", type=int, default=50, help="每个动作的调用次数")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="模拟上游固定延迟")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="模拟上游随机抖动")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="上游返回 503 的概率 (0-1)")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子")
+    parser.add_argument("--actions", default="", help="逗号分隔的动作列表，默认全部")
+    parser.add_argument("--json", dest="json_path", help="把报告写入 JSON 文件（- 表示标准输出）")
+    parser.add_argument("--cassette", help="cassette 文件路径（.gz 结尾时压缩）")
+    parser.add_argument("--cassette-mode", choices=("record", "replay"), default="replay",
+                        help="record: 录制上游交互; replay: 离线回放")
+    parser.add_argument("--replay-timing", type=float, default=0.0,
+                        help="回放耗时倍率，1 表示按录制时的原始耗时")
+    parser.add_argument("--max-p95-ms", type=float, help="任一动作 p95 超过该值时失败")
+    parser.add_argument("--max-error-rate", type=float, help="任一动作错误率超过该值时失败")
+    parser.add_argument("--compare-codecs", action="store_true",
+                        help="对比标准库 json 与 orjson 在各动作上的 JSON 编解码耗时")
+    args = parser.parse_args(argv)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    actions = [a.strip() for a in args.actions.split(",") if a.strip()]
+    if args.compare_codecs:
+        comparison = compare_codecs(
+            actions or None, concurrency=args.concurrency, requests=args.requests,
+            latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate, seed=args.seed,
+        )
+        if args.json_path == "-":
+            print(json.dumps(comparison, ensure_ascii=False, indent=2))
+        else:
+            print(format_codec_comparison(comparison))
+        return 0
+    report = run_benchmark(
+        actions or None, args.concurrency, args.requests,
+        args.latency_ms, args.jitter_ms, args.error_rate, args.seed,
+        args.cassette, args.cassette_mode, args.replay_timing,
+    )
+    failures = check_thresholds(report, args.max_p95_ms, args.max_error_rate)
+    report["failures"] = failures
+
+    if args.json_path == "-":
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(format_report(report))
+        if args.json_path:
+            with open(args.json_path, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        for failure in failures:
+            print(f"❌ {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
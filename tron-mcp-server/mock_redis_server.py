@@ -0,0 +1,189 @@
+"""本地 Redis 协议替身
+=====================
+
+供测试与单机多 worker 部署使用：在本机起一个 TCP 服务，实现 tron_mcp_server.cache
+用到的 RESP 命令子集（PING / GET / SET [EX|PX] [NX] / DEL / EXISTS / SELECT / AUTH /
+FLUSHDB / DBSIZE），数据只保存在内存中。
+
+用法::
+
+    with MockRedisServer() as redis:
+        os.environ["TRON_CACHE_URL"] = redis.url
+        ...
+
+也可以单独运行，供多 worker 部署共享缓存::
+
+    python mock_redis_server.py --port 6380
+    TRON_CACHE_URL=redis://127.0.0.1:6380/0 python -m tron_mcp_server.server --http --workers 4
+"""
+
+import argparse
+import socketserver
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+
+def _encode(value) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, int):
+        return f":{value}\r\n".encode()
+    if isinstance(value, str):
+        return f"+{value}\r\n".encode()
+    return f"${len(value)}\r\n".encode() + value + b"\r\n"
+
+
+def _error(message: str) -> bytes:
+    return f"-ERR {message}\r\n".encode()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server.mock
+        db = 0
+        authed = server.password is None
+        while True:
+            try:
+                args = self._read_command()
+            except (ConnectionError, ValueError):
+                return
+            if args is None:
+                return
+            name = args[0].decode().upper()
+            server._record(name)
+            if name == "AUTH":
+                reply = server._execute(db, name, args[1:])
+                authed = reply.startswith(b"+")
+            elif not authed:
+                reply = b"-NOAUTH Authentication required.\r\n"
+            elif name == "SELECT":
+                db = int(args[1])
+                reply = _encode("OK")
+            else:
+                reply = server._execute(db, name, args[1:])
+            self.wfile.write(reply)
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            # inline 命令（如 telnet 中手动输入）
+            return line.strip().split()
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+
+class MockRedisServer:
+    """后台线程中运行的 Redis 协议替身
+
+    Args:
+        host / port: 监听地址，port=0 表示由系统分配
+        password: 设置后要求先 AUTH
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, password: Optional[str] = None):
+        self.password = password
+        self._dbs: Dict[int, Dict[bytes, Tuple[Optional[float], bytes]]] = {}
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._server = socketserver.ThreadingTCPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.mock = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        auth = f":{self.password}@" if self.password else ""
+        return f"redis://{auth}{host}:{port}/0"
+
+    def command_counts(self) -> dict:
+        """按命令统计的调用次数"""
+        with self._lock:
+            return dict(self._counts)
+
+    def _record(self, name: str):
+        with self._lock:
+            self._counts[name] += 1
+
+    def _execute(self, db: int, name: str, args) -> bytes:
+        with self._lock:
+            data = self._dbs.setdefault(db, {})
+            now = time.monotonic()
+            for key in [k for k, (expires, _) in data.items() if expires is not None and expires <= now]:
+                del data[key]
+
+            if name == "PING":
+                return _encode("PONG")
+            if name == "AUTH":
+                return _encode("OK") if args and args[-1].decode() == self.password else _error("invalid password")
+            if name == "GET":
+                item = data.get(args[0])
+                return _encode(item[1] if item else None)
+            if name == "SET":
+                key, value, options = args[0], args[1], [a.decode().upper() for a in args[2:]]
+                expires = None
+                if "EX" in options:
+                    expires = now + int(options[options.index("EX") + 1])
+                if "PX" in options:
+                    expires = now + int(options[options.index("PX") + 1]) / 1000
+                if "NX" in options and key in data:
+                    return _encode(None)
+                data[key] = (expires, value)
+                return _encode("OK")
+            if name == "DEL":
+                return _encode(sum(1 for key in args if data.pop(key, None) is not None))
+            if name == "EXISTS":
+                return _encode(sum(1 for key in args if key in data))
+            if name == "FLUSHDB":
+                data.clear()
+                return _encode("OK")
+            if name == "DBSIZE":
+                return _encode(len(data))
+        return _error(f"unknown command '{name}'")
+
+    def start(self) -> "MockRedisServer":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, name="mock-redis-server", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self) -> "MockRedisServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 Redis 协议替身")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6380)
+    parser.add_argument("--password", default=None)
+    args = parser.parse_args()
+
+    server = MockRedisServer(args.host, args.port, args.password)
+    print(f"🧪 Redis 替身已启动: TRON_CACHE_URL={server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
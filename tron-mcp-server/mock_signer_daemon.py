@@ -0,0 +1,140 @@
+"""本地签名守护进程替身
+======================
+
+供测试与手动调试 TRON_SIGNER=daemon 使用：在 Unix socket 上按 signer.py 中的协议
+（每行一个 JSON 请求 / 响应）提供 address 与 sign 两个方法，私钥只保存在本进程中。
+支持注入固定延迟，并按方法统计请求次数。
+
+用法::
+
+    with MockSignerDaemon(private_key_hex) as daemon:
+        os.environ.update(daemon.env())
+        ...
+
+也可以单独运行，私钥从 TRON_PRIVATE_KEY 读取::
+
+    TRON_PRIVATE_KEY=... python mock_signer_daemon.py --socket /tmp/tron-signer.sock
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socketserver
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+from tron_mcp_server import key_manager
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        daemon: "MockSignerDaemon" = self.server.daemon_ref
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                response = daemon._dispatch(request)
+            except Exception as e:
+                response = {"error": str(e)}
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class MockSignerDaemon:
+    """后台线程中运行的签名守护进程替身
+
+    Args:
+        private_key_hex: 签名私钥（64 位十六进制）
+        socket_path: socket 路径，默认在临时目录中创建
+        latency_ms: 每个请求固定增加的延迟（毫秒）
+    """
+
+    def __init__(self, private_key_hex: str, socket_path: Optional[str] = None, latency_ms: float = 0.0):
+        self.private_key_hex = private_key_hex
+        self.address = key_manager.get_address_from_private_key(private_key_hex)
+        self.latency_ms = latency_ms
+        self._tmp_dir = None
+        if socket_path is None:
+            self._tmp_dir = tempfile.mkdtemp(prefix="tron-signer-")
+            socket_path = os.path.join(self._tmp_dir, "signer.sock")
+        self.socket_path = socket_path
+        self._counts = Counter()
+        self._counts_lock = threading.Lock()
+        self._server = _Server(socket_path, _Handler)
+        self._server.daemon_ref = self
+        self._thread: Optional[threading.Thread] = None
+
+    def _dispatch(self, request: dict) -> dict:
+        method = request.get("method")
+        with self._counts_lock:
+            self._counts[method] += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        if method == "address":
+            return {"address": self.address}
+        if method == "sign":
+            digest = request.get("digest")
+            if not isinstance(digest, str) or len(bytes.fromhex(digest)) != 32:
+                return {"error": "digest 必须是 32 字节十六进制"}
+            return {"signature": key_manager.sign_transaction(digest, self.private_key_hex)}
+        return {"error": f"未知方法: {method}"}
+
+    def env(self) -> dict:
+        """把签名后端指向本守护进程所需的环境变量"""
+        return {"TRON_SIGNER": "daemon", "TRON_SIGNER_SOCKET": self.socket_path}
+
+    def request_counts(self) -> dict:
+        with self._counts_lock:
+            return dict(self._counts)
+
+    def start(self) -> "MockSignerDaemon":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, name="mock-signer-daemon", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        if self._tmp_dir:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+    def __enter__(self) -> "MockSignerDaemon":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地签名守护进程替身")
+    parser.add_argument("--socket", default="/tmp/tron-signer.sock")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    daemon = MockSignerDaemon(key_manager.load_private_key(), args.socket, args.latency_ms)
+    print(f"🧪 签名守护进程已启动: {daemon.socket_path}（地址 {daemon.address}）")
+    for key, value in daemon.env().items():
+        print(f"   {key}={value}")
+    try:
+        daemon._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon._server.server_close()
+        os.unlink(daemon.socket_path)
+
+
+if __name__ == "__main__":
+    main()
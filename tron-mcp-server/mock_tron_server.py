@@ -0,0 +1,594 @@
+"""本地模拟 TRONSCAN / TronGrid 服务
+====================================
+
+供 benchmark.py 与测试使用：在本机起一个 HTTP 服务，按真实接口的返回结构
+模拟 TRONSCAN (/api/...) 与 TronGrid (/wallet/...)，并支持注入延迟与错误。
+同时提供 /v1/traces 作为 OTLP/HTTP trace 接收端的替身（收到的数据保存在 traces 列表中）。
+区块高度默认随时间推进（3 秒一个区块）；调用 mine() 后改为手动出块，并可在新区块中放入指定交易。
+
+用法::
+
+    with MockTronServer(latency_ms=20, error_rate=0.01) as server:
+        os.environ.update(server.env())
+        ...
+
+测试用例可以继承 MockServerTestCase：每个用例启动一个模拟服务，并把客户端指向它::
+
+    class TestSomething(MockServerTestCase):
+        env_vars = {"TRON_CACHE_TTL_ACCOUNT": "60"}
+
+        def test_cached(self):
+            ...
+            self.assertEqual(self._count("/api/account"), 1)
+
+也可以单独运行，供手动调试::
+
+    python mock_tron_server.py --port 8090 --latency-ms 30
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import unittest
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlsplit
+
+from tron_mcp_server import cache
+from tron_mcp_server import config
+from tron_mcp_server import transaction
+
+# 模拟账户：5,000,000 TRX + 1,000,000 USDT，交易数 > 0 视为已激活
+MOCK_BALANCE_SUN = 5_000_000 * 1_000_000
+MOCK_USDT_RAW = 1_000_000 * 1_000_000
+MOCK_TXID = "a" * 64
+MOCK_SIMULATED_ENERGY = 31_895
+# /api/token_trc20 对任意合约返回的精度
+MOCK_TOKEN_DECIMALS = 8
+# 美元价格：trx 由 /api/token/price 返回，TRC20 合约由 /api/token_trc20 的 market_info 返回
+MOCK_PRICES_USD = {"trx": 0.25, config.get_usdt_contract(): 1.0}
+
+# 区块高度起点，之后按 3 秒出块推进
+_GENESIS_BLOCK = 60_000_000
+_GENESIS_TIME = time.time()
+
+
+def _block_number() -> int:
+    return _GENESIS_BLOCK + int((time.time() - _GENESIS_TIME) / 3)
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+# protocol.Transaction.Contract.ContractType
+_CONTRACT_TYPES = {"TransferContract": 1, "TriggerSmartContract": 31}
+
+
+def _hex_or_text(value: str) -> bytes:
+    try:
+        return bytes.fromhex(value)
+    except ValueError:
+        return value.encode("utf-8")
+
+
+def _encode_raw_data(raw_data: dict) -> bytes:
+    """按 protocol.Transaction.raw 的字段号编码 raw_data（合约参数值以 JSON 字节代替其 protobuf 编码）"""
+    encoded = b""
+    for contract in raw_data["contract"]:
+        parameter = contract["parameter"]
+        value = json.dumps(parameter["value"], sort_keys=True, separators=(",", ":")).encode()
+        any_bytes = (transaction._length_delimited(1, parameter["type_url"].encode())
+                     + transaction._length_delimited(2, value))
+        encoded += transaction._length_delimited(11, (
+            transaction._varint_field(1, _CONTRACT_TYPES.get(contract["type"], 0))
+            + transaction._length_delimited(2, any_bytes)
+        ))
+    data = raw_data.get("data")
+    return (
+        transaction._length_delimited(1, bytes.fromhex(raw_data["ref_block_bytes"]))
+        + transaction._length_delimited(4, bytes.fromhex(raw_data["ref_block_hash"]))
+        + transaction._varint_field(8, raw_data["expiration"])
+        + (transaction._length_delimited(10, _hex_or_text(data)) if data else b"")
+        + encoded
+        + transaction._varint_field(14, raw_data["timestamp"])
+        + (transaction._varint_field(18, raw_data["fee_limit"]) if raw_data.get("fee_limit") else b"")
+    )
+
+
+def build_transaction(contract_type: str, value: dict, extra_data: str = "",
+                      now_ms: Optional[int] = None, fee_limit: Optional[int] = None) -> dict:
+    """构造一笔结构上与 TronGrid 一致的未签名交易（raw_data_hex 为 protobuf，txID = sha256(raw_data_hex)）
+
+    指定 now_ms 时结果完全确定（引用区块固定），便于录制 / 回放。
+    """
+    block = _block_number() if now_ms is None else _GENESIS_BLOCK
+    now = _now_ms() if now_ms is None else now_ms
+    raw_data = {
+        "contract": [{
+            "parameter": {"value": value, "type_url": f"type.googleapis.com/protocol.{contract_type}"},
+            "type": contract_type,
+        }],
+        "ref_block_bytes": f"{block & 0xFFFF:04x}",
+        "ref_block_hash": hashlib.sha256(str(block).encode()).hexdigest()[:16],
+        "expiration": now + 60_000,
+        "timestamp": now,
+    }
+    if extra_data:
+        raw_data["data"] = extra_data
+    if fee_limit is not None:
+        raw_data["fee_limit"] = fee_limit
+    raw_data_hex = _encode_raw_data(raw_data).hex()
+    return {
+        "visible": False,
+        "txID": hashlib.sha256(bytes.fromhex(raw_data_hex)).hexdigest(),
+        "raw_data": raw_data,
+        "raw_data_hex": raw_data_hex,
+    }
+
+
+# ============ TRONSCAN ============
+
+def _account(query: dict, body: dict) -> dict:
+    return {
+        "address": query.get("address", ""),
+        "balance": MOCK_BALANCE_SUN,
+        "transactions": 128,
+        "trc20token_balances": [{
+            "tokenId": config.get_usdt_contract(),
+            "tokenName": "Tether USD",
+            "tokenAbbr": "USDT",
+            "tokenDecimal": 6,
+            "balance": str(MOCK_USDT_RAW),
+        }],
+        "tokenBalances": [
+            {"tokenName": "_", "balance": str(MOCK_BALANCE_SUN), "tokenDecimal": 6},
+            {"tokenName": "BitTorrent", "tokenAbbr": "BTT", "balance": "1500000", "tokenDecimal": 6},
+        ],
+    }
+
+
+def _accountv2(query: dict, body: dict) -> dict:
+    return {
+        "address": query.get("address", ""),
+        "redTag": "",
+        "greyTag": "",
+        "blueTag": "",
+        "publicTag": "",
+        "feedbackRisk": False,
+    }
+
+
+def _security(query: dict, body: dict) -> dict:
+    return {
+        "is_black_list": False,
+        "has_fraud_transaction": False,
+        "fraud_token_creator": False,
+        "send_ad_by_memo": False,
+    }
+
+
+def _chainparameters(query: dict, body: dict) -> dict:
+    return {"tronParameters": [
+        {"key": "getTransactionFee", "value": 1000},
+        {"key": "getEnergyFee", "value": 420},
+    ]}
+
+
+def _block(query: dict, body: dict) -> dict:
+    number = _block_number()
+    return {"total": number, "data": [{
+        "number": number,
+        "hash": hashlib.sha256(str(number).encode()).hexdigest(),
+        "timestamp": _now_ms(),
+    }]}
+
+
+def _transaction_info(query: dict, body: dict) -> dict:
+    return {
+        "hash": query.get("hash", MOCK_TXID),
+        "contractRet": "SUCCESS",
+        "confirmed": True,
+        "block": _block_number() - 20,
+        "ownerAddress": "TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7",
+        "toAddress": "TKyPzHiXW4Zms4txUxfWjXBidGzZpiCchn",
+        "contractType": 1,
+        "amount": 1_000_000,
+        "timestamp": _now_ms() - 60_000,
+        "cost": {"fee": 0},
+    }
+
+
+def _history_rows(query: dict, key_from: str, key_to: str, amount_key: str, extra: dict) -> list:
+    address = query.get("address") or query.get("relatedAddress") or ""
+    limit = int(query.get("limit", 10))
+    now = _now_ms()
+    rows = []
+    for i in range(limit):
+        row = {
+            "transactionHash": hashlib.sha256(f"{address}{i}".encode()).hexdigest(),
+            key_from: address,
+            key_to: "TKyPzHiXW4Zms4txUxfWjXBidGzZpiCchn",
+            amount_key: str((i + 1) * 1_000_000),
+            "timestamp": now - i * 60_000,
+            "confirmed": True,
+        }
+        row.update(extra)
+        rows.append(row)
+    return rows
+
+
+def _transfer(query: dict, body: dict) -> dict:
+    rows = _history_rows(query, "transferFromAddress", "transferToAddress", "amount",
+                         {"tokenName": "_", "tokenInfo": {"tokenAbbr": "trx", "tokenDecimal": 6}})
+    return {"total": 1000, "data": rows}
+
+
+def _trc20_transfers(query: dict, body: dict) -> dict:
+    rows = _history_rows(query, "from_address", "to_address", "quant", {
+        "block_ts": _now_ms(),
+        "tokenInfo": {"tokenAbbr": "USDT", "tokenDecimal": 6, "tokenId": config.get_usdt_contract()},
+    })
+    return {"total": 1000, "token_transfers": rows}
+
+
+def _token_trc20(query: dict, body: dict) -> dict:
+    contract = query.get("contract", "")
+    token = {
+        "contract_address": contract,
+        "name": "Mock Token",
+        "symbol": "MOCK",
+        "decimals": MOCK_TOKEN_DECIMALS,
+    }
+    if contract in MOCK_PRICES_USD:
+        token["market_info"] = {"priceInUsd": MOCK_PRICES_USD[contract]}
+    return {"total": 1, "trc20_tokens": [token]}
+
+
+def _token_price(query: dict, body: dict) -> dict:
+    # 与 TRONSCAN 一致：只提供 TRX 价格，其他代币返回错误
+    token = query.get("token", "")
+    if token != "trx":
+        return {"Error": f"unsupported token {token}"}
+    return {"token": token, "price_in_usd": MOCK_PRICES_USD[token]}
+
+
+def _internal_transaction(query: dict, body: dict) -> dict:
+    rows = _history_rows(query, "callerAddress", "transferToAddress", "callValue",
+                         {"callValueInfo": [{"callValue": 1_000_000}]})
+    return {"total": 200, "data": rows}
+
+
+# ============ TronGrid ============
+
+def _createtransaction(query: dict, body: dict) -> dict:
+    value = {
+        "amount": int(body.get("amount", 0)),
+        "owner_address": body.get("owner_address", ""),
+        "to_address": body.get("to_address", ""),
+    }
+    return build_transaction("TransferContract", value, body.get("extra_data", ""))
+
+
+def _triggersmartcontract(query: dict, body: dict) -> dict:
+    value = {
+        "data": "a9059cbb" + body.get("parameter", ""),
+        "owner_address": body.get("owner_address", ""),
+        "contract_address": body.get("contract_address", ""),
+    }
+    tx = build_transaction("TriggerSmartContract", value, body.get("extra_data", ""), fee_limit=body.get("fee_limit", 0))
+    return {"result": {"result": True}, "energy_used": 14_650, "transaction": tx}
+
+
+def _triggerconstantcontract(query: dict, body: dict) -> dict:
+    return {
+        "result": {"result": True},
+        "energy_used": MOCK_SIMULATED_ENERGY,
+        "energy_penalty": 0,
+        "constant_result": ["0" * 63 + "1"],
+        "transaction": {"ret": [{}]},
+    }
+
+
+def _broadcasttransaction(query: dict, body: dict) -> dict:
+    if not body.get("signature"):
+        return {"result": False, "code": "SIGERROR", "message": b"missing signature".hex()}
+    return {"result": True, "txid": body.get("txID", "")}
+
+
+def _broadcasthex(query: dict, body: dict) -> dict:
+    try:
+        tx = transaction.Transaction.from_protobuf(bytes.fromhex(body.get("transaction", "")))
+    except ValueError as e:
+        return {"result": False, "code": "OTHER_ERROR", "message": str(e).encode().hex()}
+    if not tx.signatures:
+        return {"result": False, "code": "SIGERROR", "message": b"missing signature".hex()}
+    return {"result": True, "txid": tx.txid_hex}
+
+
+def _getaccountresource(query: dict, body: dict) -> dict:
+    return {
+        "freeNetLimit": 600,
+        "freeNetUsed": 120,
+        "NetLimit": 5_000,
+        "NetUsed": 300,
+        "EnergyLimit": 100_000,
+        "EnergyUsed": 25_000,
+        "TotalNetLimit": 43_200_000_000,
+        "TotalNetWeight": 26_000_000_000,
+        "TotalEnergyLimit": 180_000_000_000,
+        "TotalEnergyWeight": 16_000_000_000,
+    }
+
+
+def _block_payload(number: int, transactions: list) -> dict:
+    """TronGrid 格式的区块：blockID 前 8 字节为区块高度"""
+    return {
+        "blockID": f"{number:016x}" + hashlib.sha256(str(number).encode()).hexdigest()[16:],
+        "block_header": {"raw_data": {"number": number, "timestamp": _now_ms()}},
+        "transactions": transactions,
+    }
+
+
+ROUTES = {
+    "/api/account": _account,
+    "/api/accountv2": _accountv2,
+    "/api/security/account/data": _security,
+    "/api/chainparameters": _chainparameters,
+    "/api/block": _block,
+    "/api/transaction-info": _transaction_info,
+    "/api/transfer": _transfer,
+    "/api/token_trc20/transfers": _trc20_transfers,
+    "/api/token_trc20": _token_trc20,
+    "/api/token/price": _token_price,
+    "/api/internal-transaction": _internal_transaction,
+    "/wallet/createtransaction": _createtransaction,
+    "/wallet/triggersmartcontract": _triggersmartcontract,
+    "/wallet/triggerconstantcontract": _triggerconstantcontract,
+    "/wallet/broadcasttransaction": _broadcasttransaction,
+    "/wallet/broadcasthex": _broadcasthex,
+    "/wallet/getaccountresource": _getaccountresource,
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # 压测时不输出访问日志
+
+    def do_GET(self):
+        self._dispatch({})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        try:
+            body = json.loads(raw) if raw else {}
+        except ValueError:
+            self._reply(400, {"Error": "invalid json"})
+            return
+        self._dispatch(body if isinstance(body, dict) else {})
+
+    def _dispatch(self, body: dict):
+        mock = self.server.mock
+        parts = urlsplit(self.path)
+        path = parts.path.rstrip("/")
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        mock._record(path)
+
+        if path == "/v1/traces":
+            # OTLP/HTTP JSON 接收端替身：保存收到的 trace，不注入延迟与错误
+            mock._collect(body)
+            self._reply(200, {})
+            return
+
+        delay, inject_error = mock._plan()
+        if delay:
+            time.sleep(delay)
+
+        route = ROUTES.get(path) or mock.block_routes().get(path)
+        if route is None:
+            self._reply(404, {"Error": f"unknown path {path}"})
+        elif inject_error:
+            self._reply(503, {"Error": "injected failure"})
+        else:
+            self._reply(200, route(query, body))
+
+    def _reply(self, status: int, payload: dict):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class MockTronServer:
+    """后台线程中运行的模拟 TRONSCAN / TronGrid 服务
+
+    Args:
+        latency_ms: 每个请求固定增加的延迟（毫秒）
+        jitter_ms: 在固定延迟之上再叠加 [0, jitter_ms) 的随机延迟
+        error_rate: 返回 HTTP 503 的概率 (0-1)
+        seed: 随机数种子，便于复现
+        host / port: 监听地址，port=0 表示由系统分配
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        if not 0 <= error_rate <= 1:
+            raise ValueError("error_rate 必须在 0-1 之间")
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self.traces = []
+        self._height: Optional[int] = None
+        self._block_transactions = {}
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.mock = self
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> dict:
+        """把客户端指向本服务所需的环境变量"""
+        return {
+            "TRONSCAN_API_URL": f"{self.base_url}/api",
+            "TRONSCAN_SECURITY_API_URL": f"{self.base_url}/api",
+            "TRONGRID_API_URL": self.base_url,
+        }
+
+    def request_counts(self) -> dict:
+        """按路径统计的请求数"""
+        with self._lock:
+            return dict(self._counts)
+
+    # ---- 区块 ----
+
+    def current_block(self) -> int:
+        with self._lock:
+            return self._height if self._height is not None else _block_number()
+
+    def mine(self, transactions: list = (), count: int = 1) -> int:
+        """切换为手动出块：推进 count 个区块，transactions 放入最后一个区块，返回新高度"""
+        with self._lock:
+            if self._height is None:
+                self._height = _block_number()
+            self._height += count
+            self._block_transactions[self._height] = list(transactions)
+            return self._height
+
+    def _block(self, number: int) -> dict:
+        with self._lock:
+            transactions = list(self._block_transactions.get(number, []))
+        return _block_payload(number, transactions)
+
+    def block_routes(self) -> dict:
+        """依赖出块状态的 TronGrid 接口"""
+        def getnowblock(query, body):
+            return self._block(self.current_block())
+
+        def getblockbynum(query, body):
+            number = int(body.get("num", 0))
+            return self._block(number) if number <= self.current_block() else {}
+
+        def getblockbylimitnext(query, body):
+            start, end = int(body.get("startNum", 0)), int(body.get("endNum", 0))
+            end = min(end, self.current_block() + 1, start + 100)
+            blocks = [self._block(n) for n in range(start, end)]
+            return {"block": blocks} if blocks else {}
+
+        return {
+            "/wallet/getnowblock": getnowblock,
+            "/wallet/getblockbynum": getblockbynum,
+            "/wallet/getblockbylimitnext": getblockbylimitnext,
+        }
+
+    def reset_counts(self):
+        with self._lock:
+            self._counts.clear()
+
+    def _record(self, path: str):
+        with self._lock:
+            self._counts[path] += 1
+
+    def _collect(self, payload: dict):
+        with self._lock:
+            self.traces.append(payload)
+
+    def _plan(self):
+        with self._lock:
+            jitter = self._random.random() * self.jitter_ms if self.jitter_ms else 0.0
+            inject_error = self.error_rate > 0 and self._random.random() < self.error_rate
+        return (self.latency_ms + jitter) / 1000, inject_error
+
+    def start(self) -> "MockTronServer":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-tron-server", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self) -> "MockTronServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class MockServerTestCase(unittest.TestCase):
+    """
+    测试基类：每个用例启动一个 MockTronServer，环境变量指向它，前后清空缓存
+
+    env_vars 为额外的环境变量（如 TRON_CACHE_TTL_*）；依赖临时目录等运行时值的子类
+    可以在调用 super().setUp() 之前给 self.env_vars 赋值。
+    """
+
+    env_vars: dict = {}
+
+    def setUp(self):
+        cache.reset()
+        self.server = MockTronServer().start()
+        self.env = patch.dict(os.environ, dict(self.server.env(), **self.env_vars))
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        self.server.stop()
+        cache.reset()
+
+    def _count(self, path: str) -> int:
+        """模拟服务收到的某个路径的请求数"""
+        return self.server.request_counts().get(path, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟 TRONSCAN / TronGrid 服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = MockTronServer(args.latency_ms, args.jitter_ms, args.error_rate, host=args.host, port=args.port)
+    print(f"🧪 模拟服务已启动: {server.base_url}")
+    for key, value in server.env().items():
+        print(f"   {key}={value}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
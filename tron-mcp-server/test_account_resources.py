@@ -7,6 +7,9 @@
 - Energy 查询（零能量、有能量、能量耗尽）
 - Bandwidth 查询（仅免费带宽、有质押带宽）
 - Formatters 测试
+- 合并查询 get_account_resources（一次上游请求）
+- 资源快照缓存共享与按 24 小时恢复模型推算
+- check_sender_balance 使用资源快照抵扣手续费
 """
 
 import unittest
@@ -352,6 +355,135 @@ class TestFormatters(unittest.TestCase):
         self.assertIn("TRX 转账", formatted["summary"])
 
 
+class TestAccountResourcesHandler(unittest.TestCase):
+    """测试 call_router._handle_get_account_resources"""
+
+    def test_invalid_address_format(self):
+        from tron_mcp_server import call_router
+
+        result = call_router.call("get_account_resources", {"address": "bad_address"})
+        self.assertEqual(result["error"], "invalid_address")
+
+    @patch('tron_mcp_server.trongrid_client._post')
+    def test_energy_and_bandwidth_in_one_request(self, mock_post):
+        from tron_mcp_server import call_router
+
+        mock_post.return_value = {
+            "freeNetLimit": 600,
+            "freeNetUsed": 100,
+            "NetLimit": 1000,
+            "NetUsed": 0,
+            "EnergyLimit": 130000,
+            "EnergyUsed": 30000,
+        }
+
+        result = call_router.call("get_account_resources", {
+            "address": "TXYZopYRdj2D9XRtbG411XZZ3kM5VkAeBf"
+        })
+
+        self.assertNotIn("error", result)
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(result["energy"]["energy_remaining"], 100000)
+        self.assertEqual(result["bandwidth"]["total_remaining"], 1500)
+        self.assertIn("能量", result["summary"])
+        self.assertIn("带宽", result["summary"])
+
+
+class TestResourceSnapshot(unittest.TestCase):
+    """测试资源快照缓存（TRON_CACHE_TTL_ACCOUNT_RESOURCE 开启时）"""
+
+    ADDRESS = "TXYZopYRdj2D9XRtbG411XZZ3kM5VkAeBf"
+
+    def setUp(self):
+        from tron_mcp_server import cache
+        cache.reset()
+        self.env = patch.dict(os.environ, {"TRON_CACHE_TTL_ACCOUNT_RESOURCE": "86400"})
+        self.env.start()
+        self.post = patch('tron_mcp_server.trongrid_client._post', return_value={
+            "freeNetLimit": 600,
+            "freeNetUsed": 600,
+            "NetLimit": 1000,
+            "NetUsed": 400,
+            "EnergyLimit": 100000,
+            "EnergyUsed": 65000,
+        })
+        self.mock_post = self.post.start()
+
+    def tearDown(self):
+        from tron_mcp_server import cache
+        self.post.stop()
+        self.env.stop()
+        cache.reset()
+
+    def test_shared_by_all_accessors(self):
+        from tron_mcp_server import fee_estimator, tron_client
+
+        tron_client.get_account_energy(self.ADDRESS)
+        tron_client.get_account_bandwidth(self.ADDRESS)
+        tron_client.get_account_resources(self.ADDRESS)
+        with patch('tron_mcp_server.tron_client.get_chain_prices', side_effect=ValueError("down")):
+            estimate = fee_estimator.estimate_fee(self.ADDRESS, None, 1.0, "USDT")
+        self.assertEqual(estimate["energy_available"], 35000)
+        self.assertEqual(estimate["bandwidth_source"], "staked")
+        self.assertEqual(self.mock_post.call_count, 1)
+
+    def test_usage_recovers_without_refetch(self):
+        import time
+        from tron_mcp_server import tron_client
+
+        fresh = tron_client.get_account_resources(self.ADDRESS)
+        self.assertEqual(fresh["bandwidth"]["free_net_remaining"], 0)
+        self.assertEqual(fresh["energy"]["energy_used"], 65000)
+
+        later = time.time() + tron_client.RESOURCE_RECOVERY_SECONDS / 2
+        with patch('tron_mcp_server.tron_client.time.time', return_value=later):
+            half = tron_client.get_account_resources(self.ADDRESS)
+        self.assertEqual(self.mock_post.call_count, 1)
+        self.assertEqual(half["bandwidth"]["free_net_used"], 300)
+        self.assertEqual(half["bandwidth"]["net_used"], 200)
+        self.assertEqual(half["energy"]["energy_used"], 32500)
+        self.assertGreaterEqual(half["snapshot_age"], 43000)
+
+        with patch('tron_mcp_server.tron_client.time.time', return_value=later * 2):
+            recovered = tron_client.get_account_bandwidth(self.ADDRESS)
+        self.assertEqual(recovered["free_net_remaining"], 600)
+
+    def test_recovered_rounds_up(self):
+        from tron_mcp_server import tron_client
+
+        self.assertEqual(tron_client._recovered(25000, 0.001), 25000)
+        self.assertEqual(tron_client._recovered(0, 1000), 0)
+
+
+class TestSenderBalanceResources(unittest.TestCase):
+    """测试 check_sender_balance 使用账户资源抵扣手续费"""
+
+    @patch('tron_mcp_server.tron_client.get_account_resources')
+    @patch('tron_mcp_server.tron_client.get_usdt_balance', return_value=50.0)
+    @patch('tron_mcp_server.tron_client.get_balance_trx', return_value=5.0)
+    def test_staked_energy_covers_fee(self, mock_trx, mock_usdt, mock_resources):
+        from tron_mcp_server.tx_builder import check_sender_balance
+
+        mock_resources.return_value = {
+            "energy": {"energy_remaining": 100000},
+            "bandwidth": {"free_net_remaining": 600, "net_remaining": 0},
+        }
+        with patch('tron_mcp_server.tron_client.get_chain_prices', side_effect=ValueError("down")):
+            result = check_sender_balance("TXYZopYRdj2D9XRtbG411XZZ3kM5VkAeBf", 20.0, "USDT")
+        self.assertTrue(result["sufficient"])
+
+    @patch('tron_mcp_server.tron_client.get_account_resources', side_effect=ValueError("down"))
+    @patch('tron_mcp_server.tron_client.get_usdt_balance', return_value=50.0)
+    @patch('tron_mcp_server.tron_client.get_balance_trx', return_value=5.0)
+    def test_lookup_failure_uses_daily_model(self, mock_trx, mock_usdt, mock_resources):
+        from tron_mcp_server.tx_builder import check_sender_balance, InsufficientBalanceError
+
+        with self.assertRaises(InsufficientBalanceError) as cm, \
+                patch('tron_mcp_server.tron_client.get_chain_prices', side_effect=ValueError("down")):
+            check_sender_balance("TXYZopYRdj2D9XRtbG411XZZ3kM5VkAeBf", 20.0, "USDT")
+        self.assertEqual(cm.exception.error_code, "insufficient_trx_for_gas")
+
+
 class TestServerTools(unittest.TestCase):
     """测试 server.py 中的 MCP 工具注册"""
 
@@ -367,6 +499,12 @@ class TestServerTools(unittest.TestCase):
         
         self.assertTrue(hasattr(server, 'tron_get_account_bandwidth'))
 
+    def test_resources_tool_exists(self):
+        """验证 tron_get_account_resources 工具已注册"""
+        from tron_mcp_server import server
+        
+        self.assertTrue(hasattr(server, 'tron_get_account_resources'))
+
 
 if __name__ == '__main__':
     unittest.main()
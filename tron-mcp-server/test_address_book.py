@@ -11,6 +11,7 @@
 6. resolve_address 函数（合法地址直接返回 vs 别名查找）
 7. 空地址簿场景
 8. 地址验证（通过 call_router 调用时验证地址格式）
+9. 内存索引（mtime 失效）、反向索引、原子写入与多进程并发写入
 """
 
 import unittest
@@ -18,6 +19,8 @@ import sys
 import os
 import tempfile
 import json
+import shutil
+import subprocess
 from pathlib import Path
 
 # 强制 UTF-8 编码
@@ -332,5 +335,112 @@ class TestAddressBookViaCallRouter(unittest.TestCase):
         self.assertIn("已删除联系人", result["summary"])
 
 
+class TestAddressBookIndex(unittest.TestCase):
+    """测试地址簿内存索引、原子写入与文件锁"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.temp_file = Path(self.temp_dir) / "book.json"
+        self.env_patcher = patch.dict(os.environ, {"TRON_ADDRESSBOOK_PATH": str(self.temp_file)})
+        self.env_patcher.start()
+
+    def tearDown(self):
+        self.env_patcher.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_lookup_uses_memory_index(self):
+        """文件未变化时，重复查询不应重新读盘"""
+        address_book.add_contact("小明", "TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7")
+
+        with patch.object(address_book, "_read_file", wraps=address_book._read_file) as mock_read:
+            for _ in range(5):
+                self.assertTrue(address_book.lookup("小明")["found"])
+            address_book.resolve_address("小明")
+            address_book.list_contacts()
+
+        mock_read.assert_not_called()
+
+    def test_external_write_invalidates_index(self):
+        """其他进程修改文件后（签名变化），索引应自动重新加载"""
+        address_book.add_contact("小明", "TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7")
+
+        data = json.loads(self.temp_file.read_text(encoding="utf-8"))
+        data["老板"] = {"address": "TKyPzHiXW4Zms4txUxfWjXBidGzZpiCchn", "note": "外部写入"}
+        tmp = Path(self.temp_dir) / "external.tmp"
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.temp_file)
+
+        result = address_book.lookup("老板")
+        self.assertTrue(result["found"])
+        self.assertEqual(result["note"], "外部写入")
+
+    def test_reverse_lookup(self):
+        """反向索引：地址 → 别名列表"""
+        address_book.add_contact("小明", "TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7")
+        address_book.add_contact("明哥", "TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7")
+        address_book.add_contact("老板", "TKyPzHiXW4Zms4txUxfWjXBidGzZpiCchn")
+
+        result = address_book.reverse_lookup("TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7")
+        self.assertTrue(result["found"])
+        self.assertEqual(sorted(result["aliases"]), ["小明", "明哥"])
+
+        address_book.remove_contact("小明")
+        result = address_book.reverse_lookup("TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7")
+        self.assertEqual(result["aliases"], ["明哥"])
+
+        result = address_book.reverse_lookup("TPepEjJgigAbcGWkxnyjdCE2X8ZQanAXbW")
+        self.assertFalse(result["found"])
+        self.assertEqual(result["aliases"], [])
+
+    def test_atomic_write_leaves_no_temp_files(self):
+        """原子写入后目录中只应保留地址簿文件本身"""
+        address_book.add_contact("小明", "TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7")
+        address_book.add_contact("老板", "TKyPzHiXW4Zms4txUxfWjXBidGzZpiCchn")
+        address_book.remove_contact("小明")
+
+        self.assertEqual(os.listdir(self.temp_dir), ["book.json"])
+
+    def test_failed_write_keeps_original_file(self):
+        """序列化失败时原文件保持不变"""
+        address_book.add_contact("小明", "TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7")
+        before = self.temp_file.read_bytes()
+
+        with patch.object(address_book.json, "dump", side_effect=IOError("disk full")):
+            with self.assertRaises(IOError):
+                address_book.add_contact("老板", "TKyPzHiXW4Zms4txUxfWjXBidGzZpiCchn")
+
+        self.assertEqual(self.temp_file.read_bytes(), before)
+        self.assertEqual(os.listdir(self.temp_dir), ["book.json"])
+        self.assertFalse(address_book.lookup("老板")["found"])
+
+    def test_remove_missing_does_not_rewrite(self):
+        """删除不存在的联系人不应重写文件"""
+        address_book.add_contact("小明", "TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7")
+
+        with patch.object(address_book, "_save_addressbook") as mock_save:
+            address_book.remove_contact("不存在")
+
+        mock_save.assert_not_called()
+
+    def test_concurrent_writers_do_not_lose_updates(self):
+        """多个进程并发写入同一地址簿，所有联系人都应保留"""
+        script = (
+            "import sys\n"
+            "from tron_mcp_server import address_book\n"
+            "worker = sys.argv[1]\n"
+            "for i in range(15):\n"
+            "    address_book.add_contact(f'w{worker}-{i}', 'TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7')\n"
+        )
+        env = dict(os.environ, TRON_ADDRESSBOOK_PATH=str(self.temp_file))
+        procs = [
+            subprocess.Popen([sys.executable, "-c", script, str(w)], cwd=project_root, env=env)
+            for w in range(4)
+        ]
+        for proc in procs:
+            self.assertEqual(proc.wait(timeout=60), 0)
+
+        self.assertEqual(address_book.list_contacts()["total"], 60)
+
+
 if __name__ == "__main__":
     unittest.main()
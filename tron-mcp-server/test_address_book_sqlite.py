@@ -0,0 +1,321 @@
+"""
+测试地址簿 SQLite 后端、标签、分页搜索与批量导入导出
+=====================================================
+
+覆盖场景：
+1. 后端选择（扩展名 / TRON_ADDRESSBOOK_BACKEND）
+2. JSON 与 SQLite 两种后端行为一致：增删查、模糊搜索、反查、标签、分页、搜索
+3. SQLite 索引与旧 JSON 地址簿自动迁移
+4. CSV / JSON 导入（逐行错误）与导出往返
+5. 多进程并发写入 SQLite
+6. call_router 的 addressbook_list 分页与 addressbook_search 动作
+"""
+
+import unittest
+import sys
+import os
+import json
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+from pathlib import Path
+
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from unittest.mock import patch
+
+from tron_mcp_server import address_book
+from tron_mcp_server import call_router
+
+ADDR_1 = "TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7"
+ADDR_2 = "TKyPzHiXW4Zms4txUxfWjXBidGzZpiCchn"
+ADDR_3 = "TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t"
+
+
+class _BackendTestMixin:
+    """两种后端共用的行为测试，子类指定地址簿文件名"""
+
+    filename = None
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = Path(self.temp_dir) / self.filename
+        self.env_patcher = patch.dict(os.environ, {"TRON_ADDRESSBOOK_PATH": str(self.path)})
+        self.env_patcher.start()
+        os.environ.pop("TRON_ADDRESSBOOK_BACKEND", None)
+
+    def tearDown(self):
+        address_book._close_sqlite_books()
+        self.env_patcher.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_add_update_keeps_created_at_and_tags(self):
+        """更新联系人时保留创建时间；未传 tags 时保留原标签"""
+        first = address_book.add_contact("小明", ADDR_1, "同学", tags=["朋友", " 同学 ", "朋友"])
+        self.assertEqual(first["tags"], ["朋友", "同学"])
+        self.assertFalse(first["is_update"])
+        created_at = address_book.lookup("小明")["created_at"]
+
+        second = address_book.add_contact("小明", ADDR_2, "换了新地址")
+        self.assertTrue(second["is_update"])
+        self.assertEqual(second["tags"], ["朋友", "同学"])
+        self.assertEqual(second["total_contacts"], 1)
+
+        result = address_book.lookup("小明")
+        self.assertEqual(result["address"], ADDR_2)
+        self.assertEqual(result["created_at"], created_at)
+
+    def test_remove_and_lookup(self):
+        """删除后精确查找失败，模糊搜索仍返回相似别名"""
+        address_book.add_contact("binance-hot", ADDR_1)
+        address_book.add_contact("binance-cold", ADDR_2)
+
+        removed = address_book.remove_contact("binance-hot")
+        self.assertTrue(removed["found"])
+        self.assertEqual(removed["removed_address"], ADDR_1)
+        self.assertEqual(removed["total_contacts"], 1)
+        self.assertFalse(address_book.remove_contact("binance-hot")["found"])
+
+        result = address_book.lookup("binance-hot")
+        self.assertFalse(result["found"])
+        self.assertEqual([m["alias"] for m in result["similar_matches"]], ["binance-cold"])
+
+    def test_reverse_lookup(self):
+        """同一地址的多个别名按添加顺序返回"""
+        address_book.add_contact("老板", ADDR_1)
+        address_book.add_contact("公司财务", ADDR_1)
+        address_book.add_contact("小明", ADDR_2)
+
+        self.assertEqual(address_book.reverse_lookup(ADDR_1)["aliases"], ["老板", "公司财务"])
+        self.assertFalse(address_book.reverse_lookup(ADDR_3)["found"])
+
+    def test_list_pagination_and_tag_filter(self):
+        """分页返回总数与当前页，按创建时间倒序"""
+        for i in range(5):
+            with patch.object(address_book, "datetime") as mock_dt:
+                mock_dt.now.return_value.isoformat.return_value = f"2024-01-0{i + 1}T00:00:00"
+                address_book.add_contact(f"c{i}", ADDR_1, tags=["even"] if i % 2 == 0 else [])
+
+        page = address_book.list_contacts(limit=2, offset=1)
+        self.assertEqual(page["total"], 5)
+        self.assertEqual([c["alias"] for c in page["contacts"]], ["c3", "c2"])
+
+        tagged = address_book.list_contacts(tag="even")
+        self.assertEqual(tagged["total"], 3)
+        self.assertEqual([c["alias"] for c in tagged["contacts"]], ["c4", "c2", "c0"])
+
+    def test_search_by_note_tag_and_wildcards(self):
+        """在别名 / 备注 / 地址中搜索，LIKE 通配符按字面匹配"""
+        address_book.add_contact("小明", ADDR_1, "公司财务", tags=["员工"])
+        address_book.add_contact("老王", ADDR_2, "100% 可信")
+        address_book.add_contact("scam-1", ADDR_3, "钓鱼地址", tags=["scam"])
+
+        self.assertEqual([c["alias"] for c in address_book.search_contacts("财务")["contacts"]], ["小明"])
+        self.assertEqual([c["alias"] for c in address_book.search_contacts("%")["contacts"]], ["老王"])
+        self.assertEqual(address_book.search_contacts("_")["total"], 0)
+        self.assertEqual(address_book.search_contacts(tag="scam")["contacts"][0]["tags"], ["scam"])
+        self.assertEqual(address_book.search_contacts(ADDR_2[:8])["total"], 1)
+        self.assertEqual(address_book.search_contacts("地址", tag="员工")["total"], 0)
+
+    def test_import_csv_reports_row_errors(self):
+        """CSV 导入逐行报告错误，合法行在一次写入中生效"""
+        source = Path(self.temp_dir) / "contacts.csv"
+        source.write_text(
+            "alias,address,note,tags\n"
+            f"小明,{ADDR_1},同学,朋友;同学\n"
+            f",{ADDR_2},,\n"
+            "老王,not-an-address,,\n"
+            f"老板,{ADDR_2},,\n",
+            encoding="utf-8",
+        )
+
+        result = address_book.import_contacts(source)
+        self.assertEqual(result["imported"], 2)
+        self.assertEqual([e["row"] for e in result["errors"]], [3, 4])
+        self.assertEqual(result["errors"][1]["alias"], "老王")
+        self.assertEqual(address_book.lookup("小明")["tags"], ["朋友", "同学"])
+
+        again = address_book.import_contacts(source, overwrite=False)
+        self.assertEqual((again["imported"], again["skipped"]), (0, 2))
+
+    def test_export_import_round_trip(self):
+        """导出的 CSV / JSON 可以无损导入"""
+        address_book.add_contact("小明", ADDR_1, "同学", tags=["朋友"])
+        address_book.add_contact("老板", ADDR_2, "公司")
+        original = {c["alias"]: c for c in address_book.list_contacts()["contacts"]}
+
+        for fmt in ("csv", "json"):
+            with self.subTest(fmt=fmt):
+                exported = Path(self.temp_dir) / f"export.{fmt}"
+                self.assertEqual(address_book.export_contacts(exported)["total"], 2)
+
+                address_book.remove_contact("小明")
+                address_book.remove_contact("老板")
+                result = address_book.import_contacts(exported)
+                self.assertEqual((result["imported"], result["errors"]), (2, []))
+                restored = {c["alias"]: c for c in address_book.list_contacts()["contacts"]}
+                self.assertEqual(restored, original)
+
+    def test_import_unsupported_format(self):
+        """不支持的文件格式抛出 ValueError"""
+        with self.assertRaises(ValueError):
+            address_book.import_contacts(Path(self.temp_dir) / "contacts.xlsx")
+
+
+class TestJsonBackend(_BackendTestMixin, unittest.TestCase):
+    """JSON 后端"""
+
+    filename = "book.json"
+
+    def test_uses_json_file(self):
+        address_book.add_contact("小明", ADDR_1, tags=["朋友"])
+        data = json.loads(self.path.read_text(encoding="utf-8"))
+        self.assertEqual(data["小明"]["tags"], ["朋友"])
+
+
+class TestSQLiteBackend(_BackendTestMixin, unittest.TestCase):
+    """SQLite 后端"""
+
+    filename = "book.db"
+
+    def test_uses_sqlite_file(self):
+        """.db 扩展名使用 SQLite 存储，不生成 JSON 文件"""
+        address_book.add_contact("小明", ADDR_1)
+        with sqlite3.connect(str(self.path)) as conn:
+            rows = conn.execute("SELECT alias, address FROM contacts").fetchall()
+        self.assertEqual(rows, [("小明", ADDR_1)])
+        self.assertFalse(self.path.with_suffix(".json").exists())
+
+    def test_address_and_tag_queries_use_indexes(self):
+        """地址反查与标签过滤走索引"""
+        address_book.add_contact("小明", ADDR_1)
+        with sqlite3.connect(str(self.path)) as conn:
+            plan = " ".join(
+                str(row) for row in conn.execute(
+                    "EXPLAIN QUERY PLAN SELECT alias FROM contacts WHERE address = ?", (ADDR_1,)
+                )
+            )
+            self.assertIn("idx_contacts_address", plan)
+            plan = " ".join(
+                str(row) for row in conn.execute(
+                    "EXPLAIN QUERY PLAN SELECT alias FROM contact_tags WHERE tag = ?", ("scam",)
+                )
+            )
+            self.assertIn("idx_contact_tags_tag", plan)
+
+    def test_migrates_legacy_json(self):
+        """新建 SQLite 地址簿时自动导入同名 JSON 旧地址簿"""
+        address_book._close_sqlite_books()
+        self.path.with_suffix(".json").write_text(json.dumps({
+            "小明": {"address": ADDR_1, "note": "同学", "created_at": "2024-01-01T00:00:00", "updated_at": None},
+            "坏数据": "not-a-dict",
+        }, ensure_ascii=False), encoding="utf-8")
+
+        result = address_book.lookup("小明")
+        self.assertTrue(result["found"])
+        self.assertEqual(result["created_at"], "2024-01-01T00:00:00")
+        self.assertEqual(address_book.list_contacts()["total"], 1)
+
+    def test_sees_writes_from_other_connections(self):
+        """其他连接（进程）写入后，模糊搜索索引随之更新"""
+        address_book.add_contact("binance-hot", ADDR_1)
+        self.assertEqual(len(address_book.lookup("binance")["similar_matches"]), 1)
+
+        with sqlite3.connect(str(self.path)) as conn:
+            conn.execute(
+                "INSERT INTO contacts (alias, address, created_at) VALUES (?, ?, ?)",
+                ("binance-cold", ADDR_2, "2024-01-01T00:00:00"),
+            )
+        self.assertEqual(len(address_book.lookup("binance")["similar_matches"]), 2)
+        self.assertEqual(address_book.reverse_lookup(ADDR_2)["aliases"], ["binance-cold"])
+
+    def test_concurrent_writers_do_not_lose_updates(self):
+        """多个进程并发添加联系人，不丢失任何一条"""
+        script = (
+            "import sys\n"
+            "from tron_mcp_server import address_book\n"
+            "worker = sys.argv[1]\n"
+            "for i in range(15):\n"
+            f"    address_book.add_contact(f'w{{worker}}-{{i}}', '{ADDR_1}')\n"
+        )
+        env = {**os.environ, "TRON_ADDRESSBOOK_PATH": str(self.path)}
+        procs = [
+            subprocess.Popen([sys.executable, "-c", script, str(w)], cwd=project_root, env=env)
+            for w in range(4)
+        ]
+        for proc in procs:
+            self.assertEqual(proc.wait(timeout=120), 0)
+        self.assertEqual(address_book.list_contacts()["total"], 60)
+
+
+class TestBackendSelection(unittest.TestCase):
+    """测试后端选择"""
+
+    def test_backend_setting_overrides_extension(self):
+        """TRON_ADDRESSBOOK_BACKEND 优先于扩展名"""
+        with patch.dict(os.environ, {"TRON_ADDRESSBOOK_BACKEND": "sqlite"}):
+            self.assertTrue(address_book._uses_sqlite(Path("book.json")))
+        with patch.dict(os.environ, {"TRON_ADDRESSBOOK_BACKEND": "json"}):
+            self.assertFalse(address_book._uses_sqlite(Path("book.sqlite3")))
+        with patch.dict(os.environ, {"TRON_ADDRESSBOOK_BACKEND": ""}):
+            self.assertTrue(address_book._uses_sqlite(Path("book.SQLITE")))
+            self.assertFalse(address_book._uses_sqlite(Path("book.json")))
+
+    def test_default_path_follows_backend(self):
+        """未设置路径时，SQLite 后端默认使用 address_book.db"""
+        with tempfile.TemporaryDirectory() as home:
+            with patch.dict(os.environ, {"TRON_ADDRESSBOOK_BACKEND": "sqlite"}), \
+                    patch.object(Path, "home", return_value=Path(home)):
+                os.environ.pop("TRON_ADDRESSBOOK_PATH", None)
+                self.assertEqual(address_book._get_storage_path().name, "address_book.db")
+
+
+class TestAddressBookRouting(unittest.TestCase):
+    """测试 call_router 地址簿分页与搜索动作"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.env_patcher = patch.dict(
+            os.environ, {"TRON_ADDRESSBOOK_PATH": str(Path(self.temp_dir) / "book.db")}
+        )
+        self.env_patcher.start()
+
+    def tearDown(self):
+        address_book._close_sqlite_books()
+        self.env_patcher.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_add_with_tags_and_search(self):
+        """addressbook_add 支持标签，addressbook_search 按标签返回"""
+        result = call_router.call("addressbook_add", {"alias": "scam-1", "address": ADDR_1, "tags": ["scam"]})
+        self.assertEqual(result["tags"], ["scam"])
+
+        result = call_router.call("addressbook_search", {"tag": "scam"})
+        self.assertEqual(result["total"], 1)
+        self.assertIn("scam-1", result["summary"])
+
+    def test_search_requires_condition(self):
+        result = call_router.call("addressbook_search", {})
+        self.assertTrue(result.get("error"))
+
+    def test_list_pagination_params(self):
+        """addressbook_list 的 limit 校验与分页提示"""
+        for i in range(3):
+            call_router.call("addressbook_add", {"alias": f"c{i}", "address": ADDR_1})
+
+        result = call_router.call("addressbook_list", {"limit": 2})
+        self.assertEqual((result["total"], len(result["contacts"])), (3, 2))
+        self.assertIn("第 1-2 位", result["summary"])
+
+        self.assertTrue(call_router.call("addressbook_list", {"limit": 0}).get("error"))
+        self.assertTrue(call_router.call("addressbook_list", {"limit": "abc"}).get("error"))
+
+
+if __name__ == "__main__":
+    unittest.main()
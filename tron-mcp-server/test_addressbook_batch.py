@@ -0,0 +1,181 @@
+"""
+测试地址簿批量导入与批量解析
+============================
+
+覆盖场景：
+1. addressbook_import: 文件 / 文本 / 数组三种来源，逐行错误，dry_run
+2. 整批导入只写盘一次（JSON 后端）
+3. addressbook_resolve_batch: 地址原样返回、别名解析、未找到时的相似建议
+4. SQLite 后端大批量解析（分批 IN 查询）
+5. 参数校验
+"""
+
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from unittest.mock import patch
+
+from tron_mcp_server import address_book
+from tron_mcp_server import call_router
+
+ADDR_1 = "TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7"
+ADDR_2 = "TKyPzHiXW4Zms4txUxfWjXBidGzZpiCchn"
+
+
+class _TempBookMixin:
+    filename = "book.json"
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = Path(self.temp_dir) / self.filename
+        self.env_patcher = patch.dict(os.environ, {"TRON_ADDRESSBOOK_PATH": str(self.path)})
+        self.env_patcher.start()
+
+    def tearDown(self):
+        address_book._close_sqlite_books()
+        self.env_patcher.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+class TestAddressBookImportAction(_TempBookMixin, unittest.TestCase):
+    """测试 addressbook_import 动作"""
+
+    def test_import_inline_contacts_single_write(self):
+        """数组导入：逐行报告错误，合法记录只写盘一次"""
+        contacts = [
+            {"alias": f"c{i}", "address": ADDR_1, "tags": ["批量"]} for i in range(200)
+        ] + [{"alias": "坏地址", "address": "T123"}, {"address": ADDR_2}]
+
+        with patch.object(address_book, "_save_addressbook", wraps=address_book._save_addressbook) as mock_save:
+            result = call_router.call("addressbook_import", {"contacts": contacts})
+
+        self.assertEqual(mock_save.call_count, 1)
+        self.assertEqual(result["imported"], 200)
+        self.assertEqual([e["row"] for e in result["errors"]], [201, 202])
+        self.assertIn("2 行未导入", result["summary"])
+        self.assertEqual(len(json.loads(self.path.read_text(encoding="utf-8"))), 200)
+
+    def test_import_csv_content(self):
+        """CSV 文本导入，自动识别格式"""
+        content = f"alias,address,note\n小明,{ADDR_1},同学\n老板,{ADDR_2},\n"
+        result = call_router.call("addressbook_import", {"content": content})
+
+        self.assertEqual((result["format"], result["imported"], result["errors"]), ("csv", 2, []))
+        self.assertEqual(address_book.lookup("小明")["note"], "同学")
+
+    def test_import_legacy_json_file(self):
+        """导入旧格式 JSON 地址簿文件"""
+        source = Path(self.temp_dir) / "old.json"
+        source.write_text(json.dumps({"小明": {"address": ADDR_1, "note": "同学"}}, ensure_ascii=False), encoding="utf-8")
+
+        result = call_router.call("addressbook_import", {"path": str(source)})
+        self.assertEqual(result["imported"], 1)
+
+    def test_dry_run_does_not_write(self):
+        """dry_run 只统计，不写入"""
+        address_book.add_contact("小明", ADDR_1)
+        result = call_router.call("addressbook_import", {
+            "contacts": [{"alias": "小明", "address": ADDR_2}, {"alias": "老板", "address": ADDR_2}],
+            "dry_run": True,
+        })
+
+        self.assertEqual((result["imported"], result["updated"]), (1, 1))
+        self.assertIn("试运行", result["summary"])
+        self.assertEqual(address_book.lookup("小明")["address"], ADDR_1)
+        self.assertFalse(address_book.lookup("老板")["found"])
+
+    def test_duplicate_alias_last_row_wins(self):
+        """同一批次中重复的别名以最后一行为准"""
+        result = call_router.call("addressbook_import", {"contacts": [
+            {"alias": "小明", "address": ADDR_1},
+            {"alias": "小明", "address": ADDR_2},
+        ]})
+        self.assertEqual(result["imported"], 1)
+        self.assertEqual(address_book.lookup("小明")["address"], ADDR_2)
+
+    def test_import_param_errors(self):
+        """缺少来源、多个来源、文件不存在、格式错误"""
+        self.assertEqual(call_router.call("addressbook_import", {})["error"], "missing_param")
+        self.assertEqual(
+            call_router.call("addressbook_import", {"content": "a", "path": "b.csv"})["error"], "invalid_param"
+        )
+        self.assertEqual(
+            call_router.call("addressbook_import", {"path": str(Path(self.temp_dir) / "none.csv")})["error"],
+            "invalid_param",
+        )
+        self.assertEqual(
+            call_router.call("addressbook_import", {"content": "{not json", "format": "json"})["error"],
+            "invalid_param",
+        )
+        self.assertEqual(
+            call_router.call("addressbook_import", {"content": "name,addr\nx,y\n"})["error"], "invalid_param"
+        )
+
+
+class TestAddressBookResolveBatch(_TempBookMixin, unittest.TestCase):
+    """测试 addressbook_resolve_batch 动作"""
+
+    def setUp(self):
+        super().setUp()
+        address_book.add_contact("binance-hot", ADDR_1)
+        address_book.add_contact("老板", ADDR_2)
+
+    def test_mixed_inputs(self):
+        """地址原样返回，别名解析，未找到给出相似建议"""
+        result = call_router.call("addressbook_resolve_batch", {
+            "aliases": [ADDR_2, "老板", "binance-hox", ""],
+        })
+
+        self.assertEqual((result["total"], result["resolved"], result["failed"]), (4, 2, 2))
+        first, second, third, fourth = result["results"]
+        self.assertEqual((first["source"], first["address"]), ("address", ADDR_2))
+        self.assertEqual((second["source"], second["address"]), ("alias", ADDR_2))
+        self.assertFalse(third["found"])
+        self.assertEqual(third["suggestions"], ["binance-hot"])
+        self.assertIn("binance-hot", result["summary"])
+        self.assertEqual(fourth["error"], "输入为空")
+
+    def test_comma_separated_string(self):
+        result = call_router.call("addressbook_resolve_batch", {"aliases": "老板, binance-hot"})
+        self.assertEqual([r["address"] for r in result["results"]], [ADDR_2, ADDR_1])
+
+    def test_param_errors(self):
+        self.assertEqual(call_router.call("addressbook_resolve_batch", {})["error"], "missing_param")
+        self.assertEqual(
+            call_router.call("addressbook_resolve_batch", {"aliases": {"a": 1}})["error"], "invalid_param"
+        )
+        with patch.object(call_router, "_RESOLVE_BATCH_MAX", 1):
+            self.assertEqual(
+                call_router.call("addressbook_resolve_batch", {"aliases": ["a", "b"]})["error"], "invalid_param"
+            )
+
+
+class TestSQLiteBatch(_TempBookMixin, unittest.TestCase):
+    """测试 SQLite 后端批量导入与解析"""
+
+    filename = "book.db"
+
+    def test_large_batch_resolve(self):
+        """超过单批 SQL 变量数上限的批量解析"""
+        contacts = [{"alias": f"c{i}", "address": ADDR_1 if i % 2 else ADDR_2} for i in range(1200)]
+        self.assertEqual(call_router.call("addressbook_import", {"contacts": contacts})["imported"], 1200)
+
+        result = address_book.resolve_batch([f"c{i}" for i in range(1200)] + ["missing"])
+        self.assertEqual((result["resolved"], result["failed"]), (1200, 1))
+        self.assertEqual(result["results"][3]["address"], ADDR_1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+"""
+测试 benchmark.py 与 mock_tron_server.py
+========================================
+
+覆盖场景：
+1. 模拟服务的 TRONSCAN / TronGrid 接口、延迟与错误注入
+2. 基准场景覆盖 call_router 的全部动作
+3. 无错误注入时全部动作成功，且上游请求数符合预期
+4. 错误注入、延迟注入与阈值检查
+5. 命令行入口与 JSON 报告
+6. --compare-codecs：标准库 json 与 orjson 的编解码耗时对比
+"""
+
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import httpx
+
+import benchmark
+from mock_tron_server import MockTronServer
+from tron_mcp_server import call_router
+from tron_mcp_server import json_codec
+
+
+class TestMockTronServer(unittest.TestCase):
+    """测试模拟服务本身"""
+
+    def test_endpoints(self):
+        with MockTronServer() as server:
+            account = httpx.get(f"{server.base_url}/api/account", params={"address": "T1"}).json()
+            self.assertEqual(account["address"], "T1")
+            self.assertGreater(account["balance"], 0)
+
+            sec = httpx.get(f"{server.base_url}/api/security/account/data").json()
+            self.assertFalse(sec["is_black_list"])
+
+            tx = httpx.post(f"{server.base_url}/wallet/createtransaction", json={"amount": 5}).json()
+            self.assertEqual(len(tx["txID"]), 64)
+            self.assertEqual(tx["raw_data"]["contract"][0]["parameter"]["value"]["amount"], 5)
+
+            trigger = httpx.post(f"{server.base_url}/wallet/triggersmartcontract", json={}).json()
+            self.assertTrue(trigger["result"]["result"])
+
+            self.assertEqual(httpx.get(f"{server.base_url}/api/nope").status_code, 404)
+            counts = server.request_counts()
+        self.assertEqual(counts["/api/account"], 1)
+        self.assertEqual(counts["/wallet/triggersmartcontract"], 1)
+
+    def test_error_injection(self):
+        with MockTronServer(error_rate=1.0) as server:
+            response = httpx.get(f"{server.base_url}/api/block")
+        self.assertEqual(response.status_code, 503)
+
+    def test_invalid_error_rate(self):
+        with self.assertRaises(ValueError):
+            MockTronServer(error_rate=1.5)
+
+
+class TestBenchmark(unittest.TestCase):
+    """测试基准测试驱动"""
+
+    def test_scenarios_cover_all_actions(self):
+        """新增动作时必须同时补充基准场景"""
+        scenarios = benchmark.build_scenarios(tempfile.gettempdir())
+        self.assertEqual(set(scenarios), set(call_router._ACTION_HANDLERS))
+
+    def test_all_actions_succeed(self):
+        report = benchmark.run_benchmark(requests=2, concurrency=2)
+        rows = {row["action"]: row for row in report["actions"]}
+
+        self.assertEqual(set(rows), set(call_router._ACTION_HANDLERS))
+        failed = {a: r["error_samples"] for a, r in rows.items() if r["errors"]}
+        self.assertEqual(failed, {})
+        self.assertEqual(rows["get_balance"]["upstream_per_call"], 1)
+        self.assertEqual(rows["check_account_safety"]["upstream_per_call"], 2)
+        self.assertEqual(rows["addressbook_lookup"]["upstream_per_call"], 0)
+        self.assertGreaterEqual(rows["transfer"]["upstream_per_call"], 4)
+        for path in ("/api/account", "/api/accountv2", "/api/security/account/data",
+                     "/wallet/createtransaction", "/wallet/triggersmartcontract",
+                     "/wallet/broadcasttransaction"):
+            self.assertIn(path, report["mock_requests"])
+        for row in rows.values():
+            self.assertLessEqual(row["p50_ms"], row["p95_ms"])
+            self.assertLessEqual(row["p95_ms"], row["p99_ms"])
+
+    def test_error_injection_and_thresholds(self):
+        report = benchmark.run_benchmark(["get_balance"], requests=3, concurrency=3, error_rate=1.0)
+        row = report["actions"][0]
+        self.assertEqual(row["errors"], 3)
+        self.assertTrue(row["error_samples"])
+        self.assertEqual(benchmark.check_thresholds(report, max_error_rate=0.5),
+                         ["get_balance: 错误率 3/3 > 0.5"])
+
+    def test_latency_injection(self):
+        report = benchmark.run_benchmark(["get_network_status"], requests=2, concurrency=1, latency_ms=50)
+        self.assertGreaterEqual(report["actions"][0]["p50_ms"], 50)
+        self.assertEqual(benchmark.check_thresholds(report, max_p95_ms=10_000), [])
+
+    def test_unknown_action(self):
+        with self.assertRaises(ValueError):
+            benchmark.run_benchmark(["no_such_action"], requests=1)
+
+    @unittest.skipIf(json_codec.orjson is None, "未安装 orjson")
+    def test_compare_codecs(self):
+        comparison = benchmark.compare_codecs(["get_transaction_history", "sign_tx"], repeat=2, requests=2, concurrency=1)
+        rows = {row["action"]: row for row in comparison["actions"]}
+        self.assertEqual(set(rows), {"get_transaction_history", "sign_tx"})
+        self.assertGreater(rows["get_transaction_history"]["json_bytes"], 0)
+        for row in rows.values():
+            self.assertGreater(row["stdlib_json_us"], 0)
+            self.assertGreater(row["orjson_json_us"], 0)
+        # 重放结束后恢复为环境变量选择的编解码器
+        self.assertEqual(json_codec.backend(), json_codec.configure())
+        self.assertIn("speedup", benchmark.format_codec_comparison(comparison))
+
+    def test_percentile(self):
+        values = [float(i) for i in range(1, 101)]
+        self.assertEqual(benchmark.percentile(values, 0.5), 50)
+        self.assertEqual(benchmark.percentile(values, 0.99), 99)
+        self.assertEqual(benchmark.percentile([], 0.5), 0.0)
+
+
+class TestBenchmarkCli(unittest.TestCase):
+    """测试命令行入口"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_json_report_and_exit_code(self):
+        path = Path(self.temp_dir) / "report.json"
+        code = benchmark.main(["--actions", "skills,get_balance", "--requests", "2", "--json", str(path)])
+        self.assertEqual(code, 0)
+        report = json.loads(path.read_text(encoding="utf-8"))
+        self.assertEqual([r["action"] for r in report["actions"]], ["skills", "get_balance"])
+
+        code = benchmark.main(["--actions", "get_balance", "--requests", "2", "--max-p95-ms", "0"])
+        self.assertEqual(code, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
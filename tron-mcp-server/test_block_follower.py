@@ -0,0 +1,248 @@
+"""
+测试 block_follower.py 区块跟随器
+================================
+
+覆盖场景：
+1. 交易涉及地址的提取：TRX 转账、TRC20 transfer / transferFrom、非法数据
+2. 新区块只失效其中涉及的地址，其余热点地址继续命中缓存
+3. 落后多个区块时批量补拉；落后过多时失效全部热点地址
+4. 索引延迟：地址在若干区块后再失效一次
+5. 跟随期间账户缓存使用带跟随会话标识的键与长有效期，停止 / 停滞后不再读取，恢复后开启新会话
+6. 新区块回调与回调异常隔离
+7. 后台线程端到端（模拟 TronGrid 出块）
+"""
+
+import unittest
+import sys
+import os
+import time
+
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from unittest.mock import patch
+
+from mock_tron_server import MockServerTestCase, MockTronServer, build_transaction
+from tron_mcp_server import block_follower
+from tron_mcp_server import cache
+from tron_mcp_server import tron_client
+from tron_mcp_server import trongrid_client
+
+OWNER = "TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7"
+RECIPIENT = "TKyPzHiXW4Zms4txUxfWjXBidGzZpiCchn"
+OTHER = "TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t"
+
+
+def _hex(address: str) -> str:
+    return trongrid_client._base58_to_hex(address)
+
+
+def _trx_transfer(owner: str, to: str) -> dict:
+    return build_transaction("TransferContract", {
+        "amount": 1_000_000, "owner_address": _hex(owner), "to_address": _hex(to),
+    })
+
+
+class TestTransactionAddresses(unittest.TestCase):
+    """测试交易涉及地址的提取"""
+
+    def test_trx_transfer(self):
+        self.assertEqual(tron_client.transaction_addresses(_trx_transfer(OWNER, RECIPIENT)), {OWNER, RECIPIENT})
+
+    def test_trc20_transfer(self):
+        data = "a9059cbb" + _hex(RECIPIENT)[2:].rjust(64, "0") + "0" * 64
+        tx = build_transaction("TriggerSmartContract", {
+            "owner_address": _hex(OWNER), "contract_address": _hex(OTHER), "data": data,
+        })
+        self.assertEqual(tron_client.transaction_addresses(tx), {OWNER, RECIPIENT})
+
+    def test_trc20_transfer_from(self):
+        data = "23b872dd" + _hex(OTHER)[2:].rjust(64, "0") + _hex(RECIPIENT)[2:].rjust(64, "0") + "0" * 64
+        tx = build_transaction("TriggerSmartContract", {"owner_address": _hex(OWNER), "data": data})
+        self.assertEqual(tron_client.transaction_addresses(tx), {OWNER, OTHER, RECIPIENT})
+
+    def test_malformed(self):
+        self.assertEqual(tron_client.transaction_addresses({}), set())
+        self.assertEqual(tron_client.transaction_addresses({"raw_data": {"contract": [{"parameter": None}]}}), set())
+        tx = build_transaction("TransferContract", {"owner_address": "41" + "zz" * 20, "to_address": _hex(RECIPIENT)})
+        self.assertEqual(tron_client.transaction_addresses(tx), {RECIPIENT})
+
+
+class _FollowerTestCase(MockServerTestCase):
+    """共用：手动出块 + 进程级跟随器（不启动线程，手动轮询）"""
+
+    def setUp(self):
+        super().setUp()
+        self.server.mine()
+        os.environ.pop("TRON_CACHE_TTL_ACCOUNT", None)
+        block_follower.stop()
+        self.follower = block_follower.BlockFollower(interval=60, max_catchup=5, settle_blocks=0)
+        block_follower._follower = self.follower
+        self.follower.poll_once()
+
+    def tearDown(self):
+        block_follower.stop()
+        super().tearDown()
+
+    def _account_requests(self) -> int:
+        return self._count("/api/account")
+
+
+class TestInvalidation(_FollowerTestCase):
+    """测试按区块失效"""
+
+    def test_only_touched_addresses_invalidated(self):
+        for address in (OWNER, OTHER):
+            tron_client.get_balance_trx(address)
+        self.server.mine([_trx_transfer(OWNER, RECIPIENT)])
+        self.assertEqual(self.follower.poll_once(), 1)
+
+        tron_client.get_balance_trx(OTHER)    # 未涉及：仍命中
+        tron_client.get_balance_trx(OWNER)    # 涉及：回源
+        self.assertEqual(self._account_requests(), 3)
+        self.assertEqual(self.follower.stats["invalidated"], 2)
+
+    def test_catch_up_in_one_request(self):
+        tron_client.get_balance_trx(OWNER)
+        self.server.mine([_trx_transfer(OWNER, RECIPIENT)])
+        self.server.mine(count=3)
+        before = self.server.request_counts().get("/wallet/getblockbylimitnext", 0)
+        self.assertEqual(self.follower.poll_once(), 4)
+        self.assertEqual(self.server.request_counts()["/wallet/getblockbylimitnext"] - before, 1)
+        tron_client.get_balance_trx(OWNER)
+        self.assertEqual(self._account_requests(), 2)
+
+    def test_gap_invalidates_hot_addresses(self):
+        tron_client.get_balance_trx(OTHER)
+        self.server.mine(count=10)
+        with self.assertLogs("tron_mcp_server.block_follower", level="WARNING"):
+            self.follower.poll_once()
+        self.assertEqual(self.follower.stats["skipped"], 9)
+        tron_client.get_balance_trx(OTHER)
+        self.assertEqual(self._account_requests(), 2)
+
+    def test_settle_blocks(self):
+        self.follower.settle_blocks = 2
+        self.server.mine([_trx_transfer(OWNER, RECIPIENT)])
+        self.follower.poll_once()
+        tron_client.get_balance_trx(OWNER)  # 索引延迟期间回源，可能拿到旧数据
+        self.server.mine()
+        self.follower.poll_once()
+        tron_client.get_balance_trx(OWNER)
+        self.assertEqual(self._account_requests(), 1)
+        self.server.mine()
+        self.follower.poll_once()           # 2 个区块后再次失效
+        tron_client.get_balance_trx(OWNER)
+        self.assertEqual(self._account_requests(), 2)
+
+    def test_resource_cache_invalidated(self):
+        trongrid_client.get_account_resource(OWNER)
+        trongrid_client.get_account_resource(OWNER)
+        self.server.mine([_trx_transfer(RECIPIENT, OWNER)])
+        self.follower.poll_once()
+        trongrid_client.get_account_resource(OWNER)
+        self.assertEqual(self.server.request_counts()["/wallet/getaccountresource"], 2)
+
+
+class TestCacheTtl(_FollowerTestCase):
+    """测试跟随期间的缓存有效期"""
+
+    def test_long_ttl_while_live(self):
+        session = self.follower.session
+        self.assertEqual(block_follower.account_cache("account", OWNER, "k"), (f"k|{session}", 300))
+        self.assertEqual(self.follower.status()["hot_addresses"], 1)
+        self.assertEqual(block_follower.account_cache("risk", OWNER, "k"), ("k", 0))
+
+    def test_configured_ttl_when_not_live(self):
+        self.follower._last_success = time.monotonic() - 1000
+        with patch.dict(os.environ, {"TRON_CACHE_TTL_ACCOUNT": "5"}):
+            self.assertEqual(block_follower.account_cache("account", OWNER, "k"), ("k", 5))
+        block_follower.stop()
+        self.assertEqual(block_follower.account_cache("account", OWNER, "k"), ("k", 0))
+        self.assertEqual(block_follower.status(), {"running": False, "live": False})
+
+    def test_long_ttl_entries_unreachable_after_stall(self):
+        tron_client.get_balance_trx(OWNER)
+        self.follower._last_success = time.monotonic() - 1000   # 停滞：不再读取长有效期缓存
+        tron_client.get_balance_trx(OWNER)
+        self.assertEqual(self._account_requests(), 2)
+
+    def test_new_session_after_recovery(self):
+        tron_client.get_balance_trx(OWNER)
+        session = self.follower.session
+        self.follower._last_success = time.monotonic() - 1000
+        self.follower.poll_once()
+        self.assertTrue(self.follower.is_live())
+        self.assertNotEqual(self.follower.session, session)
+        tron_client.get_balance_trx(OWNER)      # 停滞期间可能漏掉失效，恢复后不读取旧会话的缓存
+        self.assertEqual(self._account_requests(), 2)
+
+    def test_session_kept_while_live(self):
+        session = self.follower.session
+        self.server.mine()
+        self.follower.poll_once()
+        self.follower.poll_once()
+        self.assertEqual(self.follower.session, session)
+
+    def test_invalidate_addresses_covers_session_key(self):
+        tron_client.get_balance_trx(OWNER)
+        tron_client.invalidate_addresses([OWNER])
+        tron_client.get_balance_trx(OWNER)
+        self.assertEqual(self._account_requests(), 2)
+
+    def test_upstream_failure_keeps_position(self):
+        last = self.follower.last_block
+        self.server.mine([_trx_transfer(OWNER, RECIPIENT)])
+        self.server.error_rate = 1.0
+        with self.assertRaises(Exception):
+            self.follower.poll_once()
+        self.assertEqual(self.follower.last_block, last)
+        self.server.error_rate = 0.0
+        self.assertEqual(self.follower.poll_once(), 1)
+
+
+class TestListeners(_FollowerTestCase):
+    """测试新区块回调"""
+
+    def test_listener_receives_blocks(self):
+        seen = []
+        self.follower.add_listener(lambda number, txs: (_ for _ in ()).throw(RuntimeError("boom")))
+        self.follower.add_listener(lambda number, txs: seen.append((number, len(txs))))
+        height = self.server.mine([_trx_transfer(OWNER, RECIPIENT)])
+        with self.assertLogs("tron_mcp_server.block_follower", level="ERROR"):
+            self.follower.poll_once()
+        self.assertEqual(seen, [(height, 1)])
+
+
+class TestBackgroundThread(unittest.TestCase):
+    """端到端：后台线程跟随模拟服务出块"""
+
+    def test_thread(self):
+        cache.reset()
+        with MockTronServer() as server, patch.dict(os.environ, dict(server.env(), TRON_BLOCK_FOLLOWER="true")):
+            server.mine()
+            try:
+                follower = block_follower.start_from_env()
+                self.assertIs(block_follower.start(), follower)
+                deadline = time.time() + 5
+                while not follower.is_live() and time.time() < deadline:
+                    time.sleep(0.01)
+                self.assertTrue(block_follower.status()["live"])
+                tron_client.get_balance_trx(OWNER)
+                tron_client.get_balance_trx(OWNER)
+                self.assertEqual(server.request_counts()["/api/account"], 1)
+            finally:
+                block_follower.stop()
+                cache.reset()
+
+    def test_disabled_by_default(self):
+        with patch.dict(os.environ, {"TRON_BLOCK_FOLLOWER": ""}):
+            self.assertIsNone(block_follower.start_from_env())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+"""
+测试 wallet/broadcasthex 广播方式
+=================================
+
+覆盖场景：
+1. Transaction.to_protobuf / from_protobuf：字段编码、长度 varint、忽略 ret 字段、截断数据
+2. broadcast_transaction(mode="hex") 发送本地序列化的 protobuf，请求体小于 JSON 方式
+3. TRON_BROADCAST_MODE 选择广播方式；缺少 raw_data_hex 时回退 JSON；失败信息解码
+4. 模拟服务端到端：transfer 与 broadcast_tx 经 broadcasthex 广播
+"""
+
+import unittest
+import sys
+import os
+import json
+
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from unittest.mock import patch
+
+from mock_tron_server import MockServerTestCase, build_transaction
+from tron_mcp_server import call_router
+from tron_mcp_server import key_manager
+from tron_mcp_server import transaction
+from tron_mcp_server import trongrid_client
+
+TEST_PRIVATE_KEY = "0" * 63 + "1"
+TEST_TO = "TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7"
+
+
+def _signed_tx() -> dict:
+    tx = build_transaction("TransferContract", {
+        "amount": 1_000_000,
+        "owner_address": "41" + "0" * 40,
+        "to_address": "41" + "1" * 40,
+    }, now_ms=1_700_000_000_000)
+    tx["signature"] = [key_manager.sign_transaction(tx["txID"], TEST_PRIVATE_KEY)]
+    return tx
+
+
+class TestProtobuf(unittest.TestCase):
+    """测试签名交易的 protobuf 编解码"""
+
+    def test_encoding(self):
+        tx = transaction.Transaction(b"\x00" * 32, b"\x01\x02")
+        tx.add_signature(b"\x03" * 65)
+        self.assertEqual(tx.to_protobuf(), b"\x0a\x02\x01\x02" + b"\x12\x41" + b"\x03" * 65)
+
+    def test_round_trip(self):
+        signed = _signed_tx()
+        tx = transaction.Transaction.from_json(signed)
+        data = tx.to_protobuf()
+        # raw_data 超过 127 字节，长度占两个字节
+        self.assertGreater(len(tx.raw_data), 127)
+        decoded = transaction.Transaction.from_protobuf(data)
+        self.assertEqual(decoded.txid_hex, signed["txID"])
+        self.assertEqual(decoded.raw_data, tx.raw_data)
+        self.assertEqual(decoded.signatures, tx.signatures)
+
+    def test_ignores_ret_field(self):
+        tx = transaction.Transaction(b"\x00" * 32, b"\x01")
+        decoded = transaction.Transaction.from_protobuf(tx.to_protobuf() + b"\x2a\x02\x08\x01")
+        self.assertEqual(decoded.raw_data, b"\x01")
+
+    def test_invalid_bytes(self):
+        for data in (b"\x0a\x05\x01", b"\x0a", b"\x12\x01\x00", b"\x0d\x00\x00\x00\x00"):
+            with self.subTest(data=data):
+                with self.assertRaises(transaction.InvalidTransactionError):
+                    transaction.Transaction.from_protobuf(data)
+
+    def test_requires_raw_data_hex(self):
+        tx = transaction.Transaction.from_json({"txID": "a" * 64, "raw_data": {}})
+        with self.assertRaises(transaction.InvalidTransactionError):
+            tx.to_protobuf()
+
+
+class TestBroadcastMode(unittest.TestCase):
+    """测试广播方式选择"""
+
+    @patch.object(trongrid_client, "_post", return_value={"result": True})
+    def test_hex_mode_payload(self, post):
+        signed = _signed_tx()
+        result = trongrid_client.broadcast_transaction(signed, mode="hex")
+        self.assertEqual(result, {"result": True, "txid": signed["txID"]})
+        path, body = post.call_args[0]
+        self.assertEqual(path, "wallet/broadcasthex")
+        self.assertEqual(transaction.Transaction.from_protobuf(bytes.fromhex(body["transaction"])).txid_hex,
+                         signed["txID"])
+        self.assertLess(len(json.dumps(body)), len(json.dumps(signed)))
+
+    @patch.object(trongrid_client, "_post", return_value={"result": True})
+    def test_env_selects_mode(self, post):
+        with patch.dict(os.environ, {"TRON_BROADCAST_MODE": "hex"}):
+            trongrid_client.broadcast_transaction(_signed_tx())
+        self.assertEqual(post.call_args[0][0], "wallet/broadcasthex")
+        with patch.dict(os.environ, {"TRON_BROADCAST_MODE": "bogus"}):
+            self.assertEqual(trongrid_client.get_broadcast_mode(), "json")
+            trongrid_client.broadcast_transaction(_signed_tx())
+        self.assertEqual(post.call_args[0][0], "wallet/broadcasttransaction")
+
+    @patch.object(trongrid_client, "_post", return_value={"result": True})
+    def test_falls_back_without_raw_data_hex(self, post):
+        signed = {"txID": "a" * 64, "raw_data": {}, "signature": ["ab" * 65]}
+        trongrid_client.broadcast_transaction(signed, mode="hex")
+        self.assertEqual(post.call_args[0], ("wallet/broadcasttransaction", signed))
+
+    def test_hex_mode_errors(self):
+        unsigned = _signed_tx()
+        del unsigned["signature"]
+        with self.assertRaises(ValueError):
+            trongrid_client.broadcast_transaction(unsigned, mode="hex")
+        failure = {"result": False, "code": "SIGERROR", "message": b"bad sig".hex()}
+        with patch.object(trongrid_client, "_post", return_value=failure):
+            with self.assertRaises(ValueError) as ctx:
+                trongrid_client.broadcast_transaction(_signed_tx(), mode="hex")
+        self.assertIn("[SIGERROR]: bad sig", str(ctx.exception))
+
+
+class TestEndToEnd(MockServerTestCase):
+    """测试模拟服务下的端到端广播"""
+
+    env_vars = {"TRON_BROADCAST_MODE": "hex", "TRON_PRIVATE_KEY": TEST_PRIVATE_KEY}
+
+    def test_transfer(self):
+        result = call_router.call("transfer", {"to": TEST_TO, "amount": 1, "token": "TRX"})
+        self.assertNotIn("error", result)
+        counts = self.server.request_counts()
+        self.assertEqual(counts.get("/wallet/broadcasthex"), 1)
+        self.assertNotIn("/wallet/broadcasttransaction", counts)
+
+    def test_broadcast_tx_action(self):
+        signed = _signed_tx()
+        result = call_router.call("broadcast_tx", {"signed_tx_json": json.dumps(signed)})
+        self.assertEqual(result["txid"], signed["txID"])
+        self.assertEqual(self.server.request_counts().get("/wallet/broadcasthex"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,386 @@
+"""
+测试 cache.py 共享缓存后端
+==========================
+
+覆盖场景：
+1. 进程内缓存的 TTL、LRU 淘汰、删除与清空
+2. SQLite 文件后端：读写、过期、多连接共享（模拟多进程）
+3. Redis 协议后端：读写、过期、密码、db 选择、连接复用（使用本地替身）
+4. 编码：JSON 回退、超出 msgpack 范围的整数、无法解码的值按未命中处理
+5. cached 读穿：命中 / 未命中计数，TTL <= 0 不缓存，cacheable 过滤，后端不可用时回源
+6. TRON_CACHE_URL 解析与不支持的后端
+7. 链参数查询仅在配置 TTL 后缓存，且按 API 地址区分
+8. 账户 / 资源 / 风控 / 交易状态 / 参考区块缓存，降级结果不缓存，广播后失效
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import time
+
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from unittest.mock import patch
+
+import httpx
+
+from mock_redis_server import MockRedisServer
+from mock_tron_server import MockServerTestCase, MockTronServer
+from tron_mcp_server import cache
+from tron_mcp_server import metrics
+from tron_mcp_server import tron_client
+from tron_mcp_server import trongrid_client
+from tron_mcp_server import tx_builder
+
+OWNER = "TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7"
+RECIPIENT = "TKyPzHiXW4Zms4txUxfWjXBidGzZpiCchn"
+
+
+def _cache_samples(name: str) -> dict:
+    return {result: value for (c, result), value in metrics.CACHE_REQUESTS.samples() if c == name}
+
+
+class TestMemoryCache(unittest.TestCase):
+    """测试进程内后端"""
+
+    def test_ttl(self):
+        backend = cache.MemoryCache()
+        backend.set("k", b"v", 0.05)
+        self.assertEqual(backend.get("k"), b"v")
+        time.sleep(0.06)
+        self.assertIsNone(backend.get("k"))
+
+    def test_delete_and_clear(self):
+        backend = cache.MemoryCache()
+        backend.set("a", b"1", 60)
+        backend.set("b", b"2", 60)
+        backend.delete("a")
+        self.assertIsNone(backend.get("a"))
+        backend.clear()
+        self.assertIsNone(backend.get("b"))
+
+    def test_lru_eviction(self):
+        backend = cache.MemoryCache(max_entries=2)
+        backend.set("a", b"1", 60)
+        backend.set("b", b"2", 60)
+        backend.get("a")  # a 变为最近使用
+        backend.set("c", b"3", 60)
+        self.assertEqual(len(backend), 2)
+        self.assertIsNone(backend.get("b"))
+        self.assertEqual(backend.get("a"), b"1")
+
+    def test_max_entries_from_url(self):
+        self.assertEqual(cache.create_backend("memory://?max_entries=5").max_entries, 5)
+
+
+class TestSQLiteCache(unittest.TestCase):
+    """测试 SQLite 文件后端"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "sub", "cache.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_get_set_delete_clear(self):
+        backend = cache.create_backend(f"sqlite:///{self.path}")
+        self.assertIsNone(backend.get("k"))
+        backend.set("k", b"\x00\xff", 60)
+        self.assertEqual(backend.get("k"), b"\x00\xff")
+        backend.delete("k")
+        self.assertIsNone(backend.get("k"))
+        backend.set("k", b"v", 60)
+        backend.clear()
+        self.assertIsNone(backend.get("k"))
+
+    def test_expiry_and_purge(self):
+        backend = cache.SQLiteCache(self.path, purge_every=2)
+        backend.set("old", b"v", 0.05)
+        time.sleep(0.06)
+        self.assertIsNone(backend.get("old"))
+        backend.set("new", b"v", 60)  # 第二次写入触发清理
+        rows = backend._connection().execute("SELECT key FROM cache").fetchall()
+        self.assertEqual(rows, [("new",)])
+
+    def test_shared_between_instances(self):
+        writer = cache.SQLiteCache(self.path)
+        reader = cache.SQLiteCache(self.path)  # 模拟另一个进程
+        writer.set("k", b"shared", 60)
+        self.assertEqual(reader.get("k"), b"shared")
+
+    def test_missing_path(self):
+        with self.assertRaises(ValueError):
+            cache.create_backend("sqlite://")
+
+    def test_unavailable(self):
+        backend = cache.SQLiteCache(os.path.join(self.tmp.name, "missing-dir", "x", "cache.db"))
+        with patch("os.makedirs", side_effect=PermissionError("denied")):
+            with self.assertRaises(cache.CacheError):
+                backend.get("k")
+
+
+class TestRedisCache(unittest.TestCase):
+    """测试 Redis 协议后端"""
+
+    def setUp(self):
+        self.server = MockRedisServer().start()
+        self.backend = cache.RedisCache.from_url(self.server.url)
+
+    def tearDown(self):
+        self.backend.close()
+        self.server.stop()
+
+    def test_get_set_delete(self):
+        self.assertIsNone(self.backend.get("k"))
+        self.backend.set("k", "中文".encode("utf-8"), 60)
+        self.assertEqual(self.backend.get("k").decode("utf-8"), "中文")
+        self.backend.delete("k")
+        self.assertIsNone(self.backend.get("k"))
+
+    def test_expiry(self):
+        self.backend.set("k", b"v", 0.05)
+        time.sleep(0.08)
+        self.assertIsNone(self.backend.get("k"))
+
+    def test_db_isolation_and_password(self):
+        with MockRedisServer(password="s3cret") as server:
+            db0 = cache.RedisCache.from_url(server.url)
+            db1 = cache.RedisCache.from_url(server.url.replace("/0", "/1"))
+            db0.set("k", b"0", 60)
+            self.assertIsNone(db1.get("k"))
+            self.assertEqual(db0.get("k"), b"0")
+
+            wrong = cache.RedisCache.from_url(server.url.replace("s3cret", "wrong"))
+            with self.assertRaises(cache.CacheError):
+                wrong.get("k")
+            for backend in (db0, db1, wrong):
+                backend.close()
+
+    def test_connection_reuse(self):
+        for _ in range(5):
+            self.backend.get("k")
+        self.assertEqual(self.server.command_counts()["GET"], 5)
+        self.assertEqual(len(self.backend._pool), 1)
+
+    def test_unavailable(self):
+        self.server.stop()
+        self.backend.close()
+        with self.assertRaises(cache.CacheError):
+            self.backend.get("k")
+
+
+class TestCodec(unittest.TestCase):
+    """测试缓存值编码"""
+
+    def test_round_trip(self):
+        value = {"data": [1, 2.5, "中文", None, True], "nested": {"k": []}}
+        self.assertEqual(cache.decode(cache.encode(value)), value)
+
+    def test_json_fallback(self):
+        with patch.object(cache, "msgpack", None):
+            raw = cache.encode({"a": 1})
+        self.assertTrue(raw.startswith(b"j"))
+        self.assertEqual(cache.decode(raw), {"a": 1})
+
+    def test_big_int(self):
+        big = 2 ** 70
+        self.assertEqual(cache.decode(cache.encode({"v": big})), {"v": big})
+
+    @unittest.skipIf(cache.msgpack is None, "需要 msgpack")
+    def test_msgpack_is_compact(self):
+        value = {"balance": 5_000_000, "tokens": [{"id": i, "amount": i * 1000} for i in range(20)]}
+        raw = cache.encode(value)
+        self.assertTrue(raw.startswith(b"m"))
+        with patch.object(cache, "msgpack", None):
+            self.assertLess(len(raw), len(cache.encode(value)))
+
+    def test_undecodable(self):
+        with self.assertRaises(ValueError):
+            cache.decode(b"?garbage")
+        with patch.object(cache, "msgpack", None):
+            with self.assertRaises(ValueError):
+                cache.decode(b"m\x81")
+
+
+class TestCached(unittest.TestCase):
+    """测试读穿缓存"""
+
+    def setUp(self):
+        cache.reset()
+
+    def tearDown(self):
+        cache.reset()
+
+    def test_hit_and_miss(self):
+        calls = []
+        loader = lambda: calls.append(1) or {"value": [1, 2]}
+        before = _cache_samples("test_hit_and_miss")
+        with patch.dict(os.environ, {"TRON_CACHE_URL": "memory://"}):
+            self.assertEqual(cache.cached("test_hit_and_miss", "k", 60, loader), {"value": [1, 2]})
+            self.assertEqual(cache.cached("test_hit_and_miss", "k", 60, loader), {"value": [1, 2]})
+        self.assertEqual(len(calls), 1)
+        after = _cache_samples("test_hit_and_miss")
+        self.assertEqual(after.get("hit", 0) - before.get("hit", 0), 1)
+        self.assertEqual(after.get("miss", 0) - before.get("miss", 0), 1)
+
+    def test_zero_ttl_bypasses(self):
+        calls = []
+        for _ in range(3):
+            cache.cached("bypass", "k", 0, lambda: calls.append(1))
+        self.assertEqual(len(calls), 3)
+
+    def test_shared_through_redis(self):
+        with MockRedisServer() as server, patch.dict(os.environ, {"TRON_CACHE_URL": server.url}):
+            cache.cached("shared", "k", 60, lambda: 42)
+            cache.reset()  # 模拟另一个进程
+            self.assertEqual(cache.cached("shared", "k", 60, lambda: 0), 42)
+            self.assertEqual(server.command_counts()["SET"], 1)
+
+    def test_backend_failure_falls_back(self):
+        with MockRedisServer() as server:
+            url = server.url
+        with patch.dict(os.environ, {"TRON_CACHE_URL": url}):
+            with self.assertLogs("tron_mcp_server.cache", level="WARNING"):
+                self.assertEqual(cache.cached("down", "k", 60, lambda: "fresh"), "fresh")
+
+    def test_cacheable_filter(self):
+        calls = []
+        loader = lambda: calls.append(1) or {"confirmed": False}
+        for _ in range(2):
+            cache.cached("filtered", "k", 60, loader, cacheable=lambda v: v["confirmed"])
+        self.assertEqual(len(calls), 2)
+
+    def test_undecodable_value_is_miss(self):
+        cache.get_cache().set(cache.KEY_PREFIX + "broken:k", b"?garbage", 60)
+        self.assertEqual(cache.cached("broken", "k", 60, lambda: "fresh"), "fresh")
+        self.assertEqual(cache.cached("broken", "k", 60, lambda: "stale"), "fresh")
+
+    def test_invalidate(self):
+        cache.cached("inv", "k", 60, lambda: 1)
+        cache.invalidate("inv", "k")
+        self.assertEqual(cache.cached("inv", "k", 60, lambda: 2), 2)
+
+    def test_shared_through_sqlite(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            url = f"sqlite:///{tmp}/cache.db"
+            with patch.dict(os.environ, {"TRON_CACHE_URL": url}):
+                cache.cached("shared", "k", 60, lambda: {"v": 42})
+                cache.reset()  # 模拟另一个进程
+                self.assertEqual(cache.cached("shared", "k", 60, lambda: None), {"v": 42})
+
+    def test_invalid_backend(self):
+        with self.assertRaises(ValueError):
+            cache.create_backend("memcached://localhost")
+
+
+class TestChainParametersCache(unittest.TestCase):
+    """测试链参数缓存"""
+
+    def setUp(self):
+        cache.reset()
+
+    def tearDown(self):
+        cache.reset()
+
+    def test_disabled_by_default(self):
+        with MockTronServer() as server, patch.dict(os.environ, server.env()):
+            os.environ.pop("TRON_CACHE_TTL_CHAIN_PARAMS", None)
+            tron_client.get_gas_parameters()
+            tron_client.get_gas_parameters()
+            self.assertEqual(server.request_counts()["/api/chainparameters"], 2)
+
+    def test_cached_per_api_url(self):
+        with MockTronServer() as a, MockTronServer() as b:
+            with patch.dict(os.environ, dict(a.env(), TRON_CACHE_TTL_CHAIN_PARAMS="60")):
+                first = tron_client.get_gas_parameters()
+                self.assertEqual(tron_client.get_gas_parameters(), first)
+            with patch.dict(os.environ, dict(b.env(), TRON_CACHE_TTL_CHAIN_PARAMS="60")):
+                tron_client.get_gas_parameters()
+            self.assertEqual(a.request_counts()["/api/chainparameters"], 1)
+            self.assertEqual(b.request_counts()["/api/chainparameters"], 1)
+
+
+class TestClientCaches(MockServerTestCase):
+    """测试客户端各类数据的缓存"""
+
+    env_vars = {
+        "TRON_CACHE_TTL_ACCOUNT": "60",
+        "TRON_CACHE_TTL_ACCOUNT_RESOURCE": "60",
+        "TRON_CACHE_TTL_RISK": "60",
+        "TRON_CACHE_TTL_TX_STATUS": "60",
+        "TRON_CACHE_TTL_REF_BLOCK": "60",
+    }
+
+    def test_account_and_resource(self):
+        for _ in range(3):
+            tron_client.get_balance_trx(OWNER)
+            trongrid_client.get_account_resource(OWNER)
+        self.assertEqual(self._count("/api/account"), 1)
+        self.assertEqual(self._count("/wallet/getaccountresource"), 1)
+
+    def test_ref_block(self):
+        for _ in range(3):
+            tx_builder._get_ref_block()
+        self.assertEqual(self._count("/api/block"), 1)
+
+    def test_confirmed_tx_status(self):
+        for _ in range(2):
+            self.assertTrue(tron_client.get_transaction_status("a" * 64)["success"])
+        self.assertEqual(self._count("/api/transaction-info"), 1)
+
+    def test_unconfirmed_tx_status_not_cached(self):
+        with patch.object(tron_client, "_get", return_value={"contractRet": "SUCCESS", "confirmed": False}) as get:
+            tron_client.get_transaction_status("b" * 64)
+            tron_client.get_transaction_status("b" * 64)
+        self.assertEqual(get.call_count, 2)
+
+    def test_risk_report(self):
+        for _ in range(2):
+            self.assertEqual(tron_client.check_account_risk(RECIPIENT)["risk_type"], "Safe")
+        self.assertEqual(self._count("/api/accountv2"), 1)
+        self.assertEqual(self._count("/api/security/account/data"), 1)
+
+    def test_degraded_risk_report_not_cached(self):
+        with patch.object(tron_client.http_client, "get", side_effect=httpx.ConnectError("down")):
+            self.assertEqual(tron_client.check_account_risk(RECIPIENT)["risk_type"], "Unknown")
+        self.assertEqual(tron_client.check_account_risk(RECIPIENT)["risk_type"], "Safe")
+
+    def test_broadcast_invalidates_accounts(self):
+        tron_client.get_balance_trx(OWNER)
+        tron_client.get_balance_trx(RECIPIENT)
+        trongrid_client.get_account_resource(OWNER)
+        signed_tx = {
+            "txID": "c" * 64,
+            "signature": ["00" * 65],
+            "raw_data": {"contract": [{"parameter": {"value": {
+                "owner_address": trongrid_client._base58_to_hex(OWNER),
+                "to_address": trongrid_client._base58_to_hex(RECIPIENT),
+            }}}]},
+        }
+        trongrid_client.broadcast_transaction(signed_tx)
+        tron_client.get_balance_trx(OWNER)
+        tron_client.get_balance_trx(RECIPIENT)
+        trongrid_client.get_account_resource(OWNER)
+        self.assertEqual(self._count("/api/account"), 4)
+        self.assertEqual(self._count("/wallet/getaccountresource"), 2)
+
+    def test_trc20_recipient_invalidated(self):
+        tron_client.get_balance_trx(RECIPIENT)
+        data = "a9059cbb" + trongrid_client._base58_to_hex(RECIPIENT)[2:].rjust(64, "0") + "0" * 64
+        tron_client.invalidate_account_cache({"raw_data": {"contract": [{"parameter": {"value": {
+            "owner_address": trongrid_client._base58_to_hex(OWNER),
+            "data": data,
+        }}}]}})
+        tron_client.get_balance_trx(RECIPIENT)
+        self.assertEqual(self._count("/api/account"), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
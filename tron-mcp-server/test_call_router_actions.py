@@ -257,7 +257,7 @@ class TestTransferRoute(unittest.TestCase):
             "txID": "b" * 64,
             "raw_data": {},
         }
-        mock_sign.return_value = "sig" * 43 + "s"  # 130 chars
+        mock_sign.return_value = "ab" * 65  # 130 个十六进制字符（65 字节）
         mock_broadcast.return_value = {"result": True, "txid": "b" * 64}
         
         result = call_router.call("transfer", {"to": TEST_TO, "amount": 100, "token": "USDT"})
@@ -284,7 +284,7 @@ class TestTransferRoute(unittest.TestCase):
             "txID": "d" * 64,
             "raw_data": {},
         }
-        mock_sign.return_value = "sig" * 43 + "s"  # 130 chars
+        mock_sign.return_value = "ab" * 65  # 130 个十六进制字符（65 字节）
         mock_broadcast.return_value = {"result": True, "txid": "d" * 64}
         
         result = call_router.call("transfer", {"to": TEST_TO, "amount": 10, "token": "TRX"})
@@ -381,7 +381,7 @@ class TestTransferRoute(unittest.TestCase):
         mock_get_addr.return_value = TEST_ADDRESS
         mock_preview.return_value = {"txID": "a" * 64, "raw_data": {}}
         mock_build.return_value = {"txID": "b" * 64, "raw_data": {}}
-        mock_sign.return_value = "sig" * 43 + "s"
+        mock_sign.return_value = "ab" * 65
         mock_broadcast.side_effect = Exception("Broadcast failed")
         
         result = call_router.call("transfer", {"to": TEST_TO, "amount": 100, "token": "USDT"})
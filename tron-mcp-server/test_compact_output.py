@@ -0,0 +1,175 @@
+"""
+测试列表类动作的紧凑输出（format="compact"）
+============================================
+
+覆盖场景：
+1. to_columns / compact_result：字段并集、缺失值为 None、字段投影、摘要可选
+2. 交易历史、内部交易、代币持仓、地址簿列表支持 format="compact"，与完整格式数据一致
+3. fields 在两种格式下均可用，未知字段、非法 format 返回 invalid_param（非法参数不发起请求）
+4. 紧凑输出的序列化体积随条目数增长明显小于完整格式
+5. 错误结果原样返回
+"""
+
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from unittest.mock import patch
+
+from tron_mcp_server import address_book
+from tron_mcp_server import call_router
+from tron_mcp_server import formatters
+from tron_mcp_server import tron_client
+
+ADDR = "TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7"
+OTHER = "TKyPzHiXW4Zms4txUxfWjXBidGzZpiCchn"
+
+
+def _transfers(n: int) -> dict:
+    return {
+        "total": n,
+        "data": [
+            {"transactionHash": f"{i:064x}", "transferFromAddress": ADDR, "transferToAddress": OTHER,
+             "amount": 1_000_000 * (i + 1), "tokenName": "_", "timestamp": 1_700_000_000_000 - i}
+            for i in range(n)
+        ],
+    }
+
+
+class TestFormatHelpers(unittest.TestCase):
+    """测试列式转换工具函数"""
+
+    def test_to_columns_union_of_keys(self):
+        table = formatters.to_columns([{"a": 1, "b": 2}, {"b": 3, "c": 4}])
+        self.assertEqual(table["columns"], ["a", "b", "c"])
+        self.assertEqual(table["rows"], [[1, 2, None], [None, 3, 4]])
+
+    def test_to_columns_projection(self):
+        table = formatters.to_columns([{"a": 1, "b": 2}], ["b", "a"])
+        self.assertEqual(table, {"columns": ["b", "a"], "rows": [[2, 1]]})
+
+    def test_compact_result_summary_optional(self):
+        result = {"total": 1, "items": [{"a": 1}], "summary": "s"}
+        self.assertNotIn("summary", formatters.compact_result(result, "items"))
+        compact = formatters.compact_result(result, "items", include_summary=True)
+        self.assertEqual(compact["summary"], "s")
+        self.assertEqual(compact["format"], "compact")
+        self.assertEqual(compact["total"], 1)
+
+
+class TestCompactActions(unittest.TestCase):
+    """测试列表类动作的 format / fields / include_summary 参数"""
+
+    def setUp(self):
+        history = patch.object(tron_client, "get_transfer_history", return_value=_transfers(30))
+        trc20 = patch.object(tron_client, "get_trc20_transfer_history", return_value={"total": 0, "token_transfers": []})
+        self.history = history.start()
+        trc20.start()
+        self.addCleanup(patch.stopall)
+
+    def test_history_compact_matches_full(self):
+        full = call_router.call("get_transaction_history", {"address": ADDR, "limit": 30})
+        compact = call_router.call("get_transaction_history", {"address": ADDR, "limit": 30, "format": "compact"})
+        self.assertEqual(compact["format"], "compact")
+        self.assertNotIn("summary", compact)
+        self.assertEqual(compact["total"], full["total"])
+        columns = compact["transfers"]["columns"]
+        self.assertEqual([dict(zip(columns, row)) for row in compact["transfers"]["rows"]], full["transfers"])
+
+    def test_compact_payload_smaller(self):
+        full = call_router.call("get_transaction_history", {"address": ADDR, "limit": 30})
+        compact = call_router.call("get_transaction_history", {
+            "address": ADDR, "limit": 30, "format": "compact", "fields": "txid,amount,direction",
+        })
+        self.assertLess(len(json.dumps(compact)), len(json.dumps(full)) * 0.6)
+        self.assertEqual(compact["transfers"]["columns"], ["txid", "amount", "direction"])
+        self.assertEqual(compact["transfers"]["rows"][0][1:], [1.0, "OUT"])
+
+    def test_fields_in_full_format(self):
+        result = call_router.call("get_transaction_history", {"address": ADDR, "fields": ["txid", "to"]})
+        self.assertEqual(set(result["transfers"][0]), {"txid", "to"})
+        self.assertIn("summary", result)
+
+    def test_include_summary(self):
+        result = call_router.call("get_transaction_history", {
+            "address": ADDR, "format": "compact", "include_summary": True,
+        })
+        self.assertIn("交易记录", result["summary"])
+
+    def test_invalid_params(self):
+        cases = [
+            {"format": "xml"},
+            {"fields": 5},
+            {"fields": ["txid", "nope"]},
+        ]
+        for extra in cases:
+            with self.subTest(extra=extra):
+                result = call_router.call("get_transaction_history", dict(address=ADDR, **extra))
+                self.assertEqual(result["error"], "invalid_param")
+        # 非法 format 在查询前拒绝
+        self.history.reset_mock()
+        call_router.call("get_transaction_history", {"address": ADDR, "format": "xml"})
+        self.history.assert_not_called()
+
+    def test_errors_pass_through(self):
+        result = call_router.call("get_transaction_history", {"address": "bad", "format": "compact"})
+        self.assertEqual(result["error"], "invalid_address")
+
+    def test_internal_transactions_compact(self):
+        data = {"total": 1, "data": [{"hash": "h", "callerAddress": ADDR, "transferToAddress": OTHER,
+                                      "callValueInfo": [{"callValue": 2_000_000}], "timestamp": 1}]}
+        with patch.object(tron_client, "get_internal_transactions", return_value=data):
+            result = call_router.call("get_internal_transactions", {
+                "address": ADDR, "format": "compact", "fields": ["txid", "amount"],
+            })
+        self.assertEqual(result["internal_transactions"], {"columns": ["txid", "amount"], "rows": [["h", 2.0]]})
+
+    def test_account_tokens_compact(self):
+        tokens = {"address": ADDR, "token_count": 1, "tokens": [
+            {"token_name": "trx", "token_abbr": "TRX", "balance": 5.0, "token_type": "native"},
+        ]}
+        with patch.object(tron_client, "get_account_tokens", return_value=tokens):
+            result = call_router.call("get_account_tokens", {"address": ADDR, "format": "compact"})
+        self.assertEqual(result["tokens"]["rows"], [["trx", "TRX", 5.0, "native"]])
+        self.assertEqual(result["token_count"], 1)
+
+
+class TestAddressBookCompact(unittest.TestCase):
+    """测试地址簿列表的紧凑输出"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.env_patcher = patch.dict(os.environ, {"TRON_ADDRESSBOOK_PATH": str(Path(self.temp_dir) / "book.json")})
+        self.env_patcher.start()
+
+    def tearDown(self):
+        address_book._close_sqlite_books()
+        self.env_patcher.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_addressbook_list_compact(self):
+        address_book.add_contact("alice", ADDR, "热钱包", ["exchange"])
+        address_book.add_contact("bob", OTHER)
+        result = call_router.call("addressbook_list", {"format": "compact", "fields": "alias,address"})
+        self.assertEqual(result["total"], 2)
+        self.assertEqual(sorted(result["contacts"]["rows"]), [["alice", ADDR], ["bob", OTHER]])
+        self.assertNotIn("summary", result)
+
+    def test_empty_list(self):
+        result = call_router.call("addressbook_list", {"format": "compact", "fields": "alias"})
+        self.assertEqual(result["contacts"], {"columns": ["alias"], "rows": []})
+
+
+if __name__ == "__main__":
+    unittest.main()
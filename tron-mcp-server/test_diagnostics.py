@@ -0,0 +1,213 @@
+"""
+测试 diagnostics.py 慢调用日志与采样 profiler
+============================================
+
+覆盖场景：
+1. 参数脱敏：敏感字段打码、长字符串截断、长列表截断
+2. 超过阈值的调用记录阶段耗时与上游请求，未超过阈值 / 关闭时不记录
+3. get_slow_calls 动作：列表、limit、调整阈值需开启管理动作
+4. admin_profiler 动作：未开启管理动作时拒绝，参数校验
+5. profiler 开启 / 停止 / 重复开启 / 到时自动停止，folded stacks 输出
+"""
+
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from unittest.mock import patch
+
+from mock_tron_server import MockTronServer
+from tron_mcp_server import call_router
+from tron_mcp_server import diagnostics
+
+RECIPIENT = "TKyPzHiXW4Zms4txUxfWjXBidGzZpiCchn"
+
+
+def _busy_loop(stop: threading.Event):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+class TestSanitizeParams(unittest.TestCase):
+    """测试参数脱敏"""
+
+    def test_sensitive_keys(self):
+        result = diagnostics.sanitize_params({"private_key": "abc", "TRONSCAN_API_KEY": "k", "to": RECIPIENT})
+        self.assertEqual(result, {"private_key": "***", "TRONSCAN_API_KEY": "***", "to": RECIPIENT})
+
+    def test_truncation(self):
+        result = diagnostics.sanitize_params({"signed_tx_json": "x" * 500, "aliases": list(range(8))})
+        self.assertTrue(result["signed_tx_json"].endswith("(500 chars)"))
+        self.assertLess(len(result["signed_tx_json"]), 100)
+        self.assertEqual(result["aliases"], [0, 1, 2, 3, 4, "…(+3)"])
+
+    def test_nested_and_objects(self):
+        result = diagnostics.sanitize_params({"contacts": [{"alias": "a", "password": "p"}], "obj": object()})
+        self.assertEqual(result["contacts"], [{"alias": "a", "password": "***"}])
+        self.assertIsInstance(result["obj"], str)
+
+
+class _SlowCallTestCase(unittest.TestCase):
+    def setUp(self):
+        diagnostics.clear_slow_calls()
+        self.previous = diagnostics.slow_call_threshold_ms()
+
+    def tearDown(self):
+        diagnostics.set_slow_call_threshold(self.previous)
+        diagnostics.clear_slow_calls()
+
+
+class TestSlowCallLog(_SlowCallTestCase):
+    """测试慢调用日志"""
+
+    def test_slow_call_logged_with_upstream(self):
+        diagnostics.set_slow_call_threshold(1)
+        with MockTronServer(latency_ms=20) as server, patch.dict(os.environ, server.env()):
+            with self.assertLogs("tron_mcp_server.diagnostics", level="WARNING") as logs:
+                result = call_router.call("get_balance", {"address": RECIPIENT})
+        self.assertNotIn("error", result)
+        self.assertNotIn("_timing", result)
+        self.assertIn("慢调用 get_balance", logs.output[0])
+
+        entry = diagnostics.recent_slow_calls()[0]
+        self.assertEqual(entry["action"], "get_balance")
+        self.assertEqual(entry["status"], "ok")
+        self.assertEqual(entry["params"], {"address": RECIPIENT})
+        self.assertGreaterEqual(entry["duration_ms"], 20)
+        self.assertEqual(len(entry["upstream"]), 1)
+        self.assertTrue(entry["upstream"][0]["url"].startswith(server.base_url + "/api/account"))
+
+    def test_fast_or_disabled_not_logged(self):
+        diagnostics.set_slow_call_threshold(60_000)
+        call_router.call("skills", {})
+        diagnostics.set_slow_call_threshold(0)
+        call_router.call("skills", {})
+        self.assertEqual(diagnostics.recent_slow_calls(), [])
+
+    def test_error_status_and_redaction(self):
+        diagnostics.set_slow_call_threshold(1)
+        with patch("tron_mcp_server.call_router._get_skills", side_effect=lambda: time.sleep(0.01) or {"error": "x"}):
+            with self.assertLogs("tron_mcp_server.diagnostics", level="WARNING"):
+                call_router.call("skills", {"private_key": "deadbeef"})
+        entry = diagnostics.recent_slow_calls()[0]
+        self.assertEqual(entry["status"], "error")
+        self.assertEqual(entry["params"], {"private_key": "***"})
+
+    def test_negative_threshold(self):
+        with self.assertRaises(ValueError):
+            diagnostics.set_slow_call_threshold(-1)
+
+
+class TestGetSlowCallsAction(_SlowCallTestCase):
+    """测试 get_slow_calls 动作"""
+
+    def test_list_and_limit(self):
+        diagnostics.set_slow_call_threshold(1)
+        with patch("tron_mcp_server.call_router._get_skills", side_effect=lambda: time.sleep(0.005) or {}):
+            with self.assertLogs("tron_mcp_server.diagnostics", level="WARNING"):
+                for _ in range(3):
+                    call_router.call("skills", {})
+        result = call_router.call("get_slow_calls", {"limit": 2})
+        self.assertEqual(len(result["calls"]), 2)
+        self.assertIn("慢调用阈值 1ms", result["summary"])
+
+    def test_disabled_summary(self):
+        diagnostics.set_slow_call_threshold(0)
+        result = call_router.call("get_slow_calls", {})
+        self.assertFalse(result["enabled"])
+        self.assertIn("已关闭", result["summary"])
+
+    def test_set_threshold_requires_admin(self):
+        with patch.dict(os.environ, {"TRON_ADMIN_ACTIONS": "false"}):
+            result = call_router.call("get_slow_calls", {"threshold_ms": 500})
+        self.assertEqual(result["error"], "admin_disabled")
+
+        with patch.dict(os.environ, {"TRON_ADMIN_ACTIONS": "true"}):
+            result = call_router.call("get_slow_calls", {"threshold_ms": 500})
+            self.assertEqual(result["threshold_ms"], 500)
+            self.assertEqual(call_router.call("get_slow_calls", {"threshold_ms": -1})["error"], "invalid_param")
+        self.assertEqual(call_router.call("get_slow_calls", {"limit": 0})["error"], "invalid_param")
+
+
+class TestAdminProfiler(unittest.TestCase):
+    """测试采样 profiler"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.env = patch.dict(os.environ, {"TRON_ADMIN_ACTIONS": "true", "TRON_PROFILE_DIR": self.temp_dir})
+        self.env.start()
+
+    def tearDown(self):
+        if diagnostics.profiler_status()["running"]:
+            diagnostics.stop_profiler()
+        self.env.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_requires_admin(self):
+        with patch.dict(os.environ, {"TRON_ADMIN_ACTIONS": ""}):
+            result = call_router.call("admin_profiler", {"command": "start"})
+        self.assertEqual(result["error"], "admin_disabled")
+
+    def test_invalid_params(self):
+        self.assertEqual(call_router.call("admin_profiler", {"command": "pause"})["error"], "invalid_param")
+        self.assertEqual(
+            call_router.call("admin_profiler", {"command": "start", "interval_ms": 0})["error"], "invalid_param"
+        )
+        self.assertEqual(
+            call_router.call("admin_profiler", {"command": "start", "duration_s": "abc"})["error"], "invalid_param"
+        )
+
+    def test_start_stop_dump(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=_busy_loop, args=(stop,))
+        worker.start()
+        try:
+            result = call_router.call("admin_profiler", {"command": "start", "interval_ms": 2})
+            self.assertTrue(result["running"])
+            self.assertEqual(
+                call_router.call("admin_profiler", {"command": "start"})["error"], "invalid_state"
+            )
+            time.sleep(0.3)
+            result = call_router.call("admin_profiler", {"command": "stop"})
+        finally:
+            stop.set()
+            worker.join()
+
+        self.assertFalse(result["running"])
+        self.assertGreater(result["samples"], 10)
+        self.assertTrue(any("_busy_loop" in t["stack"] for t in result["top"]))
+        self.assertIn("热点调用栈", result["summary"])
+
+        path = Path(result["last_dump"])
+        self.assertEqual(path.parent, Path(self.temp_dir))
+        lines = path.read_text(encoding="utf-8").splitlines()
+        self.assertTrue(all(line.rsplit(" ", 1)[1].isdigit() for line in lines))
+        self.assertTrue(any("test_diagnostics:_busy_loop" in line for line in lines))
+        self.assertFalse(any("diagnostics:_sample" in line for line in lines))
+
+    def test_auto_stop_and_periodic_dump(self):
+        diagnostics.start_profiler(interval_ms=2, duration_s=0.2, dump_interval_s=0.05)
+        deadline = time.time() + 5
+        while diagnostics.profiler_status()["running"] and time.time() < deadline:
+            time.sleep(0.02)
+        status = call_router.call("admin_profiler", {"command": "status"})
+        self.assertFalse(status["running"])
+        self.assertIsNotNone(status["last_dump"])
+        self.assertTrue(Path(status["last_dump"]).exists())
+        self.assertIsNone(call_router.call("admin_profiler", {"command": "dump"}).get("error"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,230 @@
+"""
+测试 fee_estimator.py 手续费预估
+================================
+
+覆盖场景：
+1. 综合发送方资源、链参数单价、接收方状态与能量模拟得出燃烧明细
+2. 接收方未持有代币 / 未激活时的能量与激活费
+3. 开启缓存后重复预估不产生上游请求，同一接收方状态只模拟一次
+4. 能量模拟回滚、链上数据不可用时回退到静态估算
+5. estimate_fee 动作的参数校验、默认使用本地钱包，build_tx 附带预估明细
+6. 能量模拟默认缓存：按 (合约, 方法, 接收方是否持有) 区分，并发请求只模拟一次，失败不缓存
+"""
+
+import unittest
+import sys
+import os
+
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import threading
+from unittest.mock import patch
+
+from mock_tron_server import MOCK_SIMULATED_ENERGY, MockServerTestCase
+from tron_mcp_server import call_router
+from tron_mcp_server import fee_estimator
+from tron_mcp_server import tron_client
+from tron_mcp_server import trongrid_client
+
+OWNER = "TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7"
+RECIPIENT = "TKyPzHiXW4Zms4txUxfWjXBidGzZpiCchn"
+OTHER = "TXYZopYRdj2D9XRtbG411XZZ3kM5VkAeBf"
+
+_CACHE_TTLS = {
+    "TRON_CACHE_TTL_ACCOUNT": "60",
+    "TRON_CACHE_TTL_ACCOUNT_RESOURCE": "60",
+    "TRON_CACHE_TTL_CHAIN_PARAMS": "60",
+    "TRON_CACHE_TTL_ENERGY_SIMULATION": "600",
+}
+
+
+class TestEstimate(MockServerTestCase):
+    """测试预估明细"""
+
+    def test_usdt_to_holder(self):
+        # 模拟账户：剩余质押能量 75,000，质押带宽剩余 4,700，接收方持有 USDT
+        estimate = fee_estimator.estimate_fee(OWNER, RECIPIENT, 10, "USDT")
+        self.assertEqual(estimate["energy_required"], MOCK_SIMULATED_ENERGY)
+        self.assertEqual(estimate["energy_source"], "simulation")
+        self.assertEqual(estimate["energy_available"], 75_000)
+        self.assertEqual(estimate["energy_burn_sun"], 0)
+        self.assertEqual(estimate["bandwidth_source"], "staked")
+        self.assertTrue(estimate["recipient_holds_token"])
+        self.assertEqual(estimate["price_source"], "chain")
+        self.assertEqual(estimate["total_burn_sun"], 0)
+
+    def test_energy_beyond_staked_is_burned(self):
+        resources = {
+            "energy": {"energy_remaining": 10_000},
+            "bandwidth": {"free_net_remaining": 0, "net_remaining": 0},
+        }
+        with patch.object(tron_client, "get_account_resources", return_value=resources):
+            estimate = fee_estimator.estimate_fee(OWNER, RECIPIENT, 10, "USDT")
+        energy_burn = (MOCK_SIMULATED_ENERGY - 10_000) * 420
+        self.assertEqual(estimate["energy_burn_sun"], energy_burn)
+        self.assertEqual(estimate["bandwidth_source"], "burn")
+        self.assertEqual(estimate["bandwidth_burn_sun"], 350 * 1000)
+        self.assertEqual(estimate["total_burn_sun"], energy_burn + 350_000)
+
+    def test_empty_recipient_simulated_separately(self):
+        with patch.object(tron_client, "get_recipient_state", return_value={"is_activated": True, "holds_usdt": False}):
+            estimate = fee_estimator.estimate_fee(OWNER, OTHER, 10, "USDT")
+        self.assertFalse(estimate["recipient_holds_token"])
+        self.assertEqual(self._count("/wallet/triggerconstantcontract"), 1)
+
+    def test_trx_to_inactive_account(self):
+        resources = {
+            "energy": {"energy_remaining": 0},
+            "bandwidth": {"free_net_remaining": 600, "net_remaining": 0},
+        }
+        with patch.object(tron_client, "get_recipient_state", return_value={"is_activated": False, "holds_usdt": False}), \
+                patch.object(tron_client, "get_account_resources", return_value=resources):
+            estimate = fee_estimator.estimate_fee(OWNER, OTHER, 1, "TRX")
+        self.assertEqual(estimate["energy_required"], 0)
+        self.assertEqual(estimate["activation_fee_sun"], 1_000_000)
+        self.assertEqual(estimate["bandwidth_burn_sun"], 100_000)
+        self.assertEqual(estimate["total_burn_sun"], 1_100_000)
+
+    def test_trx_to_active_account_uses_free_bandwidth(self):
+        estimate = fee_estimator.estimate_fee(OWNER, RECIPIENT, 1, "TRX")
+        self.assertEqual(estimate["bandwidth_source"], "staked")
+        self.assertEqual(estimate["total_burn_sun"], 0)
+        self.assertEqual(self._count("/wallet/triggerconstantcontract"), 0)
+
+
+class TestCaching(MockServerTestCase):
+    """测试重复预估命中缓存"""
+
+    env_vars = _CACHE_TTLS
+
+    def test_repeat_estimates_without_round_trips(self):
+        fee_estimator.estimate_fee(OWNER, RECIPIENT, 10, "USDT")
+        before = sum(self.server.request_counts().values())
+        for amount in (1, 5, 50):
+            fee_estimator.estimate_fee(OWNER, RECIPIENT, amount, "USDT")
+        self.assertEqual(sum(self.server.request_counts().values()), before)
+
+    def test_one_simulation_per_recipient_state(self):
+        for recipient in (RECIPIENT, OTHER):
+            fee_estimator.estimate_fee(OWNER, recipient, 10, "USDT")
+        self.assertEqual(self._count("/wallet/triggerconstantcontract"), 1)
+
+
+class TestSimulationMemo(MockServerTestCase):
+    """测试能量模拟结果缓存（未配置 TRON_CACHE_TTL_ENERGY_SIMULATION 时默认开启）"""
+
+    def _estimate(self, holds: bool, contract=None, owner=OWNER, amount_raw=10_000_000):
+        return trongrid_client.estimate_trc20_transfer_energy(owner, RECIPIENT, amount_raw, holds, contract)
+
+    def test_batch_payouts_simulate_once(self):
+        for amount in range(1, 51):
+            self.assertEqual(self._estimate(True, amount_raw=amount * 1_000_000), MOCK_SIMULATED_ENERGY)
+        self._estimate(True, owner=OTHER)
+        self.assertEqual(self._count("/wallet/triggerconstantcontract"), 1)
+
+    def test_keyed_by_contract_and_recipient_state(self):
+        self._estimate(True)
+        self._estimate(False)
+        self._estimate(True, contract="TXYZopYRdj2D9XRtbG411XZZ3kM5VkAeBf")
+        self._estimate(False)
+        self.assertEqual(self._count("/wallet/triggerconstantcontract"), 3)
+
+    def test_concurrent_misses_simulate_once(self):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self._estimate(True))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [MOCK_SIMULATED_ENERGY] * 8)
+        self.assertEqual(self._count("/wallet/triggerconstantcontract"), 1)
+
+    def test_zero_ttl_disables_memo(self):
+        with patch.dict(os.environ, {"TRON_CACHE_TTL_ENERGY_SIMULATION": "0"}):
+            self._estimate(True)
+            self._estimate(True)
+        self.assertEqual(self._count("/wallet/triggerconstantcontract"), 2)
+
+    def test_failures_not_cached(self):
+        reverted = {"result": {"result": False, "message": "REVERT"}}
+        with patch.object(trongrid_client, "_post", return_value=reverted):
+            with self.assertRaises(ValueError):
+                self._estimate(True)
+        self.assertEqual(self._estimate(True), MOCK_SIMULATED_ENERGY)
+        self.assertEqual(self._count("/wallet/triggerconstantcontract"), 1)
+
+
+class TestFallback(MockServerTestCase):
+    """测试回退到静态估算"""
+
+    def test_unknown_sender_uses_static_model(self):
+        usdt = fee_estimator.estimate_fee("TAddress", None, 10, "USDT")
+        self.assertEqual(usdt["total_burn_sun"], 65_000 * 420)
+        self.assertEqual((usdt["energy_source"], usdt["price_source"]), ("default", "default"))
+        trx = fee_estimator.estimate_fee("TAddress", None, 10, "TRX")
+        self.assertEqual(trx["total_burn_sun"], 100_000)
+        self.assertEqual(sum(self.server.request_counts().values()), 0)
+
+    def test_simulation_revert(self):
+        reverted = {"result": {"result": True}, "energy_used": 500, "transaction": {"ret": [{"ret": "FAILED"}]}}
+        with patch("tron_mcp_server.trongrid_client._post", return_value=reverted):
+            estimate = fee_estimator.estimate_fee(OWNER, RECIPIENT, 10, "USDT")
+        self.assertEqual(estimate["energy_required"], fee_estimator.ESTIMATED_USDT_ENERGY)
+        self.assertEqual(estimate["energy_source"], "default")
+
+    def test_upstream_down(self):
+        self.server.error_rate = 1.0
+        estimate = fee_estimator.estimate_fee(OWNER, RECIPIENT, 10, "USDT")
+        self.assertEqual(estimate["resources_source"], "default")
+        self.assertEqual(estimate["total_burn_sun"], 65_000 * 420)
+
+    def test_unsupported_token(self):
+        with self.assertRaises(ValueError):
+            fee_estimator.estimate_fee(OWNER, RECIPIENT, 10, "XYZ")
+
+
+class TestActions(MockServerTestCase):
+    """测试 estimate_fee / build_tx 动作"""
+
+    def test_estimate_fee_action(self):
+        result = call_router.call("estimate_fee", {"from": OWNER, "to": RECIPIENT, "amount": 10})
+        self.assertNotIn("error", result)
+        self.assertEqual(result["total_burn_sun"], 0)
+        self.assertIn("预估燃烧", result["summary"])
+
+    def test_default_sender_is_local_wallet(self):
+        from tron_mcp_server import key_manager
+
+        private_key = "0" * 63 + "1"
+        with patch.dict(os.environ, {"TRON_PRIVATE_KEY": private_key}):
+            result = call_router.call("estimate_fee", {"to": RECIPIENT, "amount": 1, "token": "TRX"})
+        self.assertEqual(result["from_address"], key_manager.get_address_from_private_key(private_key))
+
+    def test_validation(self):
+        with patch.dict(os.environ, {"TRON_PRIVATE_KEY": ""}):
+            self.assertEqual(call_router.call("estimate_fee", {"to": RECIPIENT, "amount": 1})["error"], "missing_param")
+        cases = [
+            ({"from": OWNER, "amount": 1}, "missing_param"),
+            ({"from": OWNER, "to": "bad", "amount": 1}, "invalid_address"),
+            ({"from": OWNER, "to": RECIPIENT, "amount": -1}, "invalid_amount"),
+            ({"from": OWNER, "to": RECIPIENT, "amount": 1, "token": "XYZ"}, "invalid_token"),
+        ]
+        for params, error_type in cases:
+            with self.subTest(params=params):
+                self.assertEqual(call_router.call("estimate_fee", params)["error"], error_type)
+
+    def test_build_tx_includes_estimate(self):
+        result = call_router.call("build_tx", {"from": OWNER, "to": RECIPIENT, "amount": 1, "token": "USDT"})
+        self.assertNotIn("error", result)
+        self.assertEqual(result["fee_estimate"]["energy_source"], "simulation")
+        self.assertNotIn("fee_estimate", result["unsigned_tx"])
+        self.assertIn("预估燃烧", result["summary"])
+
+
+if __name__ == "__main__":
+    unittest.main()
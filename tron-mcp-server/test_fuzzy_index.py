@@ -0,0 +1,182 @@
+"""
+测试 fuzzy_index.py - 别名模糊搜索索引
+======================================
+
+覆盖场景：
+1. 与逐个计算 SequenceMatcher 的旧实现结果完全一致（阈值、排序、同分顺序）
+2. 中文 / 全角别名
+3. 增量添加、删除后结果仍一致
+4. 大地址簿下的查询耗时
+5. address_book.lookup 复用索引
+"""
+
+import unittest
+import sys
+import os
+import random
+import shutil
+import tempfile
+import time
+from difflib import SequenceMatcher
+from pathlib import Path
+
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from unittest.mock import patch
+
+from tron_mcp_server import fuzzy_index
+from tron_mcp_server.fuzzy_index import FuzzyIndex
+
+
+def _linear_search(aliases, query, limit=3, threshold=0.5):
+    """旧实现：逐个计算相似度，过滤、稳定排序后取前 limit 个"""
+    matches = []
+    for alias in aliases:
+        similarity = SequenceMatcher(
+            None, fuzzy_index.normalize(query), fuzzy_index.normalize(alias)
+        ).ratio()
+        if similarity > threshold:
+            matches.append((alias, similarity))
+    matches.sort(key=lambda m: m[1], reverse=True)
+    return matches[:limit]
+
+
+def _random_aliases(count, seed=7):
+    rng = random.Random(seed)
+    words = ["binance", "okx", "huobi", "hot", "cold", "wallet", "deposit",
+             "customer", "payout", "treasury", "kraken", "bybit"]
+    cjk = "张王李赵刘陈杨黄周吴客户老板财务小明红"
+    aliases = []
+    for i in range(count):
+        if i % 3 == 0:
+            aliases.append("".join(rng.choice(cjk) for _ in range(rng.randint(2, 5))) + str(i % 40))
+        else:
+            aliases.append(f"{rng.choice(words)}-{rng.choice(words)}-{i % 200}")
+    return list(dict.fromkeys(aliases))
+
+
+class TestFuzzyIndexCompatibility(unittest.TestCase):
+    """测试索引结果与线性扫描一致"""
+
+    def setUp(self):
+        self.aliases = _random_aliases(1500)
+        self.index = FuzzyIndex(self.aliases)
+        rng = random.Random(11)
+        self.queries = [
+            "binance-hot", "treasury-wallet-12", "waLLet", "张三", "客户老板",
+            "小", "x", "", "zzzz", "ＢＩＮＡＮＣＥ",
+        ] + rng.sample(self.aliases, 40)
+
+    def test_matches_linear_scan(self):
+        """各种查询与线性扫描结果完全相同"""
+        for query in self.queries:
+            with self.subTest(query=query):
+                self.assertEqual(self.index.search(query), _linear_search(self.aliases, query))
+
+    def test_custom_limit_and_threshold(self):
+        """自定义 limit / threshold 时同样一致"""
+        for query in self.queries[:10]:
+            with self.subTest(query=query):
+                self.assertEqual(
+                    self.index.search(query, limit=10, threshold=0.3),
+                    _linear_search(self.aliases, query, limit=10, threshold=0.3),
+                )
+
+    def test_ties_keep_insertion_order(self):
+        """同分时按插入顺序返回"""
+        aliases = ["ab-2", "ab-1", "ab-3", "ab-4"]
+        index = FuzzyIndex(aliases)
+        self.assertEqual([a for a, _ in index.search("ab")], ["ab-2", "ab-1", "ab-3"])
+
+    def test_add_and_remove(self):
+        """增量增删后结果仍与线性扫描一致"""
+        for alias in self.aliases[::2]:
+            self.index.remove(alias)
+        remaining = self.aliases[1::2]
+        for alias in ["binance-hot-new", "张三丰", "客户老板"]:
+            self.index.add(alias)
+            remaining.append(alias)
+
+        self.assertEqual(len(self.index), len(remaining))
+        for query in self.queries:
+            with self.subTest(query=query):
+                self.assertEqual(self.index.search(query), _linear_search(remaining, query))
+
+
+class TestFuzzyIndexUnicode(unittest.TestCase):
+    """测试 CJK 与全角字符"""
+
+    def test_cjk_aliases(self):
+        """中文别名按字符匹配"""
+        index = FuzzyIndex(["小明", "小红", "老王"])
+        aliases = [a for a, _ in index.search("小")]
+        self.assertEqual(sorted(aliases), ["小明", "小红"])
+
+    def test_fullwidth_normalization(self):
+        """全角字母数字与半角视为相同"""
+        index = FuzzyIndex(["Binance01"])
+        result = index.search("ＢＩＮＡＮＣＥ０１")
+        self.assertEqual(result[0][0], "Binance01")
+        self.assertEqual(result[0][1], 1.0)
+
+
+class TestFuzzyIndexPerformance(unittest.TestCase):
+    """测试大地址簿下的查询耗时"""
+
+    def test_large_book_query_is_fast(self):
+        """5000 个别名的模糊查询应远快于线性扫描"""
+        aliases = _random_aliases(5000)
+        index = FuzzyIndex(aliases)
+        queries = ["binance-hot", "treasury-wallet-12", "客户老板", "waLLet"]
+
+        start = time.perf_counter()
+        for _ in range(20):
+            for query in queries:
+                index.search(query)
+        per_query_ms = (time.perf_counter() - start) * 1000 / (20 * len(queries))
+        print(f"\n[fuzzy_index] 5000 aliases: {per_query_ms:.3f} ms/query")
+
+        # CI 机器差异较大，这里只设宽松上限
+        self.assertLess(per_query_ms, 20)
+
+
+class TestAddressBookUsesIndex(unittest.TestCase):
+    """测试 address_book.lookup 复用模糊索引"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.env_patcher = patch.dict(
+            os.environ, {"TRON_ADDRESSBOOK_PATH": str(Path(self.temp_dir) / "book.json")}
+        )
+        self.env_patcher.start()
+
+    def tearDown(self):
+        self.env_patcher.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_index_built_once_for_repeated_misses(self):
+        """多次未命中查询只构建一次索引；写入后重建"""
+        from tron_mcp_server import address_book
+
+        address_book.add_contact("小明", "TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7")
+        address_book.add_contact("小红", "TKyPzHiXW4Zms4txUxfWjXBidGzZpiCchn")
+
+        with patch.object(address_book, "FuzzyIndex", wraps=FuzzyIndex) as mock_index:
+            for _ in range(3):
+                result = address_book.lookup("小")
+            self.assertEqual(mock_index.call_count, 1)
+            self.assertEqual(len(result["similar_matches"]), 2)
+
+            address_book.add_contact("小刚", "TPepEjJgigAbcGWkxnyjdCE2X8ZQanAXbW")
+            result = address_book.lookup("小")
+            self.assertEqual(mock_index.call_count, 2)
+            self.assertEqual(len(result["similar_matches"]), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,196 @@
+"""
+测试 http_client.py 录制 / 回放 (cassette)
+==========================================
+
+覆盖场景：
+1. 请求匹配键：忽略主机名、参数排序、请求体摘要
+2. 对模拟服务录制转账 / 历史 / 风控流程，关闭服务后离线回放结果一致
+3. 未录制的请求按网络错误处理
+4. 按原始耗时回放（timing 倍率）
+5. gzip 压缩文件、重复请求按顺序回放、环境变量启用
+6. benchmark.py 录制与离线回放
+"""
+
+import unittest
+import sys
+import os
+import gzip
+import json
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from unittest.mock import patch
+
+import httpx
+
+import benchmark
+from mock_tron_server import MockTronServer
+from tron_mcp_server import call_router
+from tron_mcp_server import http_client
+
+ADDRESS = "TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7"
+RECIPIENT = "TKyPzHiXW4Zms4txUxfWjXBidGzZpiCchn"
+PRIVATE_KEY = "0" * 63 + "1"
+
+
+def _response(payload, status=200):
+    return httpx.Response(status, json=payload, request=httpx.Request("GET", "http://x/api/block"))
+
+
+class _TempDirMixin:
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+class TestRequestKey(unittest.TestCase):
+    """测试请求匹配键"""
+
+    def test_host_ignored_and_params_sorted(self):
+        a = http_client.request_key("get", "https://apilist.tronscan.org/api/account?b=2", {"a": 1})
+        b = http_client.request_key("GET", "http://127.0.0.1:9/api/account/", {"b": "2", "a": "1"})
+        self.assertEqual(a, b)
+        self.assertEqual(a, "GET /api/account?a=1&b=2")
+
+    def test_body_digest(self):
+        a = http_client.request_key("POST", "http://h/wallet/x", json_body={"a": 1, "b": 2})
+        b = http_client.request_key("POST", "http://h/wallet/x", json_body={"b": 2, "a": 1})
+        c = http_client.request_key("POST", "http://h/wallet/x", json_body={"a": 2, "b": 2})
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
+
+
+class TestRecordReplayFlows(_TempDirMixin, unittest.TestCase):
+    """录制真实 HTTP 交互后离线回放"""
+
+    def _flows(self):
+        return {
+            "balance": call_router.call("get_balance", {"address": ADDRESS}),
+            "safety": call_router.call("check_account_safety", {"address": RECIPIENT}),
+            "history": call_router.call("get_transaction_history", {"address": ADDRESS, "limit": 5}),
+            "transfer": call_router.call("transfer", {"to": RECIPIENT, "amount": 1, "token": "USDT"}),
+        }
+
+    def test_replay_offline_matches_recording(self):
+        path = Path(self.temp_dir) / "flows.json.gz"
+        # 回放阶段服务已关闭，环境变量仍指向原端口
+        with MockTronServer() as server, patch.dict(os.environ, dict(server.env(), TRON_PRIVATE_KEY=PRIVATE_KEY)):
+            with http_client.use_cassette(path, mode="record") as cassette:
+                recorded = self._flows()
+            self.assertGreaterEqual(len(cassette), 12)
+            env = dict(server.env(), TRON_PRIVATE_KEY=PRIVATE_KEY)
+
+        with patch.dict(os.environ, env), patch("httpx.get", side_effect=AssertionError("不应访问网络")), \
+                patch("httpx.post", side_effect=AssertionError("不应访问网络")):
+            with http_client.use_cassette(path, mode="replay"):
+                replayed = self._flows()
+
+        self.assertNotIn("error", recorded["transfer"])
+        self.assertEqual(replayed["balance"], recorded["balance"])
+        self.assertEqual(replayed["safety"], recorded["safety"])
+        self.assertEqual(replayed["history"], recorded["history"])
+        self.assertEqual(replayed["transfer"]["txid"], recorded["transfer"]["txid"])
+
+    def test_cassette_miss_is_network_error(self):
+        path = Path(self.temp_dir) / "empty.json"
+        path.write_text(json.dumps({"version": 1, "interactions": []}), encoding="utf-8")
+        with http_client.use_cassette(path):
+            with self.assertRaises(httpx.TransportError):
+                http_client.get("https://apilist.tronscan.org/api/block")
+            result = call_router.call("get_network_status", {})
+        self.assertIn("error", result)
+
+
+class TestCassetteFile(_TempDirMixin, unittest.TestCase):
+    """测试 cassette 文件与回放顺序"""
+
+    def _record(self, path, responses, elapsed=0.0, params=None):
+        cassette = http_client.Cassette(path, mode="record")
+        for payload in responses:
+            cassette.record("GET", "http://h/api/block", params or {"limit": 1}, None, _response(payload), elapsed)
+        cassette.save()
+
+    def test_gzip_and_sequential_replay(self):
+        path = Path(self.temp_dir) / "seq.json.gz"
+        self._record(path, [{"n": 1}, {"n": 2}])
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            self.assertEqual(len(json.load(f)["interactions"]), 2)
+
+        cassette = http_client.Cassette(path)
+        seen = [cassette.play("GET", "http://other/api/block", {"limit": "1"}).json()["n"] for _ in range(3)]
+        self.assertEqual(seen, [1, 2, 2])
+
+    def test_replayed_response_raises_for_status(self):
+        path = Path(self.temp_dir) / "err.json"
+        cassette = http_client.Cassette(path, mode="record")
+        cassette.record("GET", "http://h/api/block", None, None, _response({"Error": "x"}, status=503), 0.01)
+        cassette.save()
+
+        response = http_client.Cassette(path).play("GET", "http://h/api/block")
+        self.assertEqual(response.status_code, 503)
+        with self.assertRaises(httpx.HTTPStatusError):
+            response.raise_for_status()
+
+    def test_timing_profile(self):
+        path = Path(self.temp_dir) / "timing.json"
+        self._record(path, [{"n": 1}], elapsed=0.08)
+
+        start = time.perf_counter()
+        http_client.Cassette(path, timing=1.0).play("GET", "http://h/api/block", {"limit": 1})
+        self.assertGreaterEqual(time.perf_counter() - start, 0.07)
+
+        start = time.perf_counter()
+        http_client.Cassette(path, timing=0).play("GET", "http://h/api/block", {"limit": 1})
+        self.assertLess(time.perf_counter() - start, 0.05)
+
+    def test_env_activation(self):
+        path = Path(self.temp_dir) / "env.json"
+        self._record(path, [{"data": [{"number": 42, "hash": "h"}]}],
+                     params={"sort": "-number", "limit": 1, "start": 0})
+        http_client._env_cassettes.clear()
+        try:
+            env = {"TRON_HTTP_CASSETTE": str(path), "TRON_HTTP_CASSETTE_MODE": "replay",
+                   "TRONSCAN_API_URL": "https://apilist.tronscan.org/api"}
+            with patch.dict(os.environ, env), patch("httpx.get", side_effect=AssertionError("不应访问网络")):
+                result = call_router.call("get_network_status", {})
+            self.assertNotIn("error", result)
+            self.assertEqual(result["latest_block"], 42)
+        finally:
+            http_client._env_cassettes.clear()
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            http_client.Cassette(Path(self.temp_dir) / "x.json", mode="rewind")
+        with self.assertRaises(FileNotFoundError):
+            http_client.Cassette(Path(self.temp_dir) / "missing.json")
+
+
+class TestBenchmarkCassette(_TempDirMixin, unittest.TestCase):
+    """benchmark.py 录制后离线回放"""
+
+    def test_record_then_replay(self):
+        path = str(Path(self.temp_dir) / "bench.json.gz")
+        actions = ["get_balance", "check_account_safety", "transfer", "broadcast_tx"]
+        recorded = benchmark.run_benchmark(actions, requests=2, concurrency=2, cassette=path, cassette_mode="record")
+        self.assertEqual(recorded["total_errors"], 0)
+
+        replayed = benchmark.run_benchmark(actions, requests=4, concurrency=2, cassette=path)
+        self.assertEqual(replayed["total_errors"], 0)
+        self.assertEqual(replayed["mock_requests"], {})
+        rows = {row["action"]: row for row in replayed["actions"]}
+        self.assertEqual(rows["check_account_safety"]["upstream_per_call"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+"""
+测试冷启动导入开销 - 延迟导入回归保护
+=====================================
+
+stdio 模式下每个 Agent 会话都会启动一个新进程，导入成本会被反复支付。
+本测试在子进程中以 `python -X importtime` 方式导入入口模块，并：
+1. 断言重量级依赖（ecdsa / pycryptodome / qrcode / PIL / difflib）未被提前加载
+2. 输出按累计耗时排序的导入报告（pytest -s 可见），便于定位回归来源
+3. 校验导入总耗时不超过预算（可通过 TRON_IMPORT_BUDGET_MS 调整）
+"""
+
+import unittest
+import sys
+import os
+import subprocess
+import importlib.machinery
+
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+# 冷启动时不应加载的重量级模块（仅在对应动作首次调用时加载）
+HEAVY_MODULES = (
+    "ecdsa",
+    "Crypto",
+    "qrcode",
+    "PIL",
+    "difflib",
+    "tron_mcp_server.key_manager",
+    "tron_mcp_server.qrcode_generator",
+    "tron_mcp_server.address_book",
+    "tron_mcp_server.trongrid_client",
+)
+
+# 导入总耗时预算（毫秒），CI 机器较慢时可通过环境变量放宽
+IMPORT_BUDGET_MS = float(os.getenv("TRON_IMPORT_BUDGET_MS", "3000"))
+
+
+def _run_importtime(statement: str) -> list:
+    """
+    在干净的子进程中执行导入语句，解析 -X importtime 输出
+
+    Returns:
+        [(module_name, self_us, cumulative_us), ...]
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=project_root,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    if proc.returncode != 0:
+        raise AssertionError(f"导入失败:\n{proc.stderr[-2000:]}")
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        # 格式: "import time:   self |   cumulative |   module"
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append((name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def _format_report(entries: list, top: int = 15) -> str:
+    """生成按累计耗时排序的导入报告"""
+    lines = [f"{'cumulative(ms)':>15} {'self(ms)':>10}  module"]
+    for name, self_us, cumulative_us in sorted(entries, key=lambda e: e[2], reverse=True)[:top]:
+        lines.append(f"{cumulative_us / 1000:>15.1f} {self_us / 1000:>10.1f}  {name}")
+    return "\n".join(lines)
+
+
+def _loaded_heavy_modules(entries: list) -> list:
+    names = {name for name, _, _ in entries}
+    return sorted(
+        name for name in names
+        if any(name == heavy or name.startswith(heavy + ".") for heavy in HEAVY_MODULES)
+    )
+
+
+class TestColdStartImports(unittest.TestCase):
+    """测试入口模块冷启动时不加载重量级依赖"""
+
+    def test_call_router_import_is_lightweight(self):
+        """导入 call_router 不应加载签名、二维码、地址簿等子系统"""
+        entries = _run_importtime("import tron_mcp_server.call_router")
+        print("\n[importtime] tron_mcp_server.call_router\n" + _format_report(entries))
+
+        self.assertEqual(_loaded_heavy_modules(entries), [])
+
+    def test_call_router_import_within_budget(self):
+        """导入 call_router 的累计耗时应在预算内"""
+        entries = _run_importtime("import tron_mcp_server.call_router")
+        total_ms = sum(self_us for _, self_us, _ in entries) / 1000
+
+        self.assertLess(
+            total_ms, IMPORT_BUDGET_MS,
+            f"冷启动导入耗时 {total_ms:.1f}ms 超出预算 {IMPORT_BUDGET_MS:.0f}ms\n" + _format_report(entries),
+        )
+
+    # 其他测试文件会把 mock 对象塞进 sys.modules["mcp"]，这里直接查找安装路径
+    @unittest.skipUnless(importlib.machinery.PathFinder.find_spec("mcp"), "未安装 mcp 包")
+    def test_server_import_is_lightweight(self):
+        """导入 server（注册全部 MCP 工具）不应加载重量级子系统"""
+        entries = _run_importtime("import tron_mcp_server.server")
+        print("\n[importtime] tron_mcp_server.server\n" + _format_report(entries))
+
+        self.assertEqual(_loaded_heavy_modules(entries), [])
+
+
+class TestLazyModuleAccess(unittest.TestCase):
+    """测试延迟导入后模块属性访问仍然可用"""
+
+    def test_call_router_lazy_attributes(self):
+        """call_router.key_manager 等属性应按需返回真实模块"""
+        from tron_mcp_server import call_router
+        from tron_mcp_server import key_manager, address_book
+
+        self.assertIs(call_router.key_manager, key_manager)
+        self.assertIs(call_router.address_book, address_book)
+
+    def test_call_router_unknown_attribute(self):
+        """未声明的属性仍应抛出 AttributeError"""
+        from tron_mcp_server import call_router
+
+        with self.assertRaises(AttributeError):
+            call_router.not_a_module
+
+    def test_package_lazy_attributes(self):
+        """tron_mcp_server.<子模块> 属性访问应按需导入"""
+        import tron_mcp_server
+
+        self.assertIsNotNone(tron_mcp_server.qrcode_generator.generate_address_qrcode)
+
+    def test_qrcode_action_loads_module_on_demand(self):
+        """首次调用 generate_qrcode 动作时才导入二维码模块"""
+        proc = subprocess.run(
+            [
+                sys.executable, "-c",
+                "import sys, tempfile\n"
+                "from tron_mcp_server import call_router\n"
+                "assert 'qrcode' not in sys.modules\n"
+                "r = call_router.call('generate_qrcode', {'address': 'TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7',"
+                " 'output_dir': tempfile.mkdtemp()})\n"
+                "assert 'file_path' in r, r\n"
+                "assert 'qrcode' in sys.modules\n",
+            ],
+            cwd=project_root,
+            capture_output=True,
+            text=True,
+            timeout=60,
+        )
+        self.assertEqual(proc.returncode, 0, proc.stderr[-2000:])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+测试 json_codec.py JSON 编解码层
+================================
+
+覆盖场景：
+1. orjson 与标准库两种编解码器结果一致（紧凑输出、非 ASCII 原样、非字符串键、default=str）
+2. 超出 64 位的整数：解析与序列化均保持精确（自动改用标准库）
+3. 非法 JSON 在两种编解码器下都抛出 json.JSONDecodeError
+4. TRON_JSON_CODEC 选择编解码器，未安装 orjson 时回退标准库
+5. response_json：httpx.Response 按字节解析，其他响应对象使用自身的 json()
+6. 上游解析与 broadcast_tx / sign_tx 的交易 JSON 输入经过编解码层
+"""
+
+import unittest
+import sys
+import os
+
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import json
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+import httpx
+
+from tron_mcp_server import call_router
+from tron_mcp_server import json_codec
+from tron_mcp_server import tron_client
+
+CODECS = ("stdlib", "orjson") if json_codec.orjson is not None else ("stdlib",)
+
+
+class _CodecTestCase(unittest.TestCase):
+    def tearDown(self):
+        json_codec.configure()
+
+    def each_codec(self):
+        for codec in CODECS:
+            json_codec.configure(codec)
+            with self.subTest(codec=codec):
+                yield codec
+
+
+class TestRoundTrip(_CodecTestCase):
+    """测试两种编解码器的一致性"""
+
+    def test_dumps_compact_and_unicode(self):
+        for _ in self.each_codec():
+            self.assertEqual(json_codec.dumps({"a": [1, 2.5, None, True], "名": "值"}),
+                             '{"a":[1,2.5,null,true],"名":"值"}')
+
+    def test_dumps_non_str_keys_and_default(self):
+        for _ in self.each_codec():
+            self.assertEqual(json.loads(json_codec.dumps({1: Decimal("1.5")})), {"1": "1.5"})
+
+    def test_loads_str_and_bytes(self):
+        text = '{"txID": "ab", "raw_data": {"timestamp": 1700000000000}, "名": "值"}'
+        for _ in self.each_codec():
+            self.assertEqual(json_codec.loads(text), json.loads(text))
+            self.assertEqual(json_codec.loads(text.encode("utf-8")), json.loads(text))
+
+    def test_big_integers_exact(self):
+        big = 2 ** 200
+        for _ in self.each_codec():
+            self.assertEqual(json_codec.loads(f'{{"value": {big}}}')["value"], big)
+            self.assertEqual(json_codec.loads(f"[1, {-big}]")[1], -big)
+            self.assertEqual(json.loads(json_codec.dumps({"value": big}))["value"], big)
+
+    def test_invalid_json(self):
+        for _ in self.each_codec():
+            for text in ("{bad", "", b"[1,"):
+                with self.assertRaises(json.JSONDecodeError):
+                    json_codec.loads(text)
+            with self.assertRaises(TypeError):
+                json_codec.loads(123)
+
+
+class TestConfigure(_CodecTestCase):
+    """测试编解码器选择"""
+
+    def test_env_selects_codec(self):
+        with patch.dict(os.environ, {"TRON_JSON_CODEC": "stdlib"}):
+            self.assertEqual(json_codec.configure(), "stdlib")
+        with patch.dict(os.environ, {"TRON_JSON_CODEC": "auto"}):
+            self.assertEqual(json_codec.configure(), CODECS[-1])
+
+    def test_fallback_without_orjson(self):
+        with patch.object(json_codec, "orjson", None):
+            self.assertEqual(json_codec.configure("orjson"), "stdlib")
+            self.assertEqual(json_codec.loads(b'{"a": 1}'), {"a": 1})
+
+
+class TestIntegration(_CodecTestCase):
+    """测试上游解析与交易 JSON 输入"""
+
+    def test_response_json(self):
+        response = httpx.Response(200, content=b'{"balance": 5}')
+        for _ in self.each_codec():
+            self.assertEqual(json_codec.response_json(response), {"balance": 5})
+        double = MagicMock()
+        double.json.return_value = {"x": 1}
+        self.assertEqual(json_codec.response_json(double), {"x": 1})
+
+    def test_upstream_get_uses_codec(self):
+        response = httpx.Response(200, content=b'{"number": 42}', request=httpx.Request("GET", "http://t"))
+        with patch("tron_mcp_server.tron_client.http_client.get", return_value=response), \
+                patch.object(json_codec, "loads", wraps=json_codec.loads) as loads:
+            self.assertEqual(tron_client._get("block"), {"number": 42})
+        loads.assert_called_once_with(b'{"number": 42}')
+
+    def test_broadcast_input_parsed_by_codec(self):
+        for _ in self.each_codec():
+            result = call_router.call("broadcast_tx", {"signed_tx_json": "{not json"})
+            self.assertEqual(result["error"], "invalid_json")
+            result = call_router.call("sign_tx", {"unsigned_tx_json": '{"raw_data": {}}'})
+            self.assertEqual(result["error"], "invalid_tx")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -278,10 +278,10 @@ class TestCallRouterWithMemo(unittest.TestCase):
             "raw_data": {},
         }
         mock_build_trx.return_value = {
-            "txID": "real123",
+            "txID": "1" * 64,
             "raw_data": {},
         }
-        mock_sign.return_value = "signature123"
+        mock_sign.return_value = "ab" * 65
         mock_broadcast.return_value = {"result": True}
         mock_format.return_value = {"txid": "real123", "result": True}
         
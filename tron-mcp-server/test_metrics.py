@@ -0,0 +1,227 @@
+"""
+测试 metrics.py 运行指标
+========================
+
+覆盖场景：
+1. Counter / Gauge / Histogram 与 Prometheus 文本格式
+2. call_router.call 记录动作耗时与状态（ok / error / exception / 未知动作）
+3. tron_client / trongrid_client 记录上游请求数、状态码、字节数
+4. 缓存命中率（地址簿内存索引）
+5. get_server_metrics 动作与 SSE /metrics 路由
+6. 关闭采集与热路径开销
+"""
+
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import time
+import importlib.util
+from pathlib import Path
+
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from unittest.mock import patch, MagicMock
+
+import httpx
+
+from tron_mcp_server import metrics
+from tron_mcp_server import call_router
+from tron_mcp_server import tron_client
+from tron_mcp_server import trongrid_client
+
+
+def _mock_response(status_code=200, content=b'{"ok": true}', payload=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.content = content
+    response.json.return_value = payload if payload is not None else {"ok": True}
+    return response
+
+
+class _MetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        metrics.set_enabled(True)
+        metrics.reset()
+
+    def tearDown(self):
+        metrics.set_enabled(True)
+        metrics.reset()
+
+
+class TestMetricTypes(_MetricsTestCase):
+    """测试指标类型与 Prometheus 文本格式"""
+
+    def test_histogram_render(self):
+        histogram = metrics.Histogram("demo_seconds", "Demo.", ("op",), buckets=(0.1, 1.0))
+        histogram.observe(0.05, "read")
+        histogram.observe(0.5, "read")
+        histogram.observe(5, "read")
+
+        text = "\n".join(histogram.render())
+        self.assertIn('# TYPE demo_seconds histogram', text)
+        self.assertIn('demo_seconds_bucket{op="read",le="0.1"} 1', text)
+        self.assertIn('demo_seconds_bucket{op="read",le="1"} 2', text)
+        self.assertIn('demo_seconds_bucket{op="read",le="+Inf"} 3', text)
+        self.assertIn('demo_seconds_count{op="read"} 3', text)
+        self.assertIn('demo_seconds_sum{op="read"} 5.55', text)
+
+    def test_label_escaping(self):
+        counter = metrics.Counter("demo_total", "Demo.", ("name",))
+        counter.inc('a"b\\c')
+        self.assertIn('demo_total{name="a\\"b\\\\c"} 1', counter.render())
+
+    def test_label_count_checked(self):
+        with self.assertRaises(ValueError):
+            metrics.UPSTREAM_REQUESTS.inc("tronscan")
+
+    def test_quantile_estimate(self):
+        histogram = metrics.Histogram("q_seconds", "Demo.", buckets=(0.1, 0.2))
+        for _ in range(10):
+            histogram.observe(0.15)
+        state = histogram.samples()[0][1]
+        self.assertAlmostEqual(histogram.quantile(0.5, state), 0.15)
+
+
+class TestActionMetrics(_MetricsTestCase):
+    """测试 call_router 动作指标"""
+
+    @patch("tron_mcp_server.call_router._get_skills", return_value={"skills": []})
+    def test_ok_and_error_status(self, _):
+        call_router.call("skills", {})
+        call_router.call("get_balance", {})  # 缺少参数 → error
+
+        summary = {a["action"]: a for a in metrics.summarize()["actions"]}
+        self.assertEqual((summary["skills"]["count"], summary["skills"]["errors"]), (1, 0))
+        self.assertEqual((summary["get_balance"]["count"], summary["get_balance"]["errors"]), (1, 1))
+        self.assertEqual(metrics.ACTIONS_IN_FLIGHT.get("skills"), 0)
+
+    def test_unknown_action_uses_fixed_label(self):
+        call_router.call("no_such_action_1", {})
+        call_router.call("no_such_action_2", {})
+        actions = [a["action"] for a in metrics.summarize()["actions"]]
+        self.assertEqual(actions, ["_unknown"])
+
+    @patch("tron_mcp_server.call_router._get_skills", side_effect=RuntimeError("boom"))
+    def test_exception_status(self, _):
+        with self.assertRaises(RuntimeError):
+            call_router.call("skills", {})
+        self.assertIn('status="exception"', metrics.render_prometheus())
+        self.assertEqual(metrics.summarize()["in_flight"]["actions"], 0)
+
+
+class TestUpstreamMetrics(_MetricsTestCase):
+    """测试上游请求指标"""
+
+    @patch("tron_mcp_server.tron_client.httpx.get")
+    def test_tronscan_get(self, mock_get):
+        mock_get.return_value = _mock_response(content=b"x" * 100)
+        tron_client._get("/account", {"address": "T"})
+        tron_client._get("account", {"address": "T"})
+
+        self.assertEqual(metrics.UPSTREAM_REQUESTS.get("tronscan", "account", "GET", "200"), 2)
+        upstream = metrics.summarize()["upstream"][0]
+        self.assertEqual((upstream["requests"], upstream["errors"], upstream["bytes"]), (2, 0, 200))
+
+    @patch("tron_mcp_server.tron_client.httpx.get")
+    def test_http_error_status_counted(self, mock_get):
+        response = _mock_response(status_code=503)
+        response.raise_for_status.side_effect = httpx.HTTPStatusError("503", request=MagicMock(), response=response)
+        mock_get.return_value = response
+
+        with self.assertRaises(httpx.HTTPStatusError):
+            tron_client._get("account")
+        self.assertEqual(metrics.UPSTREAM_REQUESTS.get("tronscan", "account", "GET", "503"), 1)
+        self.assertEqual(metrics.summarize()["upstream"][0]["errors"], 1)
+
+    @patch("tron_mcp_server.trongrid_client.httpx.post", side_effect=httpx.ConnectTimeout("timeout"))
+    def test_trongrid_timeout(self, _):
+        with self.assertRaises(httpx.ConnectTimeout):
+            trongrid_client._post("/wallet/createtransaction", {})
+        self.assertEqual(
+            metrics.UPSTREAM_REQUESTS.get("trongrid", "wallet/createtransaction", "POST", "error"), 1
+        )
+        self.assertEqual(metrics.UPSTREAM_IN_FLIGHT.get("trongrid"), 0)
+
+
+class TestCacheMetrics(_MetricsTestCase):
+    """测试缓存命中率"""
+
+    def test_addressbook_index_hit_ratio(self):
+        from tron_mcp_server import address_book
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            with patch.dict(os.environ, {"TRON_ADDRESSBOOK_PATH": str(Path(temp_dir) / "book.json")}):
+                address_book.add_contact("小明", "TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7")
+                metrics.reset()
+                for _ in range(4):
+                    address_book.lookup("小明")
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        cache = {c["cache"]: c for c in metrics.summarize()["cache"]}
+        self.assertEqual(cache["addressbook_index"]["hit_ratio"], 1.0)
+
+
+class TestMetricsExport(_MetricsTestCase):
+    """测试指标导出"""
+
+    @patch("tron_mcp_server.call_router._get_skills", return_value={"skills": []})
+    def test_get_server_metrics_action(self, _):
+        call_router.call("skills", {})
+        result = call_router.call("get_server_metrics", {})
+        self.assertIn("skills", result["summary"])
+        self.assertNotIn("prometheus", result)
+
+        result = call_router.call("get_server_metrics", {"format": "prometheus"})
+        self.assertIn('tron_mcp_action_duration_seconds_count{action="skills",status="ok"} 1', result["prometheus"])
+
+    @unittest.skipUnless(importlib.util.find_spec("starlette"), "未安装 starlette")
+    def test_sse_metrics_route(self):
+        from starlette.applications import Starlette
+        from starlette.testclient import TestClient
+        from tron_mcp_server import server
+
+        call_router.call("get_server_metrics", {})
+        client = TestClient(Starlette(routes=[server._metrics_route()]))
+        response = client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        self.assertIn("tron_mcp_action_duration_seconds_bucket", response.text)
+
+
+class TestMetricsOverhead(_MetricsTestCase):
+    """测试关闭采集与热路径开销"""
+
+    def test_disabled_records_nothing(self):
+        metrics.set_enabled(False)
+        with metrics.track_action("skills") as outcome:
+            outcome["status"] = "ok"
+        with metrics.track_upstream("tronscan", "account", "GET") as call:
+            call.response(_mock_response())
+        self.assertEqual(metrics.summarize()["actions"], [])
+        self.assertEqual(metrics.summarize()["upstream"], [])
+
+    def test_hot_path_overhead(self):
+        """单次动作 + 上游记录的开销应在微秒级"""
+        iterations = 20000
+        start = time.perf_counter()
+        for _ in range(iterations):
+            with metrics.track_action("bench") as outcome:
+                with metrics.track_upstream("tronscan", "account", "GET") as call:
+                    call.status = "200"
+                outcome["status"] = "ok"
+        per_call_us = (time.perf_counter() - start) / iterations * 1e6
+        print(f"\n[metrics] overhead: {per_call_us:.2f} µs/call")
+        self.assertLess(per_call_us, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+"""
+测试 portfolio.py 多地址资产估值
+================================
+
+覆盖场景：
+1. 按代币汇总多个地址的持仓，重复地址只查询一次，上游请求数与去重地址数成正比
+2. 每种代币只查询一次价格（TRX 走 /api/token/price，TRC20 走 /api/token_trc20），价格与查询失败均按 TTL 缓存；
+   无法获取价格的代币计入 unpriced_tokens
+3. TRON_PRICE_SOURCE=static 使用本地价格表，不请求价格接口
+4. 单个地址查询失败不影响其余地址
+5. get_portfolio 动作的参数校验与列式输出
+"""
+
+import unittest
+import sys
+import os
+
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import json
+from unittest.mock import patch
+
+import base58
+
+from mock_tron_server import MOCK_BALANCE_SUN, MOCK_USDT_RAW, MockServerTestCase
+from tron_mcp_server import call_router
+from tron_mcp_server import portfolio
+from tron_mcp_server import token_registry
+from tron_mcp_server import tron_client
+
+OWNER = "TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7"
+RECIPIENT = "TKyPzHiXW4Zms4txUxfWjXBidGzZpiCchn"
+
+
+def _address(i: int) -> str:
+    return base58.b58encode_check(bytes.fromhex("41" + f"{i:040x}")).decode()
+
+
+class _PortfolioTestCase(MockServerTestCase):
+    """共用：默认使用 tronscan 价格源"""
+
+    env_vars = {"TRON_PRICE_SOURCE": "tronscan"}
+
+    def setUp(self):
+        token_registry._reset()
+        super().setUp()
+
+    @staticmethod
+    def _rows(table: dict) -> dict:
+        """列式结构 → {首列: 行字典}"""
+        return {row[0]: dict(zip(table["columns"], row)) for row in table["rows"]}
+
+
+class TestAggregation(_PortfolioTestCase):
+    """测试持仓汇总与估值"""
+
+    def test_aggregates_unique_addresses(self):
+        result = portfolio.get_portfolio([OWNER, RECIPIENT, OWNER])
+        self.assertEqual((result["address_count"], result["duplicates"]), (2, 1))
+        self.assertEqual(self._count("/api/account"), 2)
+
+        holdings = self._rows(result["holdings"])
+        trx = MOCK_BALANCE_SUN / 1_000_000
+        usdt = MOCK_USDT_RAW / 1_000_000
+        self.assertEqual(holdings["TRX"]["balance"], 2 * trx)
+        self.assertEqual(holdings["TRX"]["holders"], 2)
+        self.assertEqual(holdings["USDT"]["value_usd"], 2 * usdt * 1.0)
+        self.assertEqual(result["total_value_usd"], 2 * (trx * 0.25 + usdt))
+        self.assertEqual(result["unpriced_tokens"], ["BTT"])
+        self.assertEqual(self._rows(result["addresses"])[OWNER]["value_usd"], trx * 0.25 + usdt)
+
+    def test_request_count_proportional_to_unique_addresses(self):
+        addresses = [_address(i) for i in range(1, 121)]
+        result = portfolio.get_portfolio(addresses + addresses[:30])
+        self.assertEqual(result["address_count"], 120)
+        self.assertEqual(self._count("/api/account"), 120)
+        # 每种代币只查询一次价格；TRC10（BTT）没有价格来源，不请求上游
+        self.assertEqual(self._count("/api/token/price"), 1)
+        self.assertEqual(self._count("/api/token_trc20"), 1)
+
+    def test_prices_cached(self):
+        portfolio.get_portfolio([OWNER])
+        portfolio.get_portfolio([RECIPIENT])
+        self.assertEqual(self._count("/api/token/price"), 1)
+        self.assertEqual(self._count("/api/token_trc20"), 1)
+
+        with patch.dict(os.environ, {"TRON_CACHE_TTL_TOKEN_PRICE": "0"}):
+            portfolio.get_portfolio([OWNER])
+        self.assertEqual(self._count("/api/token/price"), 2)
+        self.assertEqual(self._count("/api/token_trc20"), 2)
+
+    def test_failed_price_cached(self):
+        self.server.error_rate = 1.0
+        self.assertIsNone(portfolio.get_price("TRX"))
+        self.server.error_rate = 0.0
+        self.assertIsNone(portfolio.get_price("TRX"))   # 有效期内不重复请求上游
+        self.assertEqual(self._count("/api/token/price"), 1)
+
+    def test_token_price_sources(self):
+        self.assertEqual(tron_client.get_token_price_usd("trx"), 0.25)
+        self.assertEqual(tron_client.get_token_price_usd(tron_client.USDT_CONTRACT_BASE58), 1.0)
+        with self.assertRaises(ValueError):
+            tron_client.get_token_price_usd("btt")
+        self.assertEqual(self._count("/api/token/price"), 1)
+        # 合约没有行情数据
+        with self.assertRaises(ValueError):
+            tron_client.get_token_price_usd(RECIPIENT)
+
+    def test_static_price_source(self):
+        prices = {"trx": 0.1, tron_client.USDT_CONTRACT_BASE58: 0.99, "BTT": 0.000001}
+        with patch.dict(os.environ, {"TRON_PRICE_SOURCE": "static", "TRON_STATIC_PRICES": json.dumps(prices)}):
+            result = portfolio.get_portfolio([OWNER])
+        holdings = self._rows(result["holdings"])
+        self.assertEqual(holdings["TRX"]["price_usd"], 0.1)
+        self.assertEqual(holdings["USDT"]["price_usd"], 0.99)
+        self.assertEqual(result["unpriced_tokens"], [])
+        self.assertEqual(result["price_source"], "static")
+        self.assertEqual(self._count("/api/token/price"), 0)
+
+    def test_failed_address_reported(self):
+        original = tron_client.get_account_tokens
+
+        def flaky(address):
+            if address == RECIPIENT:
+                raise ValueError("down")
+            return original(address)
+
+        with patch.object(tron_client, "get_account_tokens", side_effect=flaky):
+            result = portfolio.get_portfolio([OWNER, RECIPIENT])
+        self.assertEqual([f["address"] for f in result["failed"]], [RECIPIENT])
+        self.assertEqual(self._rows(result["holdings"])["TRX"]["holders"], 1)
+
+
+class TestAction(_PortfolioTestCase):
+    """测试 get_portfolio 动作"""
+
+    def test_action_output(self):
+        result = call_router.call("get_portfolio", {"addresses": f"{OWNER},\n{RECIPIENT}"})
+        self.assertNotIn("error", result)
+        self.assertEqual(result["holdings"]["columns"], portfolio.HOLDING_COLUMNS)
+        self.assertIn("2 个地址合计估值", result["summary"])
+        self.assertIn("BTT", result["summary"])
+
+    def test_validation(self):
+        cases = [
+            ({}, "missing_param"),
+            ({"addresses": {"a": 1}}, "invalid_param"),
+            ({"addresses": [OWNER, "bad"]}, "invalid_address"),
+            ({"addresses": [OWNER] * 1001}, "invalid_param"),
+        ]
+        for params, error_type in cases:
+            with self.subTest(params=str(params)[:40]):
+                self.assertEqual(call_router.call("get_portfolio", params)["error"], error_type)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -344,7 +344,10 @@ class TestTronGetTransactionHistory(unittest.TestCase):
                 "address": "TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7",
                 "limit": 10,
                 "start": 0,
-                "token": None
+                "token": None,
+                "format": "full",
+                "fields": None,
+                "include_summary": False,
             }
         )
 
@@ -361,6 +364,7 @@ class TestTronGetTransactionHistory(unittest.TestCase):
         self.assertEqual(args["limit"], 10)
         self.assertEqual(args["start"], 0)
         self.assertIsNone(args["token"])
+        self.assertEqual(args["format"], "full")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,266 @@
+"""
+测试 serving.py 生产部署模式
+============================
+
+覆盖场景：
+1. MCP_* 环境变量解析：默认值、多 worker 自动无状态、SSE 不支持多 worker
+2. 工具在线程池中执行（不占用事件循环线程）；进行中的工具调用计数与排空：排空后拒绝转账 / 广播 / 预签名登记，查询不受影响；停机时停止队列调度线程
+3. 多 worker streamable-HTTP 端到端：健康检查、工具调用、worker 之间共享链参数缓存；工具结果经 json_codec 紧凑序列化
+4. SIGTERM 优雅停机：进行中的转账执行完毕后进程才退出
+"""
+
+import unittest
+import sys
+import os
+import json
+import signal
+import socket
+import subprocess
+import threading
+import time
+
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from unittest.mock import patch
+
+import httpx
+
+from mock_redis_server import MockRedisServer
+from mock_tron_server import MockTronServer
+from tron_mcp_server import json_codec
+from tron_mcp_server import serving
+
+RECIPIENT = "TKyPzHiXW4Zms4txUxfWjXBidGzZpiCchn"
+PRIVATE_KEY = "0" * 63 + "1"
+
+try:
+    import uvicorn  # noqa: F401
+    HAS_UVICORN = True
+except ImportError:
+    HAS_UVICORN = False
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class TestSettings(unittest.TestCase):
+    """测试部署配置解析"""
+
+    def test_defaults(self):
+        with patch.dict(os.environ, {}, clear=True):
+            settings = serving.load_settings()
+        self.assertEqual(settings["transport"], "http")
+        self.assertEqual((settings["host"], settings["port"], settings["workers"]), ("127.0.0.1", 8765, 1))
+        self.assertFalse(settings["stateless"])
+        self.assertIsNone(settings["limit_concurrency"])
+
+    def test_multi_worker_is_stateless(self):
+        with patch.dict(os.environ, {"MCP_WORKERS": "4", "MCP_ALLOWED_HOSTS": "mcp.example.com, 10.0.0.1:8765"}):
+            settings = serving.load_settings()
+        self.assertTrue(settings["stateless"])
+        self.assertEqual(settings["allowed_hosts"], ["mcp.example.com", "10.0.0.1:8765"])
+
+    def test_invalid(self):
+        with patch.dict(os.environ, {"MCP_TRANSPORT": "sse", "MCP_WORKERS": "2"}):
+            with self.assertRaises(ValueError):
+                serving.load_settings()
+        with patch.dict(os.environ, {"MCP_TRANSPORT": "grpc"}):
+            with self.assertRaises(ValueError):
+                serving.load_settings()
+
+    def test_export_settings(self):
+        with patch.dict(os.environ, {}, clear=True):
+            serving.export_settings(transport="http", port=9000, stateless=True, workers=None)
+            self.assertEqual(os.environ["MCP_PORT"], "9000")
+            self.assertEqual(os.environ["MCP_STATELESS"], "true")
+            self.assertNotIn("MCP_WORKERS", os.environ)
+
+
+class TestDrain(unittest.TestCase):
+    """测试进行中的调用与排空"""
+
+    def setUp(self):
+        serving._reset()
+
+    def tearDown(self):
+        serving._reset()
+
+    def test_wait_for_in_flight_transfer(self):
+        started, release = threading.Event(), threading.Event()
+
+        def transfer(**kwargs):
+            started.set()
+            release.wait(5)
+            return {"txid": "a" * 64}
+
+        results = []
+        worker = threading.Thread(target=lambda: results.append(serving.run_tool("tron_transfer", transfer, {})))
+        worker.start()
+        started.wait(5)
+        self.assertEqual(serving.in_flight(), 1)
+
+        serving.begin_drain()
+        self.assertFalse(serving.wait_drained(0.05))
+        rejected = serving.run_tool("tron_transfer", transfer, {})
+        self.assertEqual(rejected["error"], "shutting_down")
+        self.assertEqual(serving.run_tool("tron_get_balance", lambda **kw: {"ok": True}, {}), {"ok": True})
+
+        release.set()
+        self.assertTrue(serving.wait_drained(5))
+        worker.join()
+        self.assertEqual(results, [{"txid": "a" * 64}])
+        self.assertEqual(serving.in_flight(), 0)
+
+    def test_queue_tools_rejected_while_draining(self):
+        serving.begin_drain()
+        for tool in ("tron_queue_transfer", "tron_cancel_queued_tx"):
+            with self.subTest(tool=tool):
+                self.assertEqual(serving.run_tool(tool, lambda **kw: {"ok": True}, {})["error"], "shutting_down")
+
+    @unittest.skipUnless(HAS_UVICORN, "需要 uvicorn")
+    def test_lifespan_stops_queue_scheduler(self):
+        import anyio
+        from starlette.applications import Starlette
+        from tron_mcp_server import tx_queue
+
+        app = serving._with_drain(Starlette(), 1.5)
+
+        async def run_lifespan():
+            async with app.router.lifespan_context(app):
+                pass
+
+        with patch.object(tx_queue, "stop", return_value=True) as stop:
+            anyio.run(run_lifespan)
+        stop.assert_called_once_with(1.5)
+        self.assertTrue(serving.is_draining())
+
+    def test_offloaded_tool_runs_off_event_loop(self):
+        import anyio
+
+        class Registry:
+            def __init__(self):
+                self.tools = {}
+
+            def remove_tool(self, name):
+                self.tools.pop(name, None)
+
+            def add_tool(self, fn, name):
+                self.tools[name] = fn
+
+        threads = []
+
+        def tron_probe(value: int) -> dict:
+            threads.append(threading.current_thread())
+            return {"value": value}
+
+        registry = Registry()
+        with patch("tron_mcp_server.server._tool_result", side_effect=lambda result: result):
+            serving.offload_tools(registry, {"tron_probe": tron_probe}, 2)
+
+            async def call():
+                return threading.current_thread(), await registry.tools["tron_probe"](value=3)
+
+            loop_thread, result = anyio.run(call)
+        self.assertEqual(result, {"value": 3})
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], loop_thread)
+
+    def test_exception_releases_slot(self):
+        with self.assertRaises(RuntimeError):
+            serving.run_tool("tron_get_balance", lambda: (_ for _ in ()).throw(RuntimeError("boom")), {})
+        self.assertEqual(serving.in_flight(), 0)
+
+
+@unittest.skipUnless(HAS_UVICORN, "需要 uvicorn")
+class TestHttpServer(unittest.TestCase):
+    """端到端：以子进程启动 streamable-HTTP 服务"""
+
+    def setUp(self):
+        self.tron = MockTronServer().start()
+        self.redis = MockRedisServer().start()
+        self.port = _free_port()
+        self.base = f"http://127.0.0.1:{self.port}"
+        self.process = None
+
+    def tearDown(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+        self.redis.stop()
+        self.tron.stop()
+
+    def _start(self, *args, **env):
+        full_env = dict(os.environ, **self.tron.env(), TRON_PRIVATE_KEY=PRIVATE_KEY, PYTHONPATH=project_root, **env)
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "tron_mcp_server.server", "--http", "--port", str(self.port), *args],
+            cwd=project_root, env=full_env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            try:
+                if httpx.get(f"{self.base}/healthz", timeout=1).status_code == 200:
+                    return
+            except httpx.TransportError:
+                time.sleep(0.1)
+        self.fail("服务未能在 30 秒内启动")
+
+    def _call(self, tool: str, arguments: dict, timeout: float = 30) -> str:
+        response = httpx.post(
+            f"{self.base}/mcp",
+            json={"jsonrpc": "2.0", "id": 1, "method": "tools/call", "params": {"name": tool, "arguments": arguments}},
+            headers={"Accept": "application/json, text/event-stream"},
+            timeout=timeout,
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.text
+
+    def test_workers_share_cache(self):
+        self._start("--workers", "2", TRON_CACHE_URL=self.redis.url, TRON_CACHE_TTL_CHAIN_PARAMS="60")
+        health = httpx.get(f"{self.base}/healthz").json()
+        self.assertEqual(health["status"], "ok")
+
+        self.assertIn("5,000,000", self._call("tron_get_balance", {"address": RECIPIENT}))
+        for _ in range(6):
+            self.assertIn("gas_price", self._call("tron_get_gas_parameters", {}))
+        self.assertEqual(self.tron.request_counts().get("/api/chainparameters"), 1)
+        self.assertIn("tron_mcp_action_duration_seconds", httpx.get(f"{self.base}/metrics").text)
+
+    def test_tool_result_uses_json_codec(self):
+        self._start("--stateless")
+        response = json.loads(self._call("tron_get_balance", {"address": RECIPIENT}))
+        text = response["result"]["content"][0]["text"]
+        # 与 stdio 模式一致：json_codec 的紧凑输出，而不是 pydantic 的缩进 JSON
+        self.assertNotIn("\n", text)
+        self.assertEqual(text, json_codec.dumps(json.loads(text)))
+
+    def test_graceful_shutdown_drains_transfer(self):
+        self._start("--stateless")
+        self.tron.latency_ms = 150
+        results = []
+        caller = threading.Thread(target=lambda: results.append(
+            self._call("tron_transfer", {"to_address": RECIPIENT, "amount": 1, "token": "TRX"})
+        ))
+        caller.start()
+        deadline = time.time() + 10
+        while not self.tron.request_counts() and time.time() < deadline:
+            time.sleep(0.01)
+        self.process.send_signal(signal.SIGTERM)
+        caller.join(30)
+
+        # 单进程 uvicorn 停机后会重新抛出收到的信号
+        self.assertIn(self.process.wait(30), (0, -signal.SIGTERM))
+        self.assertEqual(len(results), 1)
+        self.assertIn("txid", results[0])
+        self.assertEqual(self.tron.request_counts().get("/wallet/broadcasttransaction"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,421 @@
+"""
+测试 signer.py 签名后端与签名工作池
+====================================
+
+覆盖场景：
+1. TRON_SIGNER 选择后端：env（默认）/ keystore / daemon，无效取值与缺少配置时报错
+2. keystore：scrypt / pbkdf2 解密、口令错误、口令文件、解密结果缓存与文件变化后重新解密
+3. daemon：经 Unix socket 获取地址与签名，守护进程不可用 / 拒绝请求 / 返回无效签名
+4. 签名工作池：单笔签名在调用线程执行（process 模式走进程池）；批量签名顺序与逐笔签名一致，
+   本地私钥批量签名走进程池，进程池结果同样校验签名长度
+5. transfer / sign_tx / get_wallet_info 经 keystore 与 daemon 后端签名
+6. 预签名队列：同一次检查中多笔重建交易批量签名
+"""
+
+import unittest
+import sys
+import os
+import json
+import socket
+import tempfile
+import shutil
+import threading
+
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from unittest.mock import patch
+
+from mock_tron_server import MockTronServer, build_transaction
+from tron_mcp_server import cache
+from tron_mcp_server import call_router
+from tron_mcp_server import key_manager
+from tron_mcp_server import signer
+from tron_mcp_server import tx_queue
+
+TEST_PRIVATE_KEY = "0" * 63 + "1"
+TEST_ADDRESS = key_manager.get_address_from_private_key(TEST_PRIVATE_KEY)
+TEST_TO = "TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7"
+OTHER_PRIVATE_KEY = "0" * 63 + "2"
+DIGEST = bytes.fromhex("ab" * 32)
+
+HAS_UNIX_SOCKET = hasattr(socket, "AF_UNIX")
+
+
+def _unsigned_tx() -> dict:
+    return build_transaction("TransferContract", {
+        "amount": 1_000_000,
+        "owner_address": "41" + "0" * 40,
+        "to_address": "41" + "1" * 40,
+    }, now_ms=1_700_000_000_000)
+
+
+class _SignerTestCase(unittest.TestCase):
+    """清空签名后端相关环境变量与工作池"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.env = patch.dict(os.environ)
+        self.env.start()
+        for name in ("TRON_SIGNER", "TRON_PRIVATE_KEY", "TRON_KEYSTORE_PATH", "TRON_KEYSTORE_PASSWORD",
+                     "TRON_KEYSTORE_PASSWORD_FILE", "TRON_SIGNER_SOCKET", "TRON_SIGNER_POOL",
+                     "TRON_SIGNER_WORKERS", "TRON_SIGNER_TIMEOUT"):
+            os.environ.pop(name, None)
+        signer._reset()
+
+    def tearDown(self):
+        signer._reset()
+        self.env.stop()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def write_keystore(self, password: str = "secret", private_key: str = TEST_PRIVATE_KEY) -> str:
+        path = os.path.join(self.tmp_dir, "keystore.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(signer.encrypt_keystore(private_key, password, n=2 ** 10), f)
+        return path
+
+
+class TestBackendSelection(_SignerTestCase):
+    """测试 TRON_SIGNER 后端选择"""
+
+    def test_default_env_backend(self):
+        os.environ["TRON_PRIVATE_KEY"] = TEST_PRIVATE_KEY
+        self.assertIsInstance(signer.get_signer(), signer.EnvKeySigner)
+        self.assertEqual(signer.get_address(), TEST_ADDRESS)
+        self.assertEqual(signer.sign(DIGEST).hex(), key_manager.sign_transaction(DIGEST.hex(), TEST_PRIVATE_KEY))
+
+    def test_env_backend_not_configured(self):
+        with self.assertRaises(ValueError) as ctx:
+            signer.get_address()
+        self.assertIn("TRON_PRIVATE_KEY", str(ctx.exception))
+
+    def test_invalid_configuration(self):
+        cases = [
+            ({"TRON_SIGNER": "hsm"}, "TRON_SIGNER"),
+            ({"TRON_SIGNER": "keystore"}, "TRON_KEYSTORE_PATH"),
+            ({"TRON_SIGNER": "keystore", "TRON_KEYSTORE_PATH": "/nonexistent/ks.json"}, "口令"),
+            ({"TRON_SIGNER": "keystore", "TRON_KEYSTORE_PATH": "/nonexistent/ks.json",
+              "TRON_KEYSTORE_PASSWORD": "x"}, "无法读取"),
+            ({"TRON_SIGNER": "daemon"}, "TRON_SIGNER_SOCKET"),
+            ({"TRON_SIGNER": "daemon", "TRON_SIGNER_SOCKET": "/tmp/x.sock", "TRON_SIGNER_TIMEOUT": "soon"},
+             "TRON_SIGNER_TIMEOUT"),
+        ]
+        for env, message in cases:
+            with self.subTest(env=env), patch.dict(os.environ, env):
+                with self.assertRaises(signer.SignerError) as ctx:
+                    signer.get_signer()
+                self.assertIn(message, str(ctx.exception))
+        # 仍是 ValueError，调用方的 except ValueError 分支继续生效
+        self.assertTrue(issubclass(signer.SignerError, ValueError))
+
+
+class TestKeystore(_SignerTestCase):
+    """测试加密 keystore 后端"""
+
+    def test_round_trip(self):
+        path = self.write_keystore()
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.assertNotIn(TEST_PRIVATE_KEY, json.dumps(data))
+        self.assertEqual(data["address"], TEST_ADDRESS)
+        self.assertEqual(signer.decrypt_keystore(data, "secret"), TEST_PRIVATE_KEY)
+
+    def test_wrong_password(self):
+        path = self.write_keystore()
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        with self.assertRaises(signer.SignerError) as ctx:
+            signer.decrypt_keystore(data, "wrong")
+        self.assertIn("MAC", str(ctx.exception))
+
+    def test_pbkdf2(self):
+        import hashlib
+        from Crypto.Cipher import AES
+        salt, iv = b"\x01" * 32, b"\x02" * 16
+        derived = hashlib.pbkdf2_hmac("sha256", b"pw", salt, 1000, 32)
+        ciphertext = AES.new(derived[:16], AES.MODE_CTR, nonce=b"", initial_value=iv).encrypt(
+            bytes.fromhex(TEST_PRIVATE_KEY))
+        data = {"version": 3, "crypto": {
+            "cipher": "aes-128-ctr", "cipherparams": {"iv": iv.hex()}, "ciphertext": ciphertext.hex(),
+            "kdf": "pbkdf2", "kdfparams": {"c": 1000, "dklen": 32, "prf": "hmac-sha256", "salt": salt.hex()},
+            "mac": signer._keccak256(derived[16:32] + ciphertext).hex(),
+        }}
+        self.assertEqual(signer.decrypt_keystore(data, "pw"), TEST_PRIVATE_KEY)
+
+    def test_invalid_format(self):
+        cases = [
+            ([], "version 3"),
+            ({"version": 1, "crypto": {}}, "version 3"),
+            ({"version": 3, "crypto": {"cipher": "aes-256-gcm"}}, "cipher"),
+            ({"version": 3, "crypto": {"cipher": "aes-128-ctr", "kdf": "argon2"}}, "kdf"),
+            ({"version": 3, "crypto": {"cipher": "aes-128-ctr", "kdf": "scrypt", "kdfparams": {}}}, "kdfparams"),
+        ]
+        for data, message in cases:
+            with self.subTest(data=data):
+                with self.assertRaises(signer.SignerError) as ctx:
+                    signer.decrypt_keystore(data, "pw")
+                self.assertIn(message, str(ctx.exception))
+
+    def test_backend_and_cache(self):
+        path = self.write_keystore()
+        os.environ.update(TRON_SIGNER="keystore", TRON_KEYSTORE_PATH=path, TRON_KEYSTORE_PASSWORD="secret")
+        first = signer.get_signer()
+        self.assertIsInstance(first, signer.KeystoreSigner)
+        self.assertEqual(first.get_address(), TEST_ADDRESS)
+        self.assertEqual(signer.sign(DIGEST).hex(), key_manager.sign_transaction(DIGEST.hex(), TEST_PRIVATE_KEY))
+        # 文件与口令不变时不重复解密
+        with patch.object(signer, "decrypt_keystore") as decrypt:
+            self.assertIs(signer.get_signer(), first)
+        decrypt.assert_not_called()
+        # 口令变化时重新解密
+        os.environ["TRON_KEYSTORE_PASSWORD"] = "wrong"
+        with self.assertRaises(signer.SignerError):
+            signer.get_signer()
+
+    def test_file_replaced(self):
+        path = self.write_keystore()
+        os.environ.update(TRON_SIGNER="keystore", TRON_KEYSTORE_PATH=path, TRON_KEYSTORE_PASSWORD="secret")
+        self.assertEqual(signer.get_address(), TEST_ADDRESS)
+        self.write_keystore(private_key=OTHER_PRIVATE_KEY)
+        os.utime(path, ns=(0, 1))
+        self.assertEqual(signer.get_address(), key_manager.get_address_from_private_key(OTHER_PRIVATE_KEY))
+
+    def test_password_file(self):
+        path = self.write_keystore(password="from-file")
+        password_file = os.path.join(self.tmp_dir, "password")
+        with open(password_file, "w", encoding="utf-8") as f:
+            f.write("from-file\n")
+        os.environ.update(TRON_SIGNER="keystore", TRON_KEYSTORE_PATH=path,
+                          TRON_KEYSTORE_PASSWORD_FILE=password_file)
+        self.assertEqual(signer.get_address(), TEST_ADDRESS)
+
+
+@unittest.skipUnless(HAS_UNIX_SOCKET, "当前平台不支持 Unix socket")
+class TestDaemon(_SignerTestCase):
+    """测试本地签名守护进程后端"""
+
+    def setUp(self):
+        super().setUp()
+        from mock_signer_daemon import MockSignerDaemon
+        self.daemon = MockSignerDaemon(TEST_PRIVATE_KEY).start()
+        os.environ.update(self.daemon.env())
+
+    def tearDown(self):
+        self.daemon.stop()
+        super().tearDown()
+
+    def test_address_and_sign(self):
+        self.assertIsInstance(signer.get_signer(), signer.DaemonSigner)
+        self.assertIsNone(signer.get_signer().private_key())
+        self.assertEqual(signer.get_address(), TEST_ADDRESS)
+        self.assertEqual(signer.sign(DIGEST).hex(), key_manager.sign_transaction(DIGEST.hex(), TEST_PRIVATE_KEY))
+        self.assertEqual(self.daemon.request_counts(), {"address": 1, "sign": 1})
+
+    def test_private_key_not_required(self):
+        with patch.object(key_manager, "load_private_key", side_effect=AssertionError("不应读取本地私钥")):
+            self.assertEqual(signer.get_address(), TEST_ADDRESS)
+
+    def test_batch_uses_threads(self):
+        os.environ.update(TRON_SIGNER_POOL="process", TRON_SIGNER_WORKERS="4")
+        digests = [bytes([i]) * 32 for i in range(6)]
+        signatures = signer.sign_many(digests)
+        self.assertEqual([s.hex() for s in signatures],
+                         [key_manager.sign_transaction(d.hex(), TEST_PRIVATE_KEY) for d in digests])
+        self.assertIsNone(signer._process_pool)
+        self.assertEqual(self.daemon.request_counts(), {"sign": 6})
+
+    def test_daemon_errors(self):
+        with patch.object(self.daemon, "_dispatch", return_value={"error": "locked"}):
+            with self.assertRaises(signer.SignerError) as ctx:
+                signer.sign(DIGEST)
+            self.assertIn("locked", str(ctx.exception))
+        with patch.object(self.daemon, "_dispatch", return_value={"signature": "zz"}):
+            with self.assertRaises(signer.SignerError):
+                signer.sign(DIGEST)
+        with patch.object(self.daemon, "_dispatch", return_value={"signature": "ab" * 64}):
+            with self.assertRaises(signer.SignerError) as ctx:
+                signer.sign(DIGEST)
+            self.assertIn("65 字节", str(ctx.exception))
+        os.environ["TRON_SIGNER_SOCKET"] = os.path.join(self.tmp_dir, "missing.sock")
+        with self.assertRaises(signer.SignerError) as ctx:
+            signer.get_address()
+        self.assertIn("不可用", str(ctx.exception))
+
+
+class TestWorkerPool(_SignerTestCase):
+    """测试签名工作池"""
+
+    def setUp(self):
+        super().setUp()
+        os.environ["TRON_PRIVATE_KEY"] = TEST_PRIVATE_KEY
+
+    def test_single_sign_runs_inline(self):
+        threads = []
+
+        def fake_sign(tx_id_hex, pk):
+            threads.append(threading.current_thread())
+            return "ab" * 65
+
+        with patch.object(key_manager, "sign_transaction", side_effect=fake_sign):
+            self.assertEqual(signer.sign(DIGEST), bytes.fromhex("ab" * 65))
+        self.assertIs(threads[0], threading.current_thread())
+        self.assertIsNone(signer._thread_pool)
+
+    def test_single_sign_in_process_mode(self):
+        os.environ.update(TRON_SIGNER_POOL="process", TRON_SIGNER_WORKERS="1")
+        self.assertEqual(signer.sign(DIGEST).hex(), key_manager.sign_transaction(DIGEST.hex(), TEST_PRIVATE_KEY))
+        self.assertIsNotNone(signer._process_pool)
+
+    def test_worker_checks_signature_length(self):
+        signer._init_worker(TEST_PRIVATE_KEY)
+        self.addCleanup(signer._init_worker, None)
+        self.assertEqual(len(signer._sign_in_worker(DIGEST)), 65)
+        with patch.object(key_manager, "sign_transaction", return_value="ab" * 64):
+            with self.assertRaises(signer.SignerError):
+                signer._sign_in_worker(DIGEST)
+
+    def test_errors_propagate(self):
+        with patch.object(key_manager, "sign_transaction", side_effect=ValueError("boom")):
+            with self.assertRaises(ValueError):
+                signer.sign(DIGEST)
+            with self.assertRaises(ValueError):
+                signer.sign_many([DIGEST, DIGEST])
+
+    def test_thread_pool_batch(self):
+        os.environ.update(TRON_SIGNER_POOL="thread", TRON_SIGNER_WORKERS="3")
+        digests = [bytes([i]) * 32 for i in range(5)]
+        signatures = signer.sign_many(digests)
+        self.assertEqual([s.hex() for s in signatures],
+                         [key_manager.sign_transaction(d.hex(), TEST_PRIVATE_KEY) for d in digests])
+        self.assertIsNone(signer._process_pool)
+        self.assertEqual(signer.sign_many([]), [])
+
+    def test_process_pool_batch(self):
+        os.environ.update(TRON_SIGNER_POOL="auto", TRON_SIGNER_WORKERS="2")
+        digests = [bytes([i]) * 32 for i in range(4)]
+        signatures = signer.sign_many(digests)
+        self.assertIsNotNone(signer._process_pool)
+        self.assertEqual([s.hex() for s in signatures],
+                         [key_manager.sign_transaction(d.hex(), TEST_PRIVATE_KEY) for d in digests])
+        # 私钥变化时重建进程池
+        pool = signer._process_pool
+        os.environ["TRON_PRIVATE_KEY"] = OTHER_PRIVATE_KEY
+        signature = signer.sign_many(digests[:2])[0]
+        self.assertIsNot(signer._process_pool, pool)
+        self.assertEqual(signature.hex(), key_manager.sign_transaction(digests[0].hex(), OTHER_PRIVATE_KEY))
+
+    def test_auto_mode_single_digest_stays_in_process(self):
+        os.environ.update(TRON_SIGNER_POOL="auto", TRON_SIGNER_WORKERS="2")
+        signer.sign_many([DIGEST])
+        signer.sign(DIGEST)
+        self.assertIsNone(signer._process_pool)
+
+    def test_invalid_settings_fall_back(self):
+        os.environ.update(TRON_SIGNER_POOL="gpu", TRON_SIGNER_WORKERS="many")
+        self.assertEqual(signer.get_pool_mode(), "auto")
+        self.assertEqual(signer._workers(), os.cpu_count() or 1)
+
+
+class TestActions(_SignerTestCase):
+    """测试动作经不同签名后端签名"""
+
+    def setUp(self):
+        super().setUp()
+        cache.reset()
+        self.server = MockTronServer().start()
+        os.environ.update(self.server.env())
+
+    def tearDown(self):
+        self.server.stop()
+        cache.reset()
+        super().tearDown()
+
+    def check_actions(self):
+        info = call_router.call("get_wallet_info", {})
+        self.assertEqual(info["address"], TEST_ADDRESS)
+
+        unsigned = _unsigned_tx()
+        result = call_router.call("sign_tx", {"unsigned_tx_json": unsigned})
+        self.assertNotIn("error", result)
+        signed = json.loads(result["signed_tx_json"])
+        self.assertEqual(signed["signature"], [key_manager.sign_transaction(unsigned["txID"], TEST_PRIVATE_KEY)])
+
+        result = call_router.call("transfer", {"to": TEST_TO, "amount": 1, "token": "TRX"})
+        self.assertNotIn("error", result)
+        self.assertEqual(self.server.request_counts().get("/wallet/broadcasttransaction"), 1)
+
+    def test_keystore_backend(self):
+        os.environ.update(TRON_SIGNER="keystore", TRON_KEYSTORE_PATH=self.write_keystore(),
+                          TRON_KEYSTORE_PASSWORD="secret")
+        self.check_actions()
+
+    @unittest.skipUnless(HAS_UNIX_SOCKET, "当前平台不支持 Unix socket")
+    def test_daemon_backend(self):
+        from mock_signer_daemon import MockSignerDaemon
+        with MockSignerDaemon(TEST_PRIVATE_KEY) as daemon:
+            os.environ.update(daemon.env())
+            self.check_actions()
+        self.assertEqual(daemon.request_counts()["sign"], 2)
+
+    def test_backend_error(self):
+        os.environ["TRON_SIGNER"] = "keystore"
+        self.assertEqual(call_router.call("get_wallet_info", {})["error"], "wallet_error")
+        self.assertEqual(call_router.call("transfer", {"to": TEST_TO, "amount": 1, "token": "TRX"})["error"],
+                         "wallet_error")
+        self.assertEqual(call_router.call("sign_tx", {"unsigned_tx_json": _unsigned_tx()})["error"], "sign_error")
+
+
+class TestQueueBatchSigning(_SignerTestCase):
+    """测试预签名队列批量重建时的签名"""
+
+    def setUp(self):
+        super().setUp()
+        cache.reset()
+        tx_queue._reset()
+        self.server = MockTronServer().start()
+        os.environ.update(self.server.env())
+        os.environ.update(TRON_PRIVATE_KEY=TEST_PRIVATE_KEY,
+                          TRON_TX_QUEUE_PATH=os.path.join(self.tmp_dir, "queue.json"))
+        scheduler = patch.object(tx_queue, "start_scheduler")
+        scheduler.start()
+        self.addCleanup(scheduler.stop)
+
+    def tearDown(self):
+        tx_queue._reset()
+        self.server.stop()
+        cache.reset()
+        super().tearDown()
+
+    def test_rebuilt_entries_signed_in_one_batch(self):
+        entries = [
+            call_router.call("queue_transfer", {"to": TEST_TO, "amount": 1 + i, "token": "TRX",
+                                                "delay_seconds": 600, "id": f"batch-{i}"})
+            for i in range(3)
+        ]
+        due = max(e["broadcast_at"] for e in entries)
+        with patch.object(tx_queue, "REF_BLOCK_MAX_AGE", 0), \
+                patch.object(signer, "sign_many", wraps=signer.sign_many) as sign_many:
+            stats = tx_queue.run_due(now=due)
+        self.assertEqual(sign_many.call_count, 1)
+        self.assertEqual(len(sign_many.call_args[0][0]), 3)
+        self.assertEqual(stats["rebuilt"], 3)
+        self.assertEqual(stats["broadcast"], 3)
+
+    def test_batch_failure_keeps_pending(self):
+        entry = call_router.call("queue_transfer", {"to": TEST_TO, "amount": 1, "token": "TRX",
+                                                    "delay_seconds": 600})
+        with patch.object(tx_queue, "REF_BLOCK_MAX_AGE", 0), \
+                patch.object(signer, "sign_many", side_effect=ValueError("locked")):
+            stats = tx_queue.run_due(now=entry["broadcast_at"])
+        self.assertEqual(stats, {"rebuilt": 0, "broadcast": 0, "failed": 0, "errors": 1})
+        status = tx_queue.queue_status()
+        self.assertEqual(status["items"][0]["status"], "pending")
+        self.assertIn("locked", status["items"][0]["last_error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+"""
+测试 token_registry.py 代币元数据注册表
+======================================
+
+覆盖场景：
+1. 预置代币按符号 / 合约地址（Base58 与 Hex）解析，不发起请求
+2. 未知合约只查询一次 TRONSCAN，写入本地文件，重启后直接读取
+3. 符号安全：预置符号不被同名代币覆盖，多个同名代币必须使用合约地址
+4. 未知符号、元数据查询失败时抛出 UnknownTokenError (ValueError)
+5. build_tx / transfer / estimate_fee 支持任意 TRC20（按注册表精度换算金额）
+6. sign_tx 解析 TRC20 transfer 的接收方与金额，交易历史支持按代币符号筛选
+"""
+
+import unittest
+import sys
+import os
+
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import json
+import shutil
+import tempfile
+from unittest.mock import patch
+
+import base58
+
+from mock_tron_server import MOCK_TOKEN_DECIMALS, MockServerTestCase, build_transaction
+from tron_mcp_server import call_router
+from tron_mcp_server import fee_estimator
+from tron_mcp_server import formatters
+from tron_mcp_server import token_registry
+from tron_mcp_server import tron_client
+
+OWNER = "TKyPzHiXW4Zms4txUxfWjXBidGzZpiCchn"
+RECIPIENT = "TXYZopYRdj2D9XRtbG411XZZ3kM5VkAeBf"
+USDC = "TEkxiTehnzSmSe2XqrBj4w32RUN966rdz8"
+WBTC = "TXpw8XeWYeTUd4quDskoUqeQPowRh4jY65"
+# 注册表中没有的合约（/api/token_trc20 返回 symbol=MOCK, decimals=MOCK_TOKEN_DECIMALS）
+UNKNOWN = "TBXSw8fM4jpQkGc6zZjsVABFpVN7UvXPdV"
+
+
+def _hex(address: str) -> str:
+    return base58.b58decode_check(address).hex()
+
+
+class _RegistryTestCase(MockServerTestCase):
+    """共用：模拟服务，注册表文件放在临时目录"""
+
+    def setUp(self):
+        token_registry._reset()
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "tokens.json")
+        self.env_vars = {"TRON_NETWORK": "mainnet", "TRON_TOKEN_REGISTRY_PATH": self.path}
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        token_registry._reset()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+
+class TestResolve(_RegistryTestCase):
+    """测试符号 / 合约解析"""
+
+    def test_bundled_tokens_without_requests(self):
+        self.assertEqual(token_registry.resolve("usdc")["contract"], USDC)
+        self.assertEqual(token_registry.resolve(WBTC)["decimals"], 8)
+        self.assertEqual(token_registry.resolve(_hex(USDC))["symbol"], "USDC")
+        self.assertEqual(token_registry.resolve("USDT")["contract"], tron_client.USDT_CONTRACT_BASE58)
+        self.assertTrue(token_registry.is_native(token_registry.resolve("trx")))
+        self.assertEqual(sum(self.server.request_counts().values()), 0)
+
+    def test_unknown_contract_fetched_once_and_persisted(self):
+        info = token_registry.resolve(UNKNOWN)
+        self.assertEqual((info["symbol"], info["decimals"]), ("MOCK", MOCK_TOKEN_DECIMALS))
+        token_registry.resolve(UNKNOWN)
+        self.assertEqual(self._count("/api/token_trc20"), 1)
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["mainnet"][UNKNOWN]["decimals"], MOCK_TOKEN_DECIMALS)
+
+        # 模拟进程重启：从本地文件加载，符号也可直接使用
+        token_registry._reset()
+        self.assertEqual(token_registry.resolve("mock")["contract"], UNKNOWN)
+        self.assertEqual(self._count("/api/token_trc20"), 1)
+
+    def test_bundled_symbol_not_hijacked(self):
+        token_registry.register(UNKNOWN, "USDT", 6, "Fake Tether")
+        self.assertEqual(token_registry.resolve("USDT")["contract"], tron_client.USDT_CONTRACT_BASE58)
+        self.assertEqual(token_registry.resolve(UNKNOWN)["name"], "Fake Tether")
+
+    def test_ambiguous_symbol_requires_contract(self):
+        token_registry.register(UNKNOWN, "DUP", 6)
+        token_registry.register(RECIPIENT, "DUP", 18)
+        with self.assertRaises(token_registry.UnknownTokenError):
+            token_registry.resolve("DUP")
+        self.assertEqual(token_registry.resolve(RECIPIENT)["decimals"], 18)
+
+    def test_unknown_symbol_and_fetch_failure(self):
+        with self.assertRaises(ValueError):
+            token_registry.resolve("XYZ")
+        self.server.error_rate = 1.0
+        with self.assertRaises(token_registry.UnknownTokenError):
+            token_registry.resolve(UNKNOWN)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_to_raw_uses_decimal_arithmetic(self):
+        self.assertEqual(token_registry.to_raw(1.005, 6), 1_005_000)
+        self.assertEqual(token_registry.to_raw("0.1", 18), 10 ** 17)
+
+
+class TestActions(_RegistryTestCase):
+    """测试转账相关动作支持任意 TRC20"""
+
+    def test_build_tx_with_registry_decimals(self):
+        with patch.object(tron_client, "get_trc20_balance", return_value=1_000.0) as balance:
+            result = call_router.call("build_tx", {"from": OWNER, "to": RECIPIENT, "amount": 1.5, "token": WBTC})
+        self.assertNotIn("error", result)
+        balance.assert_any_call(OWNER, WBTC, 8)
+        value = result["unsigned_tx"]["raw_data"]["contract"][0]["parameter"]["value"]
+        self.assertEqual(value["contract_address"], WBTC)
+        self.assertEqual(int(value["data"][72:136], 16), 150_000_000)
+        self.assertEqual(result["fee_estimate"]["token"], "WBTC")
+
+    def test_build_tx_insufficient_token_balance(self):
+        result = call_router.call("build_tx", {"from": OWNER, "to": RECIPIENT, "amount": 1, "token": "USDC"})
+        self.assertEqual(result["error_type"], "insufficient_token")
+        self.assertIn("USDC 余额不足", result["summary"])
+
+    def test_transfer_builds_with_contract_and_decimals(self):
+        with patch.dict(os.environ, {"TRON_PRIVATE_KEY": "0" * 63 + "1"}), \
+                patch.object(tron_client, "get_trc20_balance", return_value=1_000.0), \
+                patch("tron_mcp_server.trongrid_client.build_trc20_transfer") as build:
+            build.side_effect = RuntimeError("stop")
+            result = call_router.call("transfer", {"to": RECIPIENT, "amount": 2, "token": "wbtc"})
+        self.assertEqual(result["error"], "build_error")
+        self.assertEqual(build.call_args.kwargs["contract_address"], WBTC)
+        self.assertEqual(build.call_args.kwargs["decimals"], 8)
+
+    def test_transfer_unknown_token(self):
+        with patch.dict(os.environ, {"TRON_PRIVATE_KEY": "0" * 63 + "1"}):
+            result = call_router.call("transfer", {"to": RECIPIENT, "amount": 2, "token": "XYZ"})
+        self.assertEqual(result["error"], "invalid_token")
+
+    def test_estimate_fee_for_other_trc20(self):
+        with patch.object(tron_client, "get_trc20_balance", return_value=0.0):
+            estimate = fee_estimator.estimate_fee(OWNER, RECIPIENT, 10, "USDC")
+        self.assertEqual(estimate["contract_address"], USDC)
+        self.assertFalse(estimate["recipient_holds_token"])
+        self.assertEqual(estimate["energy_source"], "simulation")
+
+    def test_sign_tx_reads_trc20_transfer(self):
+        data = "a9059cbb" + _hex(RECIPIENT)[2:].zfill(64) + hex(25 * 10 ** 8)[2:].zfill(64)
+        unsigned = build_transaction("TriggerSmartContract", {
+            "data": data, "owner_address": _hex(OWNER), "contract_address": _hex(WBTC),
+        })
+        with patch.dict(os.environ, {"TRON_PRIVATE_KEY": "0" * 63 + "1"}):
+            result = call_router.call("sign_tx", {"unsigned_tx_json": unsigned})
+        self.assertIn("转账 25.0 WBTC", result["summary"])
+        self.assertIn(RECIPIENT[:8], result["summary"])
+
+    def test_history_by_symbol(self):
+        result = call_router.call("get_transaction_history", {"address": OWNER, "token": "usdc", "limit": 2})
+        self.assertEqual(result["token_filter"], "USDC")
+        self.assertEqual(self._count("/api/token_trc20/transfers"), 1)
+        self.assertEqual(self._count("/api/transfer"), 0)
+
+    def test_history_decimals_from_registry(self):
+        transfers = [{"transaction_id": "t", "from_address": OWNER, "to_address": RECIPIENT,
+                      "quant": "250000000", "tokenInfo": {"tokenId": WBTC}}]
+        result = formatters.format_transaction_history(OWNER, transfers, 1)
+        self.assertEqual(result["transfers"][0]["amount"], 2.5)
+        self.assertEqual(result["transfers"][0]["token"], "WBTC")
+
+
+if __name__ == "__main__":
+    unittest.main()
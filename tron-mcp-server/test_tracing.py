@@ -0,0 +1,173 @@
+"""
+测试 tracing.py 请求级链路追踪
+==============================
+
+覆盖场景：
+1. 未开启时为空操作，返回值不含 _timing
+2. 调试模式下转账六个阶段的耗时、上游请求 URL 与状态码
+3. 阶段失败时 span 状态为 error，后续阶段不再出现
+4. 缓存命中记为 span 事件
+5. OTLP/JSON 文件导出与 OTLP/HTTP 接收端导出
+6. 不污染处理函数缓存的返回值；处理函数抛出异常时根 span 记为 error
+"""
+
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from unittest.mock import patch
+
+from mock_tron_server import MockTronServer
+from tron_mcp_server import call_router
+from tron_mcp_server import tracing
+
+RECIPIENT = "TKyPzHiXW4Zms4txUxfWjXBidGzZpiCchn"
+PRIVATE_KEY = "0" * 63 + "1"
+
+TRANSFER_STAGES = [
+    "transfer.load_key", "transfer.preflight", "transfer.build",
+    "transfer.sign", "transfer.broadcast", "transfer.format",
+]
+
+
+class _TracingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        tracing.configure(debug=False, trace_file=None, endpoint=None)
+
+    def tearDown(self):
+        tracing.configure(debug=False, trace_file=None, endpoint=None)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+class TestTracingDisabled(_TracingTestCase):
+    """测试关闭状态"""
+
+    def test_noop(self):
+        with tracing.trace_action("skills") as trace:
+            self.assertIsNone(trace)
+            with tracing.span("x") as span:
+                self.assertIs(span, tracing.NOOP_SPAN)
+        result = call_router.call("get_balance", {})
+        self.assertNotIn("_timing", result)
+
+
+class TestTransferTiming(_TracingTestCase):
+    """测试转账各阶段耗时"""
+
+    def setUp(self):
+        super().setUp()
+        tracing.configure(debug=True)
+        self.server = MockTronServer().start()
+        self.env = patch.dict(os.environ, dict(self.server.env(), TRON_PRIVATE_KEY=PRIVATE_KEY))
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        self.server.stop()
+        super().tearDown()
+
+    def test_stages_and_upstream(self):
+        result = call_router.call("transfer", {"to": RECIPIENT, "amount": 1, "token": "USDT"})
+        self.assertNotIn("error", result)
+
+        timing = result["_timing"]
+        self.assertEqual([s["name"] for s in timing["stages"]], TRANSFER_STAGES)
+        self.assertGreaterEqual(timing["total_ms"], sum(s["ms"] for s in timing["stages"]))
+        urls = [u["url"] for u in timing["upstream"]]
+        self.assertTrue(any(u.startswith(self.server.base_url + "/api/account?") for u in urls))
+        self.assertTrue(urls[-1].endswith("/wallet/broadcasttransaction"))
+        self.assertTrue(all(u["status"] == 200 for u in timing["upstream"]))
+        self.assertEqual(len(timing["upstream"]), sum(self.server.request_counts().values()))
+
+    @patch("tron_mcp_server.trongrid_client.broadcast_transaction", side_effect=ValueError("节点拒绝"))
+    def test_failed_stage(self, _):
+        result = call_router.call("transfer", {"to": RECIPIENT, "amount": 1, "token": "TRX"})
+        self.assertEqual(result["error"], "broadcast_error")
+
+        stages = result["_timing"]["stages"]
+        self.assertEqual([s["name"] for s in stages], TRANSFER_STAGES[:5])
+        self.assertTrue(stages[-1]["error"])
+
+
+class TestCacheEvents(_TracingTestCase):
+    """测试缓存事件"""
+
+    def test_addressbook_cache_hits(self):
+        tracing.configure(debug=True)
+        with patch.dict(os.environ, {"TRON_ADDRESSBOOK_PATH": str(Path(self.temp_dir) / "book.json")}):
+            call_router.call("addressbook_add", {"alias": "小明", "address": RECIPIENT})
+            result = call_router.call("addressbook_lookup", {"alias": "小明"})
+        self.assertEqual(result["_timing"]["cache"]["addressbook_index"], {"hits": 1, "misses": 0})
+
+
+class TestExport(_TracingTestCase):
+    """测试 OTLP 导出"""
+
+    def test_file_export(self):
+        path = Path(self.temp_dir) / "traces.jsonl"
+        tracing.configure(trace_file=str(path))
+        with MockTronServer() as server, patch.dict(os.environ, server.env()):
+            result = call_router.call("check_account_safety", {"address": RECIPIENT})
+        self.assertNotIn("_timing", result)
+
+        lines = path.read_text(encoding="utf-8").splitlines()
+        self.assertEqual(len(lines), 1)
+        resource_spans = json.loads(lines[0])["resourceSpans"][0]
+        self.assertEqual(resource_spans["resource"]["attributes"][0]["value"]["stringValue"], "tron-mcp-server")
+        spans = resource_spans["scopeSpans"][0]["spans"]
+        root = [s for s in spans if "parentSpanId" not in s]
+        clients = [s for s in spans if s["kind"] == tracing.KIND_CLIENT]
+        self.assertEqual(len(root), 1)
+        self.assertEqual(root[0]["name"], "action check_account_safety")
+        self.assertEqual(len(clients), 2)
+        self.assertTrue(all(s["parentSpanId"] == root[0]["spanId"] for s in clients))
+        self.assertEqual({s["traceId"] for s in spans}, {root[0]["traceId"]})
+        attributes = {a["key"]: a["value"] for a in clients[0]["attributes"]}
+        self.assertEqual(attributes["http.response.status_code"], {"intValue": "200"})
+
+    def test_endpoint_export(self):
+        with MockTronServer() as collector:
+            tracing.configure(endpoint=f"{collector.base_url}/v1/traces")
+            call_router.call("get_balance", {})
+            tracing.flush()
+            self.assertEqual(len(collector.traces), 1)
+        span = collector.traces[0]["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+        self.assertEqual(span["status"]["code"], tracing.STATUS_ERROR)
+
+
+class TestResultHandling(_TracingTestCase):
+    """测试返回值处理"""
+
+    def test_cached_result_not_mutated(self):
+        tracing.configure(debug=True)
+        cached = {"skills": []}
+        with patch("tron_mcp_server.call_router._get_skills", return_value=cached):
+            result = call_router.call("skills", {})
+        self.assertIn("_timing", result)
+        self.assertNotIn("_timing", cached)
+
+    def test_exception_marks_root(self):
+        path = Path(self.temp_dir) / "traces.jsonl"
+        tracing.configure(trace_file=str(path))
+        with patch("tron_mcp_server.call_router._get_skills", side_effect=RuntimeError("boom")):
+            with self.assertRaises(RuntimeError):
+                call_router.call("skills", {})
+        span = json.loads(path.read_text(encoding="utf-8"))["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+        self.assertEqual(span["status"]["code"], tracing.STATUS_ERROR)
+        self.assertIn("boom", span["status"]["message"])
+
+
+if __name__ == "__main__":
+    unittest.main()
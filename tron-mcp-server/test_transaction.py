@@ -0,0 +1,211 @@
+"""
+测试 transaction.py 交易内部表示
+================================
+
+覆盖场景：
+1. from_json：txID == sha256(raw_data_hex) 校验、缺少字段、非法十六进制
+2. 缺少 raw_data_hex 时按原样信任 txID（verified 为 False）
+3. to_json：TronGrid JSON 结构、raw_data 不复制、签名为十六进制
+4. sign_tx：txID 不符返回 invalid_tx，签名结果可直接广播
+5. transfer：TronGrid 返回的 txID 不符时不签名，广播时才转换为 JSON
+6. with_expiration：只改写 raw_data 的 expiration 字段，txID 与 JSON 同步更新；已签名 / 无 raw_data_hex 时拒绝
+"""
+
+import unittest
+import sys
+import os
+import json
+
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import hashlib
+from unittest.mock import patch
+
+import mock_tron_server
+from mock_tron_server import build_transaction
+from tron_mcp_server import call_router
+from tron_mcp_server import key_manager
+from tron_mcp_server import transaction
+from tron_mcp_server import trongrid_client
+
+TEST_PRIVATE_KEY = "0" * 63 + "1"
+TEST_TO = "TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7"
+
+
+def _unsigned_tx() -> dict:
+    return build_transaction("TransferContract", {
+        "amount": 1_000_000,
+        "owner_address": "41" + "0" * 40,
+        "to_address": "41" + "1" * 40,
+    }, now_ms=1_700_000_000_000)
+
+
+class TestFromJson(unittest.TestCase):
+    """测试从 TronGrid JSON 构造"""
+
+    def test_verified_txid(self):
+        unsigned = _unsigned_tx()
+        tx = transaction.Transaction.from_json(unsigned)
+        self.assertTrue(tx.verified)
+        self.assertEqual(tx.txid_hex, unsigned["txID"])
+        self.assertEqual(tx.raw_data, bytes.fromhex(unsigned["raw_data_hex"]))
+        self.assertEqual(tx.signatures, [])
+
+    def test_txid_mismatch(self):
+        unsigned = _unsigned_tx()
+        unsigned["txID"] = "a" * 64
+        with self.assertRaises(transaction.InvalidTransactionError) as ctx:
+            transaction.Transaction.from_json(unsigned)
+        self.assertIn("不符", str(ctx.exception))
+
+    def test_invalid_input(self):
+        cases = [
+            ([], "JSON 对象"),
+            ({"raw_data": {}}, "txID"),
+            ({"txID": "a" * 64}, "raw_data"),
+            ({"txID": "zz", "raw_data": {}}, "十六进制"),
+            ({"txID": "ab", "raw_data": {}}, "32 字节"),
+            ({"txID": "a" * 64, "raw_data_hex": "0g"}, "raw_data_hex"),
+            ({"txID": "a" * 64, "raw_data": {}, "signature": [5]}, "signature"),
+        ]
+        for tx, message in cases:
+            with self.subTest(tx=tx):
+                with self.assertRaises(transaction.InvalidTransactionError) as ctx:
+                    transaction.Transaction.from_json(tx)
+                self.assertIn(message, str(ctx.exception))
+        # 仍是 ValueError，原有的 except ValueError 分支继续生效
+        self.assertTrue(issubclass(transaction.InvalidTransactionError, ValueError))
+
+    def test_without_raw_data_hex(self):
+        tx = transaction.Transaction.from_json({"txID": "b" * 64, "raw_data": {"contract": []}})
+        self.assertFalse(tx.verified)
+        self.assertEqual(tx.txid_hex, "b" * 64)
+
+    def test_slots(self):
+        tx = transaction.Transaction.from_json(_unsigned_tx())
+        self.assertFalse(hasattr(tx, "__dict__"))
+
+
+class TestToJson(unittest.TestCase):
+    """测试转换为 TronGrid JSON 结构"""
+
+    def test_round_trip(self):
+        unsigned = _unsigned_tx()
+        tx = transaction.Transaction.from_json(unsigned)
+        self.assertEqual(tx.to_json(), unsigned)
+        # raw_data 是原字典的引用，不复制
+        self.assertIs(tx.to_json()["raw_data"], unsigned["raw_data"])
+
+    def test_signatures_hex(self):
+        tx = transaction.Transaction.from_json(_unsigned_tx())
+        tx.add_signature(b"\x01" * 65)
+        signed = tx.to_json()
+        self.assertEqual(signed["signature"], ["01" * 65])
+        self.assertEqual(transaction.Transaction.from_json(signed).signatures, [b"\x01" * 65])
+
+
+class TestWithExpiration(unittest.TestCase):
+    """测试改写有效期"""
+
+    def test_rewrites_field(self):
+        unsigned = _unsigned_tx()
+        expiration = unsigned["raw_data"]["expiration"] + 3_600_000
+        tx = transaction.Transaction.from_json(unsigned).with_expiration(expiration)
+        # 与按新有效期重新编码的 raw_data 逐字节一致
+        expected = mock_tron_server._encode_raw_data(dict(unsigned["raw_data"], expiration=expiration))
+        self.assertEqual(tx.raw_data, expected)
+        self.assertEqual(tx.txid, hashlib.sha256(expected).digest())
+        self.assertEqual(tx.raw_data_json["expiration"], expiration)
+        self.assertEqual(unsigned["raw_data"]["expiration"], 1_700_000_060_000)  # 原交易不变
+        self.assertTrue(transaction.Transaction.from_json(tx.to_json()).verified)
+
+    def test_inserts_missing_field(self):
+        raw = transaction._length_delimited(1, b"\x00\x01") + transaction._varint_field(14, 5)
+        tx = transaction.Transaction(b"\x00" * 32, raw).with_expiration(300)
+        self.assertEqual(tx.raw_data, transaction._length_delimited(1, b"\x00\x01")
+                         + transaction._varint_field(8, 300) + transaction._varint_field(14, 5))
+        self.assertIsNone(tx.raw_data_json)
+
+    def test_rejects(self):
+        signed = transaction.Transaction.from_json(_unsigned_tx())
+        signed.add_signature(b"\x01" * 65)
+        cases = [
+            signed,
+            transaction.Transaction(b"\x00" * 32),
+            transaction.Transaction(b"\x00" * 32, b"\x0a\x05\x00"),
+        ]
+        for tx in cases:
+            with self.subTest(tx=tx.to_json()):
+                with self.assertRaises(transaction.InvalidTransactionError):
+                    tx.with_expiration(1)
+
+
+class TestSignTx(unittest.TestCase):
+    """测试 sign_tx 动作"""
+
+    @patch.dict(os.environ, {"TRON_PRIVATE_KEY": TEST_PRIVATE_KEY})
+    def test_sign_verified_tx(self):
+        unsigned = _unsigned_tx()
+        result = call_router.call("sign_tx", {"unsigned_tx_json": json.dumps(unsigned)})
+        self.assertNotIn("error", result)
+        self.assertEqual(result["txID"], unsigned["txID"])
+        signed = json.loads(result["signed_tx_json"])
+        self.assertEqual(signed["raw_data_hex"], unsigned["raw_data_hex"])
+        self.assertEqual(signed["signature"], [key_manager.sign_transaction(unsigned["txID"], TEST_PRIVATE_KEY)])
+        # 输入字典不被修改
+        self.assertNotIn("signature", unsigned)
+
+    @patch.dict(os.environ, {"TRON_PRIVATE_KEY": TEST_PRIVATE_KEY})
+    def test_sign_rejects_txid_mismatch(self):
+        unsigned = _unsigned_tx()
+        unsigned["txID"] = "c" * 64
+        with patch.object(key_manager, "sign_transaction") as sign:
+            result = call_router.call("sign_tx", {"unsigned_tx_json": unsigned})
+        self.assertEqual(result["error"], "invalid_tx")
+        sign.assert_not_called()
+
+
+class TestTransfer(unittest.TestCase):
+    """测试 transfer 动作的签名与广播"""
+
+    def setUp(self):
+        patches = [
+            patch.dict(os.environ, {"TRON_PRIVATE_KEY": TEST_PRIVATE_KEY}),
+            patch("tron_mcp_server.tx_builder.build_unsigned_tx", return_value={"txID": "p" * 64}),
+        ]
+        for p in patches:
+            p.start()
+        self.addCleanup(patch.stopall)
+
+    def test_broadcasts_transaction_object(self):
+        unsigned = _unsigned_tx()
+        with patch.object(trongrid_client, "build_trx_transfer", return_value=unsigned), \
+                patch.object(trongrid_client, "_post", return_value={"result": True, "txid": unsigned["txID"]}) as post:
+            result = call_router.call("transfer", {"to": TEST_TO, "amount": 1, "token": "TRX"})
+        self.assertNotIn("error", result)
+        path, body = post.call_args[0]
+        self.assertEqual(path, "wallet/broadcasttransaction")
+        self.assertEqual(body["txID"], unsigned["txID"])
+        self.assertEqual(body["raw_data_hex"], unsigned["raw_data_hex"])
+        self.assertEqual(len(body["signature"]), 1)
+
+    def test_rejects_txid_mismatch_before_signing(self):
+        unsigned = _unsigned_tx()
+        unsigned["txID"] = "d" * 64
+        with patch.object(trongrid_client, "build_trx_transfer", return_value=unsigned), \
+                patch.object(key_manager, "sign_transaction") as sign, \
+                patch.object(trongrid_client, "broadcast_transaction") as broadcast:
+            result = call_router.call("transfer", {"to": TEST_TO, "amount": 1, "token": "TRX"})
+        self.assertEqual(result["error"], "build_error")
+        self.assertIn("不符", result["summary"])
+        sign.assert_not_called()
+        broadcast.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -30,6 +30,7 @@ from unittest.mock import patch, MagicMock
 import sys
 import os
 import json
+import hashlib
 
 # 强制 UTF-8 编码
 if hasattr(sys.stdout, 'reconfigure'):
@@ -63,9 +64,9 @@ TEST_ADDRESS = "TMVQGm1qAQYVdetCeGRRkTWYYrLXuHK2HC"
 # 第二个测试私钥
 TEST_PRIVATE_KEY_2 = "0000000000000000000000000000000000000000000000000000000000000002"
 
-# 模拟的 TronGrid 交易响应
+# 模拟的 TronGrid 交易响应（txID = sha256(raw_data_hex)）
 MOCK_TRX_TX = {
-    "txID": "a" * 64,
+    "txID": hashlib.sha256(bytes.fromhex("0a" * 50)).hexdigest(),
     "raw_data": {
         "contract": [{
             "parameter": {
@@ -87,7 +88,7 @@ MOCK_TRX_TX = {
 }
 
 MOCK_TRC20_TX = {
-    "txID": "b" * 64,
+    "txID": hashlib.sha256(bytes.fromhex("0b" * 50)).hexdigest(),
     "raw_data": {
         "contract": [{
             "parameter": {
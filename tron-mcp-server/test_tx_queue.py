@@ -0,0 +1,369 @@
+"""
+测试 tx_queue.py 预签名交易队列
+================================
+
+覆盖场景：
+1. queue_transfer：安全检查 + 构建 + 签名后登记，txID 已校验，写入队列文件
+2. 调度：未到目标时间不广播，到点广播登记时的签名（有效期已延长）；引用区块过旧或临近过期时重建后再广播
+3. 重建失败保留待广播并指数退避、签名后端地址不符与超过最大延迟标记 failed、广播失败标记 failed 且不重试
+4. 取消、重复 id、参数校验、状态过滤；多 worker 部署时队列动作与调度线程禁用
+5. 持久化：重启后恢复，广播中退出的交易标记 failed，已结束条目按上限裁剪，只处理当前网络
+6. 后台调度线程到点自动广播；服务启动时仅在有待广播交易时启动；停止时等待进行中的广播完成
+"""
+
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import hashlib
+from unittest.mock import patch
+
+from mock_tron_server import MockServerTestCase
+from tron_mcp_server import call_router
+from tron_mcp_server import trongrid_client
+from tron_mcp_server import tx_builder
+from tron_mcp_server import tx_queue
+
+TEST_PRIVATE_KEY = "0" * 63 + "1"
+RECIPIENT = "TKyPzHiXW4Zms4txUxfWjXBidGzZpiCchn"
+
+
+class _QueueTestCase(MockServerTestCase):
+    """共用：模拟服务 + 临时队列文件"""
+
+    auto_scheduler = False
+
+    def setUp(self):
+        tx_queue._reset()
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = Path(self.temp_dir) / "tx_queue.json"
+        self.env_vars = {
+            "TRON_PRIVATE_KEY": TEST_PRIVATE_KEY, "TRON_TX_QUEUE_PATH": str(self.path),
+            "TRON_TX_QUEUE_INTERVAL": "0.05",
+        }
+        super().setUp()
+        if not self.auto_scheduler:
+            # 手动调用 run_due，避免后台线程抢先处理
+            scheduler = patch.object(tx_queue, "start_scheduler")
+            scheduler.start()
+            self.addCleanup(scheduler.stop)
+
+    def tearDown(self):
+        tx_queue._reset()
+        super().tearDown()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def queue(self, **params) -> dict:
+        result = call_router.call("queue_transfer", dict({"to": RECIPIENT, "amount": 1, "token": "TRX"}, **params))
+        self.assertNotIn("error", result, result.get("summary"))
+        return result
+
+    def entry(self, entry_id: str) -> dict:
+        return next(e for e in tx_queue.queue_status()["items"] if e["id"] == entry_id)
+
+
+class TestQueueTransfer(_QueueTestCase):
+    """测试登记"""
+
+    def test_signed_and_persisted(self):
+        result = self.queue(delay_seconds=600, memo="工资", id="payout-1")
+        self.assertEqual(result["id"], "payout-1")
+        self.assertEqual(result["status"], "pending")
+        self.assertIn("security_check", result)
+        self.assertAlmostEqual(result["broadcast_at"], time.time() + 600, delta=5)
+        self.assertNotIn("tx", result)
+
+        stored = json.loads(self.path.read_text(encoding="utf-8"))["entries"][0]
+        tx = stored["tx"]
+        self.assertEqual(tx["txID"], hashlib.sha256(bytes.fromhex(tx["raw_data_hex"])).hexdigest())
+        self.assertEqual(len(tx["signature"]), 1)
+        self.assertEqual(stored["expiration"], tx["raw_data"]["expiration"])
+        # 有效期延长到广播时间之后，登记时的签名即广播的签名
+        self.assertEqual(stored["expiration"], int(result["broadcast_at"] * 1000) + tx_builder.TX_EXPIRATION_MS)
+        self.assertEqual(self._count("/wallet/broadcasttransaction"), 0)
+
+    def test_invalid_params(self):
+        cases = [
+            ({"broadcast_at": time.time(), "delay_seconds": 5}, "invalid_param"),
+            ({"delay_seconds": -1}, "invalid_param"),
+            ({"broadcast_at": "tomorrow"}, "invalid_param"),
+            ({"id": "x" * 65}, "invalid_param"),
+            ({"amount": 0}, "invalid_amount"),
+            ({"to": "bad"}, "invalid_address"),
+            ({"token": "NOPE"}, "invalid_token"),
+        ]
+        for extra, error in cases:
+            with self.subTest(extra=extra):
+                params = dict({"to": RECIPIENT, "amount": 1, "token": "TRX"}, **extra)
+                self.assertEqual(call_router.call("queue_transfer", params)["error"], error)
+
+    def test_duplicate_id(self):
+        self.queue(id="dup", delay_seconds=60)
+        result = call_router.call("queue_transfer", {"to": RECIPIENT, "amount": 1, "token": "TRX", "id": "dup"})
+        self.assertEqual(result["error"], "duplicate")
+
+    def test_wallet_error(self):
+        with patch.dict(os.environ, {"TRON_PRIVATE_KEY": ""}):
+            result = call_router.call("queue_transfer", {"to": RECIPIENT, "amount": 1})
+        self.assertEqual(result["error"], "wallet_error")
+
+
+class TestScheduling(_QueueTestCase):
+    """测试到期处理"""
+
+    def stale(self):
+        """让已登记的交易都需要重建（引用区块视为已过旧）"""
+        return patch.object(tx_queue, "REF_BLOCK_MAX_AGE", 0)
+
+    def test_broadcast_at_target_time(self):
+        entry = self.queue(delay_seconds=600)
+        builds = self._count("/wallet/createtransaction")
+        self.assertEqual(tx_queue.run_due(), {"rebuilt": 0, "broadcast": 0, "failed": 0, "errors": 0})
+        self.assertEqual(tx_queue.run_due(now=entry["broadcast_at"] - 1)["broadcast"], 0)
+
+        stats = tx_queue.run_due(now=entry["broadcast_at"])
+        self.assertEqual((stats["rebuilt"], stats["broadcast"]), (0, 1))
+        done = self.entry(entry["id"])
+        self.assertEqual(done["status"], "broadcast")
+        # 广播的是登记时签名的交易，没有重建
+        self.assertEqual((done["txid"], done["rebuilds"]), (entry["txid"], 0))
+        self.assertEqual(self._count("/wallet/createtransaction"), builds)
+        self.assertEqual(self._count("/wallet/broadcasttransaction"), 1)
+
+    def test_rebuilt_when_ref_block_too_old(self):
+        entry = self.queue(delay_seconds=tx_queue.REF_BLOCK_MAX_AGE + 3600)
+        stats = tx_queue.run_due(now=entry["broadcast_at"] - 1)
+        # 提前一个重建余量开始检查：引用区块已过旧，重建但不广播
+        self.assertEqual((stats["rebuilt"], stats["broadcast"]), (1, 0))
+
+        stats = tx_queue.run_due(now=entry["broadcast_at"])
+        self.assertEqual((stats["rebuilt"], stats["broadcast"]), (0, 1))
+        done = self.entry(entry["id"])
+        self.assertNotEqual(done["txid"], entry["txid"])
+        self.assertEqual(done["rebuilds"], 1)
+
+    def test_fresh_transaction_not_rebuilt(self):
+        entry = self.queue()
+        builds = self._count("/wallet/createtransaction")
+        self.assertEqual(tx_queue.run_due(), {"rebuilt": 0, "broadcast": 1, "failed": 0, "errors": 0})
+        self.assertEqual(self._count("/wallet/createtransaction"), builds)
+        self.assertEqual(self.entry(entry["id"])["txid"], entry["txid"])
+
+    def test_hex_broadcast_mode(self):
+        self.queue()
+        with patch.dict(os.environ, {"TRON_BROADCAST_MODE": "hex"}):
+            tx_queue.run_due()
+        self.assertEqual(self._count("/wallet/broadcasthex"), 1)
+
+    def test_rebuild_failure_keeps_pending(self):
+        entry = self.queue(delay_seconds=600)
+        with self.stale(), patch.object(trongrid_client, "build_trx_transfer", side_effect=RuntimeError("boom")):
+            stats = tx_queue.run_due(now=entry["broadcast_at"])
+        self.assertEqual((stats["errors"], stats["broadcast"]), (1, 0))
+        pending = self.entry(entry["id"])
+        self.assertEqual(pending["status"], "pending")
+        self.assertIn("boom", pending["last_error"])
+        self.assertEqual(self._count("/wallet/broadcasttransaction"), 0)
+
+    def test_rebuild_backoff(self):
+        entry = self.queue(delay_seconds=600)
+        now = entry["broadcast_at"]
+        with self.stale(), patch.object(trongrid_client, "build_trx_transfer",
+                                        side_effect=RuntimeError("boom")) as build:
+            for i in range(5):
+                tx_queue.run_due(now=now + i * 0.5)
+            self.assertEqual(build.call_count, 1)      # 退避期（5 秒）内不重试
+            tx_queue.run_due(now=now + tx_queue.REBUILD_BACKOFF_BASE)
+            self.assertEqual(build.call_count, 2)
+            tx_queue.run_due(now=now + tx_queue.REBUILD_BACKOFF_BASE * 2)
+            self.assertEqual(build.call_count, 2)      # 第二次失败后退避 10 秒
+            tx_queue.run_due(now=now + tx_queue.REBUILD_BACKOFF_BASE * 3)
+            self.assertEqual(build.call_count, 3)
+        self.assertEqual(self.entry(entry["id"])["rebuild_failures"], 3)
+
+        with self.stale():
+            stats = tx_queue.run_due(now=now + 60)
+        self.assertEqual((stats["rebuilt"], stats["broadcast"]), (1, 1))
+        self.assertEqual(self.entry(entry["id"])["rebuild_failures"], 0)
+
+    def test_max_delay(self):
+        entry = self.queue(delay_seconds=600)
+        with patch.object(trongrid_client, "build_trx_transfer", side_effect=RuntimeError("boom")) as build:
+            stats = tx_queue.run_due(now=entry["broadcast_at"] + 3600)
+        self.assertEqual((stats["failed"], stats["broadcast"]), (1, 0))
+        self.assertEqual(build.call_count, 0)
+        failed = self.entry(entry["id"])
+        self.assertEqual(failed["status"], "failed")
+        self.assertIn("最大延迟", failed["last_error"])
+        self.assertEqual(self._count("/wallet/broadcasttransaction"), 0)
+
+        late = self.queue(delay_seconds=600)
+        with patch.dict(os.environ, {"TRON_TX_QUEUE_MAX_DELAY": "7200"}):
+            self.assertEqual(tx_queue.run_due(now=late["broadcast_at"] + 3600)["failed"], 0)
+
+    def test_broadcast_failure_not_retried(self):
+        entry = self.queue()
+        with patch.object(trongrid_client, "broadcast_transaction", side_effect=ValueError("交易广播失败 [SIGERROR]")):
+            self.assertEqual(tx_queue.run_due()["failed"], 1)
+        self.assertEqual(tx_queue.run_due()["broadcast"], 0)
+        failed = self.entry(entry["id"])
+        self.assertEqual(failed["status"], "failed")
+        self.assertIn("SIGERROR", failed["last_error"])
+
+    def test_key_changed(self):
+        entry = self.queue(delay_seconds=600)
+        with self.stale(), patch.dict(os.environ, {"TRON_PRIVATE_KEY": "0" * 63 + "2"}):
+            stats = tx_queue.run_due(now=entry["broadcast_at"])
+            # 无法通过重试恢复：直接标记为 failed，不再重建
+            self.assertEqual(tx_queue.run_due(now=entry["broadcast_at"] + 1), {"rebuilt": 0, "broadcast": 0, "failed": 0, "errors": 0})
+        self.assertEqual((stats["failed"], stats["errors"]), (1, 0))
+        failed = self.entry(entry["id"])
+        self.assertEqual(failed["status"], "failed")
+        self.assertIn("发送方地址不一致", failed["last_error"])
+
+
+class TestQueueManagement(_QueueTestCase):
+    """测试取消与状态查询"""
+
+    def test_cancel(self):
+        entry = self.queue(delay_seconds=0)
+        result = call_router.call("cancel_queued_tx", {"id": entry["id"]})
+        self.assertEqual(result["status"], "cancelled")
+        self.assertEqual(tx_queue.run_due()["broadcast"], 0)
+        self.assertEqual(call_router.call("cancel_queued_tx", {"id": entry["id"]})["error"], "invalid_state")
+        self.assertEqual(call_router.call("cancel_queued_tx", {"id": "nope"})["error"], "not_found")
+        self.assertEqual(call_router.call("cancel_queued_tx", {})["error"], "missing_param")
+
+    def test_status(self):
+        first = self.queue(delay_seconds=300)
+        self.queue(delay_seconds=100)
+        done = self.queue()
+        tx_queue.run_due()
+
+        result = call_router.call("get_tx_queue", {})
+        self.assertEqual(result["counts"]["pending"], 2)
+        self.assertEqual(result["counts"]["broadcast"], 1)
+        self.assertAlmostEqual(result["next_broadcast_at"], time.time() + 100, delta=5)
+        self.assertEqual(result["items"][0]["id"], done["id"])
+        self.assertIn("待广播 2", result["summary"])
+
+        pending = call_router.call("get_tx_queue", {"status": "pending", "limit": 1})
+        self.assertEqual(pending["total"], 2)
+        self.assertEqual(len(pending["items"]), 1)
+        self.assertNotEqual(pending["items"][0]["id"], first["id"])
+
+        self.assertEqual(call_router.call("get_tx_queue", {"status": "done"})["error"], "invalid_param")
+        self.assertEqual(call_router.call("get_tx_queue", {"limit": 0})["error"], "invalid_param")
+
+    def test_disabled_with_multiple_workers(self):
+        entry = self.queue(delay_seconds=0)
+        with patch.dict(os.environ, {"MCP_WORKERS": "4"}):
+            for action, params in (("queue_transfer", {"to": RECIPIENT, "amount": 1, "token": "TRX"}),
+                                   ("get_tx_queue", {}), ("cancel_queued_tx", {"id": entry["id"]})):
+                with self.subTest(action=action):
+                    result = call_router.call(action, params)
+                    self.assertEqual(result["error"], "queue_unavailable")
+                    self.assertIn("MCP_WORKERS=4", result["summary"])
+            with self.assertRaises(tx_queue.QueueUnavailableError):
+                tx_queue.enqueue(entry["from"], RECIPIENT, 1, {"symbol": "TRX", "contract": None, "decimals": 6})
+            self.assertIsNone(tx_queue.start_from_env())
+        self.assertEqual(self.entry(entry["id"])["status"], "pending")
+
+    def test_empty_queue(self):
+        result = call_router.call("get_tx_queue", {})
+        self.assertEqual(result["total"], 0)
+        self.assertIn("为空", result["summary"])
+
+
+class TestPersistence(_QueueTestCase):
+    """测试重启恢复"""
+
+    def test_reload_after_restart(self):
+        entry = self.queue(delay_seconds=600)
+        tx_queue._reset()
+        self.assertEqual(self.entry(entry["id"])["txid"], entry["txid"])
+
+    def test_interrupted_broadcast_marked_failed(self):
+        entry = self.queue(delay_seconds=600)
+        data = json.loads(self.path.read_text(encoding="utf-8"))
+        data["entries"][0]["status"] = "broadcasting"
+        self.path.write_text(json.dumps(data), encoding="utf-8")
+        tx_queue._reset()
+        failed = self.entry(entry["id"])
+        self.assertEqual(failed["status"], "failed")
+        self.assertIn("txID", failed["last_error"])
+
+    def test_history_limit(self):
+        with patch.dict(os.environ, {"TRON_TX_QUEUE_HISTORY": "1"}):
+            first = self.queue()
+            tx_queue.run_due()
+            self.queue()
+            tx_queue.run_due()
+        ids = [e["id"] for e in json.loads(self.path.read_text(encoding="utf-8"))["entries"]]
+        self.assertEqual(len(ids), 1)
+        self.assertNotIn(first["id"], ids)
+
+    def test_other_network_ignored(self):
+        entry = self.queue()
+        with patch.dict(os.environ, {"TRON_NETWORK": "nile"}):
+            self.assertEqual(tx_queue.run_due()["broadcast"], 0)
+            self.assertEqual(call_router.call("get_tx_queue", {})["total"], 0)
+        self.assertEqual(self.entry(entry["id"])["status"], "pending")
+
+    def test_corrupt_file(self):
+        self.path.write_text("{not json", encoding="utf-8")
+        self.assertEqual(tx_queue.queue_status()["total"], 0)
+
+
+class TestScheduler(_QueueTestCase):
+    """测试后台调度线程"""
+
+    auto_scheduler = True
+
+    def test_broadcasts_in_background(self):
+        entry = self.queue(delay_seconds=0.2)
+        self.assertTrue(tx_queue.queue_status()["scheduler"]["running"])
+        deadline = time.time() + 10
+        while self.entry(entry["id"])["status"] != "broadcast" and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(self.entry(entry["id"])["status"], "broadcast")
+        self.assertEqual(tx_queue.queue_status()["scheduler"]["broadcast"], 1)
+
+    def test_stop_waits_for_broadcast(self):
+        started, release = threading.Event(), threading.Event()
+
+        def slow_broadcast(tx):
+            started.set()
+            release.wait(5)
+            return {"result": True, "txid": tx.txid_hex}
+
+        with patch.object(trongrid_client, "broadcast_transaction", side_effect=slow_broadcast):
+            entry = self.queue(delay_seconds=0)
+            self.assertTrue(started.wait(5))
+            threading.Timer(0.2, release.set).start()
+            self.assertTrue(tx_queue.stop(timeout=5))
+        self.assertEqual(self.entry(entry["id"])["status"], "broadcast")
+
+    def test_start_from_env(self):
+        self.assertIsNone(tx_queue.start_from_env())
+        entry = self.queue(delay_seconds=600)
+        tx_queue._reset()
+        self.assertIsNotNone(tx_queue.start_from_env())
+        self.assertEqual(self.entry(entry["id"])["status"], "pending")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,324 @@
+"""
+测试 watcher.py 地址监听
+========================
+
+覆盖场景：
+1. 监听登记：重复监听累加订阅数、取消监听、token 校验、数量上限
+2. 区块扫描：TRX / USDT / 其他 TRC20 转入（transfer / transferFrom，按注册表精度换算），失败交易与 token 过滤，事件游标
+3. 路由动作 watch_address / unwatch_address / get_watch_events 的参数校验与错误
+4. 推送回调：向订阅会话的事件循环投递 resources/updated，断开的会话自动移除
+5. 端到端：stdio 客户端订阅 tron://watch/{address}，模拟出块后收到推送并读取事件
+"""
+
+import unittest
+import sys
+import os
+import asyncio
+import json
+import subprocess
+import threading
+import time
+
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from unittest.mock import patch
+
+from mock_tron_server import MockServerTestCase, MockTronServer, build_transaction
+from tron_mcp_server import block_follower
+from tron_mcp_server import call_router
+from tron_mcp_server import config
+from tron_mcp_server import token_registry
+from tron_mcp_server import trongrid_client
+from tron_mcp_server import watcher
+
+OWNER = "TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7"
+RECIPIENT = "TKyPzHiXW4Zms4txUxfWjXBidGzZpiCchn"
+TOKEN_CONTRACT = "TXYZopYRdj2D9XRtbG411XZZ3kM5VkAeBf"
+
+
+def _hex(address: str) -> str:
+    return trongrid_client._base58_to_hex(address)
+
+
+def _trx(to: str, amount_sun: int = 2_500_000, ret: str = None) -> dict:
+    tx = build_transaction("TransferContract", {
+        "amount": amount_sun, "owner_address": _hex(OWNER), "to_address": _hex(to),
+    })
+    if ret:
+        tx["ret"] = [{"contractRet": ret}]
+    return tx
+
+
+def _trc20(to: str, raw_amount: int, contract: str) -> dict:
+    data = "a9059cbb" + _hex(to)[2:].rjust(64, "0") + f"{raw_amount:064x}"
+    return build_transaction("TriggerSmartContract", {
+        "owner_address": _hex(OWNER), "contract_address": _hex(contract), "data": data,
+    })
+
+
+def _trc20_from(sender: str, to: str, raw_amount: int, contract: str) -> dict:
+    data = "23b872dd" + _hex(sender)[2:].rjust(64, "0") + _hex(to)[2:].rjust(64, "0") + f"{raw_amount:064x}"
+    return build_transaction("TriggerSmartContract", {
+        "owner_address": _hex(OWNER), "contract_address": _hex(contract), "data": data,
+    })
+
+
+class _WatcherTestCase(MockServerTestCase):
+    """共用：手动出块，区块跟随器线程启动后不再自动轮询"""
+
+    env_vars = {"TRON_BLOCK_FOLLOWER_INTERVAL": "600"}
+
+    def setUp(self):
+        watcher._reset()
+        token_registry._reset()
+        block_follower.stop()
+        super().setUp()
+        self.server.mine()
+
+    def tearDown(self):
+        block_follower.stop()
+        watcher._reset()
+        token_registry._reset()
+        super().tearDown()
+
+    def _watch(self, address: str = RECIPIENT, token: str = "ALL") -> dict:
+        result = watcher.watch(address, token)
+        follower = block_follower.get_follower()
+        deadline = time.time() + 5
+        while follower.last_block is None and time.time() < deadline:
+            time.sleep(0.01)
+        return result
+
+    def _mine_and_poll(self, transactions: list) -> int:
+        height = self.server.mine(transactions)
+        block_follower.get_follower().poll_once()
+        return height
+
+
+class TestRegistry(_WatcherTestCase):
+    """测试监听登记"""
+
+    def test_refcount(self):
+        self.assertEqual(self._watch()["subscribers"], 1)
+        self.assertEqual(watcher.watch(RECIPIENT, "usdt")["subscribers"], 2)
+        self.assertEqual(watcher.list_watches()[0]["token"], "ALL")
+        self.assertEqual(watcher.unwatch(RECIPIENT)["subscribers"], 1)
+        self.assertEqual(watcher.unwatch(RECIPIENT)["subscribers"], 0)
+        self.assertIsNone(watcher.unwatch(RECIPIENT))
+        self.assertEqual(watcher.list_watches(), [])
+
+    def test_invalid_token(self):
+        with self.assertRaises(ValueError):
+            watcher.watch(RECIPIENT, "BTC")
+
+    def test_limit(self):
+        with patch.object(watcher, "_MAX_WATCHES", 1):
+            self._watch(RECIPIENT)
+            with self.assertRaises(watcher.WatchLimitError):
+                watcher.watch(OWNER)
+
+    def test_starts_follower_once(self):
+        self._watch(RECIPIENT)
+        follower = block_follower.get_follower()
+        watcher.watch(OWNER)
+        self.assertIs(block_follower.get_follower(), follower)
+        self.assertEqual(follower._listeners.count(watcher._on_block), 1)
+
+
+class TestBlockScan(_WatcherTestCase):
+    """测试区块扫描"""
+
+    def test_incoming_transfers(self):
+        self._watch()
+        usdt = config.get_usdt_contract()
+        height = self._mine_and_poll([
+            _trx(RECIPIENT),
+            _trc20(RECIPIENT, 12_340_000, usdt),
+            _trc20(RECIPIENT, 7, TOKEN_CONTRACT),
+            _trx(RECIPIENT, ret="REVERT"),
+            _trx(OWNER),
+        ])
+        result = watcher.events(RECIPIENT)
+        items = result["items"]
+        self.assertEqual([(e["token"], e["amount"]) for e in items], [("TRX", 2.5), ("USDT", 12.34), ("TRC20", 7)])
+        self.assertEqual({e["block"] for e in items}, {height})
+        self.assertEqual(items[0]["from"], OWNER)
+        self.assertEqual(items[1]["contract"], usdt)
+        self.assertEqual(result["cursor"], 3)
+
+    def test_registry_decimals_and_transfer_from(self):
+        self._watch()
+        token_registry.register(TOKEN_CONTRACT, "XYZ", 2)
+        self._mine_and_poll([
+            _trc20(RECIPIENT, 1234, TOKEN_CONTRACT),
+            _trc20_from(OWNER, RECIPIENT, 5_000_000, config.get_usdt_contract()),
+            _trc20_from(RECIPIENT, OWNER, 1, TOKEN_CONTRACT),     # 转出不记录
+        ])
+        items = watcher.events(RECIPIENT)["items"]
+        self.assertEqual([(e["token"], e["amount"]) for e in items], [("TRC20", 12.34), ("USDT", 5.0)])
+        self.assertEqual(items[1]["from"], OWNER)
+        # 只查本地注册表，不请求上游
+        self.assertEqual(self._count("/api/token_trc20"), 0)
+
+    def test_token_filter_and_cursor(self):
+        self._watch(token="USDT")
+        self._mine_and_poll([_trx(RECIPIENT), _trc20(RECIPIENT, 1_000_000, config.get_usdt_contract())])
+        first = watcher.events(RECIPIENT)
+        self.assertEqual([e["token"] for e in first["items"]], ["USDT"])
+        self.assertEqual(watcher.events(RECIPIENT, since=first["cursor"])["items"], [])
+        self._mine_and_poll([_trc20(RECIPIENT, 2_000_000, config.get_usdt_contract())])
+        self.assertEqual([e["amount"] for e in watcher.events(RECIPIENT, since=first["cursor"])["items"]], [2.0])
+
+    def test_notifier(self):
+        self._watch()
+        seen = []
+        watcher.add_notifier(lambda address, event: (_ for _ in ()).throw(RuntimeError("boom")))
+        watcher.add_notifier(lambda address, event: seen.append((address, event["txid"])))
+        tx = _trx(RECIPIENT)
+        with self.assertLogs("tron_mcp_server.watcher", level="ERROR"):
+            self._mine_and_poll([tx])
+        self.assertEqual(seen, [(RECIPIENT, tx["txID"])])
+
+
+class TestActions(_WatcherTestCase):
+    """测试路由动作"""
+
+    def test_watch_and_events(self):
+        result = call_router.call("watch_address", {"address": "0x" + _hex(RECIPIENT)})
+        self.assertEqual(result["address"], RECIPIENT)
+        self.assertEqual(result["uri"], f"tron://watch/{RECIPIENT}")
+        self.assertIn("正在监听", result["summary"])
+        self._mine_and_poll([_trx(RECIPIENT)])
+        events = call_router.call("get_watch_events", {"address": RECIPIENT})
+        self.assertEqual(len(events["items"]), 1)
+        self.assertIn("since=1", events["summary"])
+        self.assertIn("已停止监听", call_router.call("unwatch_address", {"address": RECIPIENT})["summary"])
+
+    def test_errors(self):
+        self.assertEqual(call_router.call("watch_address", {})["error"], "missing_param")
+        self.assertEqual(call_router.call("watch_address", {"address": "bad"})["error"], "invalid_address")
+        self.assertEqual(call_router.call("watch_address", {"address": RECIPIENT, "token": "BTC"})["error"], "invalid_param")
+        self.assertEqual(call_router.call("unwatch_address", {"address": RECIPIENT})["error"], "not_found")
+        self.assertEqual(call_router.call("get_watch_events", {"address": RECIPIENT})["error"], "not_found")
+        self._watch()
+        self.assertEqual(call_router.call("get_watch_events", {"address": RECIPIENT, "limit": 0})["error"], "invalid_param")
+
+
+class TestPush(unittest.TestCase):
+    """测试向订阅会话推送"""
+
+    def setUp(self):
+        from tron_mcp_server import server
+        self.server = server
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.loop.close()
+        self.server._watch_sessions.clear()
+
+    def test_send_and_drop_closed(self):
+        sent = []
+
+        class Session:
+            def __init__(self, fail):
+                self.fail = fail
+
+            async def send_resource_updated(self, uri):
+                if self.fail:
+                    raise ConnectionError("closed")
+                sent.append(str(uri))
+
+        uri = watcher.resource_uri(RECIPIENT)
+        alive, closed = Session(False), Session(True)
+        self.server._watch_sessions[uri] = {alive: self.loop, closed: self.loop}
+        self.server._notify_watch(RECIPIENT, {})
+        deadline = time.time() + 5
+        while len(self.server._watch_sessions.get(uri, {})) > 1 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(sent, [uri])
+        self.assertEqual(list(self.server._watch_sessions[uri]), [alive])
+
+    def test_closed_loop(self):
+        class Session:
+            async def send_resource_updated(self, uri):
+                pass
+
+        loop = asyncio.new_event_loop()
+        loop.close()
+        uri = watcher.resource_uri(RECIPIENT)
+        self.server._watch_sessions[uri] = {Session(): loop}
+        self.server._notify_watch(RECIPIENT, {})
+        self.assertNotIn(uri, self.server._watch_sessions)
+
+
+_CLIENT = r"""
+import asyncio, json, os, sys
+import mcp.types as types
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+ADDRESS = sys.argv[1]
+
+
+async def main():
+    updates = asyncio.Queue()
+
+    async def handler(message):
+        if isinstance(message, types.ServerNotification) and isinstance(message.root, types.ResourceUpdatedNotification):
+            await updates.put(str(message.root.params.uri))
+
+    params = StdioServerParameters(command=sys.executable, args=["-m", "tron_mcp_server.server"], env=dict(os.environ))
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write, message_handler=handler) as session:
+            init = await session.initialize()
+            await session.call_tool("tron_watch_address", {"address": ADDRESS})
+            uri = f"tron://watch/{ADDRESS}"
+            await session.subscribe_resource(uri)
+            print(json.dumps({"ready": True, "subscribe": init.capabilities.resources.subscribe}), flush=True)
+            updated = await asyncio.wait_for(updates.get(), 20)
+            content = await session.read_resource(updated)
+            print(json.dumps({"uri": updated, "resource": json.loads(content.contents[0].text)}), flush=True)
+
+
+asyncio.run(main())
+"""
+
+
+class TestStdioEndToEnd(unittest.TestCase):
+    """端到端：stdio 客户端订阅监听资源并收到推送"""
+
+    def test_subscribe_and_receive(self):
+        with MockTronServer() as tron:
+            tron.mine()
+            env = dict(os.environ, **tron.env(), PYTHONPATH=project_root, TRON_BLOCK_FOLLOWER_INTERVAL="0.1")
+            process = subprocess.Popen(
+                [sys.executable, "-c", _CLIENT, RECIPIENT], cwd=project_root, env=env,
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+            )
+            try:
+                ready = json.loads(process.stdout.readline())
+                self.assertTrue(ready["subscribe"])
+                tx = _trx(RECIPIENT)
+                tron.mine([tx])
+                pushed = json.loads(process.stdout.readline())
+                self.assertEqual(process.wait(30), 0)
+            finally:
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+        self.assertEqual(pushed["uri"], f"tron://watch/{RECIPIENT}")
+        self.assertEqual(pushed["resource"]["items"][0]["txid"], tx["txID"])
+        self.assertEqual(pushed["resource"]["items"][0]["amount"], 2.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,23 +1,17 @@
 # TRON MCP Server
 # 渐进式披露架构实现
 
+import importlib
+
 from tron_mcp_server.logging_config import setup_logging
 
 # 初始化统一日志配置
 setup_logging()
 
-from tron_mcp_server import skills
-from tron_mcp_server import validators
-from tron_mcp_server import formatters
-from tron_mcp_server import tron_client
-from tron_mcp_server import tx_builder
-from tron_mcp_server import key_manager
-from tron_mcp_server import call_router
-from tron_mcp_server import address_book
-from tron_mcp_server import qrcode_generator
-
-# server 模块延迟导入，避免在测试环境中因缺少 mcp 包报错
-# from tron_mcp_server.server import mcp
+# 子模块按需加载：stdio 模式下每个 Agent 会话都会冷启动一次进程，
+# key_manager (ecdsa/pycryptodome)、qrcode_generator (qrcode/PIL) 等重量级依赖
+# 只在首次访问对应属性时才导入，避免每次启动都支付这部分导入成本。
+# server 模块同样延迟导入，避免在测试环境中因缺少 mcp 包报错。
 
 __all__ = [
     "skills",
@@ -30,3 +24,10 @@ __all__ = [
     "address_book",
     "qrcode_generator",
 ]
+
+
+def __getattr__(name: str):
+    """首次访问 tron_mcp_server.<子模块> 时再导入（PEP 562）"""
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
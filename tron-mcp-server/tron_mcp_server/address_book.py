@@ -1,16 +1,77 @@
 """地址簿模块 - 本地地址别名映射存储
 
-使用 JSON 文件持久化存储 TRON 钱包地址的别名映射。
-默认存储路径: ~/.tron_mcp/address_book.json
+持久化存储 TRON 钱包地址的别名映射，支持两种存储后端：
+- JSON（默认）: ~/.tron_mcp/address_book.json，适合少量联系人
+- SQLite: 路径扩展名为 .db / .sqlite / .sqlite3，或设置
+  TRON_ADDRESSBOOK_BACKEND=sqlite 时启用，适合数万条带标签的地址
+  （见 address_book_sqlite 模块）。新建 SQLite 地址簿时会自动导入
+  同目录同名的 .json 旧地址簿
 可通过环境变量 TRON_ADDRESSBOOK_PATH 自定义存储路径。
+
+联系人支持标签（tags），可分页列出、按标签 / 备注搜索，
+并支持 CSV / JSON 批量导入导出。
+
+性能与并发:
+- 进程内维护内存索引（别名 → 联系人、地址 → 别名），只在文件
+  mtime/size/inode 变化时重新解析，查询不再每次读盘
+- 写入采用「写临时文件 → os.replace」原子替换，读者不会看到半截文件
+- 读-改-写全程持有文件锁，多个 SSE worker 并发修改时不会丢失更新
 """
 
+import contextlib
+import csv
+import hashlib
+import io
 import json
+import logging
 import os
+import tempfile
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict, List
-from difflib import SequenceMatcher
+from typing import TYPE_CHECKING, Optional, Dict, List, Iterator, Iterable, Tuple, Union
+
+from . import metrics
+from .fuzzy_index import FuzzyIndex
+
+if TYPE_CHECKING:
+    from .address_book_sqlite import SQLiteAddressBook
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+# 使用 SQLite 后端的文件扩展名
+_SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+# CSV 导入导出的列，tags 用分号分隔
+_CSV_FIELDS = ("alias", "address", "note", "tags", "created_at", "updated_at")
+
+# 进程内线程锁（文件锁只保证跨进程互斥，同进程多线程还需要这把锁）
+_lock = threading.RLock()
+
+# 内存索引: 对应文件路径、文件签名、别名 → 联系人、地址 → 别名列表、
+# 别名模糊搜索索引（首次模糊查询时才构建）
+_index = {
+    "path": None,
+    "signature": None,
+    "contacts": {},
+    "by_address": {},
+    "fuzzy": None,
+}
+
+# SQLite 后端实例缓存: 路径 → SQLiteAddressBook（每个路径共享一个连接）
+_sqlite_books: Dict[Path, "SQLiteAddressBook"] = {}
+
+
+def _configured_backend() -> str:
+    """TRON_ADDRESSBOOK_BACKEND 设置（json / sqlite），未设置或无法识别时返回空字符串"""
+    backend = os.getenv("TRON_ADDRESSBOOK_BACKEND", "").strip().lower()
+    return backend if backend in ("json", "sqlite") else ""
 
 
 def _get_storage_path() -> Path:
@@ -19,37 +80,286 @@ def _get_storage_path() -> Path:
     if custom_path:
         return Path(custom_path)
     
-    # 默认路径: ~/.tron_mcp/address_book.json
+    # 默认路径: ~/.tron_mcp/address_book.json（SQLite 后端为 address_book.db）
     home_dir = Path.home()
     tron_dir = home_dir / ".tron_mcp"
     tron_dir.mkdir(parents=True, exist_ok=True)
+    if _configured_backend() == "sqlite":
+        return tron_dir / "address_book.db"
     return tron_dir / "address_book.json"
 
 
-def _load_addressbook() -> dict:
-    """加载地址簿数据"""
+def _uses_sqlite(path: Path) -> bool:
+    """显式设置的后端优先，否则按扩展名判断"""
+    backend = _configured_backend()
+    if backend:
+        return backend == "sqlite"
+    return path.suffix.lower() in _SQLITE_SUFFIXES
+
+
+def _sqlite_book() -> Optional["SQLiteAddressBook"]:
+    """当前路径使用 SQLite 后端时返回对应实例，否则返回 None"""
     path = _get_storage_path()
+    if not _uses_sqlite(path):
+        return None
+    with _lock:
+        book = _sqlite_books.get(path)
+        if book is None:
+            from .address_book_sqlite import SQLiteAddressBook
+
+            book = SQLiteAddressBook(path)
+            _sqlite_books[path] = book
+            if book.created:
+                _migrate_legacy_json(book)
+        return book
+
+
+def _migrate_legacy_json(book: "SQLiteAddressBook") -> None:
+    """新建 SQLite 地址簿时，导入同目录同名的 JSON 旧地址簿"""
+    legacy_path = book.path.with_suffix(".json")
+    legacy = _read_file(legacy_path)
+    if not legacy:
+        return
+    with book.transaction():
+        for alias, contact in legacy.items():
+            if isinstance(contact, dict) and contact.get("address") and alias not in book:
+                book[alias] = _normalize_record(contact)
+    logger.info(f"已从 {legacy_path} 迁移 {len(legacy)} 位联系人到 {book.path}")
+
+
+def _close_sqlite_books() -> None:
+    """关闭全部 SQLite 连接（测试及进程退出时使用）"""
+    with _lock:
+        for book in _sqlite_books.values():
+            book.close()
+        _sqlite_books.clear()
+
+
+def _file_signature(path: Path) -> Optional[tuple]:
+    """文件签名 (mtime_ns, size, inode)，文件不存在时返回 None"""
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _read_file(path: Path) -> dict:
+    """从磁盘读取并解析地址簿文件"""
     if not path.exists():
         return {}
     
     try:
         with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+            data = json.load(f)
     except (json.JSONDecodeError, IOError):
         # 文件损坏或读取失败，返回空字典
         return {}
+    return data if isinstance(data, dict) else {}
 
 
-def _save_addressbook(data: dict) -> None:
-    """保存地址簿数据"""
+def _build_reverse_index(contacts: dict) -> Dict[str, List[str]]:
+    """构建地址 → 别名列表的反向索引"""
+    by_address: Dict[str, List[str]] = {}
+    for alias, contact in contacts.items():
+        address = contact.get("address") if isinstance(contact, dict) else None
+        if address:
+            by_address.setdefault(address, []).append(alias)
+    return by_address
+
+
+def _set_index(path: Path, signature: Optional[tuple], contacts: dict) -> None:
+    _index["path"] = path
+    _index["signature"] = signature
+    _index["contacts"] = contacts
+    _index["by_address"] = _build_reverse_index(contacts)
+    _index["fuzzy"] = None
+
+
+def _ensure_index() -> dict:
+    """
+    返回当前存储路径对应的内存索引
+
+    只有在存储路径切换或文件签名变化（其他进程写入）时才重新读盘。
+    """
     path = _get_storage_path()
+    signature = _file_signature(path)
+    with _lock:
+        hit = _index["path"] == path and _index["signature"] == signature
+        if not hit:
+            _set_index(path, signature, _read_file(path))
+        metrics.record_cache("addressbook_index", hit)
+        return _index
+
+
+def _fuzzy_index() -> FuzzyIndex:
+    """返回别名模糊搜索索引（按需构建，随内存索引一起失效）"""
+    index = _ensure_index()
+    with _lock:
+        hit = index["fuzzy"] is not None
+        if not hit:
+            index["fuzzy"] = FuzzyIndex(index["contacts"].keys())
+        metrics.record_cache("addressbook_fuzzy", hit)
+        return index["fuzzy"]
+
+
+def _load_addressbook() -> dict:
+    """加载地址簿数据（返回内存索引中的字典，调用方只读不可修改）"""
+    return _ensure_index()["contacts"]
+
+
+def _lock_file_path(path: Path) -> Path:
+    """锁文件放在系统临时目录，避免在地址簿目录下遗留文件"""
+    digest = hashlib.sha1(str(path.resolve()).encode("utf-8")).hexdigest()[:16]
+    return Path(tempfile.gettempdir()) / f"tron_mcp_addressbook_{digest}.lock"
+
+
+@contextlib.contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """跨进程互斥锁（POSIX 使用 flock，Windows 使用 msvcrt.locking）"""
+    with open(_lock_file_path(path), "a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _atomic_write(path: Path, write) -> None:
+    """原子写文件：write(f) 写入同目录临时文件后 os.replace 替换"""
     path.parent.mkdir(parents=True, exist_ok=True)
     
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
+
+def _save_addressbook(data: dict) -> None:
+    """原子保存地址簿数据：写入同目录临时文件后 os.replace 替换"""
+    path = _get_storage_path()
+    _atomic_write(path, lambda f: json.dump(data, f, ensure_ascii=False, indent=2))
+    
+    with _lock:
+        _set_index(path, _file_signature(path), data)
+
 
+@contextlib.contextmanager
+def _transaction() -> Iterator[dict]:
+    """
+    读-改-写事务：持有文件锁期间基于磁盘最新内容修改，退出时原子保存
 
-def add_contact(alias: str, address: str, note: str = "") -> dict:
+    用法:
+        with _transaction() as addressbook:
+            addressbook[alias] = {...}
+    """
+    path = _get_storage_path()
+    with _lock, _file_lock(path):
+        # 持锁后重新校验签名，确保基于其他进程的最新写入进行修改
+        original = _ensure_index()["contacts"]
+        addressbook = dict(original)
+        yield addressbook
+        if addressbook != original:
+            _save_addressbook(addressbook)
+
+
+def _readable():
+    """返回当前后端的只读视图（JSON 为内存索引字典，SQLite 为存储实例）"""
+    book = _sqlite_book()
+    return book if book is not None else _load_addressbook()
+
+
+@contextlib.contextmanager
+def _writable():
+    """当前后端的写事务，两种后端都提供 dict 风格的读写接口"""
+    book = _sqlite_book()
+    if book is not None:
+        with book.transaction():
+            yield book
+    else:
+        with _transaction() as addressbook:
+            yield addressbook
+
+
+def _normalize_tags(tags: Union[str, Iterable[str], None]) -> List[str]:
+    """标签去空白、去重并保持顺序；字符串按逗号 / 分号分隔"""
+    if not tags:
+        return []
+    if isinstance(tags, str):
+        tags = tags.replace(";", ",").split(",")
+    return list(dict.fromkeys(t.strip() for t in tags if t and t.strip()))
+
+
+def _normalize_record(contact: dict) -> dict:
+    """补全旧格式记录缺失的字段"""
+    return {
+        "address": contact["address"],
+        "note": contact.get("note") or "",
+        "tags": _normalize_tags(contact.get("tags")),
+        "created_at": contact.get("created_at") or datetime.now().isoformat(),
+        "updated_at": contact.get("updated_at"),
+    }
+
+
+def _contact_entry(alias: str, contact: dict) -> dict:
+    """列表 / 搜索结果中的单个联系人"""
+    return {
+        "alias": alias,
+        "address": contact["address"],
+        "note": contact.get("note", ""),
+        "tags": contact.get("tags", []),
+        "created_at": contact.get("created_at", ""),
+    }
+
+
+def _query_dict(
+    addressbook: dict,
+    text: str = "",
+    tag: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: int = 0,
+) -> Tuple[int, List[Tuple[str, dict]]]:
+    """JSON 后端的分页查询，语义与 SQLiteAddressBook.query 一致"""
+    needle = text.lower()
+    matched = []
+    for alias, contact in addressbook.items():
+        if tag and tag not in contact.get("tags", []):
+            continue
+        if needle and not any(
+            needle in (value or "").lower()
+            for value in (alias, contact.get("note"), contact.get("address"))
+        ):
+            continue
+        matched.append((alias, contact))
+    # 按创建时间排序（最新的在前）
+    matched.sort(key=lambda item: item[1].get("created_at", ""), reverse=True)
+    end = None if limit is None else offset + limit
+    return len(matched), matched[offset:end]
+
+
+def _query(text: str = "", tag: Optional[str] = None, limit: Optional[int] = None, offset: int = 0):
+    book = _sqlite_book()
+    if book is not None:
+        return book.query(text, tag, limit, offset)
+    return _query_dict(_load_addressbook(), text, tag, limit, offset)
+
+
+def add_contact(alias: str, address: str, note: str = "", tags: Optional[List[str]] = None) -> dict:
     """
     添加或更新联系人
     
@@ -57,31 +367,36 @@ def add_contact(alias: str, address: str, note: str = "") -> dict:
         alias: 联系人别名（如 "小明"、"老板"）
         address: TRON 地址（Base58 格式）
         note: 备注信息（可选）
+        tags: 标签列表（可选，如 ["交易所", "充值地址"]；更新时为 None 则保留原标签）
     
     Returns:
-        包含 alias, address, note, is_update, total_contacts 的结果字典
+        包含 alias, address, note, tags, is_update, total_contacts 的结果字典
     """
-    addressbook = _load_addressbook()
-    
-    # 检查是否为更新操作
-    is_update = alias in addressbook
-    
-    # 保存联系人
-    addressbook[alias] = {
-        "address": address,
-        "note": note,
-        "created_at": datetime.now().isoformat() if not is_update else addressbook[alias].get("created_at", datetime.now().isoformat()),
-        "updated_at": datetime.now().isoformat() if is_update else None,
-    }
-    
-    _save_addressbook(addressbook)
+    with _writable() as addressbook:
+        # 检查是否为更新操作
+        previous = addressbook.get(alias)
+        is_update = previous is not None
+        if tags is None:
+            tags = previous.get("tags", []) if is_update else []
+        tags = _normalize_tags(tags)
+        
+        # 保存联系人
+        addressbook[alias] = {
+            "address": address,
+            "note": note,
+            "tags": tags,
+            "created_at": datetime.now().isoformat() if not is_update else previous.get("created_at", datetime.now().isoformat()),
+            "updated_at": datetime.now().isoformat() if is_update else None,
+        }
+        total_contacts = len(addressbook)
     
     return {
         "alias": alias,
         "address": address,
         "note": note,
+        "tags": tags,
         "is_update": is_update,
-        "total_contacts": len(addressbook),
+        "total_contacts": total_contacts,
     }
 
 
@@ -95,8 +410,7 @@ def remove_contact(alias: str) -> dict:
     Returns:
         包含 alias, found, removed_address, total_contacts 的结果字典
     """
-    addressbook = _load_addressbook()
-    
+    addressbook = _readable()
     if alias not in addressbook:
         return {
             "alias": alias,
@@ -105,15 +419,24 @@ def remove_contact(alias: str) -> dict:
             "total_contacts": len(addressbook),
         }
     
-    # 删除联系人
-    removed_contact = addressbook.pop(alias)
-    _save_addressbook(addressbook)
+    with _writable() as addressbook:
+        # 持锁后再次确认（可能已被其他进程删除）
+        removed_contact = addressbook.pop(alias, None)
+        total_contacts = len(addressbook)
+    
+    if removed_contact is None:
+        return {
+            "alias": alias,
+            "found": False,
+            "removed_address": None,
+            "total_contacts": total_contacts,
+        }
     
     return {
         "alias": alias,
         "found": True,
         "removed_address": removed_contact["address"],
-        "total_contacts": len(addressbook),
+        "total_contacts": total_contacts,
     }
 
 
@@ -127,37 +450,35 @@ def lookup(alias: str) -> dict:
     Returns:
         包含 alias, found, address, note, similar_matches 的结果字典
     """
-    addressbook = _load_addressbook()
+    book = _sqlite_book()
+    addressbook = book if book is not None else _load_addressbook()
     
     # 精确匹配
-    if alias in addressbook:
-        contact = addressbook[alias]
+    contact = addressbook.get(alias)
+    if contact is not None:
         return {
             "alias": alias,
             "found": True,
             "address": contact["address"],
             "note": contact.get("note", ""),
+            "tags": contact.get("tags", []),
             "created_at": contact.get("created_at", ""),
         }
     
-    # 模糊搜索：查找相似的别名
+    # 模糊搜索：通过索引查找相似的别名（相似度 > 50%，最多 3 个，按相似度降序）
+    fuzzy = book.fuzzy_index() if book is not None else _fuzzy_index()
     similar_matches = []
-    for contact_alias, contact_data in addressbook.items():
-        # 使用 SequenceMatcher 计算相似度
-        similarity = SequenceMatcher(None, alias.lower(), contact_alias.lower()).ratio()
-        if similarity > 0.5:  # 相似度阈值 50%
-            similar_matches.append({
-                "alias": contact_alias,
-                "address": contact_data["address"],
-                "note": contact_data.get("note", ""),
-                "similarity": similarity,
-            })
-    
-    # 按相似度降序排序
-    similar_matches.sort(key=lambda x: x["similarity"], reverse=True)
-    
-    # 只返回前 3 个最相似的结果
-    similar_matches = similar_matches[:3]
+    for contact_alias, similarity in fuzzy.search(alias):
+        contact_data = addressbook.get(contact_alias)
+        if contact_data is None:
+            # 查询期间文件被其他进程改写，跳过已不存在的别名
+            continue
+        similar_matches.append({
+            "alias": contact_alias,
+            "address": contact_data["address"],
+            "note": contact_data.get("note", ""),
+            "similarity": similarity,
+        })
     
     return {
         "alias": alias,
@@ -168,30 +489,340 @@ def lookup(alias: str) -> dict:
     }
 
 
-def list_contacts() -> dict:
+def list_contacts(limit: Optional[int] = None, offset: int = 0, tag: Optional[str] = None) -> dict:
     """
-    列出所有联系人
+    列出联系人（按创建时间倒序，支持分页）
+    
+    Args:
+        limit: 每页条数（可选，默认返回全部）
+        offset: 偏移量（默认 0）
+        tag: 只列出带有该标签的联系人（可选）
     
     Returns:
-        包含 total, contacts 列表的结果字典
+        包含 tag, total（符合条件的总数）, offset, limit, contacts 列表的结果字典
+    """
+    total, page = _query(tag=tag, limit=limit, offset=offset)
+    return {
+        "tag": tag,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "contacts": [_contact_entry(alias, contact) for alias, contact in page],
+    }
+
+
+def search_contacts(
+    query: str = "",
+    tag: Optional[str] = None,
+    limit: Optional[int] = 50,
+    offset: int = 0,
+) -> dict:
     """
-    addressbook = _load_addressbook()
+    按别名 / 备注 / 地址子串及标签搜索联系人
     
-    contacts = []
-    for alias, contact_data in addressbook.items():
-        contacts.append({
-            "alias": alias,
-            "address": contact_data["address"],
-            "note": contact_data.get("note", ""),
-            "created_at": contact_data.get("created_at", ""),
-        })
+    Args:
+        query: 搜索关键词（在别名、备注、地址中匹配，不区分大小写）
+        tag: 只返回带有该标签的联系人（可选）
+        limit: 每页条数（默认 50）
+        offset: 偏移量（默认 0）
     
-    # 按创建时间排序（最新的在前）
-    contacts.sort(key=lambda x: x.get("created_at", ""), reverse=True)
+    Returns:
+        包含 query, tag, total, offset, limit, contacts 列表的结果字典
+    """
+    total, page = _query(text=query, tag=tag, limit=limit, offset=offset)
+    return {
+        "query": query,
+        "tag": tag,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "contacts": [_contact_entry(alias, contact) for alias, contact in page],
+    }
+
+
+def reverse_lookup(address: str) -> dict:
+    """
+    通过地址反查别名（JSON 后端用内存反向索引，SQLite 后端走 address 索引）
+    
+    Args:
+        address: TRON 地址
+    
+    Returns:
+        包含 address, found, aliases 的结果字典
+    """
+    book = _sqlite_book()
+    if book is not None:
+        aliases = book.aliases_for(address)
+    else:
+        aliases = list(_ensure_index()["by_address"].get(address, []))
+    return {
+        "address": address,
+        "found": bool(aliases),
+        "aliases": aliases,
+    }
+
+
+# ============ 批量导入导出 ============
+
+
+def _detect_format(path: Path, fmt: Optional[str]) -> str:
+    fmt = (fmt or path.suffix.lstrip(".")).lower()
+    if fmt not in ("csv", "json"):
+        raise ValueError(f"不支持的格式: {fmt or path.name}（仅支持 csv / json）")
+    return fmt
+
+
+def _parse_rows(text: str, fmt: str) -> List[Tuple[int, dict]]:
+    """
+    解析导入数据为 [(行号, {alias, address, note, tags, ...}), ...]
+
+    JSON 支持两种结构：旧地址簿格式 {别名: {address, note, ...}}，
+    以及联系人列表 [{alias, address, note, tags}, ...]。
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(io.StringIO(text))
+        missing = {"alias", "address"} - set(reader.fieldnames or [])
+        if missing:
+            raise ValueError(f"CSV 缺少必需的列: {', '.join(sorted(missing))}")
+        return [(reader.line_num, dict(row)) for row in reader]
+
+    data = json.loads(text)
+    if isinstance(data, dict):
+        rows = []
+        for alias, contact in data.items():
+            row = dict(contact) if isinstance(contact, dict) else {"address": contact}
+            rows.append({**row, "alias": alias})
+    elif isinstance(data, list):
+        rows = data
+    else:
+        raise ValueError("JSON 顶层必须是对象或数组")
+    return [(i, row) for i, row in enumerate(rows, start=1)]
+
+
+def _validate_rows(rows: List[Tuple[int, dict]]) -> Tuple[Dict[str, Tuple[int, dict]], List[dict]]:
+    """
+    一次遍历校验全部记录（在获取写锁之前完成）
+
+    Returns:
+        ({别名: (行号, 原始记录)}, 逐行错误列表)；同一别名出现多次时以最后一行为准
+    """
+    from . import validators
+
+    valid: Dict[str, Tuple[int, dict]] = {}
+    errors = []
+    for row_number, row in rows:
+        if not isinstance(row, dict):
+            errors.append({"row": row_number, "alias": None, "error": "记录格式错误"})
+            continue
+        alias = str(row.get("alias") or "").strip()
+        address = str(row.get("address") or "").strip()
+        if not alias:
+            errors.append({"row": row_number, "alias": None, "error": "缺少 alias"})
+            continue
+        if not validators.is_valid_address(address):
+            errors.append({"row": row_number, "alias": alias, "error": f"无效的地址格式: {address}"})
+            continue
+        valid.pop(alias, None)
+        valid[alias] = (row_number, {**row, "address": address})
+    return valid, errors
+
+
+def _import_rows(rows: List[Tuple[int, dict]], overwrite: bool, dry_run: bool) -> dict:
+    """校验后整批在一个事务内写入（dry_run 时只校验不写入）"""
+    valid, errors = _validate_rows(rows)
+
+    imported = updated = skipped = 0
+    if dry_run:
+        addressbook = _readable()
+        for alias in valid:
+            if alias not in addressbook:
+                imported += 1
+            elif overwrite:
+                updated += 1
+            else:
+                skipped += 1
+        total_contacts = len(addressbook)
+    else:
+        with _writable() as addressbook:
+            for alias, (_, row) in valid.items():
+                previous = addressbook.get(alias)
+                if previous is not None and not overwrite:
+                    skipped += 1
+                    continue
+                record = _normalize_record(row)
+                if previous is not None:
+                    record["created_at"] = row.get("created_at") or previous.get("created_at") or record["created_at"]
+                    record["updated_at"] = datetime.now().isoformat()
+                    updated += 1
+                else:
+                    imported += 1
+                addressbook[alias] = record
+            total_contacts = len(addressbook)
+
+    return {
+        "rows": len(rows),
+        "imported": imported,
+        "updated": updated,
+        "skipped": skipped,
+        "errors": errors,
+        "dry_run": dry_run,
+        "total_contacts": total_contacts,
+    }
+
+
+def import_contacts(
+    source: Union[str, Path],
+    fmt: Optional[str] = None,
+    overwrite: bool = True,
+    dry_run: bool = False,
+) -> dict:
+    """
+    从 CSV / JSON 文件批量导入联系人（先整批校验，再在一个事务内写入）
+    
+    CSV 需包含 alias, address 列，可选 note, tags（分号分隔）, created_at, updated_at。
+    JSON 可以是旧地址簿文件（{别名: {...}}），也可以是联系人数组。
+    
+    Args:
+        source: 文件路径
+        fmt: 文件格式 csv / json（可选，默认按扩展名判断）
+        overwrite: 别名已存在时是否覆盖（默认 True，False 时跳过）
+        dry_run: 只校验并统计，不写入（默认 False）
+    
+    Returns:
+        包含 source, format, rows, imported, updated, skipped, errors（逐行错误）,
+        dry_run, total_contacts 的结果字典
+    """
+    path = Path(source)
+    fmt = _detect_format(path, fmt)
+    rows = _parse_rows(path.read_text(encoding="utf-8-sig"), fmt)
+    return {"source": str(path), "format": fmt, **_import_rows(rows, overwrite, dry_run)}
+
+
+def import_contacts_data(
+    data: Union[str, list, dict],
+    fmt: Optional[str] = None,
+    overwrite: bool = True,
+    dry_run: bool = False,
+) -> dict:
+    """
+    从内存数据批量导入联系人（供 MCP 调用直接传入内容，无需落盘）
+    
+    Args:
+        data: CSV / JSON 文本，或已解析的联系人数组 / 旧地址簿格式字典
+        fmt: 文本格式 csv / json（可选，默认按首字符判断：[ 或 { 开头为 JSON）
+        overwrite: 别名已存在时是否覆盖（默认 True）
+        dry_run: 只校验并统计，不写入（默认 False）
     
+    Returns:
+        同 import_contacts，source 为 "inline"
+    """
+    if isinstance(data, str):
+        text = data.lstrip("\ufeff")
+        if not fmt:
+            fmt = "json" if text.lstrip()[:1] in ("[", "{") else "csv"
+        fmt = fmt.lower()
+        if fmt not in ("csv", "json"):
+            raise ValueError(f"不支持的格式: {fmt}（仅支持 csv / json）")
+    else:
+        text = json.dumps(data, ensure_ascii=False)
+        fmt = "json"
+    rows = _parse_rows(text, fmt)
+    return {"source": "inline", "format": fmt, **_import_rows(rows, overwrite, dry_run)}
+
+
+def resolve_batch(inputs: List[str]) -> dict:
+    """
+    批量解析别名 / 地址（一次读取地址簿快照，逐项报告结果）
+    
+    合法 TRON 地址直接返回；别名精确匹配时返回对应地址；
+    否则记录错误，并在有相似别名时给出建议。
+    
+    Args:
+        inputs: 别名或地址列表
+    
+    Returns:
+        包含 total, resolved, failed, results 的结果字典；
+        results 中每项包含 index, input, found, address, source（address / alias），
+        失败时包含 error 与 suggestions
+    """
+    from . import validators
+
+    book = _sqlite_book()
+    aliases = [
+        item for item in dict.fromkeys(inputs)
+        if isinstance(item, str) and item and not validators.is_valid_address(item)
+    ]
+    if book is not None:
+        contacts = book.get_many(aliases)
+    else:
+        snapshot = _load_addressbook()
+        contacts = {alias: snapshot[alias] for alias in aliases if alias in snapshot}
+
+    results = []
+    resolved = 0
+    fuzzy = None
+    for index, item in enumerate(inputs):
+        entry = {"index": index, "input": item, "found": False, "address": None, "source": None}
+        if not isinstance(item, str) or not item.strip():
+            entry["error"] = "输入为空"
+        elif validators.is_valid_address(item):
+            entry.update(found=True, address=item, source="address")
+        elif item in contacts:
+            entry.update(found=True, address=contacts[item]["address"], source="alias")
+        else:
+            if fuzzy is None:
+                fuzzy = book.fuzzy_index() if book is not None else _fuzzy_index()
+            entry["error"] = f"地址簿中未找到「{item}」"
+            entry["suggestions"] = [alias for alias, _ in fuzzy.search(item)]
+        if entry["found"]:
+            resolved += 1
+        results.append(entry)
+
+    return {
+        "total": len(inputs),
+        "resolved": resolved,
+        "failed": len(inputs) - resolved,
+        "results": results,
+    }
+
+
+def export_contacts(destination: Union[str, Path], fmt: Optional[str] = None) -> dict:
+    """
+    导出全部联系人到 CSV / JSON 文件（原子写入）
+    
+    JSON 导出为旧地址簿格式，可直接作为 JSON 后端的地址簿文件使用。
+    
+    Args:
+        destination: 输出文件路径
+        fmt: 文件格式 csv / json（可选，默认按扩展名判断）
+    
+    Returns:
+        包含 path, format, total 的结果字典
+    """
+    path = Path(destination)
+    fmt = _detect_format(path, fmt)
+    contacts = [(alias, _normalize_record(contact)) for alias, contact in _readable().items()]
+
+    if fmt == "csv":
+        def write(f):
+            writer = csv.DictWriter(f, fieldnames=_CSV_FIELDS)
+            writer.writeheader()
+            for alias, contact in contacts:
+                writer.writerow({
+                    **contact,
+                    "alias": alias,
+                    "tags": ";".join(contact["tags"]),
+                    "updated_at": contact["updated_at"] or "",
+                })
+    else:
+        def write(f):
+            json.dump(dict(contacts), f, ensure_ascii=False, indent=2)
+
+    _atomic_write(path, write)
     return {
+        "path": str(path),
+        "format": fmt,
         "total": len(contacts),
-        "contacts": contacts,
     }
 
 
@@ -0,0 +1,256 @@
+"""地址簿 SQLite 存储后端
+
+联系人规模达到数万（交易对手、充值地址、已知诈骗地址等）时，
+整体读写 JSON 文件不再适用。本模块提供基于 SQLite 的存储：
+- alias 为主键，address / created_at / 标签均建索引
+- 分页列表、按标签 / 备注搜索直接在 SQL 中完成，不加载全部联系人
+- WAL 模式 + BEGIN IMMEDIATE，多进程并发写入由 SQLite 自身加锁保证
+- 未精确命中时的模糊搜索复用 FuzzyIndex，数据变化（含其他进程写入）后重建
+
+对外暴露与 dict 相同的读写接口（in / [] / get / pop / len / items），
+address_book 模块在两种后端上使用同一套业务逻辑。
+"""
+
+import contextlib
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from . import metrics
+from .fuzzy_index import FuzzyIndex
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS contacts (
+    alias      TEXT PRIMARY KEY,
+    address    TEXT NOT NULL,
+    note       TEXT NOT NULL DEFAULT '',
+    tags       TEXT NOT NULL DEFAULT '[]',
+    created_at TEXT NOT NULL DEFAULT '',
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_contacts_address ON contacts(address);
+CREATE INDEX IF NOT EXISTS idx_contacts_created_at ON contacts(created_at);
+CREATE TABLE IF NOT EXISTS contact_tags (
+    alias TEXT NOT NULL REFERENCES contacts(alias) ON DELETE CASCADE,
+    tag   TEXT NOT NULL,
+    PRIMARY KEY (alias, tag)
+);
+CREATE INDEX IF NOT EXISTS idx_contact_tags_tag ON contact_tags(tag);
+"""
+
+_COLUMNS = "alias, address, note, tags, created_at, updated_at"
+
+# 批量查询每批别名数（SQLite 默认最多 999 个绑定变量）
+_BATCH_SIZE = 500
+
+
+def _escape_like(text: str) -> str:
+    """转义 LIKE 通配符"""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _row_to_record(row: sqlite3.Row) -> dict:
+    return {
+        "address": row["address"],
+        "note": row["note"],
+        "tags": json.loads(row["tags"]),
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+    }
+
+
+class SQLiteAddressBook:
+    """
+    SQLite 地址簿存储
+
+    同一进程内共享一个连接，由 RLock 串行化访问；
+    写操作需在 transaction() 中进行。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 新建的数据库由调用方决定是否从旧 JSON 地址簿迁移
+        self.created = not path.exists() or path.stat().st_size == 0
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(
+            str(path), timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(_SCHEMA)
+        self._in_transaction = False
+        self._fuzzy: Optional[FuzzyIndex] = None
+        self._fuzzy_version = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ============ 事务 ============
+
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator["SQLiteAddressBook"]:
+        """写事务：BEGIN IMMEDIATE 立即获取写锁，保证读-改-写不丢失其他进程的更新"""
+        with self._lock:
+            if self._in_transaction:
+                yield self
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._in_transaction = True
+            try:
+                yield self
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._conn.execute("COMMIT")
+            finally:
+                self._in_transaction = False
+                self._fuzzy = None
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    # ============ dict 兼容接口 ============
+
+    def get(self, alias: str, default=None) -> Optional[dict]:
+        row = self._execute(f"SELECT {_COLUMNS} FROM contacts WHERE alias = ?", (alias,)).fetchone()
+        return _row_to_record(row) if row else default
+
+    def __getitem__(self, alias: str) -> dict:
+        record = self.get(alias)
+        if record is None:
+            raise KeyError(alias)
+        return record
+
+    def __contains__(self, alias: str) -> bool:
+        return self._execute("SELECT 1 FROM contacts WHERE alias = ?", (alias,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self._execute("SELECT COUNT(*) FROM contacts").fetchone()[0]
+
+    def __setitem__(self, alias: str, record: dict) -> None:
+        tags = list(record.get("tags") or [])
+        with self.transaction():
+            self._conn.execute(
+                f"INSERT INTO contacts ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(alias) DO UPDATE SET address = excluded.address, "
+                "note = excluded.note, tags = excluded.tags, "
+                "created_at = excluded.created_at, updated_at = excluded.updated_at",
+                (
+                    alias,
+                    record["address"],
+                    record.get("note") or "",
+                    json.dumps(tags, ensure_ascii=False),
+                    record.get("created_at") or "",
+                    record.get("updated_at"),
+                ),
+            )
+            self._conn.execute("DELETE FROM contact_tags WHERE alias = ?", (alias,))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO contact_tags (alias, tag) VALUES (?, ?)",
+                [(alias, tag) for tag in tags],
+            )
+
+    def pop(self, alias: str, default=None) -> Optional[dict]:
+        with self.transaction():
+            record = self.get(alias)
+            if record is None:
+                return default
+            self._conn.execute("DELETE FROM contacts WHERE alias = ?", (alias,))
+            return record
+
+    def get_many(self, aliases: List[str]) -> Dict[str, dict]:
+        """批量精确查询（按主键，分批避免超出 SQL 变量数上限）"""
+        found: Dict[str, dict] = {}
+        for start in range(0, len(aliases), _BATCH_SIZE):
+            chunk = aliases[start:start + _BATCH_SIZE]
+            placeholders = ", ".join("?" * len(chunk))
+            rows = self._execute(
+                f"SELECT {_COLUMNS} FROM contacts WHERE alias IN ({placeholders})", tuple(chunk)
+            ).fetchall()
+            for row in rows:
+                found[row["alias"]] = _row_to_record(row)
+        return found
+
+    def items(self) -> Iterator[Tuple[str, dict]]:
+        """按插入顺序遍历全部联系人（导出用）"""
+        rows = self._execute(f"SELECT {_COLUMNS} FROM contacts ORDER BY rowid").fetchall()
+        for row in rows:
+            yield row["alias"], _row_to_record(row)
+
+    # ============ 索引查询 ============
+
+    def aliases_for(self, address: str) -> List[str]:
+        """通过地址反查别名（走 address 索引）"""
+        rows = self._execute(
+            "SELECT alias FROM contacts WHERE address = ? ORDER BY rowid", (address,)
+        ).fetchall()
+        return [row["alias"] for row in rows]
+
+    def query(
+        self,
+        text: str = "",
+        tag: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> Tuple[int, List[Tuple[str, dict]]]:
+        """
+        分页查询联系人，按创建时间倒序
+
+        Args:
+            text: 在别名 / 备注 / 地址中做子串匹配（空字符串表示不过滤）
+            tag: 只返回带有该标签的联系人
+            limit: 每页条数（None 表示不限）
+            offset: 偏移量
+
+        Returns:
+            (符合条件的总数, [(别名, 记录), ...])
+        """
+        joins = ""
+        where = []
+        params: list = []
+        if tag:
+            joins = "JOIN contact_tags t ON t.alias = c.alias AND t.tag = ?"
+            params.append(tag)
+        if text:
+            pattern = f"%{_escape_like(text)}%"
+            where.append(
+                "(c.alias LIKE ? ESCAPE '\\' OR c.note LIKE ? ESCAPE '\\' OR c.address LIKE ? ESCAPE '\\')"
+            )
+            params.extend([pattern, pattern, pattern])
+        where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+
+        total = self._execute(
+            f"SELECT COUNT(*) FROM contacts c {joins} {where_sql}", tuple(params)
+        ).fetchone()[0]
+        rows = self._execute(
+            f"SELECT c.alias, c.address, c.note, c.tags, c.created_at, c.updated_at "
+            f"FROM contacts c {joins} {where_sql} "
+            f"ORDER BY c.created_at DESC, c.rowid LIMIT ? OFFSET ?",
+            tuple(params) + (-1 if limit is None else limit, offset),
+        ).fetchall()
+        return total, [(row["alias"], _row_to_record(row)) for row in rows]
+
+    def fuzzy_index(self) -> FuzzyIndex:
+        """
+        返回别名模糊搜索索引
+
+        本连接的写入在事务结束时清空索引；其他连接（进程）的写入
+        通过 PRAGMA data_version 变化感知。
+        """
+        with self._lock:
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            hit = self._fuzzy is not None and self._fuzzy_version == version
+            metrics.record_cache("addressbook_fuzzy", hit)
+            if not hit:
+                rows = self._conn.execute("SELECT alias FROM contacts ORDER BY rowid").fetchall()
+                self._fuzzy = FuzzyIndex(row["alias"] for row in rows)
+                self._fuzzy_version = version
+            return self._fuzzy
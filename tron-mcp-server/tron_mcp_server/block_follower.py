@@ -0,0 +1,331 @@
+"""区块跟随器 — 按区块精确失效账户缓存
+
+TTL 缓存只能在新鲜度与命中率之间折中。开启区块跟随器后（TRON_BLOCK_FOLLOWER=true），
+后台线程每隔 TRON_BLOCK_FOLLOWER_INTERVAL 秒查询一次最新区块，对每个新区块只拉取一次交易列表，
+并只删除该区块中涉及地址的账户缓存（account / account_resource）。
+跟随器正常运行期间，这两类缓存的有效期提升到 TRON_BLOCK_FOLLOWER_CACHE_TTL（默认 5 分钟）：
+热点地址可以长期命中缓存，同时在其发生交易后的下一个区块内失效。
+
+- 跟随会话: 长有效期的缓存键带有跟随会话标识（每次从未在跟随恢复为正常跟随时重新生成）。
+  跟随器停止或停滞后读取回到不带标识的键与 TRON_CACHE_TTL_* 配置，此前写入的长有效期缓存不再被读取；
+  其他进程（或重启前的本进程）写入的长有效期缓存同样不会被读取
+- 盲区: 只能从交易参数中识别地址（合约调用的 owner / to / receiver 与 TRC20 transfer / transferFrom 参数）。
+  经合约转出的资产（DEX 兑换、多签 / 支付合约、内部交易）不会失效接收方的缓存，
+  这类余额最多滞后 TRON_BLOCK_FOLLOWER_CACHE_TTL，对新鲜度要求高的部署请调低该值
+
+- 追块: 一次轮询落后多个区块时用 getblockbylimitnext 批量拉取；
+  落后超过 TRON_BLOCK_FOLLOWER_MAX_CATCHUP 个区块（如长时间断网）时无法确定哪些地址变化，
+  改为删除本进程缓存过的全部热点地址
+- 索引延迟: TRONSCAN 的账户数据比区块晚几秒更新，失效后立即回源可能把旧数据重新写入缓存，
+  因此每个区块的地址会在 TRON_BLOCK_FOLLOWER_SETTLE_BLOCKS 个区块后再失效一次
+- 降级: 连续轮询失败超过 3 个间隔即视为未在跟随，缓存有效期回到 TRON_CACHE_TTL_* 的配置
+- 订阅: add_listener 注册的回调会收到每个新区块（区块高度、交易列表），供地址监听等功能复用
+
+仅依赖标准库；上游请求通过 trongrid_client 发出，计入指标与 trace。
+"""
+
+import collections
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from . import config
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# 由区块跟随器负责失效的缓存
+FOLLOWED_CACHES = ("account", "account_resource")
+
+# 单次追块请求的区块数上限（getblockbylimitnext 的限制）
+_RANGE_LIMIT = 100
+
+
+def enabled() -> bool:
+    """是否开启区块跟随器（TRON_BLOCK_FOLLOWER）"""
+    return os.getenv("TRON_BLOCK_FOLLOWER", "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name, "").strip()
+    return float(value) if value else default
+
+
+class BlockFollower:
+    """
+    后台区块跟随器
+
+    Args:
+        interval: 轮询间隔（秒）
+        max_catchup: 单次最多补拉的区块数，超出则按断档处理
+        cache_ttl: 跟随期间账户缓存的有效期（秒）
+        settle_blocks: 区块中的地址在多少个区块后再失效一次（0 表示不重复失效）
+        max_hot: 记录的热点地址上限
+        fetch_latest / fetch_range: 获取最新区块 / [start, end) 区间区块的函数（默认使用 trongrid_client）
+        invalidate: 删除一组地址的账户缓存（默认使用 tron_client.invalidate_addresses）
+    """
+
+    def __init__(self, interval: float = 3.0, max_catchup: int = 20, cache_ttl: float = 300.0,
+                 settle_blocks: int = 2, max_hot: int = 10000,
+                 fetch_latest: Optional[Callable[[], dict]] = None,
+                 fetch_range: Optional[Callable[[int, int], list]] = None,
+                 invalidate: Optional[Callable] = None):
+        from . import tron_client
+        from . import trongrid_client
+
+        self.interval = interval
+        self.max_catchup = max_catchup
+        self.cache_ttl = cache_ttl
+        self.settle_blocks = settle_blocks
+        self.max_hot = max_hot
+        self._fetch_latest = fetch_latest or trongrid_client.get_now_block
+        self._fetch_range = fetch_range or trongrid_client.get_blocks
+        self._invalidate = invalidate or tron_client.invalidate_addresses
+        self._block_number = trongrid_client.block_number
+        self._transaction_addresses = tron_client.transaction_addresses
+
+        self.last_block: Optional[int] = None
+        self.session: Optional[str] = None
+        self._last_success = 0.0
+        self._hot: "collections.OrderedDict[str, None]" = collections.OrderedDict()
+        self._settling: "collections.deque" = collections.deque()
+        self._listeners: List[Callable[[int, list], None]] = []
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats: Dict[str, int] = {"processed": 0, "skipped": 0, "errors": 0, "invalidated": 0}
+        self.last_error: Optional[str] = None
+
+    # ---- 状态 ----
+
+    def is_live(self) -> bool:
+        """最近 3 个轮询间隔内成功跟上了最新区块"""
+        return self._last_success > 0 and time.monotonic() - self._last_success <= 3 * self.interval
+
+    def live_session(self) -> Optional[str]:
+        """正常跟随时返回当前跟随会话标识，否则返回 None"""
+        session = self.session
+        return session if self.is_live() else None
+
+    def track(self, address: str) -> None:
+        """记录以长有效期缓存的地址（断档时统一失效）"""
+        with self._lock:
+            self._hot[address] = None
+            self._hot.move_to_end(address)
+            while len(self._hot) > self.max_hot:
+                self._hot.popitem(last=False)
+
+    def add_listener(self, listener: Callable[[int, list], None]) -> None:
+        """注册新区块回调 listener(block_number, transactions)；重复注册忽略，回调异常只记录日志"""
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[int, list], None]) -> None:
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def status(self) -> dict:
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "live": self.is_live(),
+            "last_block": self.last_block,
+            "interval": self.interval,
+            "cache_ttl": self.cache_ttl,
+            "hot_addresses": len(self._hot),
+            "last_error": self.last_error,
+            **self.stats,
+        }
+
+    # ---- 轮询 ----
+
+    def poll_once(self) -> int:
+        """
+        轮询一次：处理上次之后的所有新区块，返回本次处理的区块数
+
+        上游请求失败时抛出异常，last_block 保持不变，下次轮询会补拉。
+        可以在后台线程之外调用（如确定监听起点），同一时刻只有一次轮询在执行。
+        """
+        with self._poll_lock:
+            return self._poll()
+
+    def _poll(self) -> int:
+        latest = self._fetch_latest()
+        number = self._block_number(latest)
+        if self.last_block is None:
+            # 启动前的区块无法追溯：本进程此时还没有长有效期的缓存
+            self._advance(number)
+            return 0
+        if number <= self.last_block:
+            self._mark_success()
+            return 0
+
+        missing = number - self.last_block - 1
+        if missing > self.max_catchup:
+            logger.warning(f"区块跟随器落后 {missing} 个区块，失效全部热点地址缓存")
+            self.stats["skipped"] += missing
+            metrics.BLOCK_FOLLOWER_BLOCKS.inc("skipped", amount=missing)
+            self._invalidate_hot()
+            blocks = [latest]
+        else:
+            blocks = []
+            start = self.last_block + 1
+            while start < number:
+                end = min(number, start + _RANGE_LIMIT)
+                blocks.extend(self._fetch_range(start, end))
+                start = end
+            blocks.append(latest)
+
+        for block in blocks:
+            self._process(self._block_number(block), block.get("transactions") or [])
+        self._advance(number)
+        return len(blocks)
+
+    def _mark_success(self) -> None:
+        # 从未在跟随（刚启动、停滞或停止后）恢复时开启新的跟随会话，此前写入的长有效期缓存不再被读取
+        if not self.is_live():
+            self.session = os.urandom(6).hex()
+        self._last_success = time.monotonic()
+
+    def _advance(self, number: int) -> None:
+        self.last_block = number
+        self._mark_success()
+        metrics.BLOCK_FOLLOWER_HEIGHT.set(value=number)
+
+    def _process(self, number: int, transactions: list) -> None:
+        addresses = set()
+        for transaction in transactions:
+            addresses |= self._transaction_addresses(transaction)
+        self._invalidate_now(addresses)
+
+        # 索引延迟：settle_blocks 个区块后再失效一次
+        if self.settle_blocks > 0:
+            while self._settling and self._settling[0][0] <= number - self.settle_blocks:
+                self._invalidate_now(self._settling.popleft()[1])
+            if addresses:
+                self._settling.append((number, addresses))
+
+        self.stats["processed"] += 1
+        metrics.BLOCK_FOLLOWER_BLOCKS.inc("processed")
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(number, transactions)
+            except Exception:
+                logger.exception(f"区块 {number} 的回调执行失败")
+
+    def _invalidate_now(self, addresses) -> None:
+        if addresses:
+            self._invalidate(addresses)
+            self.stats["invalidated"] += len(addresses)
+
+    def _invalidate_hot(self) -> None:
+        with self._lock:
+            hot = list(self._hot)
+            self._hot.clear()
+        self._settling.clear()
+        self._invalidate_now(hot)
+
+    # ---- 线程 ----
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+                self.last_error = None
+            except Exception as e:
+                self.stats["errors"] += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                metrics.BLOCK_FOLLOWER_BLOCKS.inc("error")
+                logger.warning(f"区块跟随器轮询失败: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self) -> "BlockFollower":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="tron-block-follower", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._last_success = 0.0
+
+
+# ============ 进程级实例 ============
+
+_follower: Optional[BlockFollower] = None
+_follower_lock = threading.Lock()
+
+
+def get_follower() -> Optional[BlockFollower]:
+    return _follower
+
+
+def start(**kwargs) -> BlockFollower:
+    """启动进程级区块跟随器（已启动时直接返回），未指定的参数从环境变量读取"""
+    global _follower
+    with _follower_lock:
+        if _follower is None:
+            kwargs.setdefault("interval", _env_float("TRON_BLOCK_FOLLOWER_INTERVAL", 3.0))
+            kwargs.setdefault("max_catchup", int(_env_float("TRON_BLOCK_FOLLOWER_MAX_CATCHUP", 20)))
+            kwargs.setdefault("cache_ttl", _env_float("TRON_BLOCK_FOLLOWER_CACHE_TTL", 300.0))
+            kwargs.setdefault("settle_blocks", int(_env_float("TRON_BLOCK_FOLLOWER_SETTLE_BLOCKS", 2)))
+            _follower = BlockFollower(**kwargs)
+        return _follower.start()
+
+
+def start_from_env() -> Optional[BlockFollower]:
+    """TRON_BLOCK_FOLLOWER 开启时启动区块跟随器（服务启动时调用）"""
+    if not enabled():
+        return None
+    follower = start()
+    logger.info(f"区块跟随器已启动（每 {follower.interval:g} 秒轮询最新区块）")
+    return follower
+
+
+def stop() -> None:
+    """停止并丢弃进程级区块跟随器"""
+    global _follower
+    with _follower_lock:
+        follower, _follower = _follower, None
+    if follower is not None:
+        follower.stop()
+
+
+def status() -> dict:
+    follower = _follower
+    return follower.status() if follower is not None else {"running": False, "live": False}
+
+
+def account_cache(name: str, address: str, key: str) -> Tuple[str, float]:
+    """
+    账户类缓存的 (键, 有效期)
+
+    区块跟随器正常运行时返回带跟随会话标识的键与 max(TRON_CACHE_TTL_<NAME>, 跟随器有效期)，
+    并记录该地址为热点地址；否则返回原键与 TRON_CACHE_TTL_<NAME>。
+    """
+    ttl = config.get_cache_ttl(name)
+    follower = _follower
+    if follower is None or name not in FOLLOWED_CACHES:
+        return key, ttl
+    session = follower.live_session()
+    if session is None:
+        return key, ttl
+    follower.track(address)
+    return f"{key}|{session}", max(ttl, follower.cache_ttl)
+
+
+def invalidation_keys(key: str) -> List[str]:
+    """失效账户缓存时需要删除的键：原键，以及当前跟随会话下的键"""
+    follower = _follower
+    session = follower.session if follower is not None else None
+    return [key, f"{key}|{session}"] if session else [key]
@@ -0,0 +1,408 @@
+"""共享缓存 — 可插拔后端
+
+多 worker 部署时，进程内缓存会让每个 worker 各自预热、各自请求上游。
+缓存后端由 TRON_CACHE_URL 选择：
+- memory://[?max_entries=10000]（默认）: 进程内 LRU + TTL 缓存，仅当前进程可见
+- sqlite:///path/to/cache.db: SQLite 文件（WAL 模式），同一主机上的多个进程共享
+- redis://[:password@]host:port/db: Redis 协议 (RESP) 服务，多个 worker / 主机共享；
+  可以是 Redis、KeyDB，也可以是本地替身 mock_redis_server.py
+
+值以 msgpack 编码（未安装 msgpack 或值超出 msgpack 范围时使用 JSON），
+首字节标记编码方式，因此安装情况不同的进程可以共用同一个后端。
+所有键带 tron-mcp: 前缀。缓存后端不可用时记录警告并直接回源，不影响请求本身。
+
+各类数据的有效期由 TRON_CACHE_TTL_<NAME> 配置（见 config.get_cache_ttl），默认不缓存。
+
+用法::
+
+    value = cache.cached("chain_parameters", api_url, ttl=30, loader=lambda: _get("chainparameters"))
+"""
+
+import collections
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from . import metrics
+
+try:
+    import msgpack
+except ImportError:  # 可选依赖
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "tron-mcp:"
+DEFAULT_URL = "memory://"
+
+
+class CacheError(Exception):
+    """缓存后端通信失败"""
+
+
+# ============ 编码 ============
+
+_MSGPACK = b"m"
+_JSON = b"j"
+
+
+def encode(value) -> bytes:
+    """编码缓存值：优先 msgpack，不可用或超出范围（如超过 64 位的整数）时使用 JSON"""
+    if msgpack is not None:
+        try:
+            return _MSGPACK + msgpack.packb(value, use_bin_type=True)
+        except (TypeError, ValueError, OverflowError):
+            pass
+    return _JSON + json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def decode(raw: bytes):
+    """解码缓存值；无法解码（如本进程未安装 msgpack）时抛出 ValueError"""
+    marker, payload = raw[:1], raw[1:]
+    if marker == _JSON:
+        return json.loads(payload)
+    if marker == _MSGPACK and msgpack is not None:
+        return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+    raise ValueError(f"无法解码的缓存值（标记 {marker!r}）")
+
+
+# ============ 进程内后端 ============
+
+
+class MemoryCache:
+    """进程内 LRU + TTL 缓存（过期项在读取时清理，超出容量时淘汰最久未使用的项）"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._data: "collections.OrderedDict[str, Tuple[float, bytes]]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+# ============ SQLite 文件后端 ============
+
+
+class SQLiteCache:
+    """
+    SQLite 文件缓存：同一主机上的多个 worker 进程共享
+
+    每个线程使用独立连接；WAL 模式下读写互不阻塞。
+    过期项在读取时忽略，每写入 purge_every 次批量清理一次。
+    """
+
+    def __init__(self, path: str, timeout: float = 1.0, purge_every: int = 500):
+        self.path = path
+        self.timeout = timeout
+        self.purge_every = purge_every
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def _execute(self) -> sqlite3.Connection:
+        try:
+            return self._connection()
+        except (sqlite3.Error, OSError) as e:
+            raise CacheError(f"SQLite 缓存 {self.path} 不可用: {e}") from e
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            row = self._execute().execute(
+                "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            raise CacheError(f"读取 SQLite 缓存失败: {e}") from e
+        return bytes(row[0]) if row else None
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        now = time.time()
+        try:
+            conn = self._execute()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, sqlite3.Binary(value), now + ttl),
+            )
+            self._writes += 1
+            if self._writes % self.purge_every == 0:
+                conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+        except sqlite3.Error as e:
+            raise CacheError(f"写入 SQLite 缓存失败: {e}") from e
+
+    def delete(self, key: str) -> None:
+        try:
+            self._execute().execute("DELETE FROM cache WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            raise CacheError(f"删除 SQLite 缓存失败: {e}") from e
+
+    def clear(self) -> None:
+        try:
+            self._execute().execute("DELETE FROM cache")
+        except sqlite3.Error as e:
+            raise CacheError(f"清空 SQLite 缓存失败: {e}") from e
+
+
+# ============ Redis 协议后端 ============
+
+
+def _encode_command(args) -> bytes:
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+        parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+    return b"".join(parts)
+
+
+def _read_reply(reader):
+    line = reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise CacheError("连接已断开")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b"+":
+        return payload.decode("utf-8")
+    if kind == b"-":
+        raise CacheError(payload.decode("utf-8", errors="replace"))
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        length = int(payload)
+        if length < 0:
+            return None
+        data = reader.read(length + 2)
+        if len(data) != length + 2:
+            raise CacheError("连接已断开")
+        return data[:-2]
+    if kind == b"*":
+        count = int(payload)
+        return None if count < 0 else [_read_reply(reader) for _ in range(count)]
+    raise CacheError(f"无法解析的 RESP 响应: {line!r}")
+
+
+class RedisCache:
+    """
+    Redis 协议缓存（不依赖 redis-py，仅使用 GET / SET PX / DEL / SELECT / AUTH / FLUSHDB）
+
+    Args:
+        host / port / db / password: 连接参数
+        timeout: 连接与读写超时（秒）
+        pool_size: 空闲连接池上限
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 6379, db: int = 0,
+                 password: Optional[str] = None, timeout: float = 1.0, pool_size: int = 8):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._pool: List[tuple] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisCache":
+        parts = urlsplit(url)
+        db = parts.path.strip("/")
+        return cls(
+            host=parts.hostname or "127.0.0.1",
+            port=parts.port or 6379,
+            db=int(db) if db else 0,
+            password=unquote(parts.password) if parts.password else None,
+        )
+
+    def _connect(self) -> tuple:
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = (sock, sock.makefile("rb"))
+        if self.password:
+            self._execute(conn, ("AUTH", self.password))
+        if self.db:
+            self._execute(conn, ("SELECT", self.db))
+        return conn
+
+    @staticmethod
+    def _execute(conn: tuple, args):
+        sock, reader = conn
+        sock.sendall(_encode_command(args))
+        return _read_reply(reader)
+
+    def command(self, *args):
+        """执行一条命令；网络错误时丢弃该连接并抛出 CacheError"""
+        with self._lock:
+            conn = self._pool.pop() if self._pool else None
+        try:
+            if conn is None:
+                conn = self._connect()
+            reply = self._execute(conn, args)
+        except (OSError, ValueError, CacheError) as e:
+            if conn is not None:
+                conn[0].close()
+            if isinstance(e, CacheError):
+                raise
+            raise CacheError(f"Redis {self.host}:{self.port} 不可用: {e}") from e
+        with self._lock:
+            if len(self._pool) < self.pool_size:
+                self._pool.append(conn)
+                conn = None
+        if conn is not None:
+            conn[0].close()
+        return reply
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.command("GET", key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.command("SET", key, value, "PX", max(1, int(ttl * 1000)))
+
+    def delete(self, key: str) -> None:
+        self.command("DEL", key)
+
+    def clear(self) -> None:
+        """清空当前 db（仅用于测试与本地替身）"""
+        self.command("FLUSHDB")
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, []
+        for sock, _ in pool:
+            sock.close()
+
+
+# ============ 后端选择 ============
+
+_backends: Dict[str, Any] = {}
+_backends_lock = threading.Lock()
+
+
+def create_backend(url: str):
+    """按 URL 创建缓存后端"""
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme == "memory":
+        max_entries = parse_qs(parts.query).get("max_entries", ["10000"])[0]
+        return MemoryCache(max_entries=int(max_entries))
+    if scheme == "sqlite":
+        path = unquote(parts.path)
+        if not path or path == "/":
+            raise ValueError(f"SQLite 缓存缺少文件路径: {url}（示例: sqlite:///var/cache/tron-mcp.db）")
+        return SQLiteCache(path)
+    if scheme == "redis":
+        return RedisCache.from_url(url)
+    raise ValueError(f"不支持的缓存后端: {url}（可选: memory://, sqlite:///path, redis://host:port/db）")
+
+
+def get_cache():
+    """返回 TRON_CACHE_URL 对应的缓存后端（按 URL 复用）"""
+    url = os.getenv("TRON_CACHE_URL", "").strip() or DEFAULT_URL
+    backend = _backends.get(url)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(url)
+            if backend is None:
+                backend = create_backend(url)
+                _backends[url] = backend
+    return backend
+
+
+def reset() -> None:
+    """丢弃已创建的后端（测试使用）"""
+    with _backends_lock:
+        backends = list(_backends.values())
+        _backends.clear()
+    for backend in backends:
+        if isinstance(backend, RedisCache):
+            backend.close()
+
+
+def cached(namespace: str, key: str, ttl: float, loader: Callable[[], Any],
+           cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+    """
+    读穿缓存：命中时返回缓存值，未命中时调用 loader 并写入缓存
+
+    Args:
+        namespace: 缓存名（同时作为指标里的 cache 标签）
+        key: 缓存键（应包含网络 / API 地址，避免主网与测试网互相污染）
+        ttl: 有效期（秒），<= 0 时不缓存
+        loader: 回源函数，返回值需可 msgpack / JSON 序列化
+        cacheable: 判断回源结果是否可以缓存（如降级结果、未确认的交易不缓存）
+    """
+    if ttl <= 0:
+        return loader()
+    backend = get_cache()
+    full_key = f"{KEY_PREFIX}{namespace}:{key}"
+    raw = None
+    try:
+        raw = backend.get(full_key)
+    except CacheError as e:
+        logger.warning(f"读取缓存 {namespace} 失败，直接回源: {e}")
+    if raw is not None:
+        try:
+            value = decode(raw)
+        except ValueError as e:
+            logger.debug(f"缓存 {namespace} 的值无法解码，按未命中处理: {e}")
+        else:
+            metrics.record_cache(namespace, True)
+            return value
+
+    metrics.record_cache(namespace, False)
+    value = loader()
+    if cacheable is None or cacheable(value):
+        try:
+            backend.set(full_key, encode(value), ttl)
+        except CacheError as e:
+            logger.warning(f"写入缓存 {namespace} 失败: {e}")
+    return value
+
+
+def invalidate(namespace: str, key: str) -> None:
+    """删除一项缓存（如广播交易后账户余额已变化）"""
+    try:
+        get_cache().delete(f"{KEY_PREFIX}{namespace}:{key}")
+    except CacheError as e:
+        logger.warning(f"删除缓存 {namespace} 失败: {e}")
@@ -1,23 +1,52 @@
 """调用路由器 - 单入口 call 函数实现"""
 
+import csv
+import importlib
 import json
 import logging
+import time
+from typing import Optional
 
 from . import skills as skills_module
+from . import token_registry
 from . import tron_client
-from . import trongrid_client
+from . import transaction
 from . import tx_builder
-from . import key_manager
 from . import validators
 from . import formatters
-from . import address_book
-from . import qrcode_generator
-from .key_manager import KeyManager
+from . import json_codec
+from . import metrics
+from . import tracing
+from . import diagnostics
+from . import watcher
 
 logger = logging.getLogger(__name__)
 
-# 全局 KeyManager 实例
-_key_manager = KeyManager()
+# 重量级子系统延迟到首次使用对应动作时才导入，缩短 stdio 模式的冷启动时间：
+# - key_manager: ecdsa + pycryptodome
+# - qrcode_generator: qrcode + PIL
+# - address_book: 本地文件 IO / SQLite
+# - trongrid_client: 仅交易构建/广播/资源查询使用
+# 处理函数内部使用 `from . import xxx` 导入；模块级 __getattr__ 保证
+# `call_router.key_manager` 这类属性访问（含测试中的 patch 路径）依然可用。
+_LAZY_MODULES = ("key_manager", "qrcode_generator", "address_book", "trongrid_client")
+
+
+def __getattr__(name: str):
+    """按需导入重量级子模块（PEP 562）"""
+    if name in _LAZY_MODULES:
+        return importlib.import_module(f".{name}", __package__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# 地址簿分页单页最大条数
+_ADDRESSBOOK_MAX_PAGE = 500
+
+# addressbook_resolve_batch 单次最多解析条数
+_RESOLVE_BATCH_MAX = 5000
+
+# get_portfolio 单次最多估值地址数
+_PORTFOLIO_MAX = 1000
 
 
 def _get_skills() -> dict:
@@ -90,6 +119,10 @@ def _build_unsigned_tx(from_addr: str, to_addr: str, amount: float, token: str =
     # 如果有发送方余额检查结果，添加到响应中
     if sender_check:
         result["sender_check"] = sender_check
+        if sender_check.get("fee_estimate"):
+            result["fee_estimate"] = sender_check["fee_estimate"]
+            summary += f" 预估燃烧 {sender_check['fee_estimate']['total_burn_trx']:.6g} TRX。"
+            result["summary"] = summary
     
     # 如果有接收方预警，添加到响应中
     if recipient_check and recipient_check.get("warnings"):
@@ -118,11 +151,25 @@ def call(action: str, params: dict = None) -> dict:
     # 路由到具体动作（字典映射）
     handler = _ACTION_HANDLERS.get(action)
     if handler is None:
+        # 未知动作统一记为一个标签值，避免任意输入撑大指标基数
+        metrics.ACTION_DURATION.observe(0.0, "_unknown", "error")
         return _error_response(
             "unknown_action",
             f"未知的动作: {action}",
         )
-    return handler(params)
+    start = time.perf_counter()
+    slow_log = diagnostics.slow_log_enabled()
+    with metrics.track_action(action) as outcome, tracing.trace_action(action, force=slow_log) as trace:
+        result = handler(params)
+        outcome["status"] = "error" if isinstance(result, dict) and "error" in result else "ok"
+        if trace is not None and outcome["status"] == "error":
+            trace.set_status(True, str(result["error"]))
+    if slow_log:
+        diagnostics.record_call(action, params, time.perf_counter() - start, outcome["status"], trace)
+    if trace is not None and tracing.debug_enabled() and isinstance(result, dict):
+        # 复制一份再附加，避免污染处理函数可能缓存的返回值
+        result = dict(result, _timing=tracing.timing(trace))
+    return result
 
 
 def _handle_skills(params: dict) -> dict:
@@ -235,6 +282,7 @@ def _handle_check_account_safety(params: dict) -> dict:
 
 def _handle_build_tx(params: dict) -> dict:
     """处理 build_tx 动作"""
+    from . import trongrid_client
     from_addr = params.get("from")
     to_addr = params.get("to")
     amount = params.get("amount")
@@ -266,13 +314,15 @@ def _handle_build_tx(params: dict) -> dict:
             # 将 memo 转换为 hex
             memo_hex = memo.encode("utf-8").hex()
             
-            token_upper = token.upper()
+            token_info = token_registry.resolve(token)
             amount_float = float(amount)
             
             # 通过 TronGrid 构建包含 memo 的真实交易
-            if token_upper == "USDT":
+            if not token_registry.is_native(token_info):
                 unsigned_tx = trongrid_client.build_trc20_transfer(
                     from_addr, to_addr, amount_float,
+                    contract_address=token_info["contract"],
+                    decimals=token_info["decimals"],
                     extra_data=memo_hex,
                 )
             else:
@@ -307,6 +357,7 @@ def _handle_build_tx(params: dict) -> dict:
 
 def _handle_broadcast_tx(params: dict) -> dict:
     """处理 broadcast_tx 动作 — 广播已签名交易"""
+    from . import trongrid_client
     signed_tx_json = params.get("signed_tx_json")
     if not signed_tx_json:
         return _error_response("missing_param", "缺少必填参数: signed_tx_json")
@@ -316,7 +367,7 @@ def _handle_broadcast_tx(params: dict) -> dict:
         signed_tx = signed_tx_json
     else:
         try:
-            signed_tx = json.loads(signed_tx_json)
+            signed_tx = json_codec.loads(signed_tx_json)
         except (json.JSONDecodeError, TypeError) as e:
             return _error_response("invalid_json", f"无法解析 JSON: {e}")
 
@@ -330,8 +381,41 @@ def _handle_broadcast_tx(params: dict) -> dict:
         return _error_response("broadcast_error", f"广播过程异常: {e}")
 
 
+def _transfer_preflight(from_addr: str, to_addr: str, amount: float, token_info: dict,
+                        force_execution: bool):
+    """
+    转账前的安全检查（tx_builder 的全部检查逻辑），返回 (预览结果, 拒绝响应)
+
+    被熔断拦截、余额不足或参数无效时拒绝响应不为 None，应直接返回给调用方。
+    """
+    try:
+        preview = tx_builder.build_unsigned_tx(
+            from_addr, to_addr, amount, token_info["contract"] or "TRX",
+            force_execution=force_execution,
+        )
+    except tx_builder.InsufficientBalanceError as e:
+        return None, {
+            "error": True,
+            "error_type": e.error_code,
+            "message": str(e),
+            "details": e.details,
+            "summary": str(e),
+        }
+    except ValueError as e:
+        return None, _error_response("validation_error", str(e))
+    # 如果被熔断拦截
+    if preview.get("blocked"):
+        return None, preview
+    return preview, None
+
+
 def _handle_transfer(params: dict) -> dict:
-    """处理 transfer 动作 — 完整转账闭环：安全检查 → 构建 → 签名 → 广播"""
+    """处理 transfer 动作 — 完整转账闭环：安全检查 → 构建 → 签名 → 广播
+
+    各阶段记为 transfer.* 追踪 span（load_key / preflight / build / sign / broadcast / format）。
+    """
+    from . import signer
+    from . import trongrid_client
     to_addr = params.get("to")
     amount = params.get("amount")
     token = params.get("token", "USDT")
@@ -347,85 +431,83 @@ def _handle_transfer(params: dict) -> dict:
     if not validators.is_positive_amount(amount):
         return _error_response("invalid_amount", f"金额必须为正数: {amount}")
 
-    try:
-        # 1. 加载私钥，派生钱包地址
-        pk = key_manager.load_private_key()
-        from_addr = key_manager.get_address_from_private_key(pk)
-    except ValueError as e:
-        return _error_response("wallet_error", str(e))
+    # 1. 从签名后端获取钱包地址
+    with tracing.span("transfer.load_key") as span:
+        try:
+            from_addr = signer.get_address()
+        except ValueError as e:
+            span.set_status(True, str(e))
+            return _error_response("wallet_error", str(e))
 
-    token_upper = token.upper()
-    if token_upper not in ("USDT", "TRX"):
-        return _error_response("invalid_token", f"不支持的代币类型: {token}")
+    try:
+        token_info = token_registry.resolve(token)
+    except token_registry.UnknownTokenError as e:
+        return _error_response("invalid_token", str(e))
+    token_upper = "TRX" if token_registry.is_native(token_info) else token_info["symbol"].upper()
 
     amount_float = float(amount)
 
     # 2. 安全检查（复用 tx_builder 的全部检查逻辑）
-    try:
-        preview = tx_builder.build_unsigned_tx(
-            from_addr, to_addr, amount_float, token_upper,
-            force_execution=force_execution,
-        )
-        # 如果被熔断拦截
-        if preview.get("blocked"):
-            return preview
-    except tx_builder.InsufficientBalanceError as e:
-        return {
-            "error": True,
-            "error_type": e.error_code,
-            "message": str(e),
-            "details": e.details,
-            "summary": str(e),
-        }
-    except ValueError as e:
-        return _error_response("validation_error", str(e))
+    with tracing.span("transfer.preflight") as span:
+        preview, rejected = _transfer_preflight(from_addr, to_addr, amount_float, token_info, force_execution)
+        if rejected is not None:
+            span.set_status(True, "blocked" if rejected.get("blocked") else rejected.get("error_type") or rejected["summary"])
+            return rejected
 
     # 3. 通过 TronGrid 构建真实交易
-    try:
-        # 将 memo 转换为 hex
-        memo_hex = memo.encode("utf-8").hex() if memo else ""
-        
-        if token_upper == "USDT":
-            unsigned_tx = trongrid_client.build_trc20_transfer(
-                from_addr, to_addr, amount_float,
-                extra_data=memo_hex if memo_hex else None,
-            )
-        else:
-            unsigned_tx = trongrid_client.build_trx_transfer(
-                from_addr, to_addr, amount_float,
-                extra_data=memo_hex if memo_hex else None,
-            )
-    except Exception as e:
-        return _error_response("build_error", f"TronGrid 构建交易失败: {e}")
+    with tracing.span("transfer.build", **{"tron.token": token_upper}) as span:
+        try:
+            # 将 memo 转换为 hex
+            memo_hex = memo.encode("utf-8").hex() if memo else ""
+
+            if not token_registry.is_native(token_info):
+                unsigned_tx = trongrid_client.build_trc20_transfer(
+                    from_addr, to_addr, amount_float,
+                    contract_address=token_info["contract"],
+                    decimals=token_info["decimals"],
+                    extra_data=memo_hex if memo_hex else None,
+                )
+            else:
+                unsigned_tx = trongrid_client.build_trx_transfer(
+                    from_addr, to_addr, amount_float,
+                    extra_data=memo_hex if memo_hex else None,
+                )
+            # 只签名 sha256(raw_data_hex) 与 txID 一致的交易
+            tx = transaction.Transaction.from_json(unsigned_tx)
+        except Exception as e:
+            span.set_status(True, str(e))
+            return _error_response("build_error", f"TronGrid 构建交易失败: {e}")
 
     # 4. 签名
-    try:
-        tx_id = unsigned_tx["txID"]
-        signature = key_manager.sign_transaction(tx_id, pk)
-        signed_tx = dict(unsigned_tx)
-        signed_tx["signature"] = [signature]
-    except Exception as e:
-        return _error_response("sign_error", f"签名失败: {e}")
+    with tracing.span("transfer.sign") as span:
+        try:
+            tx.add_signature(signer.sign(tx.txid))
+        except Exception as e:
+            span.set_status(True, str(e))
+            return _error_response("sign_error", f"签名失败: {e}")
 
     # 5. 广播
-    try:
-        broadcast_result = trongrid_client.broadcast_transaction(signed_tx)
-    except Exception as e:
-        return _error_response("broadcast_error", f"广播失败: {e}")
+    with tracing.span("transfer.broadcast") as span:
+        try:
+            broadcast_result = trongrid_client.broadcast_transaction(tx)
+        except Exception as e:
+            span.set_status(True, str(e))
+            return _error_response("broadcast_error", f"广播失败: {e}")
 
     # 6. 返回完整结果
-    return formatters.format_transfer_result(
-        broadcast_result, from_addr, to_addr, amount_float, token_upper,
-        security_check=preview.get("security_check"),
-        recipient_check=preview.get("recipient_check"),
-    )
+    with tracing.span("transfer.format"):
+        return formatters.format_transfer_result(
+            broadcast_result, from_addr, to_addr, amount_float, token_upper,
+            security_check=preview.get("security_check"),
+            recipient_check=preview.get("recipient_check"),
+        )
 
 
 def _handle_get_wallet_info(params: dict) -> dict:
     """处理 get_wallet_info 动作 — 查看钱包信息"""
+    from . import signer
     try:
-        pk = key_manager.load_private_key()
-        address = key_manager.get_address_from_private_key(pk)
+        address = signer.get_address()
     except ValueError as e:
         return _error_response("wallet_error", str(e))
 
@@ -549,6 +631,17 @@ def _handle_get_transaction_history(params: dict) -> dict:
                 address, transfers, total, token, limit
             )
         
+        elif (known := _known_trc20(token)) is not None:
+            # 代币注册表中的 TRC20 符号（如 USDC），按合约地址查询
+            data = tron_client.get_trc20_transfer_history(
+                address, limit, start, contract_address=known["contract"]
+            )
+            transfers = data.get("token_transfers", data.get("data", []))
+            total = data.get("total", 0)
+            return formatters.format_transaction_history(
+                address, transfers, total, token.upper(), limit
+            )
+        
         else:
             # 其他代币名称（TRC10 token name）
             data = tron_client.get_transfer_history(address, limit, start, token=token)
@@ -563,8 +656,18 @@ def _handle_get_transaction_history(params: dict) -> dict:
         return _error_response("rpc_error", f"查询失败: {e}")
 
 
+def _known_trc20(symbol: str) -> Optional[dict]:
+    """代币注册表中已知的 TRC20 符号（不发起查询），未知或有歧义时返回 None"""
+    try:
+        info = token_registry.resolve(symbol, fetch=False)
+    except token_registry.UnknownTokenError:
+        return None
+    return None if token_registry.is_native(info) else info
+
+
 def _handle_sign_tx(params: dict) -> dict:
     """处理 sign_tx 动作 — 对未签名交易进行本地签名"""
+    from . import signer
     unsigned_tx_json = params.get("unsigned_tx_json")
     
     # 参数校验
@@ -576,26 +679,19 @@ def _handle_sign_tx(params: dict) -> dict:
         unsigned_tx = unsigned_tx_json
     else:
         try:
-            unsigned_tx = json.loads(unsigned_tx_json)
+            unsigned_tx = json_codec.loads(unsigned_tx_json)
         except (json.JSONDecodeError, TypeError) as e:
             return _error_response("invalid_json", f"无法解析 JSON: {e}")
     
-    # 校验交易必须包含 txID 和 raw_data 字段
-    if "txID" not in unsigned_tx:
-        return _error_response("invalid_tx", "交易缺少 txID 字段")
-    
-    if "raw_data" not in unsigned_tx:
-        return _error_response("invalid_tx", "交易缺少 raw_data 字段")
+    # 校验交易字段，有 raw_data_hex 时校验 txID == sha256(raw_data_hex)
+    try:
+        tx = transaction.Transaction.from_json(unsigned_tx)
+    except transaction.InvalidTransactionError as e:
+        return _error_response("invalid_tx", str(e))
     
-    # 加载私钥并签名
+    # 用当前签名后端签名
     try:
-        pk = key_manager.load_private_key()
-        tx_id = unsigned_tx["txID"]
-        signature = key_manager.sign_transaction(tx_id, pk)
-        
-        # 构建签名后的交易
-        signed_tx = dict(unsigned_tx)
-        signed_tx["signature"] = [signature]
+        tx.signatures = [signer.sign(tx.txid)]
         
         # 使用 formatters.format_signed_tx 格式化返回
         # 需要提取发送方和接收方地址（如果有的话）
@@ -605,7 +701,7 @@ def _handle_sign_tx(params: dict) -> dict:
         token = ""
         
         # 尝试从 raw_data 中提取信息（可选）
-        raw_data = unsigned_tx.get("raw_data", {})
+        raw_data = tx.raw_data_json or {}
         contracts = raw_data.get("contract", [])
         if contracts:
             contract = contracts[0]
@@ -619,10 +715,9 @@ def _handle_sign_tx(params: dict) -> dict:
                 token = "TRX"
                 amount = amount_raw / 1_000_000
             elif contract.get("type") == "TriggerSmartContract":
-                token = "TRC20"
-                amount = amount_raw / 1_000_000  # 假设 6 位小数
+                token, amount, to_addr = _describe_trc20_call(value, to_addr)
         
-        return formatters.format_signed_tx(signed_tx, from_addr, to_addr, amount, token)
+        return formatters.format_signed_tx(tx.to_json(), from_addr, to_addr, amount, token)
         
     except ValueError as e:
         return _error_response("sign_error", str(e))
@@ -631,6 +726,27 @@ def _handle_sign_tx(params: dict) -> dict:
         return _error_response("sign_error", f"签名过程异常: {e}")
 
 
+def _describe_trc20_call(value: dict, default_to: str) -> tuple:
+    """
+    解析 TriggerSmartContract 参数，返回 (代币符号, 金额, 接收方)
+
+    transfer(address,uint256) 按代币注册表中的精度换算金额，接收方取自调用参数；
+    其他合约调用或未知代币返回 ("TRC20", 0.0, 合约地址)。
+    """
+    data = value.get("data") or ""
+    if not data.startswith("a9059cbb") or len(data) < 136:
+        return "TRC20", 0.0, default_to
+    try:
+        to_addr = tron_client._hex_to_base58("41" + data[32:72])
+        amount_raw = int(data[72:136], 16)
+    except ValueError:
+        return "TRC20", 0.0, default_to
+    info = token_registry.lookup(value.get("contract_address") or "")
+    if info is None:
+        return "TRC20", 0.0, to_addr
+    return info["symbol"], amount_raw / (10 ** info["decimals"]), to_addr
+
+
 def _handle_get_internal_transactions(params: dict) -> dict:
     """处理 get_internal_transactions 动作 — 查询内部交易"""
     address = params.get("address")
@@ -703,9 +819,11 @@ def _handle_get_account_tokens(params: dict) -> dict:
 
 def _handle_addressbook_add(params: dict) -> dict:
     """处理 addressbook_add 动作 — 添加联系人"""
+    from . import address_book
     alias = params.get("alias")
     address = params.get("address")
     note = params.get("note", "")
+    tags = params.get("tags")
 
     if not alias:
         return _error_response("missing_param", "缺少必填参数: alias（联系人别名）")
@@ -715,7 +833,7 @@ def _handle_addressbook_add(params: dict) -> dict:
         return _error_response("invalid_address", f"无效的地址格式: {address}")
 
     try:
-        result = address_book.add_contact(alias, address, note)
+        result = address_book.add_contact(alias, address, note, tags)
         return formatters.format_addressbook_add(result)
     except Exception as e:
         return _error_response("addressbook_error", f"添加联系人失败: {e}")
@@ -723,6 +841,7 @@ def _handle_addressbook_add(params: dict) -> dict:
 
 def _handle_addressbook_remove(params: dict) -> dict:
     """处理 addressbook_remove 动作 — 删除联系人"""
+    from . import address_book
     alias = params.get("alias")
     if not alias:
         return _error_response("missing_param", "缺少必填参数: alias（联系人别名）")
@@ -736,6 +855,7 @@ def _handle_addressbook_remove(params: dict) -> dict:
 
 def _handle_addressbook_lookup(params: dict) -> dict:
     """处理 addressbook_lookup 动作 — 查找联系人"""
+    from . import address_book
     alias = params.get("alias")
     if not alias:
         return _error_response("missing_param", "缺少必填参数: alias（联系人别名）")
@@ -747,17 +867,196 @@ def _handle_addressbook_lookup(params: dict) -> dict:
         return _error_response("addressbook_error", f"查找联系人失败: {e}")
 
 
+def _parse_page(params: dict, default_limit: Optional[int]):
+    """
+    解析地址簿分页参数 limit / offset
+
+    Returns:
+        (limit, offset, None) 或 (None, None, 错误响应)
+    """
+    limit = params.get("limit", default_limit)
+    offset = params.get("offset", 0)
+    try:
+        if limit is not None:
+            limit = int(limit)
+            if limit < 1 or limit > _ADDRESSBOOK_MAX_PAGE:
+                return None, None, _error_response(
+                    "invalid_param", f"limit 必须在 1-{_ADDRESSBOOK_MAX_PAGE} 范围内，当前值: {limit}"
+                )
+    except (ValueError, TypeError):
+        return None, None, _error_response("invalid_param", "limit 必须为整数")
+    try:
+        offset = int(offset)
+        if offset < 0:
+            offset = 0
+    except (ValueError, TypeError):
+        return None, None, _error_response("invalid_param", "offset 必须为非负整数")
+    return limit, offset, None
+
+
 def _handle_addressbook_list(params: dict) -> dict:
-    """处理 addressbook_list 动作 — 列出所有联系人"""
+    """处理 addressbook_list 动作 — 列出联系人（可分页、按标签过滤）"""
+    from . import address_book
+    limit, offset, error = _parse_page(params, None)
+    if error:
+        return error
+
     try:
-        result = address_book.list_contacts()
+        result = address_book.list_contacts(limit=limit, offset=offset, tag=params.get("tag"))
         return formatters.format_addressbook_list(result)
     except Exception as e:
         return _error_response("addressbook_error", f"获取地址簿失败: {e}")
 
 
+def _handle_addressbook_search(params: dict) -> dict:
+    """处理 addressbook_search 动作 — 按关键词 / 标签搜索联系人"""
+    from . import address_book
+    query = params.get("query", "") or ""
+    tag = params.get("tag")
+    if not query and not tag:
+        return _error_response("missing_param", "缺少搜索条件: query（关键词）或 tag（标签）至少提供一个")
+    limit, offset, error = _parse_page(params, 50)
+    if error:
+        return error
+
+    try:
+        result = address_book.search_contacts(query, tag=tag, limit=limit, offset=offset)
+        return formatters.format_addressbook_search(result)
+    except Exception as e:
+        return _error_response("addressbook_error", f"搜索地址簿失败: {e}")
+
+
+def _handle_addressbook_import(params: dict) -> dict:
+    """处理 addressbook_import 动作 — 批量导入联系人（整批校验、单次写入）"""
+    from . import address_book
+    path = params.get("path")
+    content = params.get("content")
+    contacts = params.get("contacts")
+    fmt = params.get("format")
+    overwrite = params.get("overwrite", True)
+    dry_run = params.get("dry_run", False)
+
+    sources = [name for name, value in (("path", path), ("content", content), ("contacts", contacts)) if value]
+    if not sources:
+        return _error_response(
+            "missing_param", "缺少导入数据: path（文件路径）、content（CSV/JSON 文本）或 contacts（联系人数组）"
+        )
+    if len(sources) > 1:
+        return _error_response("invalid_param", f"path / content / contacts 只能提供一个，当前提供了: {', '.join(sources)}")
+
+    try:
+        if path:
+            result = address_book.import_contacts(path, fmt, overwrite=overwrite, dry_run=dry_run)
+        else:
+            result = address_book.import_contacts_data(
+                content if content else contacts, fmt, overwrite=overwrite, dry_run=dry_run
+            )
+        return formatters.format_addressbook_import(result)
+    except FileNotFoundError:
+        return _error_response("invalid_param", f"导入文件不存在: {path}")
+    except (ValueError, csv.Error) as e:
+        return _error_response("invalid_param", f"导入数据格式错误: {e}")
+    except Exception as e:
+        return _error_response("addressbook_error", f"导入地址簿失败: {e}")
+
+
+def _handle_addressbook_resolve_batch(params: dict) -> dict:
+    """处理 addressbook_resolve_batch 动作 — 批量将别名解析为地址"""
+    from . import address_book
+    aliases = params.get("aliases")
+    if not aliases:
+        return _error_response("missing_param", "缺少必填参数: aliases（别名或地址列表）")
+    if isinstance(aliases, str):
+        # 兼容逗号 / 换行分隔的字符串
+        aliases = [item.strip() for item in aliases.replace("\n", ",").split(",") if item.strip()]
+    if not isinstance(aliases, list):
+        return _error_response("invalid_param", "aliases 必须为数组")
+    if len(aliases) > _RESOLVE_BATCH_MAX:
+        return _error_response(
+            "invalid_param", f"单次最多解析 {_RESOLVE_BATCH_MAX} 个，当前 {len(aliases)} 个"
+        )
+
+    try:
+        result = address_book.resolve_batch(aliases)
+        return formatters.format_addressbook_resolve_batch(result)
+    except Exception as e:
+        return _error_response("addressbook_error", f"批量解析失败: {e}")
+
+
+def _handle_get_server_metrics(params: dict) -> dict:
+    """处理 get_server_metrics 动作 — 返回运行指标（stdio 模式下的指标出口）"""
+    result = metrics.summarize()
+    if str(params.get("format", "")).lower() == "prometheus":
+        result["prometheus"] = metrics.render_prometheus()
+    return formatters.format_server_metrics(result)
+
+
+def _handle_get_slow_calls(params: dict) -> dict:
+    """处理 get_slow_calls 动作 — 查看最近的慢调用；传入 threshold_ms 时调整阈值（需开启管理动作）"""
+    threshold = params.get("threshold_ms")
+    if threshold is not None:
+        if not diagnostics.admin_enabled():
+            return _error_response("admin_disabled", "调整慢调用阈值需设置 TRON_ADMIN_ACTIONS=true")
+        try:
+            diagnostics.set_slow_call_threshold(float(threshold))
+        except (ValueError, TypeError):
+            return _error_response("invalid_param", f"threshold_ms 必须为非负数，当前值: {threshold}")
+
+    limit = params.get("limit", 20)
+    try:
+        limit = int(limit)
+        if limit < 1:
+            raise ValueError
+    except (ValueError, TypeError):
+        return _error_response("invalid_param", f"limit 必须为正整数，当前值: {limit}")
+
+    result = {
+        "threshold_ms": diagnostics.slow_call_threshold_ms(),
+        "enabled": diagnostics.slow_log_enabled(),
+        "calls": diagnostics.recent_slow_calls(limit),
+    }
+    return formatters.format_slow_calls(result)
+
+
+_PROFILER_COMMANDS = ("start", "stop", "status", "dump")
+
+
+def _handle_admin_profiler(params: dict) -> dict:
+    """处理 admin_profiler 动作 — 运行时开启 / 停止采样 profiler（需开启管理动作）"""
+    if not diagnostics.admin_enabled():
+        return _error_response("admin_disabled", "管理动作未开启，请设置 TRON_ADMIN_ACTIONS=true")
+    command = str(params.get("command", "status")).lower()
+    if command not in _PROFILER_COMMANDS:
+        return _error_response("invalid_param", f"command 必须为 {' / '.join(_PROFILER_COMMANDS)}，当前值: {command}")
+
+    try:
+        if command == "start":
+            interval_ms = float(params.get("interval_ms", 10))
+            duration_s = float(params.get("duration_s", 60))
+            dump_interval_s = float(params.get("dump_interval_s", 0))
+            if not 1 <= interval_ms <= 1000:
+                return _error_response("invalid_param", f"interval_ms 必须在 1-1000 范围内，当前值: {interval_ms}")
+            if not 0 < duration_s <= 3600:
+                return _error_response("invalid_param", f"duration_s 必须在 0-3600 范围内，当前值: {duration_s}")
+            if dump_interval_s < 0:
+                return _error_response("invalid_param", f"dump_interval_s 不能为负数，当前值: {dump_interval_s}")
+            result = diagnostics.start_profiler(interval_ms, duration_s, dump_interval_s)
+        elif command == "stop":
+            result = diagnostics.stop_profiler()
+        elif command == "dump":
+            result = diagnostics.dump_profile()
+        else:
+            result = diagnostics.profiler_status()
+    except (ValueError, TypeError) as e:
+        return _error_response("invalid_param", f"参数格式错误: {e}")
+    except RuntimeError as e:
+        return _error_response("invalid_state", str(e))
+    return formatters.format_profiler_status(dict(result, command=command))
+
+
 def _handle_generate_qrcode(params: dict) -> dict:
     """处理 generate_qrcode 动作 — 生成钱包地址二维码"""
+    from . import qrcode_generator
     address = params.get("address")
     if not address:
         return _error_response("missing_param", "缺少必填参数: address（TRON 地址）")
@@ -776,6 +1075,8 @@ def _handle_generate_qrcode(params: dict) -> dict:
         return formatters.format_qrcode_result(result)
     except Exception as e:
         return _error_response("qrcode_error", f"生成二维码失败: {e}")
+
+
 def _handle_get_account_energy(params: dict) -> dict:
     """处理 get_account_energy 动作 — 查询账户能量"""
     address = params.get("address")
@@ -806,6 +1107,283 @@ def _handle_get_account_bandwidth(params: dict) -> dict:
         return _error_response("rpc_error", str(e))
 
 
+def _handle_estimate_fee(params: dict) -> dict:
+    """处理 estimate_fee 动作 — 预估转账的能量 / 带宽 / TRX 燃烧"""
+    from_addr = params.get("from")
+    to_addr = params.get("to")
+    amount = params.get("amount")
+    token = params.get("token", "USDT")
+
+    if not to_addr:
+        return _error_response("missing_param", "缺少必填参数: to")
+    if amount is None:
+        return _error_response("missing_param", "缺少必填参数: amount")
+    if not from_addr:
+        # 未指定发送方时使用本地钱包地址
+        from . import signer
+        try:
+            from_addr = signer.get_address()
+        except ValueError:
+            return _error_response("missing_param", "缺少必填参数: from（未配置本地钱包时必须指定发送方）")
+    if not validators.is_valid_address(from_addr):
+        return _error_response("invalid_address", f"无效的发送方地址: {from_addr}")
+    if not validators.is_valid_address(to_addr):
+        return _error_response("invalid_address", f"无效的接收方地址: {to_addr}")
+    if not validators.is_positive_amount(amount):
+        return _error_response("invalid_amount", f"金额必须为正数: {amount}")
+    try:
+        token_registry.resolve(token)
+    except token_registry.UnknownTokenError as e:
+        return _error_response("invalid_token", str(e))
+
+    from . import fee_estimator
+    result = fee_estimator.estimate_fee(from_addr, to_addr, float(amount), token)
+    return formatters.format_fee_estimate(result)
+
+
+def _handle_get_portfolio(params: dict) -> dict:
+    """处理 get_portfolio 动作 — 多地址持仓汇总与估值"""
+    addresses = params.get("addresses")
+    if not addresses:
+        return _error_response("missing_param", "缺少必填参数: addresses（地址列表）")
+    if isinstance(addresses, str):
+        # 兼容逗号 / 换行分隔的字符串
+        addresses = [item.strip() for item in addresses.replace("\n", ",").split(",") if item.strip()]
+    if not isinstance(addresses, list):
+        return _error_response("invalid_param", "addresses 必须为数组")
+    if len(addresses) > _PORTFOLIO_MAX:
+        return _error_response(
+            "invalid_param", f"单次最多估值 {_PORTFOLIO_MAX} 个地址，当前 {len(addresses)} 个"
+        )
+    invalid = [a for a in addresses if not validators.is_valid_address(a)]
+    if invalid:
+        return _error_response("invalid_address", f"无效的地址格式: {', '.join(map(str, invalid[:5]))}")
+
+    from . import portfolio
+    try:
+        return formatters.format_portfolio(portfolio.get_portfolio(addresses))
+    except Exception as e:
+        logger.error(f"资产估值失败: {e}", exc_info=True)
+        return _error_response("rpc_error", f"资产估值失败: {e}")
+
+
+def _handle_get_account_resources(params: dict) -> dict:
+    """处理 get_account_resources 动作 — 一次查询账户能量与带宽"""
+    address = params.get("address")
+    if not address:
+        return _error_response("missing_param", "缺少必填参数: address")
+    if not validators.is_valid_address(address):
+        return _error_response("invalid_address", f"无效的地址格式: {address}")
+    
+    try:
+        result = tron_client.get_account_resources(address)
+        return formatters.format_account_resources(result)
+    except Exception as e:
+        return _error_response("rpc_error", str(e))
+
+
+def _watch_address_param(params: dict):
+    """读取并校验 address 参数，返回 (Base58 地址, 错误响应)"""
+    address = params.get("address")
+    if not address:
+        return None, _error_response("missing_param", "缺少必填参数: address")
+    if not validators.is_valid_address(address):
+        return None, _error_response("invalid_address", f"无效的地址格式: {address}")
+    return tron_client._normalize_address(address), None
+
+
+def _handle_watch_address(params: dict) -> dict:
+    """处理 watch_address 动作 — 监听地址的转入转账（区块跟随器推送）"""
+    address, error = _watch_address_param(params)
+    if error:
+        return error
+    token = str(params.get("token") or "ALL")
+    try:
+        result = watcher.watch(address, token)
+    except watcher.WatchLimitError as e:
+        return _error_response("limit_exceeded", str(e))
+    except ValueError as e:
+        return _error_response("invalid_param", str(e))
+    return formatters.format_watch(dict(result, watching=True))
+
+
+def _handle_unwatch_address(params: dict) -> dict:
+    """处理 unwatch_address 动作 — 取消一次地址监听"""
+    address, error = _watch_address_param(params)
+    if error:
+        return error
+    result = watcher.unwatch(address)
+    if result is None:
+        return _error_response("not_found", f"地址 {address} 未在监听中")
+    return formatters.format_watch(dict(result, watching=result["subscribers"] > 0))
+
+
+def _handle_get_watch_events(params: dict) -> dict:
+    """处理 get_watch_events 动作 — 增量获取监听地址的转入事件"""
+    address, error = _watch_address_param(params)
+    if error:
+        return error
+    try:
+        since = int(params.get("since") or 0)
+        limit = int(params["limit"] if params.get("limit") is not None else 20)
+        if since < 0 or not 1 <= limit <= 100:
+            raise ValueError
+    except (ValueError, TypeError):
+        return _error_response("invalid_param", "since 必须为非负整数，limit 必须在 1-100 之间")
+    result = watcher.events(address, since, limit)
+    if result is None:
+        return _error_response("not_found", f"地址 {address} 未在监听中，请先调用 watch_address")
+    return formatters.format_watch_events(result)
+
+
+def _handle_queue_transfer(params: dict) -> dict:
+    """处理 queue_transfer 动作 — 安全检查、构建并签名转账，登记到预签名队列定时广播"""
+    from . import signer
+    from . import tx_queue
+    reason = tx_queue.unavailable_reason()
+    if reason:
+        return _error_response("queue_unavailable", reason)
+    to_addr = params.get("to")
+    amount = params.get("amount")
+    memo = params.get("memo", "") or ""
+    entry_id = params.get("id") or None
+
+    if not to_addr:
+        return _error_response("missing_param", "缺少必填参数: to")
+    if amount is None:
+        return _error_response("missing_param", "缺少必填参数: amount")
+    if not validators.is_valid_address(to_addr):
+        return _error_response("invalid_address", f"无效的接收方地址: {to_addr}")
+    if not validators.is_positive_amount(amount):
+        return _error_response("invalid_amount", f"金额必须为正数: {amount}")
+    if entry_id is not None and (not isinstance(entry_id, str) or not 1 <= len(entry_id) <= 64):
+        return _error_response("invalid_param", "id 必须为 1-64 个字符的字符串")
+    try:
+        broadcast_at = params.get("broadcast_at")
+        delay = params.get("delay_seconds")
+        if broadcast_at is not None and delay is not None:
+            raise ValueError
+        if delay is not None:
+            if float(delay) < 0:
+                raise ValueError
+            broadcast_at = time.time() + float(delay)
+        elif broadcast_at is not None:
+            broadcast_at = float(broadcast_at)
+    except (ValueError, TypeError):
+        return _error_response("invalid_param", "broadcast_at 为 Unix 时间戳（秒），delay_seconds 为非负秒数，二者只能指定一个")
+
+    try:
+        from_addr = signer.get_address()
+    except ValueError as e:
+        return _error_response("wallet_error", str(e))
+    try:
+        token_info = token_registry.resolve(params.get("token", "USDT"))
+    except token_registry.UnknownTokenError as e:
+        return _error_response("invalid_token", str(e))
+
+    amount_float = float(amount)
+    preview, rejected = _transfer_preflight(
+        from_addr, to_addr, amount_float, token_info, params.get("force_execution", False),
+    )
+    if rejected is not None:
+        return rejected
+
+    try:
+        entry = tx_queue.enqueue(from_addr, to_addr, amount_float, token_info, memo, broadcast_at, entry_id)
+    except tx_queue.QueueError as e:
+        return _error_response("duplicate", str(e))
+    except Exception as e:
+        return _error_response("build_error", f"构建或签名失败: {e}")
+    return formatters.format_queued_tx(entry, security_check=preview.get("security_check"))
+
+
+def _handle_get_tx_queue(params: dict) -> dict:
+    """处理 get_tx_queue 动作 — 查看预签名队列状态"""
+    from . import tx_queue
+    reason = tx_queue.unavailable_reason()
+    if reason:
+        return _error_response("queue_unavailable", reason)
+    status = params.get("status") or None
+    if status is not None and status not in tx_queue.STATUSES:
+        return _error_response("invalid_param", f"status 必须为 {' / '.join(tx_queue.STATUSES)} 之一")
+    try:
+        limit = int(params["limit"] if params.get("limit") is not None else 50)
+        if not 1 <= limit <= 200:
+            raise ValueError
+    except (ValueError, TypeError):
+        return _error_response("invalid_param", "limit 必须在 1-200 之间")
+    return formatters.format_tx_queue(tx_queue.queue_status(status, limit))
+
+
+def _handle_cancel_queued_tx(params: dict) -> dict:
+    """处理 cancel_queued_tx 动作 — 取消待广播的预签名交易"""
+    from . import tx_queue
+    reason = tx_queue.unavailable_reason()
+    if reason:
+        return _error_response("queue_unavailable", reason)
+    entry_id = params.get("id")
+    if not entry_id:
+        return _error_response("missing_param", "缺少必填参数: id")
+    try:
+        entry = tx_queue.cancel(str(entry_id))
+    except tx_queue.QueueError as e:
+        return _error_response("invalid_state", str(e))
+    if entry is None:
+        return _error_response("not_found", f"队列中没有 id 为 {entry_id} 的交易")
+    return formatters.format_queued_tx(entry)
+
+
+def _parse_fields(fields) -> Optional[list]:
+    """字段投影参数：列表或逗号分隔字符串，空值表示全部字段"""
+    if fields is None or fields == "" or fields == []:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    if not isinstance(fields, (list, tuple)) or not all(isinstance(f, str) for f in fields):
+        raise ValueError("fields 必须为字段名列表或逗号分隔的字符串")
+    fields = list(dict.fromkeys(f.strip() for f in fields if f.strip()))
+    return fields or None
+
+
+def _with_output_format(handler, list_key: str):
+    """
+    为列表类动作增加输出格式参数：
+
+    - format: full（默认，字典列表 + 摘要）/ compact（列表转为 columns + rows 列式结构）
+    - fields: 只返回这些字段（两种格式均可用），未知字段返回 invalid_param
+    - include_summary: compact 格式下是否保留摘要（默认不保留）
+    """
+    def wrapped(params: dict) -> dict:
+        output = str(params.get("format") or "full").strip().lower()
+        if output not in ("full", "compact"):
+            return _error_response("invalid_param", f"format 必须为 full 或 compact，当前值: {params.get('format')}")
+        try:
+            fields = _parse_fields(params.get("fields"))
+        except ValueError as e:
+            return _error_response("invalid_param", str(e))
+
+        result = handler(params)
+        if not isinstance(result, dict) or "error" in result:
+            return result
+        items = result.get(list_key) or []
+        if fields is not None and items:
+            available = list(dict.fromkeys(key for item in items for key in item))
+            unknown = [f for f in fields if f not in available]
+            if unknown:
+                return _error_response(
+                    "invalid_param", f"未知字段: {', '.join(unknown)}（可用字段: {', '.join(available)}）"
+                )
+        if output == "compact":
+            return formatters.compact_result(result, list_key, fields, bool(params.get("include_summary")))
+        if fields is not None:
+            return dict(result, **{list_key: [{f: item.get(f) for f in fields} for item in items]})
+        return result
+
+    wrapped.__name__ = handler.__name__
+    wrapped.__doc__ = handler.__doc__
+    return wrapped
+
+
 # 动作路由表 — 字典映射提升可维护性
 _ACTION_HANDLERS = {
     "skills": _handle_skills,
@@ -821,16 +1399,31 @@ _ACTION_HANDLERS = {
     "broadcast_tx": _handle_broadcast_tx,
     "transfer": _handle_transfer,
     "get_wallet_info": _handle_get_wallet_info,
-    "get_transaction_history": _handle_get_transaction_history,
-    "get_internal_transactions": _handle_get_internal_transactions,
-    "get_account_tokens": _handle_get_account_tokens,
+    "get_transaction_history": _with_output_format(_handle_get_transaction_history, "transfers"),
+    "get_internal_transactions": _with_output_format(_handle_get_internal_transactions, "internal_transactions"),
+    "get_account_tokens": _with_output_format(_handle_get_account_tokens, "tokens"),
     "addressbook_add": _handle_addressbook_add,
     "addressbook_remove": _handle_addressbook_remove,
     "addressbook_lookup": _handle_addressbook_lookup,
-    "addressbook_list": _handle_addressbook_list,
+    "addressbook_list": _with_output_format(_handle_addressbook_list, "contacts"),
+    "addressbook_search": _handle_addressbook_search,
+    "addressbook_import": _handle_addressbook_import,
+    "addressbook_resolve_batch": _handle_addressbook_resolve_batch,
     "generate_qrcode": _handle_generate_qrcode,
     "get_account_energy": _handle_get_account_energy,
     "get_account_bandwidth": _handle_get_account_bandwidth,
+    "get_account_resources": _handle_get_account_resources,
+    "estimate_fee": _handle_estimate_fee,
+    "get_portfolio": _handle_get_portfolio,
+    "get_server_metrics": _handle_get_server_metrics,
+    "get_slow_calls": _handle_get_slow_calls,
+    "admin_profiler": _handle_admin_profiler,
+    "watch_address": _handle_watch_address,
+    "unwatch_address": _handle_unwatch_address,
+    "get_watch_events": _handle_get_watch_events,
+    "queue_transfer": _handle_queue_transfer,
+    "get_tx_queue": _handle_get_tx_queue,
+    "cancel_queued_tx": _handle_cancel_queued_tx,
 }
 
 
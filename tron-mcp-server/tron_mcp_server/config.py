@@ -55,6 +55,15 @@ def get_trongrid_url() -> str:
     return url.rstrip("/")
 
 
+def get_tronscan_security_api_url() -> str:
+    """获取 TRONSCAN 安全检查接口（accountv2 / security）所在的 API URL
+
+    这两个接口只在 apilist.tronscanapi.com 上提供，默认不随网络切换。
+    """
+    url = os.getenv("TRONSCAN_SECURITY_API_URL", "") or "https://apilist.tronscanapi.com/api"
+    return url.rstrip("/")
+
+
 def get_api_key() -> str:
     """获取 TRONSCAN API KEY"""
     return os.getenv("TRONSCAN_API_KEY", "")
@@ -70,6 +79,16 @@ def get_timeout() -> float:
     return float(os.getenv("REQUEST_TIMEOUT", "10.0"))
 
 
+def get_cache_ttl(name: str, default: float = 0) -> float:
+    """
+    读取某类数据的缓存有效期（秒），对应环境变量 TRON_CACHE_TTL_<NAME>，0 表示不缓存
+
+    name: chain_params / account / account_resource / risk / tx_status / ref_block / energy_simulation / token_price
+    default: 未设置环境变量时的有效期（除能量模拟与代币价格外默认不缓存）
+    """
+    return float(os.getenv(f"TRON_CACHE_TTL_{name.upper()}", "") or default)
+
+
 # ============ 合约地址 ============
 
 
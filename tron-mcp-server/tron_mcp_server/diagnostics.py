@@ -0,0 +1,305 @@
+"""诊断模块 - 慢调用日志与采样 profiler
+
+慢调用日志：
+- call_router.call 耗时超过 TRON_SLOW_CALL_MS（毫秒，0 / 未设置表示关闭）时，
+  以 WARNING 级别记录动作名、脱敏后的参数、阶段耗时与上游请求列表（来自 tracing）
+- 最近的慢调用保留在内存中（TRON_SLOW_CALL_HISTORY 条），可通过 get_slow_calls 动作查看
+- 开启后每次调用都会收集 trace（与 TRON_MCP_DEBUG 相同的开销，微秒级）
+
+采样 profiler：
+- 后台线程按固定间隔采样所有线程的调用栈（sys._current_frames），按函数聚合计数
+- 定期 / 停止时把聚合结果以 folded stacks 格式（flamegraph.pl / speedscope 可直接读取）
+  写入 TRON_PROFILE_DIR
+- 通过 admin_profiler 动作在运行中的进程里开启 / 停止，无需重启；
+  管理动作需设置 TRON_ADMIN_ACTIONS=true 才可用
+
+仅依赖标准库。
+"""
+
+import collections
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from . import tracing
+
+logger = logging.getLogger(__name__)
+
+
+def admin_enabled() -> bool:
+    """是否允许管理动作（profiler 开关、调整慢调用阈值）"""
+    return os.getenv("TRON_ADMIN_ACTIONS", "").strip().lower() in ("1", "true", "yes", "on")
+
+
+# ============ 慢调用日志 ============
+
+_slow_call_ms = float(os.getenv("TRON_SLOW_CALL_MS", "0") or 0)
+_slow_calls = collections.deque(maxlen=int(os.getenv("TRON_SLOW_CALL_HISTORY", "50") or 50))
+_slow_lock = threading.Lock()
+
+# 参数名包含以下片段时整体脱敏
+_SENSITIVE_KEYS = ("private_key", "secret", "password", "api_key", "mnemonic", "signature")
+_MAX_STRING = 120
+_MAX_ITEMS = 5
+_MAX_DEPTH = 3
+
+
+def slow_log_enabled() -> bool:
+    return _slow_call_ms > 0
+
+
+def slow_call_threshold_ms() -> float:
+    return _slow_call_ms
+
+
+def set_slow_call_threshold(threshold_ms: float) -> None:
+    """运行时调整慢调用阈值（毫秒，0 表示关闭）"""
+    global _slow_call_ms
+    if threshold_ms < 0:
+        raise ValueError("阈值不能为负数")
+    _slow_call_ms = float(threshold_ms)
+
+
+def sanitize_params(value, key: str = "", depth: int = 0):
+    """参数脱敏：敏感字段打码，长字符串截断，长列表只保留前几项"""
+    if key and any(part in key.lower() for part in _SENSITIVE_KEYS):
+        return "***"
+    if isinstance(value, str):
+        if len(value) > _MAX_STRING:
+            return f"{value[:_MAX_STRING // 2]}…({len(value)} chars)"
+        return value
+    if isinstance(value, dict):
+        if depth >= _MAX_DEPTH:
+            return f"{{…{len(value)} keys}}"
+        return {str(k): sanitize_params(v, str(k), depth + 1) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        if depth >= _MAX_DEPTH:
+            return f"[…{len(value)} items]"
+        items = [sanitize_params(v, "", depth + 1) for v in value[:_MAX_ITEMS]]
+        if len(value) > _MAX_ITEMS:
+            items.append(f"…(+{len(value) - _MAX_ITEMS})")
+        return items
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    return sanitize_params(repr(value), key, depth)
+
+
+def record_call(action: str, params: dict, duration: float, status: str,
+                trace: Optional[tracing.Span] = None) -> Optional[dict]:
+    """动作结束后调用；超过阈值时记录并返回慢调用条目"""
+    if _slow_call_ms <= 0:
+        return None
+    duration_ms = duration * 1000
+    if duration_ms < _slow_call_ms:
+        return None
+
+    entry = {
+        "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "action": action,
+        "duration_ms": round(duration_ms, 3),
+        "status": status,
+        "params": sanitize_params(params),
+    }
+    if trace is not None:
+        timing = tracing.timing(trace)
+        entry.update({
+            "trace_id": timing["trace_id"],
+            "stages": timing["stages"],
+            "upstream": timing["upstream"],
+            "cache": timing["cache"],
+        })
+    with _slow_lock:
+        _slow_calls.append(entry)
+    logger.warning(
+        f"慢调用 {action} 耗时 {duration_ms:.0f}ms（阈值 {_slow_call_ms:.0f}ms）: "
+        f"{json.dumps(entry, ensure_ascii=False)}"
+    )
+    return entry
+
+
+def recent_slow_calls(limit: Optional[int] = None) -> List[dict]:
+    """最近的慢调用，最新的在前"""
+    with _slow_lock:
+        entries = list(_slow_calls)
+    entries.reverse()
+    return entries[:limit] if limit is not None else entries
+
+
+def clear_slow_calls() -> None:
+    with _slow_lock:
+        _slow_calls.clear()
+
+
+# ============ 采样 profiler ============
+
+
+def _profile_dir() -> Path:
+    configured = os.getenv("TRON_PROFILE_DIR", "").strip()
+    return Path(configured) if configured else Path(tempfile.gettempdir()) / "tron-mcp-profiles"
+
+
+class SamplingProfiler:
+    """
+    采样 profiler
+
+    Args:
+        interval: 采样间隔（秒）
+        max_duration: 运行上限（秒），到时自动停止，避免忘记关闭
+        dump_interval: 定期写出聚合结果的间隔（秒），0 表示只在停止时写出
+    """
+
+    def __init__(self, interval: float = 0.01, max_duration: float = 60.0, dump_interval: float = 0.0):
+        self.interval = interval
+        self.max_duration = max_duration
+        self.dump_interval = dump_interval
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self.last_dump: Optional[str] = None
+        self._stacks: collections.Counter = collections.Counter()
+        self._labels: Dict[object, str] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="tron-sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{Path(code.co_filename).stem}:{code.co_name}"
+            self._labels[code] = label
+        return label
+
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        stacks = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            stacks.append(";".join(stack))
+        with self._lock:
+            self._stacks.update(stacks)
+            self.samples += 1
+
+    def _run(self) -> None:
+        deadline = self.started_at + self.max_duration
+        next_dump = time.time() + self.dump_interval if self.dump_interval else None
+        try:
+            while not self._stop.wait(self.interval):
+                self._sample()
+                now = time.time()
+                if next_dump is not None and now >= next_dump:
+                    self.dump()
+                    next_dump = now + self.dump_interval
+                if now >= deadline:
+                    logger.info("采样 profiler 已达运行上限，自动停止")
+                    break
+        finally:
+            self.stopped_at = time.time()
+            self.dump()
+
+    def top(self, limit: int = 10) -> List[dict]:
+        """出现次数最多的调用栈（只保留最内层 6 帧）"""
+        with self._lock:
+            total = sum(self._stacks.values())
+            common = self._stacks.most_common(limit)
+        return [
+            {"stack": ";".join(stack.split(";")[-6:]), "count": count, "ratio": round(count / total, 4)}
+            for stack, count in common
+        ]
+
+    def dump(self, path: Optional[Path] = None) -> Optional[str]:
+        """以 folded stacks 格式写出聚合结果，返回文件路径"""
+        with self._lock:
+            lines = [f"{stack} {count}" for stack, count in self._stacks.most_common()]
+        if not lines:
+            return None
+        if path is None:
+            directory = _profile_dir()
+            directory.mkdir(parents=True, exist_ok=True)
+            stamp = datetime.fromtimestamp(self.started_at or time.time()).strftime("%Y%m%d-%H%M%S")
+            path = directory / f"profile-{os.getpid()}-{stamp}.folded"
+        tmp = Path(f"{path}.tmp")
+        tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        os.replace(tmp, path)
+        self.last_dump = str(path)
+        return self.last_dump
+
+    def status(self) -> dict:
+        end = time.time() if self.running else (self.stopped_at or time.time())
+        return {
+            "running": self.running,
+            "interval_ms": round(self.interval * 1000, 3),
+            "max_duration_s": self.max_duration,
+            "dump_interval_s": self.dump_interval,
+            "elapsed_s": round(end - self.started_at, 3) if self.started_at else 0.0,
+            "samples": self.samples,
+            "distinct_stacks": len(self._stacks),
+            "last_dump": self.last_dump,
+            "top": self.top(),
+        }
+
+
+_profiler: Optional[SamplingProfiler] = None
+_profiler_lock = threading.Lock()
+
+
+def start_profiler(interval_ms: float = 10.0, duration_s: float = 60.0, dump_interval_s: float = 0.0) -> dict:
+    """开启采样 profiler；已在运行时抛出 RuntimeError"""
+    global _profiler
+    with _profiler_lock:
+        if _profiler is not None and _profiler.running:
+            raise RuntimeError("采样 profiler 已在运行")
+        _profiler = SamplingProfiler(interval_ms / 1000, duration_s, dump_interval_s)
+        _profiler.start()
+        return _profiler.status()
+
+
+def stop_profiler() -> dict:
+    """停止采样 profiler 并写出结果；未开启时抛出 RuntimeError"""
+    with _profiler_lock:
+        if _profiler is None:
+            raise RuntimeError("采样 profiler 未开启")
+        _profiler.stop()
+        return _profiler.status()
+
+
+def profiler_status() -> dict:
+    with _profiler_lock:
+        if _profiler is None:
+            return {"running": False, "samples": 0, "top": []}
+        return _profiler.status()
+
+
+def dump_profile() -> dict:
+    """立即写出当前聚合结果（不停止采样）"""
+    with _profiler_lock:
+        if _profiler is None:
+            raise RuntimeError("采样 profiler 未开启")
+        _profiler.dump()
+        return _profiler.status()
@@ -0,0 +1,180 @@
+"""手续费预估 — 能量 / 带宽 / TRX 燃烧明细
+
+TRON 转账的实际费用取决于：
+- 发送方资源：质押能量抵扣能量费；质押或免费带宽足够时不燃烧 TRX（资源快照，见 tron_client.get_account_resources）
+- 链参数单价：能量 / 带宽价格与账户创建费（链参数缓存，见 tron_client.get_chain_prices）
+- 接收方状态：TRC20 接收方未持有该代币时 transfer 需写入新的存储槽，能量约翻倍；
+  TRX 转账到未激活账户需支付创建费（账户缓存，见 tron_client.get_recipient_state）
+- 代币：USDT 以外的 TRC20 按 token_registry 解析合约与精度
+- TRC20 能量：triggerconstantcontract 模拟结果按 (合约, 方法, 接收方是否持有) 缓存，
+  同类转账重复预估不再模拟（见 trongrid_client.estimate_trc20_transfer_energy）
+
+各项数据查询失败时分别回退到下方的静态估算常量，因此预估本身不会失败。
+"""
+
+import logging
+import os
+from typing import Optional
+
+from . import config
+from . import token_registry
+from . import tron_client
+from . import validators
+
+logger = logging.getLogger(__name__)
+
+
+SUN_PER_TRX = 1_000_000
+
+# 以下常量用于无法查询链上数据时的静态估算
+# TRC20 转账预估能量消耗：激活账户约 29,000 Energy，未激活账户约 65,000 Energy
+# 保守估计使用较高值
+ESTIMATED_USDT_ENERGY = int(os.getenv("ESTIMATED_USDT_ENERGY", "65000"))
+# 每单位 Energy 的 SUN 价格（默认 420 SUN）
+ENERGY_PRICE_SUN = int(os.getenv("ENERGY_PRICE_SUN", "420"))
+# TRX 转账最小 Gas 费用（SUN 单位，约 0.1 TRX = 100,000 SUN）
+MIN_TRX_TRANSFER_FEE = int(os.getenv("MIN_TRX_TRANSFER_FEE", "100000"))
+
+# 免费带宽抵扣参数
+# TRON 网络每地址每天提供 600 免费带宽点
+FREE_BANDWIDTH_DAILY = int(os.getenv("FREE_BANDWIDTH_DAILY", "600"))
+# USDT TRC20 转账消耗的带宽（约 350 字节，其他 TRC20 transfer 同样按此估算）
+USDT_BANDWIDTH_BYTES = int(os.getenv("USDT_BANDWIDTH_BYTES", "350"))
+# TRX 转账消耗的带宽（约 270 字节）
+TRX_BANDWIDTH_BYTES = int(os.getenv("TRX_BANDWIDTH_BYTES", "270"))
+# 每单位带宽的 SUN 价格（默认 1000 SUN）
+BANDWIDTH_PRICE_SUN = int(os.getenv("BANDWIDTH_PRICE_SUN", "1000"))
+
+# 账户创建费缺省值（链参数不可用时）
+_DEFAULT_PRICES = {
+    "energy_price_sun": ENERGY_PRICE_SUN,
+    "bandwidth_price_sun": BANDWIDTH_PRICE_SUN,
+    "create_account_fee_sun": 100_000,
+    "create_new_account_fee_sun": 1_000_000,
+}
+
+
+def estimate_fee(from_address: str, to_address: Optional[str], amount: float, token: str = "USDT") -> dict:
+    """
+    预估一笔转账需要燃烧的 TRX
+
+    Args:
+        from_address: 发送方地址（无法识别时全部使用静态估算）
+        to_address: 接收方地址（可选，未提供时按接收方未持有代币 / 已激活处理）
+        amount: 转账金额（代币单位）
+        token: TRX、TRC20 代币符号或合约地址（见 token_registry.resolve）
+
+    Returns:
+        包含 energy_required, energy_burn_sun, bandwidth_required, bandwidth_burn_sun,
+        activation_fee_sun, total_burn_sun, total_burn_trx 及各项数据来源的字典
+
+    Raises:
+        ValueError: 不支持的代币类型（token_registry.UnknownTokenError）
+    """
+    token_info = token_registry.resolve(token)
+    is_trc20 = not token_registry.is_native(token_info)
+    token_upper = token_info["symbol"].upper() if is_trc20 else "TRX"
+
+    live = validators.is_valid_address(from_address)
+    resources = _lookup("发送方资源", tron_client.get_account_resources, from_address) if live else None
+    chain_prices = _lookup("链参数", tron_client.get_chain_prices) if live else None
+    recipient = None
+    if live and to_address and validators.is_valid_address(to_address):
+        recipient = _lookup("接收方状态", tron_client.get_recipient_state, to_address)
+    prices = chain_prices or _DEFAULT_PRICES
+
+    # 能量：仅 TRC20 合约调用消耗，质押能量优先抵扣
+    energy_required, energy_source, holds_token = 0, "none", None
+    if is_trc20:
+        holds_token = _holds_token(to_address, recipient, token_info)
+        energy_required, energy_source = _trc20_energy(from_address, to_address, amount, holds_token, token_info)
+    energy_available = resources["energy"]["energy_remaining"] if resources else 0
+    energy_burn_sun = max(0, energy_required - energy_available) * prices["energy_price_sun"]
+
+    # 带宽：质押带宽或免费带宽任一足够时不燃烧，否则按整笔交易字节数燃烧
+    bandwidth_required = USDT_BANDWIDTH_BYTES if is_trc20 else TRX_BANDWIDTH_BYTES
+    activation_fee_sun = 0
+    if not is_trc20 and recipient is not None and not recipient["is_activated"]:
+        # 创建账户：质押带宽不足时以账户创建费代替带宽费（不使用免费带宽）
+        activation_fee_sun = prices["create_new_account_fee_sun"]
+        if resources and resources["bandwidth"]["net_remaining"] >= bandwidth_required:
+            bandwidth_source, bandwidth_burn_sun = "staked", 0
+        else:
+            bandwidth_source, bandwidth_burn_sun = "burn", prices["create_account_fee_sun"]
+    elif resources is None:
+        bandwidth_source = "default"
+        if is_trc20:
+            free_coverage = min(bandwidth_required, FREE_BANDWIDTH_DAILY)
+            bandwidth_burn_sun = max(0, bandwidth_required - free_coverage) * prices["bandwidth_price_sun"]
+        else:
+            bandwidth_burn_sun = MIN_TRX_TRANSFER_FEE
+    elif resources["bandwidth"]["net_remaining"] >= bandwidth_required:
+        bandwidth_source, bandwidth_burn_sun = "staked", 0
+    elif resources["bandwidth"]["free_net_remaining"] >= bandwidth_required:
+        bandwidth_source, bandwidth_burn_sun = "free", 0
+    else:
+        bandwidth_source = "burn"
+        bandwidth_burn_sun = bandwidth_required * prices["bandwidth_price_sun"]
+
+    total_burn_sun = energy_burn_sun + bandwidth_burn_sun + activation_fee_sun
+    return {
+        "token": token_upper,
+        "contract_address": token_info["contract"],
+        "from_address": from_address,
+        "to_address": to_address,
+        "amount": amount,
+        "energy_required": energy_required,
+        "energy_available": energy_available,
+        "energy_source": energy_source,
+        "energy_burn_sun": energy_burn_sun,
+        "bandwidth_required": bandwidth_required,
+        "bandwidth_source": bandwidth_source,
+        "bandwidth_burn_sun": bandwidth_burn_sun,
+        "activation_fee_sun": activation_fee_sun,
+        "energy_price_sun": prices["energy_price_sun"],
+        "bandwidth_price_sun": prices["bandwidth_price_sun"],
+        "price_source": "chain" if chain_prices else "default",
+        "resources_source": "account" if resources else "default",
+        "recipient_activated": recipient["is_activated"] if recipient else None,
+        "recipient_holds_token": holds_token,
+        "total_burn_sun": total_burn_sun,
+        "total_burn_trx": total_burn_sun / SUN_PER_TRX,
+    }
+
+
+def _lookup(name: str, func, *args):
+    try:
+        return func(*args)
+    except Exception as e:
+        logger.debug(f"手续费预估: 查询{name}失败，使用静态估算: {e}")
+        return None
+
+
+def _holds_token(to_address: Optional[str], recipient: Optional[dict], token_info: dict) -> Optional[bool]:
+    """接收方是否已持有该代币（无法确定时返回 None）"""
+    if recipient is None:
+        return None
+    if token_info["contract"] == config.get_usdt_contract():
+        return recipient["holds_usdt"]
+    balance = _lookup("接收方代币余额", tron_client.get_trc20_balance,
+                      to_address, token_info["contract"], token_info["decimals"])
+    return None if balance is None else balance > 0
+
+
+def _trc20_energy(from_address: str, to_address: Optional[str], amount: float,
+                  holds_token: Optional[bool], token_info: dict) -> tuple:
+    """TRC20 transfer 的能量消耗与来源（simulation / default）"""
+    if holds_token is None:
+        return ESTIMATED_USDT_ENERGY, "default"
+
+    from . import trongrid_client
+
+    amount_raw = token_registry.to_raw(amount, token_info["decimals"])
+    try:
+        energy = trongrid_client.estimate_trc20_transfer_energy(
+            from_address, to_address, amount_raw, holds_token, token_info["contract"],
+        )
+    except Exception as e:
+        logger.debug(f"手续费预估: 能量模拟失败，使用静态估算: {e}")
+        return ESTIMATED_USDT_ENERGY, "default"
+    return energy, "simulation"
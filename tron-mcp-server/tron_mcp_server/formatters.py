@@ -2,6 +2,8 @@
 
 import json
 
+from . import token_registry
+
 
 def format_usdt_balance(address: str, balance_raw: int) -> dict:
     """
@@ -383,6 +385,14 @@ def format_transaction_history(
         if token_info and isinstance(token_info, dict):
             token_name = token_info.get("tokenAbbr") or token_info.get("tokenName") or ""
             token_decimal = token_info.get("tokenDecimal")
+            if token_decimal is None:
+                # 响应未带精度时使用代币注册表（不发起查询）
+                known = token_registry.lookup(
+                    token_info.get("tokenId") or tx.get("contract_address") or "", fetch=False
+                )
+                if known is not None:
+                    token_decimal = known["decimals"]
+                    token_name = token_name or known["symbol"]
             if token_decimal is not None:
                 decimals = int(token_decimal)
         
@@ -583,6 +593,55 @@ def format_account_tokens(
     }
 
 
+def to_columns(items: list, fields: list = None) -> dict:
+    """
+    字典列表 → 列式结构 {"columns": [...], "rows": [[...], ...]}
+
+    Args:
+        items: 字典列表
+        fields: 输出的列及顺序（可选，默认为各条目字段的并集，按首次出现顺序；缺失值为 None）
+    """
+    if fields is None:
+        fields = list(dict.fromkeys(key for item in items for key in item))
+    return {"columns": list(fields), "rows": [[item.get(f) for f in fields] for item in items]}
+
+
+def compact_result(result: dict, list_key: str, fields: list = None, include_summary: bool = False) -> dict:
+    """
+    列表类结果的紧凑输出（format="compact"）：列表字段转为列式结构，字段名只出现一次
+
+    Args:
+        result: format_* 的完整结果
+        list_key: 列表字段名（如 transfers / contacts）
+        fields: 只输出这些列（可选）
+        include_summary: 是否保留自然语言摘要（默认不保留，摘要往往逐条复述列表）
+    """
+    compact = {k: v for k, v in result.items() if k != list_key and (include_summary or k != "summary")}
+    compact[list_key] = to_columns(result.get(list_key) or [], fields)
+    compact["format"] = "compact"
+    return compact
+
+
+def format_portfolio(result: dict) -> dict:
+    """格式化多地址资产估值（holdings / addresses 为列式结构）"""
+    rows = result["holdings"]["rows"]
+    lines = [
+        f"💼 {result['address_count']} 个地址合计估值 ${result['total_value_usd']:,.2f}"
+        f"（{len(rows)} 种代币，价格源 {result['price_source']}）。"
+    ]
+    for token, _, _, balance, holders, price, value in rows[:5]:
+        balance_text = f"{balance:,.2f}" if balance >= 1 else f"{balance:.6f}"
+        value_text = f"≈ ${value:,.2f}" if value is not None else "（未估值）"
+        lines.append(f"  • {token}: {balance_text}，{holders} 个地址持有 {value_text}")
+    if len(rows) > 5:
+        lines.append(f"  … 其余 {len(rows) - 5} 种代币见 holdings 字段")
+    if result.get("unpriced_tokens"):
+        lines.append(f"⚠️ 无法获取价格，未计入合计: {', '.join(result['unpriced_tokens'][:10])}")
+    if result.get("failed"):
+        lines.append(f"⚠️ {len(result['failed'])} 个地址查询失败，未计入合计（见 failed 字段）")
+    return {**result, "summary": "\n".join(lines)}
+
+
 # ============ 地址簿格式化 ============
 
 def format_addressbook_add(result: dict) -> dict:
@@ -643,22 +702,167 @@ def format_addressbook_lookup(result: dict) -> dict:
     return {**result, "summary": summary}
 
 
+def _format_contact_line(contact: dict) -> str:
+    note_text = f"（{contact['note']}）" if contact.get("note") else ""
+    tags_text = f" [{', '.join(contact['tags'])}]" if contact.get("tags") else ""
+    return f"  • {contact['alias']} → {contact['address']}{note_text}{tags_text}"
+
+
+def _format_page_hint(result: dict) -> str:
+    """分页结果的范围提示，未分页或已全部展示时为空"""
+    total = result.get("total", 0)
+    shown = len(result.get("contacts", []))
+    offset = result.get("offset", 0) or 0
+    if shown >= total:
+        return ""
+    return f"（当前显示第 {offset + 1}-{offset + shown} 位）"
+
+
 def format_addressbook_list(result: dict) -> dict:
     """格式化地址簿列表"""
     total = result.get("total", 0)
     contacts = result.get("contacts", [])
 
     if total == 0:
-        summary = "📒 地址簿为空。使用 tron_addressbook_add 添加联系人。"
+        if result.get("tag"):
+            summary = f"📒 地址簿中没有标签为「{result['tag']}」的联系人。"
+        else:
+            summary = "📒 地址簿为空。使用 tron_addressbook_add 添加联系人。"
     else:
-        lines = [f"📒 地址簿共 {total} 位联系人："]
+        lines = [f"📒 地址簿共 {total} 位联系人{_format_page_hint(result)}："]
         for c in contacts:
-            note_text = f"（{c['note']}）" if c.get("note") else ""
-            lines.append(f"  • {c['alias']} → {c['address']}{note_text}")
+            lines.append(_format_contact_line(c))
         summary = "\n".join(lines)
     return {**result, "summary": summary}
 
 
+def format_addressbook_search(result: dict) -> dict:
+    """格式化地址簿搜索结果"""
+    total = result.get("total", 0)
+    conditions = []
+    if result.get("query"):
+        conditions.append(f"关键词「{result['query']}」")
+    if result.get("tag"):
+        conditions.append(f"标签「{result['tag']}」")
+    condition_text = "、".join(conditions)
+
+    if total == 0:
+        summary = f"📒 地址簿中没有匹配{condition_text}的联系人。"
+    else:
+        lines = [f"📒 匹配{condition_text}的联系人共 {total} 位{_format_page_hint(result)}："]
+        for c in result.get("contacts", []):
+            lines.append(_format_contact_line(c))
+        summary = "\n".join(lines)
+    return {**result, "summary": summary}
+
+
+def format_addressbook_import(result: dict) -> dict:
+    """格式化地址簿批量导入结果"""
+    errors = result.get("errors", [])
+    prefix = "📒 [试运行] 校验完成，将" if result.get("dry_run") else "📒 导入完成："
+    summary = (
+        f"{prefix}新增 {result.get('imported', 0)} 位、更新 {result.get('updated', 0)} 位、"
+        f"跳过 {result.get('skipped', 0)} 位，共 {result.get('rows', 0)} 行。"
+        f"地址簿当前共 {result.get('total_contacts', 0)} 位联系人。"
+    )
+    if errors:
+        # 错误较多时只在摘要中列出前几行，完整列表见 errors 字段
+        shown = "；".join(f"第 {e['row']} 行: {e['error']}" for e in errors[:5])
+        more = f" 等 {len(errors)} 行" if len(errors) > 5 else ""
+        summary += f"\n⚠️ {len(errors)} 行未导入 — {shown}{more}。"
+    return {**result, "summary": summary}
+
+
+def format_addressbook_resolve_batch(result: dict) -> dict:
+    """格式化批量解析结果"""
+    total = result.get("total", 0)
+    resolved = result.get("resolved", 0)
+    failed = result.get("failed", 0)
+
+    summary = f"📒 批量解析 {total} 项：成功 {resolved} 项，失败 {failed} 项。"
+    failures = [r for r in result.get("results", []) if not r.get("found")]
+    if failures:
+        lines = [summary]
+        for r in failures[:10]:
+            hint = f"，您是否想找「{r['suggestions'][0]}」？" if r.get("suggestions") else ""
+            lines.append(f"  • #{r['index']}「{r['input']}」: {r.get('error', '未找到')}{hint}")
+        if len(failures) > 10:
+            lines.append(f"  … 其余 {len(failures) - 10} 项见 results 字段")
+        summary = "\n".join(lines)
+    return {**result, "summary": summary}
+
+
+# ============ 运行指标格式化 ============
+
+def format_server_metrics(result: dict) -> dict:
+    """格式化运行指标汇总"""
+    if not result.get("enabled", True):
+        return {**result, "summary": "📊 指标采集已关闭（TRON_METRICS_ENABLED=false）。"}
+
+    lines = [f"📊 服务已运行 {result.get('uptime_seconds', 0):.0f} 秒。"]
+    actions = result.get("actions", [])
+    if actions:
+        lines.append("动作耗时（前 5）：")
+        for a in actions[:5]:
+            lines.append(
+                f"  • {a['action']}: {a['count']} 次，失败 {a['errors']} 次，"
+                f"平均 {a['avg_ms']}ms，P95 {a['p95_ms']}ms"
+            )
+    upstream = result.get("upstream", [])
+    if upstream:
+        lines.append("上游请求（前 5）：")
+        for u in upstream[:5]:
+            lines.append(
+                f"  • {u['service']} {u['method']} {u['endpoint']}: {u['requests']} 次，"
+                f"失败 {u['errors']} 次，平均 {u.get('avg_ms', 0)}ms"
+            )
+    for c in result.get("cache", []):
+        if c.get("hit_ratio") is not None:
+            lines.append(f"缓存 {c['cache']}: 命中率 {c['hit_ratio'] * 100:.1f}%（{c['hits']}/{c['hits'] + c['misses']}）")
+    if not actions and not upstream:
+        lines.append("暂无调用记录。")
+    return {**result, "summary": "\n".join(lines)}
+
+
+def format_slow_calls(result: dict) -> dict:
+    """格式化慢调用列表"""
+    if not result.get("enabled"):
+        return {**result, "summary": "🐢 慢调用日志已关闭（设置 TRON_SLOW_CALL_MS 开启）。"}
+
+    calls = result.get("calls", [])
+    lines = [f"🐢 慢调用阈值 {result['threshold_ms']:.0f}ms，最近 {len(calls)} 条："]
+    for c in calls:
+        slowest = max(c.get("stages", []), key=lambda s: s["ms"], default=None)
+        detail = f"，最慢阶段 {slowest['name']} {slowest['ms']:.0f}ms" if slowest else ""
+        lines.append(
+            f"  • {c['time']} {c['action']}: {c['duration_ms']:.0f}ms（{c['status']}），"
+            f"上游请求 {len(c.get('upstream', []))} 次{detail}"
+        )
+    if not calls:
+        lines.append("暂无慢调用。")
+    return {**result, "summary": "\n".join(lines)}
+
+
+def format_profiler_status(result: dict) -> dict:
+    """格式化采样 profiler 状态"""
+    state = "运行中" if result.get("running") else "未运行"
+    lines = [f"🔬 采样 profiler {state}，已采样 {result.get('samples', 0)} 次。"]
+    if result.get("interval_ms"):
+        lines.append(
+            f"间隔 {result['interval_ms']:g}ms，已运行 {result.get('elapsed_s', 0):.1f}s"
+            f"（上限 {result.get('max_duration_s', 0):g}s）。"
+        )
+    if result.get("last_dump"):
+        lines.append(f"聚合结果（folded stacks）: {result['last_dump']}")
+    top = result.get("top", [])
+    if top:
+        lines.append("热点调用栈（前 5）：")
+        for t in top[:5]:
+            leaf = t["stack"].rsplit(";", 1)[-1]
+            lines.append(f"  • {leaf}: {t['ratio'] * 100:.1f}%（{t['count']} 次）")
+    return {**result, "summary": "\n".join(lines)}
+
+
 # ============ QR Code 格式化 ============
 
 def format_qrcode_result(result: dict) -> dict:
@@ -744,3 +948,111 @@ def format_account_bandwidth(result: dict) -> dict:
         lines.append(f"  📌 当前带宽约可执行 {trx_transfers} 笔 TRX 转账(~{270}字节) 或 {usdt_transfers} 笔 USDT 转账(~{350}字节)")
     
     return {**result, "summary": "\n".join(lines)}
+
+
+def format_fee_estimate(result: dict) -> dict:
+    """格式化手续费预估明细"""
+    sources = {"simulation": "链上模拟", "default": "静态估算", "none": "不消耗"}
+    bandwidth_sources = {"staked": "质押带宽抵扣", "free": "免费带宽抵扣", "burn": "燃烧 TRX", "default": "静态估算"}
+    lines = [f"🧾 转账 {result['amount']} {result['token']} 预估燃烧 {result['total_burn_trx']:.6g} TRX："]
+    if result["token"] != "TRX":
+        lines.append(
+            f"  能量: 需要 {result['energy_required']:,}（{sources.get(result['energy_source'], result['energy_source'])}），"
+            f"质押能量可抵扣 {min(result['energy_available'], result['energy_required']):,}，"
+            f"燃烧 {result['energy_burn_sun'] / 1_000_000:.6g} TRX（{result['energy_price_sun']} SUN/能量）"
+        )
+    lines.append(
+        f"  带宽: {result['bandwidth_required']} 字节，"
+        f"{bandwidth_sources.get(result['bandwidth_source'], result['bandwidth_source'])}，"
+        f"燃烧 {result['bandwidth_burn_sun'] / 1_000_000:.6g} TRX"
+    )
+    if result["activation_fee_sun"]:
+        lines.append(f"  激活费: 接收方未激活，需支付 {result['activation_fee_sun'] / 1_000_000:.6g} TRX 创建账户")
+    if result.get("recipient_holds_token") is False:
+        lines.append("  📌 接收方尚未持有该代币，转账需写入新的存储槽，能量消耗约为普通转账的两倍")
+    if result["price_source"] == "default" or result["resources_source"] == "default":
+        lines.append("  ⚠️ 部分链上数据不可用，已按静态参数保守估算")
+    return {**result, "summary": "\n".join(lines)}
+
+
+def format_account_resources(result: dict) -> dict:
+    """格式化账户能量 + 带宽信息（复用单项格式化的摘要）"""
+    address = result["address"]
+    energy = format_account_energy({"address": address, **result["energy"]})
+    bandwidth = format_account_bandwidth({"address": address, **result["bandwidth"]})
+    return {**result, "summary": energy["summary"] + "\n" + bandwidth["summary"]}
+
+
+# ============ 地址监听格式化 ============
+
+def format_watch(result: dict) -> dict:
+    """格式化地址监听状态"""
+    address = result["address"]
+    if not result.get("watching"):
+        return {**result, "summary": f"👁️ 已停止监听 {address}。"}
+    token = "全部转入" if result["token"] == "ALL" else f"{result['token']} 转入"
+    summary = (
+        f"👁️ 正在监听 {address} 的{token}（{result['subscribers']} 个订阅）。"
+        f"新到账会推送到资源 {result['uri']}，也可调用 get_watch_events 增量获取。"
+    )
+    return {**result, "summary": summary}
+
+
+def format_watch_events(result: dict) -> dict:
+    """格式化监听地址的转入事件"""
+    items = result.get("items", [])
+    if not items:
+        return {**result, "summary": f"👁️ {result['address']} 暂无新的转入（游标 {result['cursor']}）。"}
+    lines = [f"💰 {result['address']} 收到 {len(items)} 笔转入："]
+    for e in items:
+        lines.append(f"  • 区块 {e['block']}: {e['amount']:,} {e['token']} 来自 {e['from']}（{e['txid'][:16]}…）")
+    lines.append(f"下次查询请传入 since={result['cursor']}")
+    return {**result, "summary": "\n".join(lines)}
+
+
+# ============ 预签名队列格式化 ============
+
+_QUEUE_STATUS_TEXT = {
+    "pending": "⏳ 待广播",
+    "broadcasting": "📡 广播中",
+    "broadcast": "✅ 已广播",
+    "failed": "❌ 失败",
+    "cancelled": "🚫 已取消",
+}
+
+
+def _local_time(seconds: float) -> str:
+    import datetime
+    return datetime.datetime.fromtimestamp(seconds).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def format_queued_tx(entry: dict, security_check: dict = None) -> dict:
+    """格式化单笔预签名交易（登记 / 取消结果）"""
+    summary = (
+        f"{_QUEUE_STATUS_TEXT.get(entry['status'], entry['status'])} [{entry['id']}] "
+        f"{entry['amount']} {entry['token']} → {entry['to']}，"
+        f"计划广播时间 {_local_time(entry['broadcast_at'])}，txID: {entry['txid'][:16]}..."
+    )
+    if entry["status"] == "pending":
+        summary += "。交易已签名，到点后自动广播，可调用 get_tx_queue 查看状态。"
+    result = {**entry, "summary": summary}
+    if security_check is not None:
+        result["security_check"] = security_check
+    return result
+
+
+def format_tx_queue(result: dict) -> dict:
+    """格式化预签名队列状态"""
+    counts = "，".join(f"{_QUEUE_STATUS_TEXT[s]} {n}" for s, n in result["counts"].items() if n)
+    lines = [f"📋 预签名队列（{result['network']}）：{counts}" if counts else f"📋 预签名队列（{result['network']}）为空。"]
+    if result["next_broadcast_at"] is not None:
+        lines.append(f"下一笔计划广播时间: {_local_time(result['next_broadcast_at'])}")
+    for e in result["items"]:
+        line = (
+            f"  • [{e['id']}] {_QUEUE_STATUS_TEXT.get(e['status'], e['status'])} "
+            f"{e['amount']} {e['token']} → {e['to']} @ {_local_time(e['broadcast_at'])}"
+        )
+        if e.get("last_error"):
+            line += f"（{e['last_error']}）"
+        lines.append(line)
+    return {**result, "summary": "\n".join(lines)}
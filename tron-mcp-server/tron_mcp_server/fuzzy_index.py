@@ -0,0 +1,236 @@
+"""模糊搜索索引模块 - 地址簿别名的快速相似度检索
+
+地址簿未精确命中时需要返回「相似别名」。旧实现对每个别名都计算一次
+difflib.SequenceMatcher 相似度，复杂度 O(n·m²)，几千个联系人时就很明显。
+
+本模块用字符倒排索引 + 位运算计数做候选裁剪，结果与逐个计算完全一致：
+- SequenceMatcher.ratio() = 2·M / (len(a) + len(b))，其中 M 为匹配字符数，
+  M 不会超过两个字符串的字符多重集交集大小，因此 2·overlap / (la + lb)
+  是 ratio 的严格上界，上界不超过阈值的别名不可能命中
+- 每个 (字符, 出现次数) 对应一个大整数位图（第 i 位表示第 i 个别名），
+  查询时把各位图按位切片累加，得到每个别名与查询的字符交集大小，
+  全程在 C 实现的大整数运算中完成，不逐个遍历别名
+- 按 (交集大小, 别名长度) 分层，只对上界最高的几层调用 SequenceMatcher，
+  凑满 top-k 后上界低于第 k 名即提前结束
+
+按字符（而非空格分词）建索引，中文等 CJK 别名天然适用；
+并做 NFKC 归一化，全角/半角字母数字视为相同。
+"""
+
+import unicodedata
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# 与地址簿 similar_matches 保持一致的默认阈值和返回条数
+DEFAULT_THRESHOLD = 0.5
+DEFAULT_LIMIT = 3
+
+
+def normalize(text: str) -> str:
+    """归一化别名：NFKC（全角→半角）+ 小写"""
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+def _bits_to_int(ids: Iterable[int], size: int) -> int:
+    """将 id 列表一次性转换为位图整数（O(n)，避免逐位 |= 的 O(n²)）"""
+    buf = bytearray((size + 7) // 8)
+    for i in ids:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, "little")
+
+
+def _at_least(planes: List[int], minimum: int, universe: int) -> int:
+    """
+    在按位切片的计数器中，选出计数 >= minimum 的位
+
+    planes[i] 的第 j 位是第 j 个别名计数的第 i 个二进制位。
+    """
+    if minimum <= 0:
+        return universe
+    if minimum >= 1 << len(planes):
+        return 0
+    greater = 0
+    equal = universe
+    for i in reversed(range(len(planes))):
+        plane = planes[i]
+        if (minimum >> i) & 1:
+            equal &= plane
+        else:
+            greater |= equal & plane
+            equal &= ~plane
+    return greater | equal
+
+
+class FuzzyIndex:
+    """
+    别名模糊搜索索引
+
+    search() 的结果与「对所有别名计算 SequenceMatcher 相似度，
+    过滤 > threshold 后按相似度降序（同分按插入顺序）取前 limit 个」完全一致。
+    """
+
+    def __init__(self, keys: Optional[Iterable[str]] = None):
+        # 别名 → id（id 即插入顺序，用于同分时保持与旧实现一致的排序）
+        self._ids: Dict[str, int] = {}
+        # id → (别名, 归一化别名)
+        self._entries: Dict[int, Tuple[str, str]] = {}
+        # 字符 → [出现 ≥1 次的位图, 出现 ≥2 次的位图, ...]
+        self._postings: Dict[str, List[int]] = {}
+        # 归一化长度 → 位图
+        self._lengths: Dict[int, int] = {}
+        self._universe = 0
+        self._next_id = 0
+        if keys is not None:
+            self._bulk_load(keys)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._ids
+
+    def _bulk_load(self, keys: Iterable[str]) -> None:
+        """批量建索引：先收集 id 列表，最后一次性转换为位图"""
+        postings: Dict[str, List[List[int]]] = {}
+        lengths: Dict[int, List[int]] = {}
+        for key in keys:
+            if key in self._ids:
+                continue
+            key_id = self._next_id
+            self._next_id += 1
+            norm = normalize(key)
+            self._ids[key] = key_id
+            self._entries[key_id] = (key, norm)
+            lengths.setdefault(len(norm), []).append(key_id)
+            for ch, count in Counter(norm).items():
+                levels = postings.setdefault(ch, [])
+                while len(levels) < count:
+                    levels.append([])
+                for level in range(count):
+                    levels[level].append(key_id)
+
+        size = self._next_id
+        self._postings = {
+            ch: [_bits_to_int(ids, size) for ids in levels]
+            for ch, levels in postings.items()
+        }
+        self._lengths = {length: _bits_to_int(ids, size) for length, ids in lengths.items()}
+        self._universe = _bits_to_int(self._entries.keys(), size)
+
+    def add(self, key: str) -> None:
+        """添加别名（已存在则忽略，保留原插入顺序）"""
+        if key in self._ids:
+            return
+        key_id = self._next_id
+        self._next_id += 1
+        norm = normalize(key)
+        bit = 1 << key_id
+        self._ids[key] = key_id
+        self._entries[key_id] = (key, norm)
+        self._lengths[len(norm)] = self._lengths.get(len(norm), 0) | bit
+        for ch, count in Counter(norm).items():
+            levels = self._postings.setdefault(ch, [])
+            while len(levels) < count:
+                levels.append(0)
+            for level in range(count):
+                levels[level] |= bit
+        self._universe |= bit
+
+    def remove(self, key: str) -> None:
+        """删除别名（不存在则忽略）"""
+        key_id = self._ids.pop(key, None)
+        if key_id is None:
+            return
+        _, norm = self._entries.pop(key_id)
+        mask = ~(1 << key_id)
+        self._lengths[len(norm)] &= mask
+        for ch, count in Counter(norm).items():
+            levels = self._postings[ch]
+            for level in range(count):
+                levels[level] &= mask
+        self._universe &= mask
+
+    def search(
+        self,
+        query: str,
+        limit: int = DEFAULT_LIMIT,
+        threshold: float = DEFAULT_THRESHOLD,
+    ) -> List[Tuple[str, float]]:
+        """
+        查找与 query 相似度 > threshold 的别名
+
+        Args:
+            query: 查询字符串
+            limit: 最多返回条数
+            threshold: 相似度阈值（严格大于）
+
+        Returns:
+            [(别名, 相似度), ...]，按相似度降序
+        """
+        norm_query = normalize(query)
+        if not norm_query or not self._ids or limit <= 0:
+            return []
+        query_len = len(norm_query)
+
+        # 1. 按位切片累加：planes 表示每个别名与查询的字符多重集交集大小
+        planes: List[int] = []
+        for ch, count in Counter(norm_query).items():
+            for level_mask in self._postings.get(ch, ())[:count]:
+                carry = level_mask
+                for i in range(len(planes)):
+                    if not carry:
+                        break
+                    planes[i], carry = planes[i] ^ carry, planes[i] & carry
+                if carry:
+                    planes.append(carry)
+        if not planes:
+            return []
+
+        # 2. 分层：按交集大小 overlap 与别名长度 lk 分组，每组上界为 2·overlap / (lq + lk)，
+        #    只保留上界 > threshold 的分组（此时无需逐个别名计算上界）
+        exact_masks = {}
+        higher = 0
+        for overlap in range(min(query_len, (1 << len(planes)) - 1), 0, -1):
+            at_least = _at_least(planes, overlap, self._universe)
+            exact_masks[overlap] = at_least & ~higher
+            higher = at_least
+
+        tiers = []
+        for overlap, overlap_mask in exact_masks.items():
+            if not overlap_mask:
+                continue
+            for length in self._lengths:
+                upper_bound = 2 * overlap / (query_len + length)
+                if upper_bound > threshold:
+                    tiers.append((upper_bound, overlap, length))
+        tiers.sort(reverse=True)
+
+        # 3. 按上界降序逐层精确计算；凑满 top-k 后，上界低于第 k 名即可停止，
+        #    上界等于第 k 名时只需检查 id 更小（插入更早、同分排序更靠前）的别名
+        matches = []
+        for upper_bound, overlap, length in tiers:
+            if len(matches) >= limit and upper_bound < matches[-1][0]:
+                break
+            mask = exact_masks[overlap] & self._lengths[length]
+            while mask:
+                if len(matches) >= limit:
+                    kth_similarity, kth_id, _ = matches[-1]
+                    if upper_bound < kth_similarity:
+                        break
+                    if upper_bound == kth_similarity:
+                        mask &= (1 << kth_id) - 1
+                        if not mask:
+                            break
+                low_bit = mask & -mask
+                mask ^= low_bit
+                key_id = low_bit.bit_length() - 1
+                key, norm = self._entries[key_id]
+                similarity = SequenceMatcher(None, norm_query, norm).ratio()
+                if similarity > threshold:
+                    matches.append((similarity, key_id, key))
+                    matches.sort(key=lambda item: (-item[0], item[1]))
+                    del matches[limit:]
+
+        return [(key, similarity) for similarity, _, key in matches]
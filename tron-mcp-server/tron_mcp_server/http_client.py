@@ -0,0 +1,260 @@
+"""共享 HTTP 客户端 — 上游请求的统一出口，支持录制 / 回放 (cassette)
+
+tron_client (TRONSCAN) 与 trongrid_client (TronGrid) 的所有请求都经过 get / post，
+默认直接调用 httpx.get / httpx.post（调用时查找，测试对 httpx 的 patch 仍然生效）。
+每次请求在当前 trace 中记为一个 CLIENT span（方法、完整 URL、状态码）。
+
+启用 cassette 后：
+- record: 正常请求上游，同时把请求与响应（含耗时）写入 cassette 文件
+- replay: 不访问网络，按请求匹配 cassette 中的响应返回；未录制的请求抛出 CassetteMiss
+
+请求匹配键 = 方法 + 路径 + 排序后的查询参数 + JSON 请求体摘要，不含主机名，
+因此对模拟服务或主网录制的 cassette 都可以在任意 API URL 配置下回放。
+同一请求录制多次时按录制顺序依次回放，用尽后重复最后一次响应。
+
+启用方式：
+- 代码中: with http_client.use_cassette("flows.json.gz", mode="replay", timing=1.0): ...
+- 环境变量: TRON_HTTP_CASSETTE=路径, TRON_HTTP_CASSETTE_MODE=record|replay,
+  TRON_HTTP_CASSETTE_TIMING=回放耗时倍率（0 表示不等待，1 表示按原始耗时）
+
+文件以 .gz 结尾时使用 gzip 压缩；JSON 响应按对象存储，避免二次转义。
+"""
+
+import atexit
+import contextlib
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import httpx
+
+from . import metrics
+from . import tracing
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_VERSION = 1
+_MODES = ("record", "replay")
+
+
+class CassetteMiss(httpx.TransportError):
+    """回放模式下请求未录制（按网络错误处理，与真实上游不可达时的降级路径一致）"""
+
+
+def request_key(method: str, url: str, params: Optional[dict] = None, json_body=None) -> str:
+    """计算请求匹配键（忽略 scheme 与主机名）"""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query.extend((str(k), str(v)) for k, v in params.items() if v is not None)
+    key = f"{method.upper()} {parts.path.rstrip('/')}"
+    if query:
+        key += "?" + urlencode(sorted(query))
+    if json_body is not None:
+        body = json.dumps(json_body, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        key += " #" + hashlib.sha1(body.encode("utf-8")).hexdigest()[:16]
+    return key
+
+
+def _encode_response(response, elapsed: float) -> dict:
+    content = response.content
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    record = {
+        "status": int(response.status_code),
+        "content_type": response.headers.get("content-type", "application/json"),
+        "elapsed_ms": round(elapsed * 1000, 3),
+    }
+    try:
+        record["json"] = json.loads(content)
+    except (TypeError, ValueError):
+        record["text"] = bytes(content or b"").decode("utf-8", errors="replace")
+    return record
+
+
+def _decode_response(record: dict, method: str, url: str, params: Optional[dict]) -> httpx.Response:
+    if "json" in record:
+        content = json.dumps(record["json"], ensure_ascii=False).encode("utf-8")
+    else:
+        content = record.get("text", "").encode("utf-8")
+    return httpx.Response(
+        record["status"],
+        content=content,
+        headers={"content-type": record.get("content_type", "application/json")},
+        request=httpx.Request(method, url, params=params),
+    )
+
+
+class Cassette:
+    """一份录制的上游交互
+
+    Args:
+        path: cassette 文件路径（.gz 结尾时压缩）
+        mode: record（从空白开始录制）或 replay（读取已有文件）
+        timing: 回放时按原始耗时 × timing 等待，0 表示立即返回
+    """
+
+    def __init__(self, path, mode: str = "replay", timing: float = 0.0):
+        if mode not in _MODES:
+            raise ValueError(f"不支持的 cassette 模式: {mode}（可选: {', '.join(_MODES)}）")
+        if timing < 0:
+            raise ValueError("timing 不能为负数")
+        self.path = Path(path)
+        self.mode = mode
+        self.timing = timing
+        self._lock = threading.Lock()
+        self._interactions: Dict[str, List[dict]] = {}
+        self._cursor: Dict[str, int] = {}
+        self._dirty = False
+        if mode == "replay":
+            self.load()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(v) for v in self._interactions.values())
+
+    def load(self) -> None:
+        opener = gzip.open if self.path.suffix == ".gz" else open
+        with opener(self.path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"不支持的 cassette 版本: {data.get('version')}")
+        interactions: Dict[str, List[dict]] = {}
+        for item in data.get("interactions", []):
+            interactions.setdefault(item["key"], []).append(item["response"])
+        with self._lock:
+            self._interactions = interactions
+            self._cursor = {}
+
+    def save(self) -> None:
+        """写出 cassette（仅 record 模式且有新录制时）；先写临时文件再替换"""
+        with self._lock:
+            if self.mode != "record" or not self._dirty:
+                return
+            interactions = [
+                {"key": key, "response": response}
+                for key, responses in self._interactions.items()
+                for response in responses
+            ]
+            self._dirty = False
+        payload = json.dumps(
+            {"version": CASSETTE_VERSION, "interactions": interactions},
+            ensure_ascii=False, separators=(",", ":"),
+        )
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        opener = gzip.open if self.path.suffix == ".gz" else open
+        with opener(tmp, "wt", encoding="utf-8") as f:
+            f.write(payload)
+        os.replace(tmp, self.path)
+
+    def record(self, method: str, url: str, params, json_body, response, elapsed: float) -> None:
+        key = request_key(method, url, params, json_body)
+        entry = _encode_response(response, elapsed)
+        with self._lock:
+            self._interactions.setdefault(key, []).append(entry)
+            self._dirty = True
+
+    def play(self, method: str, url: str, params=None, json_body=None) -> httpx.Response:
+        key = request_key(method, url, params, json_body)
+        with self._lock:
+            responses = self._interactions.get(key)
+            if responses:
+                index = self._cursor.get(key, 0)
+                self._cursor[key] = index + 1
+                entry = responses[min(index, len(responses) - 1)]
+        metrics.record_cache("http_cassette", bool(responses))
+        if not responses:
+            raise CassetteMiss(f"cassette 中没有匹配的请求: {key}", request=httpx.Request(method, url, params=params))
+        if self.timing:
+            time.sleep(entry.get("elapsed_ms", 0) / 1000 * self.timing)
+        return _decode_response(entry, method, url, params)
+
+
+# ============ 当前 cassette ============
+
+_active: Optional[Cassette] = None
+_env_cassettes: Dict[tuple, Cassette] = {}
+_env_lock = threading.Lock()
+
+
+def _env_cassette() -> Optional[Cassette]:
+    path = os.getenv("TRON_HTTP_CASSETTE", "").strip()
+    if not path:
+        return None
+    mode = os.getenv("TRON_HTTP_CASSETTE_MODE", "replay").strip().lower()
+    timing = float(os.getenv("TRON_HTTP_CASSETTE_TIMING", "0") or 0)
+    config_key = (path, mode, timing)
+    cassette = _env_cassettes.get(config_key)
+    if cassette is None:
+        with _env_lock:
+            cassette = _env_cassettes.get(config_key)
+            if cassette is None:
+                cassette = Cassette(path, mode, timing)
+                if mode == "record":
+                    atexit.register(cassette.save)
+                _env_cassettes[config_key] = cassette
+                logger.info(f"HTTP cassette 已启用: {path} ({mode})")
+    return cassette
+
+
+def current_cassette() -> Optional[Cassette]:
+    """返回当前生效的 cassette：use_cassette 优先，其次是环境变量配置"""
+    return _active if _active is not None else _env_cassette()
+
+
+@contextlib.contextmanager
+def use_cassette(path, mode: str = "replay", timing: float = 0.0) -> Iterator[Cassette]:
+    """在上下文内对所有线程启用 cassette；record 模式退出时写盘"""
+    global _active
+    cassette = Cassette(path, mode, timing)
+    previous, _active = _active, cassette
+    try:
+        yield cassette
+    finally:
+        _active = previous
+        cassette.save()
+
+
+# ============ 请求入口 ============
+
+def _send(method: str, url: str, params=None, json_body=None, headers=None, timeout=None):
+    with tracing.span(f"HTTP {method}", kind=tracing.KIND_CLIENT) as span:
+        if span is not tracing.NOOP_SPAN:
+            span.set_attribute("http.request.method", method)
+            span.set_attribute("url.full", str(httpx.URL(url, params=params)) if params else url)
+        cassette = current_cassette()
+        if cassette is not None and cassette.mode == "replay":
+            span.set_attribute("tron.cassette", "replay")
+            response = cassette.play(method, url, params, json_body)
+        else:
+            start = time.perf_counter()
+            if method == "GET":
+                response = httpx.get(url, params=params, headers=headers, timeout=timeout)
+            else:
+                response = httpx.post(url, json=json_body, headers=headers, timeout=timeout)
+            if cassette is not None:
+                cassette.record(method, url, params, json_body, response, time.perf_counter() - start)
+        status = getattr(response, "status_code", None)
+        if isinstance(status, int):
+            span.set_attribute("http.response.status_code", status)
+            if status >= 400:
+                span.set_status(True, f"HTTP {status}")
+        return response
+
+
+def get(url: str, params: Optional[dict] = None, headers: Optional[dict] = None, timeout=None):
+    """发送 GET 请求（参数与 httpx.get 一致）"""
+    return _send("GET", url, params=params, headers=headers, timeout=timeout)
+
+
+def post(url: str, json=None, headers: Optional[dict] = None, timeout=None):
+    """发送 POST JSON 请求（参数与 httpx.post 一致）"""
+    return _send("POST", url, json_body=json, headers=headers, timeout=timeout)
@@ -0,0 +1,92 @@
+"""JSON 编解码 — 安装 orjson 时使用 orjson，否则使用标准库 json
+
+上游响应解析（tron_client / trongrid_client）、sign_tx / broadcast_tx 的交易 JSON 输入、
+MCP 工具结果的文本序列化都经过本模块。大分页交易历史、accountv2 等响应体积较大，
+orjson 的解析 / 序列化通常快数倍。
+
+- 编解码器 TRON_JSON_CODEC: auto（默认，有 orjson 时使用）/ orjson / stdlib，
+  导入时读取一次，之后可用 configure() 切换
+- 大整数: orjson 会把超出 64 位的整数读成浮点数、写出时报错。含 20 位以上连续数字的输入
+  （可能是 uint256 等大整数）与 orjson 无法写出的值自动改用标准库，结果与标准库一致
+- 输出统一为紧凑格式（无多余空格）、非 ASCII 字符原样输出
+
+orjson 为可选依赖。
+"""
+
+import json
+import os
+from typing import Any, Optional, Union
+
+import httpx
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+# 大整数检测：数字映射为 "0"、其他字节映射为空格后查找 20 个连续的 "0"
+# （bytes.translate + 子串查找，比正则扫描快一个数量级；字符串中的长数字也会命中，只是多走一次标准库）
+_DIGITS = bytes(0x30 if 0x30 <= i <= 0x39 else 0x20 for i in range(256))
+_BIG_INT = b"0" * 20
+
+_backend = "stdlib"
+
+
+def configure(codec: Optional[str] = None) -> str:
+    """
+    选择编解码器（None 表示重新读取 TRON_JSON_CODEC），返回实际使用的编解码器
+
+    未安装 orjson 时总是使用标准库。
+    """
+    global _backend
+    choice = (codec if codec is not None else os.getenv("TRON_JSON_CODEC", "auto")).strip().lower()
+    _backend = "orjson" if orjson is not None and choice != "stdlib" else "stdlib"
+    return _backend
+
+
+def backend() -> str:
+    """当前使用的编解码器（orjson / stdlib）"""
+    return _backend
+
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+    """
+    解析 JSON 文本
+
+    Raises:
+        json.JSONDecodeError: 不是合法 JSON（orjson 的解析错误也是其子类）
+        TypeError: 输入不是字符串 / 字节串
+    """
+    if _backend == "orjson" and isinstance(data, (str, bytes, bytearray)):
+        raw = data.encode("utf-8") if isinstance(data, str) else data
+        if _BIG_INT not in raw.translate(_DIGITS):
+            return orjson.loads(raw)
+    return json.loads(data)
+
+
+def dumps(value: Any, default=str) -> str:
+    """
+    序列化为紧凑 JSON 字符串
+
+    Args:
+        default: 无法序列化的对象的转换函数（默认转为字符串，与 FastMCP 的处理一致）
+    """
+    if _backend == "orjson":
+        try:
+            return orjson.dumps(value, default=default, option=_ORJSON_OPTIONS).decode("utf-8")
+        except TypeError:
+            # 超出 64 位的整数等 orjson 不支持的值
+            pass
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=default)
+
+
+def response_json(response) -> Any:
+    """解析 HTTP 响应体；httpx.Response 以外的响应对象（如测试替身）使用其自身的 json()"""
+    if isinstance(response, httpx.Response):
+        return loads(response.content)
+    return response.json()
+
+
+configure()
@@ -0,0 +1,452 @@
+"""运行指标模块 - 动作耗时、上游调用与缓存命中统计
+
+仅依赖标准库，内置 Counter / Gauge / Histogram 三种指标：
+- tron_mcp_action_duration_seconds: 每个 call_router 动作的耗时分布（按 action、status）
+- tron_mcp_actions_in_flight: 正在执行的动作数
+- tron_mcp_upstream_requests_total / _duration_seconds / _response_bytes_total:
+  TRONSCAN / TronGrid 各接口的请求数（含 HTTP 状态码）、耗时与响应字节数
+- tron_mcp_upstream_in_flight: 正在进行的上游请求数
+- tron_mcp_cache_requests_total: 各缓存的命中 / 未命中次数
+
+导出方式：
+- SSE 模式: GET /metrics 返回 Prometheus 文本格式
+- stdio 模式: get_server_metrics 动作返回汇总（可附带 Prometheus 文本）
+
+热路径开销：每次记录为一次 perf_counter + 一次加锁的字典更新（微秒级），
+相对网络请求可忽略；设置 TRON_METRICS_ENABLED=false 可完全关闭。
+"""
+
+import bisect
+import contextlib
+import os
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from . import tracing
+
+
+# 耗时分桶（秒）：覆盖本地动作（毫秒级）到慢速上游请求（10 秒级）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 所有指标共用一把锁：更新只是几次加法，竞争可忽略
+_lock = threading.Lock()
+
+_start_time = time.time()
+
+
+def _enabled_from_env() -> bool:
+    return os.getenv("TRON_METRICS_ENABLED", "true").strip().lower() not in ("0", "false", "no", "off")
+
+
+_enabled = _enabled_from_env()
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(enabled: bool) -> None:
+    """运行时开关（主要供测试使用）"""
+    global _enabled
+    _enabled = enabled
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """指标基类：按标签值元组保存样本"""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Tuple) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} 需要标签 {self.labelnames}，收到 {labels}")
+        return tuple(str(label) for label in labels)
+
+    def clear(self) -> None:
+        with _lock:
+            self._values.clear()
+
+    def samples(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with _lock:
+            return [(key, self._copy(value)) for key, value in self._values.items()]
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for key, value in sorted(self.samples()):
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+
+    type_name = "counter"
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        if not _enabled:
+            return
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, *labels) -> float:
+        with _lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值"""
+
+    type_name = "gauge"
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        if not _enabled:
+            return
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, *labels, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value: float) -> None:
+        if not _enabled:
+            return
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = value
+
+    def get(self, *labels) -> float:
+        with _lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Histogram(_Metric):
+    """分桶直方图，样本为 [各桶计数..., +Inf 计数] + 总和"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels) -> None:
+        if not _enabled:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0}
+            state["counts"][index] += 1
+            state["sum"] += value
+
+    @staticmethod
+    def _copy(value):
+        return {"counts": list(value["counts"]), "sum": value["sum"]}
+
+    def _render_sample(self, key, value) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), value["counts"]):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(value['sum'])}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+    def quantile(self, q: float, value: dict) -> Optional[float]:
+        """根据分桶估算分位数（桶内线性插值），无样本时返回 None"""
+        total = sum(value["counts"])
+        if total == 0:
+            return None
+        rank = q * total
+        cumulative = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets + (float("inf"),), value["counts"]):
+            if count and cumulative + count >= rank:
+                if bound == float("inf"):
+                    return lower
+                return lower + (bound - lower) * (rank - cumulative) / count
+            cumulative += count
+            lower = bound
+        return lower
+
+
+# ============ 指标定义 ============
+
+ACTION_DURATION = Histogram(
+    "tron_mcp_action_duration_seconds",
+    "Latency of call_router actions in seconds.",
+    ("action", "status"),
+)
+ACTIONS_IN_FLIGHT = Gauge(
+    "tron_mcp_actions_in_flight",
+    "Number of call_router actions currently executing.",
+    ("action",),
+)
+UPSTREAM_REQUESTS = Counter(
+    "tron_mcp_upstream_requests_total",
+    "Upstream HTTP requests by service, endpoint, method and status code.",
+    ("service", "endpoint", "method", "status"),
+)
+UPSTREAM_DURATION = Histogram(
+    "tron_mcp_upstream_request_duration_seconds",
+    "Latency of upstream HTTP requests in seconds.",
+    ("service", "endpoint", "method"),
+)
+UPSTREAM_BYTES = Counter(
+    "tron_mcp_upstream_response_bytes_total",
+    "Bytes received from upstream HTTP responses.",
+    ("service", "endpoint", "method"),
+)
+UPSTREAM_IN_FLIGHT = Gauge(
+    "tron_mcp_upstream_in_flight",
+    "Number of upstream HTTP requests currently in flight.",
+    ("service",),
+)
+CACHE_REQUESTS = Counter(
+    "tron_mcp_cache_requests_total",
+    "Cache lookups by cache name and result (hit / miss).",
+    ("cache", "result"),
+)
+BLOCK_FOLLOWER_BLOCKS = Counter(
+    "tron_mcp_block_follower_blocks_total",
+    "Blocks seen by the block follower by result (processed / skipped / error).",
+    ("result",),
+)
+BLOCK_FOLLOWER_HEIGHT = Gauge(
+    "tron_mcp_block_follower_height",
+    "Latest block height processed by the block follower.",
+    (),
+)
+
+_METRICS = (
+    ACTION_DURATION,
+    ACTIONS_IN_FLIGHT,
+    UPSTREAM_REQUESTS,
+    UPSTREAM_DURATION,
+    UPSTREAM_BYTES,
+    UPSTREAM_IN_FLIGHT,
+    CACHE_REQUESTS,
+    BLOCK_FOLLOWER_BLOCKS,
+    BLOCK_FOLLOWER_HEIGHT,
+)
+
+
+# ============ 记录接口 ============
+
+
+@contextlib.contextmanager
+def track_action(action: str) -> Iterator[dict]:
+    """
+    记录一次动作调用的耗时与结果
+
+    用法:
+        with metrics.track_action(action) as outcome:
+            result = handler(params)
+            outcome["status"] = "error" if "error" in result else "ok"
+
+    未设置 status 即退出（抛出异常）时记为 exception。
+    """
+    if not _enabled:
+        yield {}
+        return
+    outcome = {"status": "exception"}
+    ACTIONS_IN_FLIGHT.inc(action)
+    start = time.perf_counter()
+    try:
+        yield outcome
+    finally:
+        ACTION_DURATION.observe(time.perf_counter() - start, action, outcome["status"])
+        ACTIONS_IN_FLIGHT.dec(action)
+
+
+class _UpstreamCall:
+    """track_upstream 产生的记录句柄"""
+
+    __slots__ = ("status", "size")
+
+    def __init__(self):
+        self.status = "error"
+        self.size = 0
+
+    def response(self, response) -> None:
+        """记录 HTTP 状态码与响应大小（兼容测试中的 mock 响应）"""
+        status = getattr(response, "status_code", None)
+        self.status = str(status) if isinstance(status, int) else "unknown"
+        content = getattr(response, "content", None)
+        if isinstance(content, (bytes, bytearray)):
+            self.size = len(content)
+
+
+@contextlib.contextmanager
+def track_upstream(service: str, endpoint: str, method: str) -> Iterator[_UpstreamCall]:
+    """
+    记录一次上游 HTTP 请求
+
+    用法:
+        with metrics.track_upstream("tronscan", "account", "GET") as call:
+            response = httpx.get(...)
+            call.response(response)
+
+    请求抛出异常（超时、连接失败）时 status 记为 error。
+    """
+    call = _UpstreamCall()
+    if not _enabled:
+        yield call
+        return
+    UPSTREAM_IN_FLIGHT.inc(service)
+    start = time.perf_counter()
+    try:
+        yield call
+    finally:
+        UPSTREAM_DURATION.observe(time.perf_counter() - start, service, endpoint, method)
+        UPSTREAM_REQUESTS.inc(service, endpoint, method, call.status)
+        if call.size:
+            UPSTREAM_BYTES.inc(service, endpoint, method, amount=call.size)
+        UPSTREAM_IN_FLIGHT.dec(service)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """记录一次缓存查询结果（同时记为当前 trace span 的事件）"""
+    tracing.record_cache(cache, hit)
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+
+def reset() -> None:
+    """清空全部指标（测试使用）"""
+    global _start_time
+    for metric in _METRICS:
+        metric.clear()
+    _start_time = time.time()
+
+
+# ============ 导出 ============
+
+
+def render_prometheus() -> str:
+    """导出 Prometheus 文本格式（text/plain; version=0.0.4）"""
+    lines = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def _latency_stats(histogram: Histogram, state: dict) -> dict:
+    count = sum(state["counts"])
+    p50 = histogram.quantile(0.5, state)
+    p95 = histogram.quantile(0.95, state)
+    return {
+        "count": count,
+        "avg_ms": round(state["sum"] / count * 1000, 2) if count else 0.0,
+        "p50_ms": round(p50 * 1000, 2) if p50 is not None else None,
+        "p95_ms": round(p95 * 1000, 2) if p95 is not None else None,
+    }
+
+
+def summarize() -> dict:
+    """
+    汇总指标为便于阅读的结构
+
+    Returns:
+        包含 uptime_seconds, actions, upstream, cache, in_flight 的字典
+    """
+    actions: Dict[str, dict] = {}
+    for (action, status), state in ACTION_DURATION.samples():
+        entry = actions.setdefault(action, {"action": action, "count": 0, "errors": 0, "_merged": None})
+        count = sum(state["counts"])
+        entry["count"] += count
+        if status != "ok":
+            entry["errors"] += count
+        merged = entry["_merged"]
+        if merged is None:
+            entry["_merged"] = {"counts": list(state["counts"]), "sum": state["sum"]}
+        else:
+            merged["counts"] = [a + b for a, b in zip(merged["counts"], state["counts"])]
+            merged["sum"] += state["sum"]
+    action_list = []
+    for entry in actions.values():
+        stats = _latency_stats(ACTION_DURATION, entry.pop("_merged"))
+        action_list.append({**entry, **{k: v for k, v in stats.items() if k != "count"}})
+    action_list.sort(key=lambda e: e["count"], reverse=True)
+
+    upstream: Dict[Tuple[str, str, str], dict] = {}
+    for (service, endpoint, method, status), value in UPSTREAM_REQUESTS.samples():
+        entry = upstream.setdefault((service, endpoint, method), {
+            "service": service, "endpoint": endpoint, "method": method,
+            "requests": 0, "errors": 0, "bytes": 0, "status_codes": {},
+        })
+        entry["requests"] += int(value)
+        entry["status_codes"][status] = int(value)
+        if not status.isdigit() or int(status) >= 400:
+            entry["errors"] += int(value)
+    for key, state in UPSTREAM_DURATION.samples():
+        if key in upstream:
+            stats = _latency_stats(UPSTREAM_DURATION, state)
+            upstream[key].update({k: v for k, v in stats.items() if k != "count"})
+    for key, value in UPSTREAM_BYTES.samples():
+        if key in upstream:
+            upstream[key]["bytes"] = int(value)
+    upstream_list = sorted(upstream.values(), key=lambda e: e["requests"], reverse=True)
+
+    caches: Dict[str, dict] = {}
+    for (cache, result), value in CACHE_REQUESTS.samples():
+        entry = caches.setdefault(cache, {"cache": cache, "hits": 0, "misses": 0})
+        entry["hits" if result == "hit" else "misses"] += int(value)
+    for entry in caches.values():
+        total = entry["hits"] + entry["misses"]
+        entry["hit_ratio"] = round(entry["hits"] / total, 4) if total else None
+
+    in_flight = {
+        "actions": int(sum(value for _, value in ACTIONS_IN_FLIGHT.samples())),
+        "upstream": {service: int(value) for (service,), value in UPSTREAM_IN_FLIGHT.samples()},
+    }
+
+    return {
+        "enabled": _enabled,
+        "uptime_seconds": round(time.time() - _start_time, 1),
+        "actions": action_list,
+        "upstream": upstream_list,
+        "cache": sorted(caches.values(), key=lambda e: e["cache"]),
+        "in_flight": in_flight,
+    }
@@ -0,0 +1,192 @@
+"""多地址资产估值 — 并发拉取持仓，按代币汇总并以价格源估值
+
+财务报表需要数百个冷热钱包的合计资产。get_portfolio 对去重后的地址并发查询持仓
+（复用 tron_client.get_account_tokens 的账户快照与 account 缓存），按代币汇总后，
+对每种代币只查询一次价格：
+
+- 价格源 TRON_PRICE_SOURCE: tronscan（默认，TRX 取 TRONSCAN /api/token/price，
+  TRC20 取 /api/token_trc20 的 market_info.priceInUsd，TRC10 无价格）或
+  static（本地价格表 TRON_STATIC_PRICES，JSON 格式，如 {"TRX": 0.12, "USDT": 1}，
+  键为代币符号或合约地址；离线、测试或内部估值使用）
+- 价格缓存: token_price 缓存，有效期 TRON_CACHE_TTL_TOKEN_PRICE（默认 PRICE_TTL 秒）；
+  查询失败同样缓存（值为 None），有效期内不重复请求上游，该代币计入 unpriced_tokens
+- 并发: TRON_PORTFOLIO_WORKERS 个线程（默认 16）
+
+上游请求数 = 去重地址数（缓存命中时更少）+ 未缓存的代币种数，与重复地址和持仓条数无关。
+汇总结果为列式结构（columns + rows），避免在每行重复字段名。
+"""
+
+import contextvars
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from . import cache
+from . import config
+from . import token_registry
+from . import tron_client
+
+logger = logging.getLogger(__name__)
+
+# 价格缓存默认有效期（秒）
+PRICE_TTL = 60
+
+HOLDING_COLUMNS = ["token", "type", "contract", "balance", "holders", "price_usd", "value_usd"]
+ADDRESS_COLUMNS = ["address", "tokens", "value_usd"]
+
+
+def _workers() -> int:
+    return max(1, int(os.getenv("TRON_PORTFOLIO_WORKERS", "16") or 16))
+
+
+def price_source() -> str:
+    """当前价格源（tronscan / static）"""
+    source = os.getenv("TRON_PRICE_SOURCE", "tronscan").strip().lower()
+    return source if source in ("tronscan", "static") else "tronscan"
+
+
+def _static_prices() -> Dict[str, float]:
+    raw = os.getenv("TRON_STATIC_PRICES", "").strip()
+    if not raw:
+        return {}
+    try:
+        table = json.loads(raw)
+    except ValueError as e:
+        raise ValueError(f"TRON_STATIC_PRICES 不是合法 JSON: {e}") from e
+    prices = {}
+    for key, value in table.items():
+        # 合约地址区分大小写，符号不区分
+        key = str(key)
+        prices[key if len(key) == 34 else key.upper()] = float(value)
+    return prices
+
+
+def get_price(symbol: str, contract: str = "") -> Optional[float]:
+    """
+    代币的美元价格（按价格源，带缓存），无法获取时返回 None
+
+    Args:
+        symbol: 代币符号（TRX 及 TRC10 使用符号查询）
+        contract: TRC20 合约地址（有合约时优先按合约查询）
+    """
+    if price_source() == "static":
+        table = _static_prices()
+        price = table.get(contract) if contract else None
+        return price if price is not None else table.get(symbol.upper())
+
+    token_id = contract or symbol.lower()
+
+    def load() -> Optional[float]:
+        try:
+            return tron_client.get_token_price_usd(token_id)
+        except Exception as e:
+            logger.warning(f"查询 {symbol or token_id} 价格失败: {e}")
+            return None
+
+    return cache.cached(
+        "token_price", f"{config.get_network()}:{token_id}",
+        config.get_cache_ttl("token_price", PRICE_TTL), load,
+    )
+
+
+def _token_key(token: dict) -> tuple:
+    """汇总键与展示符号：TRC20 按合约、TRC10 按名称、TRX 单独一项"""
+    token_type = token.get("token_type", "")
+    contract = token.get("contract_address") or ""
+    symbol = token.get("token_abbr") or token.get("token_name") or ""
+    if token_type == "trc20" and contract:
+        known = token_registry.lookup(contract, fetch=False)
+        return contract, known["symbol"] if known else symbol
+    if token_type == "native":
+        return "TRX", "TRX"
+    return f"trc10:{token.get('token_name') or symbol}", symbol
+
+
+def _map(func, items: list, workers: int) -> list:
+    """并发执行 func(item)，保持顺序；每个任务继承调用方的追踪上下文"""
+    if len(items) <= 1 or workers <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(workers, len(items)), thread_name_prefix="tron-portfolio") as pool:
+        futures = [pool.submit(contextvars.copy_context().run, func, item) for item in items]
+        return [future.result() for future in futures]
+
+
+def _holdings(address: str) -> tuple:
+    try:
+        return address, tron_client.get_account_tokens(address)["tokens"], None
+    except Exception as e:
+        return address, [], f"{type(e).__name__}: {e}"
+
+
+def get_portfolio(addresses: List[str]) -> dict:
+    """
+    汇总多个地址的持仓并估值
+
+    Args:
+        addresses: TRON 地址列表（重复地址只查询一次）
+
+    Returns:
+        address_count, duplicates, total_value_usd, price_source, unpriced_tokens,
+        holdings（按代币汇总，列 HOLDING_COLUMNS）, addresses（按地址，列 ADDRESS_COLUMNS）,
+        failed（查询失败的地址与原因）
+    """
+    unique = list(dict.fromkeys(addresses))
+    workers = _workers()
+    fetched = _map(_holdings, unique, workers)
+
+    totals: Dict[str, dict] = {}
+    per_address = []
+    failed = []
+    for address, tokens, error in fetched:
+        if error is not None:
+            failed.append({"address": address, "error": error})
+            continue
+        held = []
+        for token in tokens:
+            balance = token.get("balance") or 0
+            if balance <= 0:
+                continue
+            key, symbol = _token_key(token)
+            entry = totals.setdefault(key, {
+                "token": symbol,
+                "type": token.get("token_type", ""),
+                "contract": token.get("contract_address") or "",
+                "balance": 0,
+                "holders": 0,
+            })
+            entry["balance"] += balance
+            entry["holders"] += 1
+            held.append((key, balance))
+        per_address.append((address, held))
+
+    keys = list(totals)
+    prices = dict(zip(keys, _map(
+        lambda key: get_price(totals[key]["token"], totals[key]["contract"] if totals[key]["type"] == "trc20" else ""),
+        keys, workers,
+    )))
+
+    rows = []
+    for key, entry in totals.items():
+        price = prices[key]
+        value = entry["balance"] * price if price is not None else None
+        rows.append([entry["token"], entry["type"], entry["contract"], entry["balance"], entry["holders"], price, value])
+    rows.sort(key=lambda row: (row[6] is None, -(row[6] or 0), -row[3]))
+
+    address_rows = []
+    for address, held in per_address:
+        value = sum(balance * prices[key] for key, balance in held if prices[key] is not None)
+        address_rows.append([address, len(held), value])
+    address_rows.sort(key=lambda row: -row[2])
+
+    return {
+        "address_count": len(unique),
+        "duplicates": len(addresses) - len(unique),
+        "total_value_usd": sum(row[6] for row in rows if row[6] is not None),
+        "price_source": price_source(),
+        "unpriced_tokens": [row[0] for row in rows if row[5] is None],
+        "holdings": {"columns": list(HOLDING_COLUMNS), "rows": rows},
+        "addresses": {"columns": list(ADDRESS_COLUMNS), "rows": address_rows},
+        "failed": failed,
+    }
@@ -6,14 +6,49 @@
 - 支持 JSON 和 Markdown 格式输出
 """
 
-import json
+import functools
+import threading
 
 from mcp.server.fastmcp import FastMCP
 from . import call_router
 from . import config  # 触发 load_dotenv()，确保 API Key 等环境变量被加载
+from . import json_codec
+from . import watcher
+
+
+def _tool_result(result):
+    """字典结果 → CallToolResult，文本内容由 json_codec 序列化（与 FastMCP 默认一样只返回文本内容）"""
+    if not isinstance(result, dict):
+        return result
+    from mcp.types import CallToolResult, TextContent
+
+    return CallToolResult(content=[TextContent(type="text", text=json_codec.dumps(result))])
+
+
+class _FastMCP(FastMCP):
+    """
+    工具结果使用 json_codec 序列化（orjson 可用时更快、输出紧凑），
+    代替 FastMCP 默认的缩进 JSON（pydantic 序列化）。
+
+    注册的是包装函数，模块中的工具函数本身仍直接返回字典，便于直接调用与测试。
+    """
+
+    def tool(self, *args, **kwargs):
+        register = super().tool(*args, **kwargs)
+
+        def decorator(fn):
+            @functools.wraps(fn)
+            def encoded(*fn_args, **fn_kwargs):
+                return _tool_result(fn(*fn_args, **fn_kwargs))
+
+            register(encoded)
+            return fn
+
+        return decorator
+
 
 # 创建 MCP Server 实例
-mcp = FastMCP("tron-mcp-server")
+mcp = _FastMCP("tron-mcp-server")
 
 
 # ============ 标准 MCP 工具（推荐使用）============
@@ -104,7 +139,8 @@ def tron_build_tx(
         from_address: 发送方地址
         to_address: 接收方地址
         amount: 转账金额（正数）
-        token: 代币类型，USDT 或 TRX，默认 USDT
+        token: 代币类型，TRX、TRC20 代币符号（如 USDT、USDC）或合约地址，默认 USDT。
+               未预置的代币请使用合约地址，首次使用时查询一次精度后缓存在本地。
         force_execution: 强制执行开关。当接收方存在风险时，只有设置为 True 才能继续构建交易。
                         仅在用户明确说"我知道有风险，但我就是要转"时才设置为 True。
         memo: 交易备注/留言（可选）。会被编码为十六进制写入交易的 data 字段，
@@ -216,7 +252,8 @@ def tron_transfer(
     Args:
         to_address: 接收方地址
         amount: 转账金额（正数）
-        token: 代币类型，USDT 或 TRX，默认 USDT
+        token: 代币类型，TRX、TRC20 代币符号（如 USDT、USDC）或合约地址，默认 USDT。
+               未预置的代币请使用合约地址，首次使用时查询一次精度后缓存在本地。
         force_execution: 强制执行开关。当接收方存在风险时，
                         只有设置为 True 才能继续转账。
         memo: 交易备注/留言（可选）。会被编码为十六进制写入交易的 data 字段，
@@ -256,6 +293,9 @@ def tron_get_transaction_history(
     limit: int = 10,
     start: int = 0,
     token: str = None,
+    format: str = "full",
+    fields: list = None,
+    include_summary: bool = False,
 ) -> dict:
     """
     查询指定地址的交易历史记录。
@@ -270,8 +310,13 @@ def tron_get_transaction_history(
                - None: 查询所有类型的交易（默认）
                - "TRX": 仅查询 TRX 原生转账
                - "USDT": 仅查询 USDT (TRC20) 转账
+               - 预置 / 已缓存的 TRC20 代币符号（如 "USDC"）: 查询该代币的转账记录
                - TRC20 合约地址: 查询指定 TRC20 代币的转账记录
                - TRC10 代币名称: 查询指定 TRC10 代币的转账记录
+        format: 输出格式，full（默认）或 compact（列表转为 {"columns": [...], "rows": [[...]]} 列式结构，
+                字段名只出现一次，适合大分页）
+        fields: 只返回这些字段（可选，如 ["txid", "amount"]）
+        include_summary: compact 格式下是否保留自然语言摘要（默认不保留）
 
     Returns:
         包含 address, total, displayed, token_filter, transfers 列表和 summary 的结果
@@ -281,6 +326,9 @@ def tron_get_transaction_history(
         "limit": limit,
         "start": start,
         "token": token,
+        "format": format,
+        "fields": fields,
+        "include_summary": include_summary,
     })
 
 
@@ -289,6 +337,9 @@ def tron_get_internal_transactions(
     address: str,
     limit: int = 20,
     start: int = 0,
+    format: str = "full",
+    fields: list = None,
+    include_summary: bool = False,
 ) -> dict:
     """
     查询地址的内部交易（合约内部调用产生的转账）。
@@ -300,6 +351,10 @@ def tron_get_internal_transactions(
         address: TRON 地址
         limit: 返回条数，默认 20，最大 50
         start: 偏移量（分页），默认 0
+        format: 输出格式，full（默认）或 compact（列表转为 {"columns": [...], "rows": [[...]]} 列式结构，
+                字段名只出现一次，适合大分页）
+        fields: 只返回这些字段（可选，如 ["txid", "amount"]）
+        include_summary: compact 格式下是否保留自然语言摘要（默认不保留）
     
     Returns:
         包含内部交易列表和统计摘要的结果
@@ -308,11 +363,19 @@ def tron_get_internal_transactions(
         "address": address,
         "limit": limit,
         "start": start,
+        "format": format,
+        "fields": fields,
+        "include_summary": include_summary,
     })
 
 
 @mcp.tool()
-def tron_get_account_tokens(address: str) -> dict:
+def tron_get_account_tokens(
+    address: str,
+    format: str = "full",
+    fields: list = None,
+    include_summary: bool = False,
+) -> dict:
     """
     查询地址持有的所有代币列表（TRX + TRC20 + TRC10）。
     
@@ -321,11 +384,39 @@ def tron_get_account_tokens(address: str) -> dict:
     
     Args:
         address: TRON 地址
+        format: 输出格式，full（默认）或 compact（列表转为 {"columns": [...], "rows": [[...]]} 列式结构，
+                字段名只出现一次，适合大分页）
+        fields: 只返回这些字段（可选，如 ["txid", "amount"]）
+        include_summary: compact 格式下是否保留自然语言摘要（默认不保留）
     
     Returns:
         包含 token_count, tokens 列表和 summary 的结果
     """
-    return call_router.call("get_account_tokens", {"address": address})
+    return call_router.call("get_account_tokens", {
+        "address": address,
+        "format": format,
+        "fields": fields,
+        "include_summary": include_summary,
+    })
+
+
+@mcp.tool()
+def tron_get_portfolio(addresses: list) -> dict:
+    """
+    多地址资产估值：汇总一批钱包（如全部冷热钱包）持有的代币并按美元估值。
+
+    并发查询各地址持仓，重复地址只查询一次，每种代币只查询一次价格（带缓存）。
+    价格来自 TRONSCAN，或由 TRON_PRICE_SOURCE=static 使用本地价格表。
+
+    Args:
+        addresses: TRON 地址列表（最多 1000 个）
+
+    Returns:
+        包含 total_value_usd, address_count, unpriced_tokens, failed, summary，
+        以及列式结构 holdings（按代币汇总）与 addresses（按地址）的结果：
+        {"columns": [...], "rows": [[...], ...]}
+    """
+    return call_router.call("get_portfolio", {"addresses": addresses})
 
 
 @mcp.tool()
@@ -371,26 +462,71 @@ def tron_get_account_bandwidth(address: str) -> dict:
 
 
 @mcp.tool()
-def tron_addressbook_add(alias: str, address: str, note: str = "") -> dict:
+def tron_estimate_fee(to_address: str, amount: float, token: str = "USDT", from_address: str = "") -> dict:
+    """
+    预估转账手续费（能量 / 带宽 / 激活费明细与需燃烧的 TRX）。
+
+    综合发送方质押的能量与带宽、链上能量 / 带宽单价、接收方是否已持有代币
+    （未持有时 USDT 转账能量约翻倍）以及是否已激活，比固定的 27 TRX 估算准确。
+
+    Args:
+        to_address: 接收方地址
+        amount: 转账金额
+        token: TRX、TRC20 代币符号或合约地址，默认 USDT
+        from_address: 发送方地址，留空使用本地钱包
+
+    Returns:
+        包含 energy_required, energy_burn_sun, bandwidth_required, bandwidth_burn_sun,
+        activation_fee_sun, total_burn_sun, total_burn_trx, summary 的结果
+    """
+    params = {"to": to_address, "amount": amount, "token": token}
+    if from_address:
+        params["from"] = from_address
+    return call_router.call("estimate_fee", params)
+
+
+@mcp.tool()
+def tron_get_account_resources(address: str) -> dict:
+    """
+    一次查询指定地址的能量 (Energy) 与带宽 (Bandwidth) 资源情况。
+
+    同时需要能量和带宽时使用，比分别调用 tron_get_account_energy /
+    tron_get_account_bandwidth 少一次链上查询。
+
+    Args:
+        address: TRON 地址（Base58 格式以 T 开头，或 Hex 格式以 0x41 开头）
+
+    Returns:
+        包含 address, energy（字段同 tron_get_account_energy）,
+        bandwidth（字段同 tron_get_account_bandwidth）, snapshot_age, summary 的结果
+    """
+    return call_router.call("get_account_resources", {"address": address})
+
+
+@mcp.tool()
+def tron_addressbook_add(alias: str, address: str, note: str = "", tags: list = None) -> dict:
     """
     添加或更新地址簿联系人。将别名与 TRON 地址映射保存到本地。
 
     使用场景：
     - "帮我把 TKyPzHiXW4Zms4txUxfWjXBidGzZpiCchn 记成小明"
     - "保存地址，别名叫老板"
+    - "把这个地址记成诈骗地址，打上 scam 标签"
 
     Args:
         alias: 联系人别名（如 "小明"、"老板"、"Binance热钱包"）
         address: TRON 地址（Base58 格式以 T 开头）
         note: 备注信息（可选，如 "大学同学"、"公司财务"）
+        tags: 标签列表（可选，如 ["交易所", "充值地址"]；更新时不传则保留原标签）
 
     Returns:
-        包含 alias, address, is_update, total_contacts, summary 的结果
+        包含 alias, address, tags, is_update, total_contacts, summary 的结果
     """
     return call_router.call("addressbook_add", {
         "alias": alias,
         "address": address,
         "note": note,
+        "tags": tags,
     })
 
 
@@ -431,15 +567,123 @@ def tron_addressbook_lookup(alias: str) -> dict:
 
 
 @mcp.tool()
-def tron_addressbook_list() -> dict:
+def tron_addressbook_list(
+    limit: int = None,
+    offset: int = 0,
+    tag: str = None,
+    format: str = "full",
+    fields: list = None,
+    include_summary: bool = False,
+) -> dict:
     """
-    列出地址簿中所有联系人。
+    列出地址簿中的联系人（按创建时间倒序）。联系人较多时请分页。
+
+    Args:
+        limit: 每页条数（可选，最大 500，默认返回全部）
+        offset: 偏移量（默认 0）
+        tag: 只列出带有该标签的联系人（可选）
+        format: 输出格式，full（默认）或 compact（列表转为 {"columns": [...], "rows": [[...]]} 列式结构，
+                字段名只出现一次，适合大分页）
+        fields: 只返回这些字段（可选，如 ["txid", "amount"]）
+        include_summary: compact 格式下是否保留自然语言摘要（默认不保留）
+
+    Returns:
+        包含 total, offset, limit, contacts 列表和 summary 的结果。
+        每个 contact 包含 alias, address, note, tags, created_at。
+    """
+    return call_router.call("addressbook_list", {
+        "limit": limit,
+        "offset": offset,
+        "tag": tag,
+        "format": format,
+        "fields": fields,
+        "include_summary": include_summary,
+    })
+
+
+@mcp.tool()
+def tron_addressbook_search(query: str = "", tag: str = None, limit: int = 50, offset: int = 0) -> dict:
+    """
+    按关键词或标签搜索地址簿联系人。
+
+    使用场景：
+    - "地址簿里有哪些交易所地址"（按标签搜索）
+    - "找一下备注里写了财务的联系人"（按关键词搜索）
+
+    Args:
+        query: 关键词，在别名、备注、地址中匹配（可选）
+        tag: 标签（可选，query 与 tag 至少提供一个）
+        limit: 每页条数（默认 50，最大 500）
+        offset: 偏移量（默认 0）
+
+    Returns:
+        包含 query, tag, total, offset, limit, contacts 列表和 summary 的结果
+    """
+    return call_router.call("addressbook_search", {
+        "query": query,
+        "tag": tag,
+        "limit": limit,
+        "offset": offset,
+    })
+
+
+@mcp.tool()
+def tron_addressbook_import(
+    path: str = None,
+    content: str = None,
+    contacts: list = None,
+    format: str = None,
+    overwrite: bool = True,
+    dry_run: bool = False,
+) -> dict:
+    """
+    批量导入地址簿联系人。整批校验地址后一次写入，逐行报告错误。
+
+    使用场景：
+    - "把这个 CSV 里的 2000 个地址导入地址簿"
+    - 一次性录入多个交易所充值地址，避免逐个调用 tron_addressbook_add
+
+    CSV 需包含 alias, address 列，可选 note, tags（分号分隔）。
+    JSON 可以是联系人数组，也可以是 {别名: {address, note}} 格式。
+
+    Args:
+        path: 本地 CSV/JSON 文件路径（path / content / contacts 三选一）
+        content: CSV 或 JSON 文本
+        contacts: 联系人数组，如 [{"alias": "小明", "address": "T...", "tags": ["朋友"]}]
+        format: csv / json（可选，默认按扩展名或内容自动判断）
+        overwrite: 别名已存在时是否覆盖（默认 True）
+        dry_run: 只校验并统计，不写入（默认 False）
 
     Returns:
-        包含 total, contacts 列表和 summary 的结果。
-        每个 contact 包含 alias, address, note, created_at。
+        包含 imported, updated, skipped, errors（逐行错误）, total_contacts, summary 的结果
     """
-    return call_router.call("addressbook_list", {})
+    return call_router.call("addressbook_import", {
+        "path": path,
+        "content": content,
+        "contacts": contacts,
+        "format": format,
+        "overwrite": overwrite,
+        "dry_run": dry_run,
+    })
+
+
+@mcp.tool()
+def tron_addressbook_resolve_batch(aliases: list) -> dict:
+    """
+    批量将别名解析为 TRON 地址。合法地址原样返回。
+
+    使用场景：
+    - 批量转账前一次性解析多个收款人
+    - "小明、老板、财务的地址分别是什么"
+
+    Args:
+        aliases: 别名或地址列表（最多 5000 个）
+
+    Returns:
+        包含 total, resolved, failed, results 的结果。
+        results 每项包含 input, found, address；失败项包含 error 与相似别名 suggestions。
+    """
+    return call_router.call("addressbook_resolve_batch", {"aliases": aliases})
 
 
 # ============ QR Code 工具 ============
@@ -473,27 +717,346 @@ def tron_generate_qrcode(
     })
 
 
-def main():
-    """启动 MCP Server（支持 stdio 和 SSE 模式）"""
-    import sys
-    import os
+@mcp.tool()
+def tron_get_server_metrics(format: str = "summary") -> dict:
+    """
+    查看 MCP 服务运行指标，用于排查响应慢的原因。
+
+    包括各动作的调用次数、失败数与耗时（平均 / P50 / P95），
+    TRONSCAN / TronGrid 各接口的请求数、HTTP 状态码、耗时与响应字节数，
+    以及缓存命中率。
+
+    Args:
+        format: summary（默认）或 prometheus（附带 Prometheus 文本格式）
+
+    Returns:
+        包含 actions, upstream, cache, in_flight, summary 的结果
+    """
+    return call_router.call("get_server_metrics", {"format": format})
 
-    # 默认端口（可通过环境变量覆盖）
-    port = int(os.getenv("MCP_PORT", "8765"))
 
-    # 检查命令行参数
-    if len(sys.argv) > 1 and sys.argv[1] == "--sse":
-        # SSE 模式：用 uvicorn 启动 HTTP 服务
+@mcp.tool()
+def tron_get_slow_calls(limit: int = 20, threshold_ms: float = None) -> dict:
+    """
+    查看最近的慢调用，用于定位偶发的慢请求。
+
+    动作耗时超过 TRON_SLOW_CALL_MS 时记录：动作名、脱敏后的参数、
+    各阶段耗时与上游请求列表（URL、状态码、耗时）。
+
+    Args:
+        limit: 返回条数，默认 20
+        threshold_ms: 调整慢调用阈值（毫秒，0 表示关闭），需 TRON_ADMIN_ACTIONS=true
+
+    Returns:
+        包含 threshold_ms, enabled, calls, summary 的结果
+    """
+    params = {"limit": limit}
+    if threshold_ms is not None:
+        params["threshold_ms"] = threshold_ms
+    return call_router.call("get_slow_calls", params)
+
+
+@mcp.tool()
+def tron_admin_profiler(
+    command: str = "status",
+    interval_ms: float = 10,
+    duration_s: float = 60,
+    dump_interval_s: float = 0,
+) -> dict:
+    """
+    管理采样 profiler：在运行中的服务进程里开启 / 停止采样，无需重启。
+
+    采样结果按调用栈聚合，以 folded stacks 格式写入 TRON_PROFILE_DIR，
+    可直接用 flamegraph.pl 或 speedscope 查看。需设置 TRON_ADMIN_ACTIONS=true。
+
+    Args:
+        command: start / stop / status / dump
+        interval_ms: 采样间隔（毫秒），默认 10
+        duration_s: 运行上限（秒），到时自动停止，默认 60
+        dump_interval_s: 定期写出聚合结果的间隔（秒），0 表示仅停止时写出
+
+    Returns:
+        包含 running, samples, top, last_dump, summary 的结果
+    """
+    return call_router.call("admin_profiler", {
+        "command": command,
+        "interval_ms": interval_ms,
+        "duration_s": duration_s,
+        "dump_interval_s": dump_interval_s,
+    })
+
+
+@mcp.tool()
+def tron_watch_address(address: str, token: str = "ALL") -> dict:
+    """
+    监听地址的转入转账，替代反复轮询余额 / 交易记录。
+
+    服务端逐块扫描交易，新到账时向订阅了资源 tron://watch/{address} 的会话
+    推送 notifications/resources/updated；读取该资源即可拿到最新事件。
+    不支持资源订阅的客户端可调用 tron_get_watch_events 增量获取。
+    重复监听同一地址会累加订阅数。
+
+    Args:
+        address: 要监听的 TRON 地址
+        token: ALL（默认）/ TRX / USDT / TRC20
+
+    Returns:
+        包含 address, token, subscribers, uri, summary 的结果
+    """
+    return call_router.call("watch_address", {"address": address, "token": token})
+
+
+@mcp.tool()
+def tron_unwatch_address(address: str) -> dict:
+    """
+    取消一次地址监听，订阅数归零时停止监听该地址。
+
+    Args:
+        address: 已监听的 TRON 地址
+
+    Returns:
+        包含 address, subscribers, watching, summary 的结果
+    """
+    return call_router.call("unwatch_address", {"address": address})
+
+
+@mcp.tool()
+def tron_get_watch_events(address: str, since: int = 0, limit: int = 20) -> dict:
+    """
+    增量获取监听地址的转入事件（开始监听之后的到账）。
+
+    Args:
+        address: 已监听的 TRON 地址
+        since: 上次返回的 cursor，只返回之后的事件，默认 0
+        limit: 返回条数 1-100，默认 20
+
+    Returns:
+        包含 items（txid, block, token, amount, from）, cursor, summary 的结果
+    """
+    return call_router.call("get_watch_events", {"address": address, "since": since, "limit": limit})
+
+
+# ============ 预签名队列 ============
+
+@mcp.tool()
+def tron_queue_transfer(
+    to_address: str,
+    amount: float,
+    token: str = "USDT",
+    broadcast_at: float = None,
+    delay_seconds: float = None,
+    memo: str = "",
+    force_execution: bool = False,
+    id: str = None,
+) -> dict:
+    """
+    预签名转账：现在完成安全检查、构建与签名，到指定时间自动广播（定时发放）。
+
+    交易保存在本地队列文件中，进程重启后继续调度。交易临近过期且尚未到广播时间时
+    会在广播前重新构建并签名（txID 随之变化）。前置条件：需设置环境变量 TRON_PRIVATE_KEY。
+
+    Args:
+        to_address: 接收方地址
+        amount: 转账金额（正数）
+        token: TRX、TRC20 代币符号或合约地址，默认 USDT
+        broadcast_at: 广播时间，Unix 时间戳（秒），与 delay_seconds 二选一，都不填表示立即广播
+        delay_seconds: 多少秒后广播
+        memo: 交易备注（可选）
+        force_execution: 接收方存在风险时强制登记
+        id: 自定义队列 id（可选，重复登记同一 id 会被拒绝，可用于幂等）
+
+    Returns:
+        包含 id, status, txid, broadcast_at, expiration, summary 的登记结果
+    """
+    return call_router.call("queue_transfer", {
+        "to": to_address,
+        "amount": amount,
+        "token": token,
+        "broadcast_at": broadcast_at,
+        "delay_seconds": delay_seconds,
+        "memo": memo,
+        "force_execution": force_execution,
+        "id": id,
+    })
+
+
+@mcp.tool()
+def tron_get_tx_queue(status: str = None, limit: int = 50) -> dict:
+    """
+    查看预签名队列：各状态数量、下一笔计划广播时间、调度线程状态与交易列表。
+
+    Args:
+        status: 只列出该状态（pending / broadcasting / broadcast / failed / cancelled），默认全部
+        limit: 返回条数 1-200，默认 50
+
+    Returns:
+        包含 counts, next_broadcast_at, scheduler, items, summary 的结果
+    """
+    return call_router.call("get_tx_queue", {"status": status, "limit": limit})
+
+
+@mcp.tool()
+def tron_cancel_queued_tx(id: str) -> dict:
+    """
+    取消尚未广播的预签名交易（已签名的交易不会再被广播）。
+
+    Args:
+        id: tron_queue_transfer 返回的队列 id
+
+    Returns:
+        取消后的队列条目
+    """
+    return call_router.call("cancel_queued_tx", {"id": id})
+
+
+# ============ 地址监听推送 ============
+
+_watch_sessions = {}  # 资源 URI -> {会话: 会话所在的事件循环}
+_watch_lock = threading.Lock()
+_watch_installed = False
+
+
+def _drop_watch_session(uri: str, session, future=None) -> None:
+    """推送失败（会话已断开）时移除订阅"""
+    if future is not None and not future.cancelled() and future.exception() is None:
+        return
+    with _watch_lock:
+        sessions = _watch_sessions.get(uri, {})
+        sessions.pop(session, None)
+        if not sessions:
+            _watch_sessions.pop(uri, None)
+
+
+def _notify_watch(address: str, event: dict) -> None:
+    """区块跟随器线程中调用：向订阅了该地址资源的会话推送 resources/updated"""
+    import asyncio
+
+    uri = watcher.resource_uri(address)
+    with _watch_lock:
+        targets = list(_watch_sessions.get(uri, {}).items())
+    for session, loop in targets:
+        coroutine = session.send_resource_updated(uri)
+        try:
+            future = asyncio.run_coroutine_threadsafe(coroutine, loop)
+        except RuntimeError:  # 事件循环已关闭
+            coroutine.close()
+            _drop_watch_session(uri, session)
+            continue
+        future.add_done_callback(functools.partial(_drop_watch_session, uri, session))
+
+
+def _install_watch_resources() -> None:
+    """注册 tron://watch/{address} 资源与订阅处理（启动服务时调用一次）"""
+    import asyncio
+    global _watch_installed
+
+    if _watch_installed:
+        return
+    _watch_installed = True
+    lowlevel = mcp._mcp_server
+
+    @mcp.resource(
+        watcher.URI_PREFIX + "{address}",
+        name="watch_events",
+        description="监听地址最近的转入事件（订阅后有新到账时收到 resources/updated 通知）",
+        mime_type="application/json",
+    )
+    def watch_events(address: str) -> str:
+        result = watcher.events(address, 0, 100)
+        if result is None:
+            result = {"error": "not_found", "summary": f"地址 {address} 未在监听中，请先调用 tron_watch_address"}
+        return json_codec.dumps(result)
+
+    @lowlevel.subscribe_resource()
+    async def subscribe(uri) -> None:
+        session = lowlevel.request_context.session
+        with _watch_lock:
+            _watch_sessions.setdefault(str(uri), {})[session] = asyncio.get_running_loop()
+
+    @lowlevel.unsubscribe_resource()
+    async def unsubscribe(uri) -> None:
+        _drop_watch_session(str(uri), lowlevel.request_context.session)
+
+    # 低层 Server 固定声明 subscribe=False，注册订阅处理后需要对外声明支持
+    get_capabilities = lowlevel.get_capabilities
+
+    def capabilities(*args, **kwargs):
+        result = get_capabilities(*args, **kwargs)
+        if result.resources is not None:
+            result.resources.subscribe = True
+        return result
+
+    lowlevel.get_capabilities = capabilities
+    watcher.add_notifier(_notify_watch)
+
+
+def _metrics_route():
+    """SSE 模式下的 GET /metrics 路由（Prometheus 抓取）"""
+    from starlette.responses import PlainTextResponse
+    from starlette.routing import Route
+    from . import metrics
+
+    async def metrics_endpoint(request):
+        return PlainTextResponse(
+            metrics.render_prometheus(),
+            media_type="text/plain; version=0.0.4; charset=utf-8",
+        )
+
+    return Route("/metrics", metrics_endpoint, methods=["GET"])
+
+
+def _parse_args(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="TRON MCP Server")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--http", action="store_true", help="streamable-HTTP 传输（端点 /mcp，支持多 worker）")
+    mode.add_argument("--sse", action="store_true", help="SSE 传输（端点 /sse，单进程）")
+    parser.add_argument("--host", help="监听地址（MCP_HOST，默认 127.0.0.1）")
+    parser.add_argument("--port", type=int, help="监听端口（MCP_PORT，默认 8765）")
+    parser.add_argument("--workers", type=int, help="worker 进程数（MCP_WORKERS，默认 1）")
+    parser.add_argument("--stateless", action="store_true", default=None, help="无状态 streamable-HTTP（多 worker 时自动开启）")
+    parser.add_argument("--limit-concurrency", type=int, help="单个 worker 的最大并发连接数（MCP_LIMIT_CONCURRENCY）")
+    parser.add_argument("--max-concurrent-calls", type=int, help="单个 worker 同时执行的工具数（MCP_MAX_CONCURRENT_CALLS，默认 32）")
+    parser.add_argument("--graceful-timeout", type=float, help="优雅停机等待秒数（MCP_GRACEFUL_TIMEOUT，默认 30）")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """启动 MCP Server（stdio / streamable-HTTP / SSE）"""
+    args = _parse_args(argv)
+
+    if args.http or args.sse:
         try:
-            import uvicorn
+            import uvicorn  # noqa: F401
         except ImportError:
-            print("❌ SSE 模式需要安装 uvicorn: pip install uvicorn")
-            sys.exit(1)
-        print(f"🚀 TRON MCP Server (SSE) 启动在 http://127.0.0.1:{port}/sse")
-        app = mcp.sse_app()
-        uvicorn.run(app, host="127.0.0.1", port=port, log_level="info")
+            print("❌ HTTP / SSE 模式需要安装 uvicorn: pip install uvicorn")
+            raise SystemExit(1)
+        from . import serving
+        serving.export_settings(
+            transport="http" if args.http else "sse",
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            stateless=args.stateless,
+            limit_concurrency=args.limit_concurrency,
+            max_concurrent_calls=args.max_concurrent_calls,
+            graceful_timeout=args.graceful_timeout,
+        )
+        try:
+            serving.run()
+        except ValueError as e:
+            print(f"❌ {e}")
+            raise SystemExit(2)
     else:
-        # 默认 stdio 模式
+        # 默认 stdio 模式：工具同样在线程池中执行，签名等 CPU 计算不阻塞事件循环
+        from . import block_follower
+        from . import serving
+        from . import tx_queue
+        serving.offload_server_tools(serving._env_int("MCP_MAX_CONCURRENT_CALLS", 32))
+        block_follower.start_from_env()
+        tx_queue.start_from_env()
+        _install_watch_resources()
         mcp.run()
 
 
@@ -0,0 +1,299 @@
+"""生产部署模式 — streamable-HTTP / SSE、多 worker、并发限制与优雅停机
+
+启动方式::
+
+    python -m tron_mcp_server.server --http --host 0.0.0.0 --port 8765 --workers 4
+    python -m tron_mcp_server.server --sse          # 兼容旧的单进程 SSE 模式
+
+- 传输: --http 使用 MCP streamable-HTTP（端点 /mcp），--sse 使用 SSE（端点 /sse）
+- 多 worker: uvicorn 多进程共享监听端口；多 worker 时 streamable-HTTP 自动切换为无状态模式
+  （任意 worker 都能处理任意请求），响应改为普通 JSON。SSE 会话绑定在单个进程内，不支持多 worker
+- 并发: 工具在线程池中执行，事件循环不再被上游请求与签名计算阻塞（stdio 模式同样如此）；
+  MCP_MAX_CONCURRENT_CALLS 限制单个 worker 同时执行的工具数，
+  MCP_LIMIT_CONCURRENCY 限制单个 worker 的并发连接数（超出返回 503），
+  MCP_MAX_SESSIONS 限制有状态模式下的会话数
+- 优雅停机: 收到 SIGTERM / SIGINT 后停止接受新连接，等待进行中的请求完成
+  （MCP_GRACEFUL_TIMEOUT）；随后拒绝新的转账 / 广播 / 预签名登记，等待已开始的转账执行完毕，
+  并停止预签名队列调度线程（等待进行中的广播完成）
+- 缓存: 通过 TRON_CACHE_URL 在 worker 之间共享（见 cache.py）；
+  TRON_BLOCK_FOLLOWER=true 时每个 worker 启动区块跟随器，按区块失效账户缓存（见 block_follower.py）
+- 运维端点: GET /metrics（Prometheus）、GET /healthz（存活与排空状态）
+
+所有配置项都通过 MCP_* 环境变量传给 worker 进程，命令行参数会写入对应的环境变量。
+"""
+
+import contextlib
+import functools
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from . import formatters
+
+logger = logging.getLogger(__name__)
+
+TRANSPORTS = ("http", "sse")
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+
+# 有链上副作用的工具：停机排空期间拒绝新的调用，并等待已开始的调用完成
+WRITE_TOOLS = frozenset({"tron_transfer", "tron_broadcast_tx", "tron_queue_transfer", "tron_cancel_queued_tx"})
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name, "").strip()
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name, "").strip()
+    return float(value) if value else default
+
+
+def load_settings() -> dict:
+    """从 MCP_* 环境变量读取部署配置"""
+    transport = os.getenv("MCP_TRANSPORT", "http").strip().lower()
+    if transport not in TRANSPORTS:
+        raise ValueError(f"不支持的传输方式: {transport}（可选: {', '.join(TRANSPORTS)}）")
+    workers = _env_int("MCP_WORKERS", 1)
+    if workers < 1:
+        raise ValueError("MCP_WORKERS 必须 >= 1")
+    if transport == "sse" and workers > 1:
+        raise ValueError("SSE 会话绑定在单个进程内，不支持多 worker；请使用 --http")
+    stateless = os.getenv("MCP_STATELESS", "").strip().lower()
+    return {
+        "transport": transport,
+        "host": os.getenv("MCP_HOST", "127.0.0.1").strip(),
+        "port": _env_int("MCP_PORT", 8765),
+        "workers": workers,
+        "stateless": workers > 1 or stateless in ("1", "true", "yes", "on"),
+        "limit_concurrency": _env_int("MCP_LIMIT_CONCURRENCY", 0) or None,
+        "max_concurrent_calls": _env_int("MCP_MAX_CONCURRENT_CALLS", 32),
+        "max_sessions": _env_int("MCP_MAX_SESSIONS", 0) or None,
+        "backlog": _env_int("MCP_BACKLOG", 2048),
+        "keep_alive": _env_int("MCP_KEEP_ALIVE", 5),
+        "graceful_timeout": _env_float("MCP_GRACEFUL_TIMEOUT", 30.0),
+        "allowed_hosts": [h.strip() for h in os.getenv("MCP_ALLOWED_HOSTS", "").split(",") if h.strip()],
+    }
+
+
+# ============ 进行中的调用与排空 ============
+
+_state = threading.Condition()
+_in_flight = 0
+_draining = False
+
+
+def in_flight() -> int:
+    """当前 worker 正在执行的工具调用数"""
+    return _in_flight
+
+
+def is_draining() -> bool:
+    return _draining
+
+
+def begin_drain() -> None:
+    """进入排空状态：此后新的转账 / 广播调用直接返回错误"""
+    global _draining
+    with _state:
+        _draining = True
+
+
+def wait_drained(timeout: float) -> bool:
+    """等待进行中的工具调用全部完成；超时返回 False"""
+    deadline = time.monotonic() + timeout
+    with _state:
+        while _in_flight:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            _state.wait(remaining)
+    return True
+
+
+def _reset() -> None:
+    """恢复初始状态（测试使用）"""
+    global _draining, _in_flight
+    with _state:
+        _draining = False
+        _in_flight = 0
+
+
+def run_tool(name: str, fn: Callable, kwargs: dict):
+    """在工作线程中执行一次工具调用，并计入进行中的调用"""
+    global _in_flight
+    with _state:
+        if _draining and name in WRITE_TOOLS:
+            return formatters.format_error("shutting_down", "服务正在停机，未执行该操作，请稍后重试")
+        _in_flight += 1
+    try:
+        return fn(**kwargs)
+    finally:
+        with _state:
+            _in_flight -= 1
+            _state.notify_all()
+
+
+def offload_tools(mcp, tools: Dict[str, Callable], max_concurrent: int) -> None:
+    """
+    把同步工具重新注册为在线程池中执行的异步工具
+
+    FastMCP 直接在事件循环中调用同步工具，一次上游请求就会阻塞整个 worker；
+    改为 anyio.to_thread 后同一 worker 可同时处理多个调用（由 max_concurrent 限制）。
+    工具签名与文档保持不变（functools.wraps），线程中的调用在请求被取消后仍会执行完毕。
+    结果与 _FastMCP.tool 注册的工具一样经 server._tool_result 由 json_codec 序列化。
+    """
+    import anyio
+
+    from .server import _tool_result
+
+    limiter = None
+
+    def _limiter():
+        nonlocal limiter
+        if limiter is None:
+            limiter = anyio.CapacityLimiter(max_concurrent)
+        return limiter
+
+    for name, fn in tools.items():
+        def _wrap(name=name, fn=fn):
+            @functools.wraps(fn)
+            async def tool(**kwargs):
+                return _tool_result(await anyio.to_thread.run_sync(
+                    functools.partial(run_tool, name, fn, kwargs), limiter=_limiter(),
+                ))
+            return tool
+
+        mcp.remove_tool(name)
+        mcp.add_tool(_wrap(), name=name)
+
+
+def offload_server_tools(max_concurrent: int) -> None:
+    """把 server 模块中的全部 tron_* 工具改为在线程池中执行（stdio 与 HTTP / SSE 共用）"""
+    from . import server
+
+    tools = {name: fn for name, fn in vars(server).items() if name.startswith("tron_") and callable(fn)}
+    offload_tools(server.mcp, tools, max_concurrent)
+
+
+# ============ ASGI 应用 ============
+
+
+def _health_route():
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+
+    async def health(request):
+        return JSONResponse(
+            {"status": "draining" if _draining else "ok", "pid": os.getpid(), "in_flight": _in_flight},
+            status_code=503 if _draining else 200,
+        )
+
+    return Route("/healthz", health, methods=["GET"])
+
+
+def _with_drain(app, timeout: float):
+    """在应用 lifespan 结束前排空进行中的工具调用，并停止预签名队列调度线程"""
+    import anyio
+
+    from . import tx_queue
+
+    inner = app.router.lifespan_context
+
+    @contextlib.asynccontextmanager
+    async def lifespan(a):
+        async with inner(a) as state:
+            try:
+                yield state
+            finally:
+                begin_drain()
+                if _in_flight:
+                    logger.info(f"等待 {_in_flight} 个进行中的工具调用完成（最多 {timeout:.0f} 秒）")
+                drained = await anyio.to_thread.run_sync(wait_drained, timeout)
+                if not drained:
+                    logger.warning(f"排空超时，仍有 {_in_flight} 个工具调用未完成")
+                # 调度线程在当前一轮处理（含进行中的广播）结束后退出，避免广播被进程退出打断
+                if not await anyio.to_thread.run_sync(tx_queue.stop, timeout):
+                    logger.warning("预签名队列调度线程未在超时内停止，进行中的广播可能被中断")
+
+    app.router.lifespan_context = lifespan
+    return app
+
+
+def _transport_security(host: str, allowed_hosts: list):
+    """非回环地址监听时按 MCP_ALLOWED_HOSTS 校验 Host 头；未配置则不校验"""
+    from mcp.server.transport_security import TransportSecuritySettings
+
+    if allowed_hosts:
+        return TransportSecuritySettings(
+            enable_dns_rebinding_protection=True,
+            allowed_hosts=allowed_hosts,
+            allowed_origins=[f"{scheme}://{h}" for h in allowed_hosts for scheme in ("http", "https")],
+        )
+    if host in LOOPBACK_HOSTS:
+        return TransportSecuritySettings(
+            enable_dns_rebinding_protection=True,
+            allowed_hosts=["127.0.0.1:*", "localhost:*", "[::1]:*"],
+            allowed_origins=["http://127.0.0.1:*", "http://localhost:*", "http://[::1]:*"],
+        )
+    return None
+
+
+def create_app(settings: Optional[dict] = None):
+    """uvicorn 应用工厂（每个 worker 进程调用一次）"""
+    from . import block_follower
+    from . import server
+    from . import tx_queue
+
+    settings = settings or load_settings()
+    mcp = server.mcp
+    mcp.settings.host = settings["host"]
+    mcp.settings.port = settings["port"]
+    mcp.settings.stateless_http = settings["stateless"]
+    # 无状态模式下直接返回 JSON：SSE 响应流在停机信号到达时会被立即关闭，普通响应则会等待处理完成
+    mcp.settings.json_response = settings["stateless"]
+    mcp.settings.max_sessions = settings["max_sessions"]
+    mcp.settings.transport_security = _transport_security(settings["host"], settings["allowed_hosts"])
+
+    offload_server_tools(settings["max_concurrent_calls"])
+    server._install_watch_resources()
+
+    app = mcp.streamable_http_app() if settings["transport"] == "http" else mcp.sse_app()
+    app.router.routes.append(server._metrics_route())
+    app.router.routes.append(_health_route())
+    block_follower.start_from_env()
+    tx_queue.start_from_env()
+    return _with_drain(app, settings["graceful_timeout"])
+
+
+def export_settings(**overrides) -> None:
+    """把命令行参数写入 MCP_* 环境变量（worker 进程继承）"""
+    for key, value in overrides.items():
+        if value is not None:
+            os.environ[f"MCP_{key.upper()}"] = str(value).lower() if isinstance(value, bool) else str(value)
+
+
+def run() -> None:
+    """按 MCP_* 环境变量启动 uvicorn"""
+    import uvicorn
+
+    settings = load_settings()
+    path = "/mcp" if settings["transport"] == "http" else "/sse"
+    mode = "streamable-HTTP" if settings["transport"] == "http" else "SSE"
+    base = f"http://{settings['host']}:{settings['port']}"
+    print(f"🚀 TRON MCP Server ({mode}) 启动在 {base}{path}（{settings['workers']} 个 worker）")
+    print(f"📊 Prometheus 指标: {base}/metrics  ❤️ 健康检查: {base}/healthz")
+    uvicorn.run(
+        "tron_mcp_server.serving:create_app",
+        factory=True,
+        host=settings["host"],
+        port=settings["port"],
+        workers=settings["workers"],
+        limit_concurrency=settings["limit_concurrency"],
+        backlog=settings["backlog"],
+        timeout_keep_alive=settings["keep_alive"],
+        timeout_graceful_shutdown=settings["graceful_timeout"],
+        log_level="info",
+    )
@@ -0,0 +1,441 @@
+"""签名后端与签名工作池 — transfer / sign_tx / 预签名队列的统一签名入口
+
+TRON_SIGNER 选择签名后端：
+
+- env（默认）: 私钥来自环境变量 TRON_PRIVATE_KEY（key_manager）
+- keystore: 加密的 keystore 文件（Web3 Secret Storage v3 格式，scrypt / pbkdf2 + AES-128-CTR），
+  路径 TRON_KEYSTORE_PATH，口令 TRON_KEYSTORE_PASSWORD 或 TRON_KEYSTORE_PASSWORD_FILE；
+  解密一次后缓存在进程内，文件变化时重新解密
+- daemon: 本地签名守护进程，经 Unix socket（TRON_SIGNER_SOCKET）通信，私钥不进入本进程。
+  协议为每行一个 JSON：{"method": "address"} → {"address": ...}；
+  {"method": "sign", "digest": <64 位十六进制>} → {"signature": <130 位十六进制>}；失败返回 {"error": ...}
+
+工具调用本身已在线程池中执行（stdio 与 HTTP / SSE 均经 serving.offload_tools），签名不会阻塞事件循环：
+
+- 单笔签名（sign）在调用线程中直接执行；TRON_SIGNER_POOL=process 且后端持有本地私钥时提交到进程池
+- 批量签名（sign_many）使用专用工作池（TRON_SIGNER_WORKERS，默认 CPU 核数）：TRON_SIGNER_POOL=auto（默认）/
+  process 且后端持有本地私钥时分发到进程池，各核并行计算椭圆曲线签名，不受 GIL 限制；
+  daemon 后端与 TRON_SIGNER_POOL=thread 时使用线程池
+
+进程池使用 spawn 方式启动，私钥在创建进程池时传给子进程，私钥变化时重建进程池。
+
+本模块仅依赖标准库，ecdsa / pycryptodome 在首次签名或解密时才导入。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("env", "keystore", "daemon")
+POOL_MODES = ("auto", "thread", "process")
+
+
+class SignerError(ValueError):
+    """签名后端未配置、不可用或返回无效结果"""
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name, "").strip()
+    try:
+        return max(1, int(value)) if value else default
+    except ValueError:
+        logger.warning(f"{name}={value!r} 无效，使用默认值 {default}")
+        return default
+
+
+def _check_signature(signature: bytes) -> bytes:
+    if len(signature) != 65:
+        raise SignerError(f"签名长度应为 65 字节，实际 {len(signature)} 字节")
+    return signature
+
+
+# ============ 签名后端 ============
+
+class Signer:
+    """签名后端接口"""
+
+    name = ""
+
+    def get_address(self) -> str:
+        """签名私钥对应的 TRON 地址"""
+        raise NotImplementedError
+
+    def sign_digest(self, digest: bytes) -> bytes:
+        """对 32 字节摘要（txID）签名，返回 r + s + recovery_id 共 65 字节"""
+        raise NotImplementedError
+
+    def private_key(self) -> Optional[str]:
+        """本进程持有的私钥（供进程池使用）；私钥不在本进程时返回 None"""
+        return None
+
+
+class EnvKeySigner(Signer):
+    """环境变量 TRON_PRIVATE_KEY 中的私钥（每次调用时读取）"""
+
+    name = "env"
+
+    def get_address(self) -> str:
+        from . import key_manager
+        return key_manager.get_address_from_private_key(key_manager.load_private_key())
+
+    def sign_digest(self, digest: bytes) -> bytes:
+        from . import key_manager
+        return _check_signature(bytes.fromhex(
+            key_manager.sign_transaction(digest.hex(), key_manager.load_private_key())
+        ))
+
+    def private_key(self) -> Optional[str]:
+        from . import key_manager
+        return key_manager.load_private_key()
+
+
+class KeystoreSigner(Signer):
+    """加密 keystore 文件中的私钥（构造时解密）"""
+
+    name = "keystore"
+
+    def __init__(self, path: str, password: str):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            raise SignerError(f"无法读取 keystore 文件 {path}: {e}") from None
+        self.path = path
+        self._key = decrypt_keystore(data, password)
+        self._address: Optional[str] = None
+
+    def get_address(self) -> str:
+        if self._address is None:
+            from . import key_manager
+            self._address = key_manager.get_address_from_private_key(self._key)
+        return self._address
+
+    def sign_digest(self, digest: bytes) -> bytes:
+        from . import key_manager
+        return _check_signature(bytes.fromhex(key_manager.sign_transaction(digest.hex(), self._key)))
+
+    def private_key(self) -> Optional[str]:
+        return self._key
+
+
+class DaemonSigner(Signer):
+    """本地签名守护进程（Unix socket，每个请求一个连接）"""
+
+    name = "daemon"
+
+    def __init__(self, socket_path: str, timeout: float = 10.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def _request(self, payload: dict) -> dict:
+        if not hasattr(socket, "AF_UNIX"):
+            raise SignerError("当前平台不支持 Unix socket，无法使用 daemon 签名后端")
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(self.timeout)
+                sock.connect(self.socket_path)
+                sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+                with sock.makefile("rb") as f:
+                    line = f.readline()
+        except OSError as e:
+            raise SignerError(f"签名守护进程 {self.socket_path} 不可用: {e}") from None
+        try:
+            response = json.loads(line)
+        except ValueError:
+            raise SignerError("签名守护进程返回了无法解析的响应") from None
+        if not isinstance(response, dict):
+            raise SignerError("签名守护进程返回了无法解析的响应")
+        if response.get("error"):
+            raise SignerError(f"签名守护进程拒绝请求: {response['error']}")
+        return response
+
+    def get_address(self) -> str:
+        address = self._request({"method": "address"}).get("address")
+        if not isinstance(address, str) or not address:
+            raise SignerError("签名守护进程未返回地址")
+        return address
+
+    def sign_digest(self, digest: bytes) -> bytes:
+        signature = self._request({"method": "sign", "digest": digest.hex()}).get("signature")
+        try:
+            raw = bytes.fromhex(signature)
+        except (TypeError, ValueError):
+            raise SignerError("签名守护进程返回的签名不是合法的十六进制") from None
+        return _check_signature(raw)
+
+
+# ============ keystore 格式 ============
+
+def _keccak256(data: bytes) -> bytes:
+    from Crypto.Hash import keccak
+    return keccak.new(digest_bits=256, data=data).digest()
+
+
+def _aes_128_ctr(key: bytes, iv: bytes, data: bytes) -> bytes:
+    from Crypto.Cipher import AES
+    return AES.new(key, AES.MODE_CTR, nonce=b"", initial_value=iv).encrypt(data)
+
+
+def _derive_key(crypto: dict, password: str) -> bytes:
+    kdf = crypto.get("kdf")
+    params = crypto.get("kdfparams") or {}
+    if kdf not in ("scrypt", "pbkdf2"):
+        raise SignerError(f"不支持的 keystore kdf: {kdf}")
+    if kdf == "pbkdf2" and params.get("prf", "hmac-sha256") != "hmac-sha256":
+        raise SignerError(f"不支持的 pbkdf2 prf: {params.get('prf')}")
+    try:
+        salt = bytes.fromhex(params["salt"])
+        dklen = int(params["dklen"])
+        if kdf == "scrypt":
+            n, r, p = int(params["n"]), int(params["r"]), int(params["p"])
+            return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+                                  maxmem=128 * n * r * p + 1024 * 1024, dklen=dklen)
+        return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, int(params["c"]), dklen)
+    except (KeyError, TypeError, ValueError) as e:
+        raise SignerError(f"keystore kdfparams 无效: {e}") from None
+
+
+def decrypt_keystore(data: dict, password: str) -> str:
+    """
+    解密 keystore（Web3 Secret Storage v3），返回 64 位十六进制私钥
+
+    Raises:
+        SignerError: 格式不支持或口令错误（MAC 不符）
+    """
+    crypto = (data.get("crypto") or data.get("Crypto")) if isinstance(data, dict) else None
+    if not isinstance(crypto, dict) or data.get("version") != 3:
+        raise SignerError("keystore 格式无效：仅支持 version 3")
+    if crypto.get("cipher") != "aes-128-ctr":
+        raise SignerError(f"不支持的 keystore cipher: {crypto.get('cipher')}")
+    derived = _derive_key(crypto, password)
+    try:
+        ciphertext = bytes.fromhex(crypto["ciphertext"])
+        iv = bytes.fromhex(crypto["cipherparams"]["iv"])
+        mac = bytes.fromhex(crypto["mac"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise SignerError(f"keystore crypto 字段无效: {e}") from None
+    if _keccak256(derived[16:32] + ciphertext) != mac:
+        raise SignerError("keystore 口令错误（MAC 校验失败）")
+    key = _aes_128_ctr(derived[:16], iv, ciphertext)
+    if len(key) != 32:
+        raise SignerError(f"keystore 私钥长度无效: {len(key)} 字节")
+    return key.hex()
+
+
+def encrypt_keystore(private_key_hex: str, password: str, n: int = 2 ** 18) -> dict:
+    """用 scrypt + AES-128-CTR 加密私钥，返回 keystore（Web3 Secret Storage v3）字典"""
+    import uuid
+    from . import key_manager
+
+    key = bytes.fromhex(private_key_hex)
+    crypto = {
+        "cipher": "aes-128-ctr",
+        "cipherparams": {"iv": os.urandom(16).hex()},
+        "kdf": "scrypt",
+        "kdfparams": {"dklen": 32, "n": n, "r": 8, "p": 1, "salt": os.urandom(32).hex()},
+    }
+    derived = _derive_key(crypto, password)
+    ciphertext = _aes_128_ctr(derived[:16], bytes.fromhex(crypto["cipherparams"]["iv"]), key)
+    crypto["ciphertext"] = ciphertext.hex()
+    crypto["mac"] = _keccak256(derived[16:32] + ciphertext).hex()
+    return {
+        "version": 3,
+        "id": str(uuid.uuid4()),
+        "address": key_manager.get_address_from_private_key(private_key_hex),
+        "crypto": crypto,
+    }
+
+
+# ============ 后端选择 ============
+
+_keystore_cache: dict = {}
+_keystore_lock = threading.Lock()
+
+
+def get_backend() -> str:
+    backend = os.getenv("TRON_SIGNER", "").strip().lower() or "env"
+    if backend not in BACKENDS:
+        raise SignerError(f"TRON_SIGNER={backend} 无效，可选: {', '.join(BACKENDS)}")
+    return backend
+
+
+def _keystore_password() -> str:
+    password_file = os.getenv("TRON_KEYSTORE_PASSWORD_FILE", "").strip()
+    if password_file:
+        try:
+            with open(password_file, "r", encoding="utf-8") as f:
+                return f.read().rstrip("\r\n")
+        except OSError as e:
+            raise SignerError(f"无法读取 keystore 口令文件 {password_file}: {e}") from None
+    password = os.getenv("TRON_KEYSTORE_PASSWORD")
+    if password is None:
+        raise SignerError("未配置 keystore 口令，请设置 TRON_KEYSTORE_PASSWORD 或 TRON_KEYSTORE_PASSWORD_FILE")
+    return password
+
+
+def _keystore_signer() -> KeystoreSigner:
+    path = os.getenv("TRON_KEYSTORE_PATH", "").strip()
+    if not path:
+        raise SignerError("未配置 keystore 文件，请设置环境变量 TRON_KEYSTORE_PATH")
+    password = _keystore_password()
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError as e:
+        raise SignerError(f"无法读取 keystore 文件 {path}: {e}") from None
+    # 口令只以摘要形式参与缓存键
+    cache_key = (path, mtime, hashlib.sha256(password.encode("utf-8")).hexdigest())
+    with _keystore_lock:
+        cached = _keystore_cache.get(path)
+        if cached is not None and cached[0] == cache_key:
+            return cached[1]
+        signer = KeystoreSigner(path, password)
+        _keystore_cache[path] = (cache_key, signer)
+        return signer
+
+
+def get_signer() -> Signer:
+    """
+    按 TRON_SIGNER 返回当前签名后端
+
+    Raises:
+        SignerError / ValueError: 后端未配置或配置无效
+    """
+    backend = get_backend()
+    if backend == "keystore":
+        return _keystore_signer()
+    if backend == "daemon":
+        path = os.getenv("TRON_SIGNER_SOCKET", "").strip()
+        if not path:
+            raise SignerError("未配置签名守护进程，请设置环境变量 TRON_SIGNER_SOCKET")
+        timeout = os.getenv("TRON_SIGNER_TIMEOUT", "").strip()
+        try:
+            return DaemonSigner(path, float(timeout) if timeout else 10.0)
+        except ValueError:
+            raise SignerError(f"TRON_SIGNER_TIMEOUT={timeout} 无效，应为秒数") from None
+    return EnvKeySigner()
+
+
+def get_address() -> str:
+    """当前签名后端的钱包地址"""
+    return get_signer().get_address()
+
+
+# ============ 签名工作池 ============
+
+_pool_lock = threading.Lock()
+_thread_pool: Optional[ThreadPoolExecutor] = None
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_key: Optional[str] = None
+_worker_key: Optional[str] = None
+
+
+def get_pool_mode() -> str:
+    mode = os.getenv("TRON_SIGNER_POOL", "").strip().lower() or "auto"
+    return mode if mode in POOL_MODES else "auto"
+
+
+def _workers() -> int:
+    return _env_int("TRON_SIGNER_WORKERS", os.cpu_count() or 1)
+
+
+def _get_thread_pool() -> ThreadPoolExecutor:
+    global _thread_pool
+    with _pool_lock:
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(max_workers=_workers(), thread_name_prefix="tron-signer")
+        return _thread_pool
+
+
+def _init_worker(private_key_hex: str) -> None:
+    global _worker_key
+    _worker_key = private_key_hex
+
+
+def _sign_in_worker(digest: bytes) -> bytes:
+    from . import key_manager
+    return _check_signature(bytes.fromhex(key_manager.sign_transaction(digest.hex(), _worker_key)))
+
+
+def _get_process_pool(private_key_hex: str) -> ProcessPoolExecutor:
+    global _process_pool, _process_pool_key
+    import multiprocessing
+
+    fingerprint = hashlib.sha256(private_key_hex.encode("ascii")).hexdigest()
+    with _pool_lock:
+        if _process_pool is not None and _process_pool_key != fingerprint:
+            _process_pool.shutdown(wait=False)
+            _process_pool = None
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=_workers(),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(private_key_hex,),
+            )
+            _process_pool_key = fingerprint
+        return _process_pool
+
+
+def _submit_all(signer: Signer, digests: List[bytes], use_processes: bool) -> List[bytes]:
+    private_key = signer.private_key() if use_processes else None
+    if private_key is not None:
+        pool: Executor = _get_process_pool(private_key)
+        futures = [pool.submit(_sign_in_worker, d) for d in digests]
+    else:
+        pool = _get_thread_pool()
+        futures = [pool.submit(signer.sign_digest, d) for d in digests]
+    return [f.result() for f in futures]
+
+
+def sign(digest: bytes) -> bytes:
+    """
+    用当前签名后端对 txID 签名（在调用线程中执行；TRON_SIGNER_POOL=process 时在进程池中执行）
+
+    Returns:
+        65 字节签名
+
+    Raises:
+        SignerError / ValueError: 后端未配置或签名失败
+    """
+    signer = get_signer()
+    if get_pool_mode() == "process" and signer.private_key() is not None:
+        return _submit_all(signer, [digest], True)[0]
+    return signer.sign_digest(digest)
+
+
+def sign_many(digests: List[bytes]) -> List[bytes]:
+    """
+    批量签名，结果与 digests 顺序一致；本地私钥的批量签名分发到进程池并行计算
+
+    任一笔失败时抛出该笔的异常。
+    """
+    if not digests:
+        return []
+    signer = get_signer()
+    mode = get_pool_mode()
+    use_processes = mode == "process" or (mode == "auto" and len(digests) > 1 and _workers() > 1)
+    return _submit_all(signer, list(digests), use_processes)
+
+
+def shutdown() -> None:
+    """关闭签名工作池（下次签名时重新创建）"""
+    global _thread_pool, _process_pool, _process_pool_key
+    with _pool_lock:
+        pools = [p for p in (_thread_pool, _process_pool) if p is not None]
+        _thread_pool = _process_pool = _process_pool_key = None
+    for pool in pools:
+        pool.shutdown(wait=True)
+
+
+def _reset() -> None:
+    """关闭工作池并清空 keystore 缓存（测试用）"""
+    shutdown()
+    with _keystore_lock:
+        _keystore_cache.clear()
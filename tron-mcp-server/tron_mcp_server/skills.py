@@ -1,5 +1,12 @@
 """Skills 清单模块 - 渐进式披露核心"""
 
+# 列表类动作共用的输出格式参数（见 call_router._with_output_format）
+_OUTPUT_FORMAT_PARAMS = {
+    "format": "full（默认）/ compact（列表转为 columns + rows 列式结构，可选）",
+    "fields": "只返回这些字段（可选，列表或逗号分隔）",
+    "include_summary": "compact 格式下是否保留摘要（可选，默认 false）",
+}
+
 # 技能清单常量 - 供 call_router 使用
 SKILLS = [
     {
@@ -44,7 +51,7 @@ SKILLS = [
             "from": "发送方地址",
             "to": "接收方地址",
             "amount": "转账数量 (数字)",
-            "token": "TRX 或 USDT",
+            "token": "TRX、TRC20 代币符号（如 USDT / USDC）或合约地址",
         },
     },
     {
@@ -60,7 +67,7 @@ SKILLS = [
         "params": {
             "to": "接收方地址",
             "amount": "转账数量 (数字)",
-            "token": "TRX 或 USDT",
+            "token": "TRX、TRC20 代币符号（如 USDT / USDC）或合约地址",
             "force_execution": "布尔值，强制执行（接收方有风险时）",
         },
     },
@@ -76,7 +83,8 @@ SKILLS = [
             "address": "TRON 地址",
             "limit": "返回条数（默认 10，最大 50）",
             "start": "偏移量（默认 0）",
-            "token": "代币筛选：TRX / USDT / TRC20合约地址 / TRC10名称（可选）",
+            "token": "代币筛选：TRX / TRC20 代币符号（如 USDT / USDC）/ TRC20合约地址 / TRC10名称（可选）",
+            **_OUTPUT_FORMAT_PARAMS,
         },
     },
     {
@@ -86,6 +94,7 @@ SKILLS = [
             "alias": "联系人别名（如 小明）",
             "address": "TRON 地址",
             "note": "备注（可选）",
+            "tags": "标签列表（可选）",
         },
     },
     {
@@ -100,8 +109,40 @@ SKILLS = [
     },
     {
         "action": "addressbook_list",
-        "desc": "列出地址簿中所有联系人",
-        "params": {},
+        "desc": "列出地址簿中的联系人（支持分页、按标签过滤）",
+        "params": {
+            "limit": "每页条数（可选，最大 500）",
+            "offset": "偏移量（可选，默认 0）",
+            "tag": "标签（可选）",
+            **_OUTPUT_FORMAT_PARAMS,
+        },
+    },
+    {
+        "action": "addressbook_search",
+        "desc": "按关键词（别名/备注/地址）或标签搜索地址簿联系人",
+        "params": {
+            "query": "关键词（可选）",
+            "tag": "标签（可选，与 query 至少提供一个）",
+            "limit": "每页条数（可选，默认 50）",
+            "offset": "偏移量（可选，默认 0）",
+        },
+    },
+    {
+        "action": "addressbook_import",
+        "desc": "批量导入联系人（CSV/JSON，整批校验后一次写入，逐行报告错误）",
+        "params": {
+            "path": "CSV/JSON 文件路径（与 content / contacts 三选一）",
+            "content": "CSV/JSON 文本（可选）",
+            "contacts": "联系人数组 [{alias, address, note, tags}]（可选）",
+            "format": "csv / json（可选，默认自动判断）",
+            "overwrite": "别名已存在时是否覆盖（可选，默认 true）",
+            "dry_run": "只校验不写入（可选，默认 false）",
+        },
+    },
+    {
+        "action": "addressbook_resolve_batch",
+        "desc": "批量将别名解析为 TRON 地址（合法地址原样返回，逐项报告错误）",
+        "params": {"aliases": "别名或地址列表"},
     },
     {
         "action": "generate_qrcode",
@@ -120,6 +161,98 @@ SKILLS = [
         "desc": "查询账户带宽(Bandwidth)资源情况（免费带宽、质押带宽、总可用）",
         "params": {"address": "TRON 地址"},
     },
+    {
+        "action": "estimate_fee",
+        "desc": "预估转账手续费：能量 / 带宽 / 激活费明细与需燃烧的 TRX（考虑质押资源与接收方状态）",
+        "params": {
+            "from": "发送方地址（可选，默认本地钱包）",
+            "to": "接收方地址",
+            "amount": "转账金额",
+            "token": "TRX、TRC20 代币符号或合约地址（默认 USDT）",
+        },
+    },
+    {
+        "action": "get_account_resources",
+        "desc": "一次查询账户能量与带宽（共用一次资源查询，同时需要两者时优先使用）",
+        "params": {"address": "TRON 地址"},
+    },
+    {
+        "action": "get_portfolio",
+        "desc": "多地址资产估值：并发查询持仓，按代币汇总并按美元估值（列式输出）",
+        "params": {"addresses": "TRON 地址列表（最多 1000 个，重复地址只查询一次）"},
+    },
+    {
+        "action": "get_server_metrics",
+        "desc": "查看服务运行指标（各动作耗时、上游接口请求数/错误/耗时、缓存命中率）",
+        "params": {"format": "prometheus 时附带 Prometheus 文本（可选）"},
+    },
+    {
+        "action": "get_slow_calls",
+        "desc": "查看最近超过阈值的慢调用（脱敏参数、阶段耗时、上游请求列表）",
+        "params": {
+            "limit": "返回条数（可选，默认 20）",
+            "threshold_ms": "调整慢调用阈值，0 表示关闭（可选，需 TRON_ADMIN_ACTIONS=true）",
+        },
+    },
+    {
+        "action": "admin_profiler",
+        "desc": "运行时开启 / 停止采样 profiler，输出 folded stacks 火焰图数据（需 TRON_ADMIN_ACTIONS=true）",
+        "params": {
+            "command": "start / stop / status / dump（默认 status）",
+            "interval_ms": "采样间隔毫秒（可选，默认 10）",
+            "duration_s": "运行上限秒数，到时自动停止（可选，默认 60）",
+            "dump_interval_s": "定期写出聚合结果的间隔秒数，0 表示仅停止时写出（可选）",
+        },
+    },
+    {
+        "action": "watch_address",
+        "desc": "监听地址的转入转账，新到账通过资源 tron://watch/{address} 推送，替代反复轮询余额 / 交易记录",
+        "params": {
+            "address": "TRON 地址",
+            "token": "ALL / TRX / USDT / TRC20（可选，默认 ALL）",
+        },
+    },
+    {
+        "action": "unwatch_address",
+        "desc": "取消一次地址监听（订阅数归零时停止监听）",
+        "params": {"address": "TRON 地址"},
+    },
+    {
+        "action": "get_watch_events",
+        "desc": "增量获取监听地址的转入事件（不支持资源订阅的客户端使用）",
+        "params": {
+            "address": "TRON 地址",
+            "since": "上次返回的 cursor（可选，默认 0）",
+            "limit": "返回条数 1-100（可选，默认 20）",
+        },
+    },
+    {
+        "action": "queue_transfer",
+        "desc": "预签名转账：登记时完成安全检查、构建与签名，到 broadcast_at 自动广播（临近过期时重建），用于定时发放",
+        "params": {
+            "to": "接收方地址",
+            "amount": "转账金额",
+            "token": "TRX、TRC20 代币符号或合约地址（可选，默认 USDT）",
+            "broadcast_at": "广播时间 Unix 时间戳（秒，可选，与 delay_seconds 二选一，默认立即）",
+            "delay_seconds": "多少秒后广播（可选）",
+            "memo": "交易备注（可选）",
+            "force_execution": "接收方存在风险时强制登记（可选）",
+            "id": "自定义队列 id（可选，用于幂等）",
+        },
+    },
+    {
+        "action": "get_tx_queue",
+        "desc": "查看预签名队列状态（各状态数量、下一笔广播时间、调度线程）",
+        "params": {
+            "status": "pending / broadcasting / broadcast / failed / cancelled（可选）",
+            "limit": "返回条数 1-200（可选，默认 50）",
+        },
+    },
+    {
+        "action": "cancel_queued_tx",
+        "desc": "取消尚未广播的预签名交易",
+        "params": {"id": "队列 id"},
+    },
 ]
 
 
@@ -0,0 +1,251 @@
+"""代币元数据注册表 — 符号 / 合约地址 → 精度、符号、名称
+
+转账、余额与历史记录需要知道 TRC20 代币的精度，本模块让任意 TRC20 只在首次遇到时查询一次：
+
+- 预置: 主网常用 TRC20（下方 _BUNDLED）与当前网络的 USDT（USDT_CONTRACT_ADDRESS）启动即可用，无需请求
+- 查询: 未知合约通过 TRONSCAN /api/token_trc20 获取元数据，之后写入本地文件
+  （TRON_TOKEN_REGISTRY_PATH，默认 ~/.tron_mcp/tokens.json，按网络分组），进程重启后直接读取
+- 符号: 只能按符号解析已知代币；预置符号不会被同名代币覆盖，查询得到的多个同名代币
+  视为有歧义，必须使用合约地址，防止仿冒代币借用 USDT 等符号
+
+仅依赖标准库；查询时才导入 tron_client。
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+# 原生代币（没有合约地址）
+TRX = {"symbol": "TRX", "name": "Tronix", "contract": "", "decimals": 6}
+
+# 预置代币: (符号, 名称, 合约地址, 精度)
+_BUNDLED = {
+    "mainnet": [
+        ("USDT", "Tether USD", "TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t", 6),
+        ("USDC", "USD Coin", "TEkxiTehnzSmSe2XqrBj4w32RUN966rdz8", 6),
+        ("USDD", "Decentralized USD", "TPYmHEhy5n8TCEfYGqW2rPxsghSfzghPDn", 18),
+        ("TUSD", "TrueUSD", "TUpMhErZL2fhh4sVNULAbNKLokS4GjC1F4", 18),
+        ("WTRX", "Wrapped TRX", "TNUC9Qb1rRpS5CbWLmNMxXBjyFoydXjWFR", 6),
+        ("BTT", "BitTorrent", "TAFjULxiVgT4qWk6UZwjqwZXTSaGaqnVp4", 18),
+        ("JST", "JUST", "TCFLL5dx5ZJdKnWuesXxi1VPwjLVmWZZy9", 18),
+        ("SUN", "SUN", "TSSMHYeV2uE9qYH95DqyoCuNCzEL1NvU3S", 18),
+        ("WIN", "WINkLink", "TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7", 6),
+        ("WBTC", "Wrapped BTC", "TXpw8XeWYeTUd4quDskoUqeQPowRh4jY65", 8),
+    ],
+}
+
+
+class UnknownTokenError(ValueError):
+    """无法识别的代币符号 / 合约，或符号对应多个合约"""
+
+
+class _Network:
+    """单个网络的注册表：合约 → 元数据，符号 → 合约（None 表示有歧义）"""
+
+    def __init__(self):
+        self.tokens: Dict[str, dict] = {}
+        self.symbols: Dict[str, Optional[str]] = {}
+        self.pinned = set()
+
+    def add(self, info: dict, pinned: bool = False) -> None:
+        contract = info["contract"]
+        self.tokens[contract] = info
+        symbol = info["symbol"].upper()
+        if not symbol or symbol == "TRX" or symbol in self.pinned:
+            return
+        if pinned:
+            self.pinned.add(symbol)
+            self.symbols[symbol] = contract
+        elif self.symbols.get(symbol, contract) != contract:
+            self.symbols[symbol] = None
+        else:
+            self.symbols[symbol] = contract
+
+
+_networks: Dict[str, _Network] = {}
+_lock = threading.Lock()
+
+
+def _storage_path() -> Path:
+    custom_path = os.getenv("TRON_TOKEN_REGISTRY_PATH")
+    if custom_path:
+        return Path(custom_path)
+    return Path.home() / ".tron_mcp" / "tokens.json"
+
+
+def _read_file(path: Path) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"读取代币注册表 {path} 失败，忽略本地缓存: {e}")
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _make_info(contract: str, symbol: str, name: str, decimals) -> dict:
+    return {"symbol": str(symbol or ""), "name": str(name or symbol or ""), "contract": contract, "decimals": int(decimals)}
+
+
+def _registry() -> _Network:
+    """当前网络的注册表（首次使用时加载预置代币与本地文件）"""
+    network = config.get_network()
+    with _lock:
+        registry = _networks.get(network)
+        if registry is not None:
+            return registry
+        registry = _Network()
+        # 先登记 USDT_CONTRACT_ADDRESS，自定义的 USDT 合约优先于预置
+        registry.add(_make_info(config.get_usdt_contract(), "USDT", "Tether USD", 6), pinned=True)
+        for symbol, name, contract, decimals in _BUNDLED.get(network, ()):
+            if contract not in registry.tokens:
+                registry.add(_make_info(contract, symbol, name, decimals), pinned=True)
+        stored = _read_file(_storage_path()).get(network) or {}
+        for contract, entry in stored.items():
+            try:
+                if contract not in registry.tokens:
+                    registry.add(_make_info(contract, entry["symbol"], entry.get("name"), entry["decimals"]))
+            except (KeyError, TypeError, ValueError):
+                continue
+        _networks[network] = registry
+        return registry
+
+
+def _persist(network: str, info: dict) -> None:
+    """把查询得到的代币写入本地文件（原子替换），失败只记录日志"""
+    path = _storage_path()
+    try:
+        data = _read_file(path)
+        data.setdefault(network, {})[info["contract"]] = {
+            "symbol": info["symbol"], "name": info["name"], "decimals": info["decimals"],
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+    except OSError as e:
+        logger.warning(f"保存代币注册表 {path} 失败: {e}")
+
+
+def _to_base58(contract: str) -> str:
+    """合约地址统一为 Base58（接受 41 开头的 Hex）"""
+    if len(contract) == 42 and contract.startswith("41"):
+        import base58
+
+        try:
+            return base58.b58encode_check(bytes.fromhex(contract)).decode()
+        except ValueError:
+            return contract
+    return contract
+
+
+def _is_contract(token: str) -> bool:
+    return (token.startswith("T") and len(token) == 34) or (token.startswith("41") and len(token) == 42)
+
+
+def lookup(contract: str, fetch: bool = True) -> Optional[dict]:
+    """
+    按合约地址（Base58 或 41 开头的 Hex）查询代币元数据
+
+    Args:
+        fetch: 注册表中没有时是否查询 TRONSCAN（查询结果写入本地文件）
+
+    Returns:
+        {"symbol", "name", "contract", "decimals"}，未知或查询失败时返回 None
+    """
+    if not contract:
+        return None
+    contract = _to_base58(contract)
+    registry = _registry()
+    info = registry.tokens.get(contract)
+    if info is not None or not fetch:
+        return dict(info) if info else None
+
+    from . import tron_client
+
+    try:
+        metadata = tron_client.get_trc20_token_info(contract)
+        info = _make_info(contract, metadata["symbol"], metadata.get("name"), metadata["decimals"])
+    except Exception as e:
+        logger.warning(f"查询代币 {contract} 元数据失败: {e}")
+        return None
+    with _lock:
+        registry.add(info)
+    _persist(config.get_network(), info)
+    return dict(info)
+
+
+def resolve(token: str, fetch: bool = True) -> dict:
+    """
+    把代币符号或合约地址解析为元数据（TRX 返回 contract 为空的原生代币）
+
+    Raises:
+        UnknownTokenError: 未知符号、符号有歧义或合约元数据无法获取
+    """
+    token = str(token or "").strip()
+    if token.upper() == "TRX":
+        return dict(TRX)
+    if _is_contract(token):
+        info = lookup(token, fetch=fetch)
+        if info is None:
+            raise UnknownTokenError(f"无法获取代币合约 {token} 的元数据")
+        return info
+
+    registry = _registry()
+    symbol = token.upper()
+    if symbol not in registry.symbols:
+        raise UnknownTokenError(f"不支持的代币类型: {token}（未知代币请使用合约地址）")
+    contract = registry.symbols[symbol]
+    if contract is None:
+        raise UnknownTokenError(f"代币符号 {token} 对应多个合约，请使用合约地址")
+    return dict(registry.tokens[contract])
+
+
+def register(contract: str, symbol: str, decimals: int, name: str = "", persist: bool = False) -> dict:
+    """手动登记代币（如预加载自定义代币列表），persist=True 时同时写入本地文件"""
+    info = _make_info(_to_base58(contract), symbol, name, decimals)
+    registry = _registry()
+    with _lock:
+        registry.add(info)
+    if persist:
+        _persist(config.get_network(), info)
+    return dict(info)
+
+
+def list_tokens() -> List[dict]:
+    """当前网络已知的全部 TRC20 代币"""
+    registry = _registry()
+    with _lock:
+        return [dict(info) for info in registry.tokens.values()]
+
+
+def is_native(info: dict) -> bool:
+    return not info.get("contract")
+
+
+def to_raw(amount, decimals: int) -> int:
+    """代币单位金额 → 最小单位（按十进制字符串换算，避免浮点误差）"""
+    return int(Decimal(str(amount)) * (10 ** int(decimals)))
+
+
+def _reset() -> None:
+    """清空已加载的注册表（测试使用）"""
+    with _lock:
+        _networks.clear()
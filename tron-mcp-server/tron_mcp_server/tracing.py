@@ -0,0 +1,325 @@
+"""请求级链路追踪 (span) — 兼容 OpenTelemetry OTLP/JSON
+
+每次 call_router.call 生成一条 trace：
+- 根 span: "action <名称>"
+- 阶段 span: 处理函数内用 tracing.span("transfer.sign") 标记（如转账的 6 个阶段）
+- 上游 span: http_client 的每次请求（方法、完整 URL、状态码）
+- 缓存事件: metrics.record_cache 的每次命中 / 未命中记为所在 span 的事件
+
+导出方式（可同时启用）：
+- TRON_TRACE_FILE: 每条 trace 追加一行 OTLP/JSON（与 OpenTelemetry Collector 文件导出格式一致）
+- TRON_TRACE_ENDPOINT: 后台线程 POST 到 OTLP/HTTP JSON 接收端（如 http://localhost:4318/v1/traces）
+- TRON_MCP_DEBUG=true: 在动作返回值中附加 _timing 摘要
+
+三者都未开启时所有接口都是空操作，热路径只多一次 ContextVar 读取。
+仅依赖标准库（HTTP 导出时才使用 httpx）。
+"""
+
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "tron-mcp-server"
+
+# OTLP SpanKind / StatusCode
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+_debug = _env_flag("TRON_MCP_DEBUG")
+_trace_file = os.getenv("TRON_TRACE_FILE", "").strip() or None
+_trace_endpoint = os.getenv("TRON_TRACE_ENDPOINT", "").strip() or None
+
+_current: contextvars.ContextVar = contextvars.ContextVar("tron_trace_span", default=None)
+
+
+_UNSET = object()
+
+
+def configure(debug=_UNSET, trace_file=_UNSET, endpoint=_UNSET) -> None:
+    """运行时调整追踪配置（未传入的项保持不变；trace_file / endpoint 传 None 表示关闭）"""
+    global _debug, _trace_file, _trace_endpoint
+    if debug is not _UNSET:
+        _debug = bool(debug)
+    if trace_file is not _UNSET:
+        _trace_file = trace_file
+    if endpoint is not _UNSET:
+        _trace_endpoint = endpoint
+
+
+def is_enabled() -> bool:
+    return _debug or _trace_file is not None or _trace_endpoint is not None
+
+
+def debug_enabled() -> bool:
+    return _debug
+
+
+# ============ Span ============
+
+
+class Span:
+    """一个已开始的 span；结束后追加到所属 trace 的 spans 列表"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "kind", "attributes",
+                 "events", "status", "status_message", "start_ns", "end_ns", "_spans")
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, kind: int = KIND_INTERNAL,
+                 attributes: Optional[dict] = None):
+        self.name = name
+        self.kind = kind
+        self.span_id = os.urandom(8).hex()
+        if parent is None:
+            self.trace_id = os.urandom(16).hex()
+            self.parent_id = ""
+            self._spans: List[Span] = []
+        else:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+            self._spans = parent._spans
+        self.attributes = dict(attributes) if attributes else {}
+        self.events: list = []
+        self.status = 0
+        self.status_message = ""
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def add_event(self, name: str, attributes: Optional[dict] = None) -> None:
+        self.events.append((time.time_ns(), name, attributes or {}))
+
+    def set_status(self, error: bool, message: str = "") -> None:
+        self.status = STATUS_ERROR if error else STATUS_OK
+        self.status_message = message
+
+    def end(self) -> None:
+        self.end_ns = time.time_ns()
+        self._spans.append(self)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    @property
+    def spans(self) -> List["Span"]:
+        """所属 trace 中已结束的全部 span（按结束顺序）"""
+        return self._spans
+
+
+class _NoopSpan:
+    """追踪关闭或不在 trace 内时使用的空 span"""
+
+    __slots__ = ()
+
+    def set_attribute(self, key, value):
+        pass
+
+    def add_event(self, name, attributes=None):
+        pass
+
+    def set_status(self, error, message=""):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+@contextlib.contextmanager
+def trace_action(action: str, force: bool = False) -> Iterator[Optional[Span]]:
+    """为一次动作调用开启 trace；追踪关闭且未 force 时产出 None（force 用于慢调用日志）"""
+    if not force and not is_enabled():
+        yield None
+        return
+    root = Span(f"action {action}", kind=KIND_SERVER, attributes={"tron.action": action})
+    token = _current.set(root)
+    try:
+        yield root
+    except BaseException as e:
+        root.set_status(True, repr(e))
+        raise
+    finally:
+        _current.reset(token)
+        root.end()
+        _export(root)
+
+
+@contextlib.contextmanager
+def span(name: str, kind: int = KIND_INTERNAL, **attributes) -> Iterator[object]:
+    """在当前 trace 内开启子 span；不在 trace 内时为空操作"""
+    parent = _current.get()
+    if parent is None:
+        yield NOOP_SPAN
+        return
+    child = Span(name, parent, kind, attributes)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.set_status(True, repr(e))
+        raise
+    finally:
+        _current.reset(token)
+        child.end()
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """把一次缓存查询记为当前 span 的事件"""
+    current = _current.get()
+    if current is not None:
+        current.add_event("cache", {"cache.name": cache, "cache.hit": hit})
+
+
+# ============ 摘要 ============
+
+
+def timing(root: Span) -> dict:
+    """生成 _timing 摘要：阶段耗时、上游请求与缓存命中"""
+    stages = [
+        {"name": s.name, "ms": round(s.duration_ms, 3), **({"error": True} if s.status == STATUS_ERROR else {})}
+        for s in sorted(root.spans, key=lambda s: s.start_ns)
+        if s.parent_id == root.span_id and s.kind == KIND_INTERNAL
+    ]
+    upstream = [
+        {
+            "method": s.attributes.get("http.request.method"),
+            "url": s.attributes.get("url.full"),
+            "status": s.attributes.get("http.response.status_code"),
+            "ms": round(s.duration_ms, 3),
+        }
+        for s in sorted(root.spans, key=lambda s: s.start_ns)
+        if s.kind == KIND_CLIENT
+    ]
+    cache: dict = {}
+    for s in root.spans:
+        for _, name, attrs in s.events:
+            if name == "cache":
+                stats = cache.setdefault(attrs["cache.name"], {"hits": 0, "misses": 0})
+                stats["hits" if attrs["cache.hit"] else "misses"] += 1
+    return {
+        "trace_id": root.trace_id,
+        "total_ms": round(root.duration_ms, 3),
+        "stages": stages,
+        "upstream": upstream,
+        "cache": cache,
+    }
+
+
+# ============ OTLP/JSON 导出 ============
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: dict) -> list:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items() if v is not None]
+
+
+def _otlp_span(s: Span) -> dict:
+    item = {
+        "traceId": s.trace_id,
+        "spanId": s.span_id,
+        "name": s.name,
+        "kind": s.kind,
+        "startTimeUnixNano": str(s.start_ns),
+        "endTimeUnixNano": str(s.end_ns),
+        "attributes": _otlp_attributes(s.attributes),
+        "status": {"code": s.status, **({"message": s.status_message} if s.status_message else {})},
+    }
+    if s.parent_id:
+        item["parentSpanId"] = s.parent_id
+    if s.events:
+        item["events"] = [
+            {"timeUnixNano": str(ts), "name": name, "attributes": _otlp_attributes(attrs)}
+            for ts, name, attrs in s.events
+        ]
+    return item
+
+
+def to_otlp(root: Span) -> dict:
+    """把一条 trace 转为 OTLP ExportTraceServiceRequest (JSON 编码)"""
+    return {"resourceSpans": [{
+        "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})},
+        "scopeSpans": [{
+            "scope": {"name": "tron_mcp_server.tracing"},
+            "spans": [_otlp_span(s) for s in root.spans],
+        }],
+    }]}
+
+
+_file_lock = threading.Lock()
+_queue: Optional[queue.Queue] = None
+_queue_lock = threading.Lock()
+
+
+def _export(root: Span) -> None:
+    if _trace_file is None and _trace_endpoint is None:
+        return
+    try:
+        payload = to_otlp(root)
+        if _trace_file is not None:
+            line = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+            with _file_lock, open(_trace_file, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        if _trace_endpoint is not None:
+            _endpoint_queue().put_nowait((_trace_endpoint, payload))
+    except queue.Full:
+        logger.debug("trace 导出队列已满，丢弃一条 trace")
+    except Exception as e:
+        # 追踪导出失败不能影响业务请求
+        logger.warning(f"trace 导出失败: {e}")
+
+
+def _endpoint_queue() -> queue.Queue:
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = queue.Queue(maxsize=1000)
+                threading.Thread(target=_endpoint_worker, args=(_queue,), name="trace-exporter", daemon=True).start()
+    return _queue
+
+
+def _endpoint_worker(q: queue.Queue) -> None:
+    import httpx
+    while True:
+        endpoint, payload = q.get()
+        try:
+            httpx.post(endpoint, json=payload, timeout=5.0)
+        except Exception as e:
+            logger.debug(f"trace 发送到 {endpoint} 失败: {e}")
+        finally:
+            q.task_done()
+
+
+def flush(timeout: float = 5.0) -> None:
+    """等待后台导出队列清空（测试与进程退出前使用）"""
+    q = _queue
+    if q is None:
+        return
+    deadline = time.monotonic() + timeout
+    while q.unfinished_tasks and time.monotonic() < deadline:
+        time.sleep(0.01)
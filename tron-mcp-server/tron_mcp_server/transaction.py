@@ -0,0 +1,237 @@
+"""交易内部表示 — sign_tx / transfer 签名与广播路径使用的紧凑交易对象
+
+TronGrid 返回的交易同时携带 raw_data（JSON）与 raw_data_hex（protobuf 字节），签名只需要
+txID，广播才需要完整的 JSON。Transaction 只保存：
+
+- raw_data: raw_data_hex 解码后的字节，构造时校验一次 txID == sha256(raw_data)
+- txid: 32 字节交易 ID
+- signatures: 签名字节列表
+- raw_data_json: 原始 raw_data 字典的引用（不复制），仅用于描述交易与广播
+
+to_json() 在广播 / 输出时才组装 TronGrid 的 JSON 结构。缺少 raw_data_hex 的交易无法校验 txID，
+按原样信任（verified 为 False）。
+
+to_protobuf() / from_protobuf() 读写签名交易的 protobuf 字节（protocol.Transaction 的
+raw_data = 1、signature = 2 两个字段），供 wallet/broadcasthex 使用。raw_data 本身已是
+protobuf 字节，无需 protobuf 库。with_expiration() 改写 raw_data 的 expiration 字段（预签名队列
+在签名前把有效期延长到广播时间之后）。
+
+仅依赖标准库。
+"""
+
+import hashlib
+from typing import List, Optional
+
+
+class InvalidTransactionError(ValueError):
+    """交易结构无效，或 txID 与 raw_data_hex 不符"""
+
+
+def _hex_bytes(value, field: str) -> bytes:
+    if not isinstance(value, str):
+        raise InvalidTransactionError(f"{field} 必须是十六进制字符串")
+    try:
+        return bytes.fromhex(value)
+    except ValueError:
+        raise InvalidTransactionError(f"{field} 不是合法的十六进制: {value[:16]}") from None
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _read_varint(data: bytes, pos: int) -> tuple:
+    value = shift = 0
+    while True:
+        if pos >= len(data) or shift > 63:
+            raise InvalidTransactionError("protobuf 数据截断或 varint 过长")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def _length_delimited(field: int, value: bytes) -> bytes:
+    return _varint(field << 3 | 2) + _varint(len(value)) + value
+
+
+def _varint_field(field: int, value: int) -> bytes:
+    return _varint(field << 3) + _varint(value)
+
+
+# protocol.Transaction.raw 的 expiration 字段号
+_EXPIRATION_FIELD = 8
+
+
+class Transaction:
+    """紧凑交易对象（签名前后共用）"""
+
+    __slots__ = ("raw_data", "txid", "signatures", "raw_data_json", "visible")
+
+    def __init__(
+        self,
+        txid: bytes,
+        raw_data: Optional[bytes] = None,
+        raw_data_json: Optional[dict] = None,
+        signatures: Optional[List[bytes]] = None,
+        visible: Optional[bool] = None,
+    ):
+        self.txid = txid
+        self.raw_data = raw_data
+        self.raw_data_json = raw_data_json
+        self.signatures = signatures if signatures is not None else []
+        self.visible = visible
+
+    @classmethod
+    def from_json(cls, tx: dict) -> "Transaction":
+        """
+        从 TronGrid JSON 结构构造，有 raw_data_hex 时校验 txID
+
+        Raises:
+            InvalidTransactionError: 缺少字段、十六进制非法或 txID 与 sha256(raw_data_hex) 不符
+        """
+        if not isinstance(tx, dict):
+            raise InvalidTransactionError("交易必须是 JSON 对象")
+        if "txID" not in tx:
+            raise InvalidTransactionError("交易缺少 txID 字段")
+        if "raw_data" not in tx and "raw_data_hex" not in tx:
+            raise InvalidTransactionError("交易缺少 raw_data 字段")
+
+        txid = _hex_bytes(tx["txID"], "txID")
+        if len(txid) != 32:
+            raise InvalidTransactionError(f"txID 长度应为 32 字节，实际 {len(txid)} 字节")
+
+        raw_data = None
+        if tx.get("raw_data_hex"):
+            raw_data = _hex_bytes(tx["raw_data_hex"], "raw_data_hex")
+            digest = hashlib.sha256(raw_data).digest()
+            if digest != txid:
+                raise InvalidTransactionError(
+                    f"txID 与 raw_data_hex 不符: txID={txid.hex()}，sha256(raw_data_hex)={digest.hex()}"
+                )
+
+        signatures = [_hex_bytes(s, "signature") for s in tx.get("signature") or []]
+        return cls(txid, raw_data, tx.get("raw_data"), signatures, tx.get("visible"))
+
+    @classmethod
+    def from_protobuf(cls, data: bytes) -> "Transaction":
+        """
+        从签名交易的 protobuf 字节构造，txID 由 raw_data 计算（忽略 ret 等其他字段）
+
+        Raises:
+            InvalidTransactionError: 字节无法解析或缺少 raw_data
+        """
+        raw_data = None
+        signatures = []
+        pos = 0
+        while pos < len(data):
+            key, pos = _read_varint(data, pos)
+            field, wire_type = key >> 3, key & 7
+            if wire_type == 0:
+                _, pos = _read_varint(data, pos)
+                continue
+            if wire_type != 2:
+                raise InvalidTransactionError(f"不支持的 protobuf 字段类型: {wire_type}")
+            length, pos = _read_varint(data, pos)
+            if pos + length > len(data):
+                raise InvalidTransactionError("protobuf 数据截断")
+            value = bytes(data[pos:pos + length])
+            pos += length
+            if field == 1:
+                raw_data = value
+            elif field == 2:
+                signatures.append(value)
+        if raw_data is None:
+            raise InvalidTransactionError("交易缺少 raw_data 字段")
+        return cls(hashlib.sha256(raw_data).digest(), raw_data, signatures=signatures)
+
+    @property
+    def txid_hex(self) -> str:
+        return self.txid.hex()
+
+    @property
+    def verified(self) -> bool:
+        """txID 是否已由 raw_data_hex 校验"""
+        return self.raw_data is not None
+
+    def add_signature(self, signature: bytes) -> None:
+        self.signatures.append(signature)
+
+    def with_expiration(self, expiration_ms: int) -> "Transaction":
+        """
+        改写 raw_data 的 expiration（字段 8）后的新交易，txID 重新计算，raw_data JSON 同步更新
+
+        其余字段的字节与顺序保持不变，节点按 raw_data JSON 重新序列化时得到相同的 txID。
+
+        Raises:
+            InvalidTransactionError: 缺少 raw_data_hex、已签名或 raw_data 无法解析
+        """
+        if self.raw_data is None:
+            raise InvalidTransactionError("交易缺少 raw_data_hex，无法修改有效期")
+        if self.signatures:
+            raise InvalidTransactionError("交易已签名，修改有效期会使签名失效")
+        data = self.raw_data
+        expiration = _varint_field(_EXPIRATION_FIELD, expiration_ms)
+        out = bytearray()
+        written = False
+        pos = 0
+        while pos < len(data):
+            start = pos
+            key, pos = _read_varint(data, pos)
+            field, wire_type = key >> 3, key & 7
+            if wire_type == 0:
+                _, pos = _read_varint(data, pos)
+            elif wire_type == 1:
+                pos += 8
+            elif wire_type == 2:
+                length, pos = _read_varint(data, pos)
+                pos += length
+            elif wire_type == 5:
+                pos += 4
+            else:
+                raise InvalidTransactionError(f"不支持的 protobuf 字段类型: {wire_type}")
+            if pos > len(data):
+                raise InvalidTransactionError("protobuf 数据截断")
+            if field >= _EXPIRATION_FIELD and not written:
+                # 原交易没有 expiration 时按字段号顺序插入
+                out += expiration
+                written = True
+            if field != _EXPIRATION_FIELD:
+                out += data[start:pos]
+        if not written:
+            out += expiration
+        raw_data = bytes(out)
+        raw_data_json = dict(self.raw_data_json, expiration=expiration_ms) if self.raw_data_json is not None else None
+        return Transaction(hashlib.sha256(raw_data).digest(), raw_data, raw_data_json, visible=self.visible)
+
+    def to_json(self) -> dict:
+        """转换为 TronGrid 的 JSON 结构（broadcasttransaction 请求体）"""
+        tx = {}
+        if self.visible is not None:
+            tx["visible"] = self.visible
+        tx["txID"] = self.txid.hex()
+        if self.raw_data_json is not None:
+            tx["raw_data"] = self.raw_data_json
+        if self.raw_data is not None:
+            tx["raw_data_hex"] = self.raw_data.hex()
+        if self.signatures:
+            tx["signature"] = [s.hex() for s in self.signatures]
+        return tx
+
+    def to_protobuf(self) -> bytes:
+        """
+        序列化为签名交易的 protobuf 字节（wallet/broadcasthex 请求体）
+
+        Raises:
+            InvalidTransactionError: 缺少 raw_data_hex，无法在本地序列化
+        """
+        if self.raw_data is None:
+            raise InvalidTransactionError("交易缺少 raw_data_hex，无法序列化为 protobuf")
+        return _length_delimited(1, self.raw_data) + b"".join(_length_delimited(2, s) for s in self.signatures)
@@ -1,12 +1,19 @@
 """TRON 客户端模块 - TRONSCAN REST API 封装"""
 
 import logging
+import math
 import os
+import time
 from typing import Optional
 import httpx
 import base58
 
+from . import block_follower
+from . import cache
 from . import config
+from . import http_client
+from . import json_codec
+from . import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -39,10 +46,13 @@ def _get_headers() -> dict:
 
 def _get(path: str, params: Optional[dict] = None) -> dict:
     """发送 GET 请求"""
-    url = f"{_get_api_url()}/{path.lstrip('/')}"
-    response = httpx.get(url, params=params, headers=_get_headers(), timeout=TIMEOUT)
+    endpoint = path.lstrip('/')
+    url = f"{_get_api_url()}/{endpoint}"
+    with metrics.track_upstream("tronscan", endpoint, "GET") as call:
+        response = http_client.get(url, params=params, headers=_get_headers(), timeout=TIMEOUT)
+        call.response(response)
     response.raise_for_status()
-    data = response.json()
+    data = json_codec.response_json(response)
     if data is None:
         raise ValueError("TRONSCAN 响应为空")
     return data
@@ -71,7 +81,59 @@ def _first_not_none(*values):
 
 
 def _get_account(address: str) -> dict:
-    return _get("account", {"address": _normalize_address(address)})
+    normalized = _normalize_address(address)
+    key, ttl = block_follower.account_cache("account", normalized, account_cache_key(normalized))
+    return cache.cached("account", key, ttl, lambda: _get("account", {"address": normalized}))
+
+
+def account_cache_key(address: str) -> str:
+    """账户类缓存（account / account_resource）的键：网络 + Base58 地址"""
+    return f"{config.get_network()}:{address}"
+
+
+def transaction_addresses(transaction: dict) -> set:
+    """
+    交易涉及的账户（Base58）：各合约的发送方 / 接收方，以及 TRC20 transfer / transferFrom 的参数地址
+    """
+    addresses = set()
+    try:
+        contracts = transaction["raw_data"]["contract"]
+    except (KeyError, TypeError):
+        return addresses
+    for contract in contracts or ():
+        try:
+            value = contract["parameter"]["value"]
+        except (KeyError, TypeError):
+            continue
+        candidates = [value.get("owner_address"), value.get("to_address"), value.get("receiver_address")]
+        data = value.get("data") or ""
+        if data.startswith("a9059cbb") and len(data) >= 72:
+            # TRC20 transfer(address,uint256)：接收方在第一个参数的低 20 字节
+            candidates.append("41" + data[32:72])
+        elif data.startswith("23b872dd") and len(data) >= 136:
+            # transferFrom(address,address,uint256)
+            candidates += ["41" + data[32:72], "41" + data[96:136]]
+        for candidate in candidates:
+            if not candidate:
+                continue
+            try:
+                addresses.add(_normalize_address(candidate))
+            except ValueError:
+                continue
+    return addresses
+
+
+def invalidate_addresses(addresses) -> None:
+    """删除这些地址的账户缓存（account / account_resource）"""
+    for address in addresses:
+        for key in block_follower.invalidation_keys(account_cache_key(address)):
+            cache.invalidate("account", key)
+            cache.invalidate("account_resource", key)
+
+
+def invalidate_account_cache(signed_tx: dict) -> None:
+    """广播成功后删除发送方与接收方的账户缓存（余额与资源已变化）"""
+    invalidate_addresses(transaction_addresses(signed_tx))
 
 
 def _normalize_address(address: str) -> str:
@@ -97,7 +159,27 @@ def get_usdt_balance(address: str) -> float:
     查询地址的 USDT 余额
     调用 TRONSCAN account 接口
     """
-    data = _get_account(address)
+    return _usdt_balance(_get_account(address))
+
+
+def _usdt_balance(data: dict) -> float:
+    """从 TRONSCAN 账户数据中读取 USDT 余额"""
+    return _trc20_balance(data, (USDT_CONTRACT_BASE58, USDT_CONTRACT_HEX), 6)
+
+
+def get_trc20_balance(address: str, contract_address: str, decimals: int) -> float:
+    """
+    查询地址的任意 TRC20 代币余额（与 USDT 余额共用账户缓存）
+
+    Args:
+        contract_address: TRC20 合约地址 (Base58)
+        decimals: 代币精度（TRONSCAN 未返回精度时使用，见 token_registry）
+    """
+    return _trc20_balance(_get_account(address), (contract_address,), decimals)
+
+
+def _trc20_balance(data: dict, token_ids: tuple, default_decimals: int) -> float:
+    """从 TRONSCAN 账户数据中读取指定合约的 TRC20 余额"""
     token_balances = _first_not_none(
         data.get("trc20token_balances"),
         data.get("trc20TokenBalances"),
@@ -113,7 +195,7 @@ def get_usdt_balance(address: str) -> float:
             or entry.get("contract_address")
             or entry.get("tokenAddress")
         )
-        if token_id in (USDT_CONTRACT_BASE58, USDT_CONTRACT_HEX):
+        if token_id in token_ids:
             balance_raw = _to_int(
                 _first_not_none(
                     entry.get("balance"),
@@ -127,12 +209,39 @@ def get_usdt_balance(address: str) -> float:
                 entry.get("token_decimals"),
                 entry.get("decimals"),
             )
-            decimals = int(decimals) if decimals is not None else 6
+            decimals = int(decimals) if decimals is not None else default_decimals
             return balance_raw / (10 ** decimals)
 
     return 0.0
 
 
+def get_trc20_token_info(contract_address: str) -> dict:
+    """
+    查询 TRC20 代币元数据
+    调用 TRONSCAN 端点：/api/token_trc20
+
+    Returns:
+        {"symbol", "name", "decimals"}
+
+    Raises:
+        ValueError: 合约不存在或响应缺少精度
+    """
+    data = _get("token_trc20", {"contract": contract_address, "showAll": 1})
+    tokens = data.get("trc20_tokens") or data.get("data") or []
+    for token in tokens:
+        if token.get("contract_address", contract_address) != contract_address:
+            continue
+        decimals = _first_not_none(token.get("decimals"), token.get("tokenDecimal"))
+        if decimals is None:
+            break
+        return {
+            "symbol": token.get("symbol") or token.get("tokenAbbr") or "",
+            "name": token.get("name") or token.get("tokenName") or "",
+            "decimals": _to_int(decimals),
+        }
+    raise ValueError(f"TRONSCAN 未找到 TRC20 合约 {contract_address}")
+
+
 def get_balance_trx(address: str) -> float:
     """
     查询地址的 TRX 余额
@@ -151,11 +260,12 @@ def get_balance_trx(address: str) -> float:
     return balance_sun / 1_000_000
 
 
-def get_gas_parameters() -> int:
-    """
-    获取当前网络 Gas 价格 (SUN)
-    """
-    data = _get("chainparameters")
+def _chain_parameters() -> list:
+    """链参数列表（chain_parameters 缓存，TRON_CACHE_TTL_CHAIN_PARAMS）"""
+    data = cache.cached(
+        "chain_parameters", _get_api_url(), config.get_cache_ttl("chain_params"),
+        lambda: _get("chainparameters"),
+    )
     params = (
         data.get("tronParameters")
         or data.get("chainParameter")
@@ -164,21 +274,54 @@ def get_gas_parameters() -> int:
     )
     if not isinstance(params, list):
         raise ValueError("TRONSCAN 响应缺少 chainParameter")
+    return params
+
+
+def _find_param(params: list, key: str):
+    for item in params:
+        if item.get("key") == key or item.get("name") == key:
+            return item.get("value") or item.get("valueStr")
+    return None
 
-    def _find_param(key: str):
-        for item in params:
-            if item.get("key") == key or item.get("name") == key:
-                return item.get("value") or item.get("valueStr")
-        return None
 
-    value = _find_param("getEnergyFee")
+def get_gas_parameters() -> int:
+    """
+    获取当前网络 Gas 价格 (SUN)
+    """
+    params = _chain_parameters()
+    value = _find_param(params, "getEnergyFee")
     if value is None:
-        value = _find_param("getTransactionFee")
+        value = _find_param(params, "getTransactionFee")
     if value is None:
         raise ValueError("TRONSCAN 响应缺少能量费用参数")
     return _to_int(value)
 
 
+def get_chain_prices() -> dict:
+    """
+    获取手续费相关的链参数 (SUN)，与 get_gas_parameters 共用链参数缓存
+
+    Returns:
+        energy_price_sun: 每单位能量价格 (getEnergyFee)
+        bandwidth_price_sun: 每字节带宽价格 (getTransactionFee)
+        create_new_account_fee_sun: 转账激活新账户的创建费 (getCreateNewAccountFeeInSystemContract，缺省 1 TRX)
+        create_account_fee_sun: 创建账户交易在质押带宽不足时燃烧的费用 (getCreateAccountFee，缺省 0.1 TRX)
+    """
+    params = _chain_parameters()
+    energy_price = _find_param(params, "getEnergyFee")
+    bandwidth_price = _find_param(params, "getTransactionFee")
+    if energy_price is None or bandwidth_price is None:
+        raise ValueError("TRONSCAN 响应缺少能量 / 带宽费用参数")
+    return {
+        "energy_price_sun": _to_int(energy_price),
+        "bandwidth_price_sun": _to_int(bandwidth_price),
+        "create_account_fee_sun": _to_int(_first_not_none(_find_param(params, "getCreateAccountFee"), 100_000)),
+        "create_new_account_fee_sun": _to_int(
+            _first_not_none(_find_param(params, "getCreateNewAccountFeeInSystemContract"), 1_000_000)
+        ),
+    }
+
+
 def get_transaction_status(txid: str) -> dict:
     """
     查询交易状态，返回详细信息字典：
@@ -191,7 +334,13 @@ def get_transaction_status(txid: str) -> dict:
     - timestamp: 交易时间戳 (毫秒)
     - fee: 手续费 (SUN)
     """
-    data = _get("transaction-info", {"hash": _normalize_txid(txid)})
+    normalized_txid = _normalize_txid(txid)
+    # 只缓存已固化的交易：确认前结果仍可能变化
+    data = cache.cached(
+        "tx_status", f"{_get_api_url()}|{normalized_txid}", config.get_cache_ttl("tx_status"),
+        lambda: _get("transaction-info", {"hash": normalized_txid}),
+        cacheable=lambda info: bool(info) and info.get("confirmed") is True,
+    )
     if not data:
         raise ValueError("交易不存在或尚未确认")
 
@@ -274,8 +423,14 @@ def get_network_status() -> int:
 def get_latest_block_info() -> dict:
     """
     获取最新区块信息（用于构建交易）
+
+    参考区块在约 18 小时内都有效，可用 TRON_CACHE_TTL_REF_BLOCK 缓存几秒，
+    连续构建交易时不必每次查询最新区块。
     """
-    data = _get("block", {"sort": "-number", "limit": 1, "start": 0})
+    data = cache.cached(
+        "ref_block", _get_api_url(), config.get_cache_ttl("ref_block"),
+        lambda: _get("block", {"sort": "-number", "limit": 1, "start": 0}),
+    )
     blocks = data.get("data") if isinstance(data, dict) else None
     if not blocks:
         raise ValueError("TRONSCAN 未返回最新区块")
@@ -318,6 +473,15 @@ def check_account_risk(address: str) -> dict:
         - raw_info: 原始风险数据字符串 (兼容旧接口)
     """
     normalized_addr = _normalize_address(address)
+    # 降级报告（安全接口失败）不缓存，下次调用重新检查
+    return cache.cached(
+        "risk", f"{config.get_tronscan_security_api_url()}|{normalized_addr}", config.get_cache_ttl("risk"),
+        lambda: _check_account_risk(normalized_addr),
+        cacheable=lambda report: report.get("risk_type") not in ("Unknown", "Partially Verified"),
+    )
+
+
+def _check_account_risk(normalized_addr: str) -> dict:
     headers = _get_headers()
     
     # 初始化完整报告结构
@@ -346,9 +510,11 @@ def check_account_risk(address: str) -> dict:
     
     # --- Layer 1: Account V2 API (查标签 + 投诉) ---
     try:
-        account_url = "https://apilist.tronscanapi.com/api/accountv2"
-        response = httpx.get(account_url, params={"address": normalized_addr}, headers=headers, timeout=TIMEOUT)
-        data_v2 = response.json()
+        account_url = f"{config.get_tronscan_security_api_url()}/accountv2"
+        with metrics.track_upstream("tronscan", "accountv2", "GET") as call:
+            response = http_client.get(account_url, params={"address": normalized_addr}, headers=headers, timeout=TIMEOUT)
+            call.response(response)
+        data_v2 = json_codec.response_json(response)
         v2_success = True
         
         red_tag = data_v2.get("redTag") or ""
@@ -388,9 +554,11 @@ def check_account_risk(address: str) -> dict:
     
     # --- Layer 2: Security Service API (查黑产行为) ---
     try:
-        security_url = "https://apilist.tronscanapi.com/api/security/account/data"
-        response = httpx.get(security_url, params={"address": normalized_addr}, headers=headers, timeout=TIMEOUT)
-        data_sec = response.json()
+        security_url = f"{config.get_tronscan_security_api_url()}/security/account/data"
+        with metrics.track_upstream("tronscan", "security/account/data", "GET") as call:
+            response = http_client.get(security_url, params={"address": normalized_addr}, headers=headers, timeout=TIMEOUT)
+            call.response(response)
+        data_sec = json_codec.response_json(response)
         sec_success = True
         
         is_black_list = bool(data_sec.get("is_black_list", False))
@@ -486,13 +654,15 @@ def broadcast_transaction(signed_tx: dict) -> dict:
     if "signature" not in signed_tx or not signed_tx["signature"]:
         raise ValueError("交易未签名：缺少 signature 字段")
 
-    url = "https://api.trongrid.io/wallet/broadcasttransaction"
+    url = f"{config.get_trongrid_url()}/wallet/broadcasttransaction"
     headers = _get_headers()
     headers["Content-Type"] = "application/json"
 
-    response = httpx.post(url, json=signed_tx, headers=headers, timeout=TIMEOUT)
+    with metrics.track_upstream("trongrid", "wallet/broadcasttransaction", "POST") as call:
+        response = http_client.post(url, json=signed_tx, headers=headers, timeout=TIMEOUT)
+        call.response(response)
     response.raise_for_status()
-    data = response.json()
+    data = json_codec.response_json(response)
 
     if not data.get("result", False):
         error_msg = data.get("message", "Unknown error")
@@ -504,6 +674,7 @@ def broadcast_transaction(signed_tx: dict) -> dict:
                 pass
         raise ValueError(f"广播失败: {error_msg}")
 
+    invalidate_account_cache(signed_tx)
     return {
         "result": True,
         "txid": data.get("txid", signed_tx.get("txID", "")),
@@ -524,8 +695,11 @@ def get_account_status(address: str) -> dict:
     1. 向未激活地址转账 TRC20 会消耗更多 Energy（SSTORE 指令）
     2. 如果接收方没有 TRX，可能无法转出代币
     """
-    data = _get_account(_normalize_address(address))
-    
+    return _account_status(_get_account(_normalize_address(address)), address)
+
+
+def _account_status(data: dict, address: str) -> dict:
+    """从 TRONSCAN 账户数据中读取激活状态（见 get_account_status）"""
     # 获取 TRX 余额 (SUN)
     trx_balance = _to_int(
         _first_not_none(
@@ -564,6 +738,21 @@ def get_account_status(address: str) -> dict:
     }
 
 
+def get_recipient_state(address: str) -> dict:
+    """
+    接收方状态（一次账户查询，命中 account 缓存）
+
+    Returns:
+        is_activated: 账户是否已激活（TRX 转账到未激活账户需支付创建费）
+        holds_usdt: 是否已持有 USDT（未持有时 TRC20 transfer 需写入新的存储槽，能量约翻倍）
+    """
+    data = _get_account(_normalize_address(address))
+    return {
+        "is_activated": _account_status(data, address)["is_activated"],
+        "holds_usdt": _usdt_balance(data) > 0,
+    }
+
+
 def get_transfer_history(address: str, limit: int = 10, start: int = 0, token: Optional[str] = None) -> dict:
     """
     查询 TRX 和 TRC10 转账记录
@@ -623,6 +812,35 @@ def get_trc20_transfer_history(
     return _get("token_trc20/transfers", params)
 
 
+def get_token_price_usd(token: str) -> float:
+    """
+    查询代币美元价格
+    TRX 调用 TRONSCAN 端点：/api/token/price（该端点只提供 TRX 价格）
+    TRC20 调用 TRONSCAN 端点：/api/token_trc20（market_info.priceInUsd）
+
+    Args:
+        token: trx 或 TRC20 合约地址
+
+    Raises:
+        ValueError: 不支持的代币，或响应缺少价格
+    """
+    if token.lower() == "trx":
+        data = _get("token/price", {"token": "trx"})
+        price = _first_not_none(data.get("price_in_usd"), data.get("priceInUsd"))
+    elif token.startswith("T") and len(token) == 34:
+        data = _get("token_trc20", {"contract": token, "showAll": 1})
+        tokens = data.get("trc20_tokens") or data.get("data") or []
+        price = next((
+            (item.get("market_info") or {}).get("priceInUsd")
+            for item in tokens if item.get("contract_address", token) == token
+        ), None)
+    else:
+        raise ValueError(f"TRONSCAN 不提供 {token} 的价格")
+    if price is None:
+        raise ValueError(f"TRONSCAN 未返回 {token} 的价格")
+    return float(price)
+
+
 def get_internal_transactions(address: str, limit: int = 20, start: int = 0) -> dict:
     """
     查询地址的内部交易（合约内部调用产生的转账）
@@ -735,29 +953,43 @@ def get_account_tokens(address: str) -> dict:
     }
 
 
-def get_account_energy(address: str) -> dict:
+# 带宽与能量的消耗在 24 小时内线性恢复（免费带宽每日 600 点即按此模型恢复）
+RESOURCE_RECOVERY_SECONDS = 24 * 3600
+
+
+def _recovered(used: int, elapsed: float) -> int:
+    """已用资源经过 elapsed 秒后的剩余用量（向上取整，偏保守）"""
+    if used <= 0 or elapsed <= 0:
+        return used
+    return math.ceil(used * max(0.0, 1 - elapsed / RESOURCE_RECOVERY_SECONDS))
+
+
+def _resource_snapshot(address: str) -> tuple:
     """
-    查询账户能量(Energy)资源情况
-    
-    通过 TronGrid /wallet/getaccountresource 接口获取真实链上数据。
-    
-    Args:
-        address: TRON 地址
-    
-    Returns:
-        包含 energy_limit, energy_used, energy_remaining 等字段的字典
+    读取账户资源快照并推算到当前时刻，返回 (规范化地址, 资源数据, 快照年龄秒数)
+
+    快照来自缓存时，按 24 小时线性恢复模型扣减期间恢复的用量，
+    而不是为了拿到最新的已用量重新请求；账户发生交易后缓存由广播 / 区块跟随器失效。
     """
     from . import trongrid_client
-    
+
     normalized = _normalize_address(address)
-    data = trongrid_client.get_account_resource(normalized)
-    
+    data, fetched_at = trongrid_client.get_account_resource_snapshot(normalized)
+    age = max(0.0, time.time() - fetched_at)
+    if age > 0:
+        data = dict(data)
+        for field in ("freeNetUsed", "NetUsed", "EnergyUsed"):
+            if field in data:
+                data[field] = _recovered(data[field], age)
+    return normalized, data, age
+
+
+def _energy_fields(data: dict) -> dict:
     energy_limit = data.get("EnergyLimit", 0)
     energy_used = data.get("EnergyUsed", 0)
     energy_remaining = max(0, energy_limit - energy_used)
     
     return {
-        "address": normalized,
         "energy_limit": energy_limit,
         "energy_used": energy_used,
         "energy_remaining": energy_remaining,
@@ -766,23 +998,7 @@ def get_account_energy(address: str) -> dict:
     }
 
 
-def get_account_bandwidth(address: str) -> dict:
-    """
-    查询账户带宽(Bandwidth)资源情况
-    
-    通过 TronGrid /wallet/getaccountresource 接口获取真实链上数据。
-    
-    Args:
-        address: TRON 地址
-    
-    Returns:
-        包含 free_net_limit, free_net_used, net_limit, net_used 等字段的字典
-    """
-    from . import trongrid_client
-    
-    normalized = _normalize_address(address)
-    data = trongrid_client.get_account_resource(normalized)
-    
+def _bandwidth_fields(data: dict) -> dict:
     # 免费带宽
     free_net_limit = data.get("freeNetLimit", 600)
     free_net_used = data.get("freeNetUsed", 0)
@@ -799,7 +1015,6 @@ def get_account_bandwidth(address: str) -> dict:
     total_remaining = free_net_remaining + net_remaining
     
     return {
-        "address": normalized,
         "free_net_limit": free_net_limit,
         "free_net_used": free_net_used,
         "free_net_remaining": free_net_remaining,
@@ -812,3 +1027,55 @@ def get_account_bandwidth(address: str) -> dict:
         "total_net_limit": data.get("TotalNetLimit", 0),
         "total_net_weight": data.get("TotalNetWeight", 0),
     }
+
+
+def get_account_energy(address: str) -> dict:
+    """
+    查询账户能量(Energy)资源情况
+    
+    通过 TronGrid /wallet/getaccountresource 接口获取真实链上数据。
+    
+    Args:
+        address: TRON 地址
+    
+    Returns:
+        包含 energy_limit, energy_used, energy_remaining 等字段的字典
+    """
+    normalized, data, _ = _resource_snapshot(address)
+    return {"address": normalized, **_energy_fields(data)}
+
+
+def get_account_bandwidth(address: str) -> dict:
+    """
+    查询账户带宽(Bandwidth)资源情况
+    
+    通过 TronGrid /wallet/getaccountresource 接口获取真实链上数据。
+    
+    Args:
+        address: TRON 地址
+    
+    Returns:
+        包含 free_net_limit, free_net_used, net_limit, net_used 等字段的字典
+    """
+    normalized, data, _ = _resource_snapshot(address)
+    return {"address": normalized, **_bandwidth_fields(data)}
+
+
+def get_account_resources(address: str) -> dict:
+    """
+    一次查询账户的能量与带宽（共用一份资源快照）
+    
+    Args:
+        address: TRON 地址
+    
+    Returns:
+        包含 address, energy（同 get_account_energy）, bandwidth（同 get_account_bandwidth）,
+        snapshot_age（快照年龄，秒）的字典
+    """
+    normalized, data, age = _resource_snapshot(address)
+    return {
+        "address": normalized,
+        "energy": _energy_fields(data),
+        "bandwidth": _bandwidth_fields(data),
+        "snapshot_age": round(age, 3),
+    }
@@ -10,13 +10,22 @@ TronGrid 返回的交易包含 protobuf 序列化的 raw_data_hex 和正确的 t
 
 import os
 import logging
+import threading
+import time
 from decimal import Decimal
-from typing import Optional
+from typing import Dict, Optional
 
 import httpx
 import base58
 
+from . import block_follower
+from . import cache
 from . import config
+from . import http_client
+from . import json_codec
+from . import metrics
+from . import tron_client
+from . import transaction
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +43,15 @@ DEFAULT_FEE_LIMIT = int(os.getenv("TRONGRID_FEE_LIMIT", "100000000"))
 # SUN 与 TRX 的转换倍数
 SUN_PER_TRX = 1_000_000
 
+# 广播方式: json（wallet/broadcasttransaction）/ hex（wallet/broadcasthex，发送本地序列化的 protobuf）
+BROADCAST_MODES = ("json", "hex")
+
+
+def get_broadcast_mode() -> str:
+    """读取 TRON_BROADCAST_MODE，默认 json"""
+    mode = os.getenv("TRON_BROADCAST_MODE", "json").strip().lower()
+    return mode if mode in BROADCAST_MODES else "json"
+
 
 def _get_trongrid_url() -> str:
     """获取 TronGrid API URL"""
@@ -51,10 +69,13 @@ def _get_headers() -> dict:
 
 def _post(path: str, data: dict) -> dict:
     """发送 POST 请求到 TronGrid"""
-    url = f"{_get_trongrid_url()}/{path.lstrip('/')}"
-    response = httpx.post(url, json=data, headers=_get_headers(), timeout=TIMEOUT)
+    endpoint = path.lstrip('/')
+    url = f"{_get_trongrid_url()}/{endpoint}"
+    with metrics.track_upstream("trongrid", endpoint, "POST") as call:
+        response = http_client.post(url, json=data, headers=_get_headers(), timeout=TIMEOUT)
+        call.response(response)
     response.raise_for_status()
-    result = response.json()
+    result = json_codec.response_json(response)
     if result is None:
         raise ValueError("TronGrid 响应为空")
     return result
@@ -171,17 +192,9 @@ def build_trc20_transfer(
     if fee_limit is None:
         fee_limit = DEFAULT_FEE_LIMIT
 
-    # 编码 transfer(address,uint256) 参数
-    to_hex = _base58_to_hex(to_address)
-    # 去掉 41 前缀，补齐到 64 字符
-    to_hex_no_prefix = to_hex[2:] if to_hex.startswith("41") else to_hex
-    to_padded = to_hex_no_prefix.zfill(64)
-
     # 金额转换为最小单位
     amount_raw = int(Decimal(str(amount)) * (10 ** decimals))
-    amount_padded = hex(amount_raw)[2:].zfill(64)
-
-    parameter = to_padded + amount_padded
+    parameter = _transfer_parameter(to_address, amount_raw)
 
     data = {
         "owner_address": _base58_to_hex(owner_address),
@@ -201,14 +214,7 @@ def build_trc20_transfer(
 
     # 检查结果
     if not result.get("result", {}).get("result", False):
-        error_msg = result.get("result", {}).get("message", "Unknown error")
-        # TronGrid 返回的 message 可能是 hex 编码
-        if isinstance(error_msg, str) and all(c in "0123456789abcdefABCDEF" for c in error_msg):
-            try:
-                error_msg = bytes.fromhex(error_msg).decode("utf-8", errors="ignore")
-            except Exception:
-                pass
-        raise ValueError(f"TronGrid 构建 TRC20 交易失败: {error_msg}")
+        raise ValueError(f"TronGrid 构建 TRC20 交易失败: {_result_message(result)}")
 
     transaction = result.get("transaction")
     if not transaction or "txID" not in transaction:
@@ -217,17 +223,139 @@ def build_trc20_transfer(
     return transaction
 
 
+# 能量模拟结果的默认缓存时间（秒）：结果只取决于合约代码、方法与接收方存储槽是否为空，
+# 合约的动态能量惩罚按维护周期（6 小时）调整，10 分钟内可视为不变
+ENERGY_SIMULATION_TTL = 600
+
+_TRC20_TRANSFER = "transfer(address,uint256)"
+
+# 同一模拟键的并发请求只模拟一次（大批量代发时所有转账等待同一次模拟）
+_simulation_locks: Dict[str, threading.Lock] = {}
+_simulation_locks_guard = threading.Lock()
+
+
+def trigger_constant_contract(
+    owner_address: str,
+    contract_address: str,
+    function_selector: str,
+    parameter: str,
+) -> int:
+    """
+    通过 /wallet/triggerconstantcontract 模拟执行合约调用，返回消耗的能量
+
+    模拟按链上当前状态执行（如接收方存储槽是否为空），结果包含合约的动态能量惩罚 energy_penalty。
+    不产生交易，也不消耗资源。
+
+    Raises:
+        ValueError: 模拟失败或执行回滚（如发送方代币余额不足）
+    """
+    data = {
+        "owner_address": _base58_to_hex(owner_address),
+        "contract_address": _base58_to_hex(contract_address),
+        "function_selector": function_selector,
+        "parameter": parameter,
+        "visible": False,
+    }
+    result = _post("wallet/triggerconstantcontract", data)
+    if not result.get("result", {}).get("result", False):
+        raise ValueError(f"TronGrid 模拟合约调用失败: {_result_message(result)}")
+    ret = ((result.get("transaction") or {}).get("ret") or [{}])[0]
+    if ret.get("ret") == "FAILED" or "energy_used" not in result:
+        raise ValueError("TronGrid 模拟合约调用执行回滚")
+    return int(result["energy_used"]) + int(result.get("energy_penalty") or 0)
+
+
+def simulate_trc20_transfer(
+    owner_address: str,
+    to_address: str,
+    amount_raw: int,
+    contract_address: Optional[str] = None,
+) -> int:
+    """
+    模拟 TRC20 transfer 并返回消耗的能量（不缓存，见 estimate_trc20_transfer_energy）
+
+    Args:
+        owner_address: 发送方地址
+        to_address: 接收方地址
+        amount_raw: 转账金额（最小单位）
+        contract_address: TRC20 合约地址, 默认 USDT
+
+    Raises:
+        ValueError: 模拟失败或执行回滚
+    """
+    return trigger_constant_contract(
+        owner_address, contract_address or USDT_CONTRACT_BASE58,
+        _TRC20_TRANSFER, _transfer_parameter(to_address, amount_raw),
+    )
+
+
+def estimate_trc20_transfer_energy(
+    owner_address: str,
+    to_address: str,
+    amount_raw: int,
+    recipient_has_balance: bool,
+    contract_address: Optional[str] = None,
+) -> int:
+    """
+    TRC20 transfer 的能量消耗，模拟结果按 (合约, 方法, 接收方是否已持有) 缓存
+
+    transfer 的能量几乎只取决于合约与接收方余额槽是否为空，与金额、发送方无关，
+    因此成千上万笔代发只需要几次模拟。有效期为 TRON_CACHE_TTL_ENERGY_SIMULATION
+    （默认 ENERGY_SIMULATION_TTL 秒，0 表示每次模拟）；模拟失败不缓存。
+
+    Raises:
+        ValueError: 模拟失败或执行回滚
+    """
+    contract = contract_address or USDT_CONTRACT_BASE58
+    return _memoized_simulation(
+        contract, _TRC20_TRANSFER, recipient_has_balance,
+        lambda: simulate_trc20_transfer(owner_address, to_address, amount_raw, contract),
+    )
+
+
+def _memoized_simulation(contract: str, method: str, recipient_has_balance: bool, simulate) -> int:
+    key = f"{config.get_network()}:{contract}:{method}:{'holder' if recipient_has_balance else 'empty'}"
+    ttl = config.get_cache_ttl("energy_simulation", ENERGY_SIMULATION_TTL)
+    if ttl <= 0:
+        return simulate()
+    with _simulation_locks_guard:
+        lock = _simulation_locks.setdefault(key, threading.Lock())
+    with lock:
+        return cache.cached("energy_simulation", key, ttl, simulate)
+
+
+def _transfer_parameter(to_address: str, amount_raw: int) -> str:
+    """编码 transfer(address,uint256) 参数：接收方去掉 41 前缀后补齐 64 字符 + 金额"""
+    to_hex = _base58_to_hex(to_address)
+    to_hex_no_prefix = to_hex[2:] if to_hex.startswith("41") else to_hex
+    return to_hex_no_prefix.zfill(64) + hex(amount_raw)[2:].zfill(64)
+
+
+def _result_message(result: dict) -> str:
+    """TronGrid result.message（可能是 hex 编码）"""
+    error_msg = result.get("result", {}).get("message", "Unknown error")
+    if isinstance(error_msg, str) and all(c in "0123456789abcdefABCDEF" for c in error_msg):
+        try:
+            error_msg = bytes.fromhex(error_msg).decode("utf-8", errors="ignore")
+        except Exception:
+            pass
+    return error_msg
+
+
 # ============ 交易广播 ============
 
-def broadcast_transaction(signed_tx: dict) -> dict:
+def broadcast_transaction(signed_tx, mode: Optional[str] = None) -> dict:
     """
     广播已签名的交易到 TRON 网络
 
     Args:
-        signed_tx: 已签名的交易对象, 必须包含:
+        signed_tx: 已签名的交易对象（dict 或 transaction.Transaction，后者此时才转换为 JSON）,
+            必须包含:
             - txID
             - raw_data 或 raw_data_hex
             - signature (列表)
+        mode: 广播方式 json / hex，None 时读取 TRON_BROADCAST_MODE。
+            hex 方式需要 raw_data_hex，缺少时仍按 json 广播
 
     Returns:
         广播结果:
@@ -241,6 +369,15 @@ def broadcast_transaction(signed_tx: dict) -> dict:
     Raises:
         ValueError: 交易格式无效或广播失败
     """
+    if (mode or get_broadcast_mode()) == "hex":
+        tx = signed_tx if isinstance(signed_tx, transaction.Transaction) else transaction.Transaction.from_json(signed_tx)
+        if tx.verified:
+            return broadcast_hex(tx)
+        logger.debug("交易缺少 raw_data_hex，改用 JSON 广播")
+
+    if isinstance(signed_tx, transaction.Transaction):
+        signed_tx = signed_tx.to_json()
+
     # 校验交易完整性
     if "txID" not in signed_tx:
         raise ValueError("签名交易缺少 txID")
@@ -249,9 +386,41 @@ def broadcast_transaction(signed_tx: dict) -> dict:
     if "raw_data" not in signed_tx and "raw_data_hex" not in signed_tx:
         raise ValueError("签名交易缺少 raw_data")
 
-    result = _post("wallet/broadcasttransaction", signed_tx)
+    _check_broadcast_result(_post("wallet/broadcasttransaction", signed_tx))
+
+    tron_client.invalidate_account_cache(signed_tx)
+    return {
+        "result": True,
+        "txid": signed_tx["txID"],
+    }
+
+
+def broadcast_hex(tx: transaction.Transaction) -> dict:
+    """
+    通过 wallet/broadcasthex 广播本地序列化的签名交易（protobuf 字节）
+
+    请求体只有交易的 protobuf 十六进制，比 JSON 结构小，节点也无需解析 JSON。
 
-    # 检查广播结果
+    Returns:
+        {"result": True, "txid": "..."}
+
+    Raises:
+        ValueError: 交易未签名、缺少 raw_data_hex 或广播失败
+    """
+    if not tx.signatures:
+        raise ValueError("签名交易缺少 signature")
+    _check_broadcast_result(_post("wallet/broadcasthex", {"transaction": tx.to_protobuf().hex()}))
+
+    if tx.raw_data_json is not None:
+        tron_client.invalidate_account_cache({"raw_data": tx.raw_data_json})
+    return {
+        "result": True,
+        "txid": tx.txid_hex,
+    }
+
+
+def _check_broadcast_result(result: dict) -> None:
+    """广播接口返回 result=false 时抛出 ValueError（message 可能是 hex 编码）"""
     if not result.get("result", False):
         code = result.get("code", "UNKNOWN")
         message = result.get("message", "")
@@ -263,10 +432,31 @@ def broadcast_transaction(signed_tx: dict) -> dict:
                 pass
         raise ValueError(f"交易广播失败 [{code}]: {message}")
 
-    return {
-        "result": True,
-        "txid": signed_tx["txID"],
-    }
+
+# ============ 区块查询 ============
+
+def get_now_block() -> dict:
+    """获取最新区块（含交易列表）"""
+    return _post("wallet/getnowblock", {"visible": False})
+
+
+def get_blocks(start: int, end: int) -> list:
+    """
+    获取 [start, end) 区间的区块（含交易列表），单次最多 100 个
+
+    TronGrid 对空区间返回 {}，结果按区块高度排序。
+    """
+    result = _post("wallet/getblockbylimitnext", {"startNum": start, "endNum": end, "visible": False})
+    blocks = result.get("block") or []
+    return sorted(blocks, key=block_number)
+
+
+def block_number(block: dict) -> int:
+    """区块高度（block_header.raw_data.number）"""
+    try:
+        return int(block["block_header"]["raw_data"]["number"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError("TronGrid 区块缺少 block_header.raw_data.number") from e
 
 
 # ============ 资源查询 ============
@@ -286,14 +476,37 @@ def get_account_resource(address: str) -> dict:
     Raises:
         ValueError: 地址无效或 API 返回错误
     """
+    return get_account_resource_snapshot(address)[0]
+
+
+def get_account_resource_snapshot(address: str) -> tuple:
+    """
+    查询账户资源快照，返回 (原始资源数据, 获取时间戳)
+
+    快照保存在 account_resource 缓存中（TRON_CACHE_TTL_ACCOUNT_RESOURCE / 区块跟随器），
+    能量、带宽与手续费预估共用同一份数据；获取时间用于推算缓存期间恢复的资源。
+
+    Raises:
+        ValueError: 地址无效或 API 返回错误
+    """
+    hex_address = _base58_to_hex(address)
     data = {
-        "address": _base58_to_hex(address),
+        "address": hex_address,
         "visible": False,
     }
-    result = _post("wallet/getaccountresource", data)
+    base58_address = base58.b58encode_check(bytes.fromhex(hex_address)).decode()
+    key, ttl = block_follower.account_cache(
+        "account_resource", base58_address, tron_client.account_cache_key(base58_address),
+    )
+    snapshot = cache.cached(
+        "account_resource", key, ttl,
+        lambda: {"fetched_at": time.time(), "resource": _post("wallet/getaccountresource", data)},
+        cacheable=lambda s: "Error" not in s["resource"],
+    )
+    result = snapshot["resource"]
     
     # 检查错误
     if "Error" in result:
         raise ValueError(f"TronGrid 查询账户资源失败: {result.get('Error')}")
     
-    return result
+    return result, snapshot["fetched_at"]
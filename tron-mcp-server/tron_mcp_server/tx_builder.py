@@ -4,7 +4,20 @@ import logging
 import os
 import time
 import hashlib
+from typing import Optional
+
 import base58
+from . import fee_estimator
+# 手续费静态估算常量（定义见 fee_estimator，保留在本模块供旧代码导入）
+from .fee_estimator import (
+    ESTIMATED_USDT_ENERGY,
+    ENERGY_PRICE_SUN,
+    MIN_TRX_TRANSFER_FEE,
+    FREE_BANDWIDTH_DAILY,
+    USDT_BANDWIDTH_BYTES,
+    BANDWIDTH_PRICE_SUN,
+)
+from . import token_registry
 from . import tron_client
 from . import validators
 
@@ -82,13 +95,13 @@ def _encode_transfer(to: str, amount: int) -> str:
     return method_sig + addr_hex + amount_hex
 
 
-def _trigger_smart_contract(to: str, amount: float, from_addr: str, token: str) -> dict:
+def _trigger_smart_contract(to: str, amount: float, from_addr: str, token_info: dict) -> dict:
     """构建 TRC20 转账交易（预览用，实际签名使用 TronGrid API 构建）"""
     timestamp = _timestamp_ms()
     ref_block_bytes, ref_block_hash = _get_ref_block()
-    # TRC20 代币使用代币自身的精度，不是 SUN
-    # USDT 精度为 6 位 (1 USDT = 10^6 最小单位)
-    amount_raw = int(amount * (10 ** USDT_DECIMALS))
+    # TRC20 代币使用代币自身的精度（见 token_registry），不是 SUN
+    # 如 USDT 精度为 6 位 (1 USDT = 10^6 最小单位)
+    amount_raw = token_registry.to_raw(amount, token_info["decimals"])
     
     raw_data = {
         "contract": [
@@ -97,7 +110,7 @@ def _trigger_smart_contract(to: str, amount: float, from_addr: str, token: str)
                     "value": {
                         "data": _encode_transfer(to, amount_raw),
                         "owner_address": from_addr,
-                        "contract_address": USDT_CONTRACT,
+                        "contract_address": token_info["contract"],
                     },
                     "type_url": "type.googleapis.com/protocol.TriggerSmartContract",
                 },
@@ -151,24 +164,6 @@ def _build_trx_transfer(from_addr: str, to_addr: str, amount: float) -> dict:
     return {"txID": tx_id, "raw_data": raw_data}
 
 
-# TRC20 转账预估能量消耗（SUN 单位）
-# 激活账户约 29,000 Energy，未激活账户约 65,000 Energy
-# 保守估计使用较高值
-ESTIMATED_USDT_ENERGY = int(os.getenv("ESTIMATED_USDT_ENERGY", "65000"))
-# 每单位 Energy 的 SUN 价格（默认 420 SUN）
-ENERGY_PRICE_SUN = int(os.getenv("ENERGY_PRICE_SUN", "420"))
-# TRX 转账最小 Gas 费用（SUN 单位，约 0.1 TRX = 100,000 SUN）
-MIN_TRX_TRANSFER_FEE = int(os.getenv("MIN_TRX_TRANSFER_FEE", "100000"))
-
-# 免费带宽抵扣参数
-# TRON 网络每地址每天提供 600 免费带宽点
-FREE_BANDWIDTH_DAILY = int(os.getenv("FREE_BANDWIDTH_DAILY", "600"))
-# USDT TRC20 转账消耗的带宽（约 350 字节）
-USDT_BANDWIDTH_BYTES = int(os.getenv("USDT_BANDWIDTH_BYTES", "350"))
-# 每单位带宽的 SUN 价格（默认 1000 SUN）
-BANDWIDTH_PRICE_SUN = int(os.getenv("BANDWIDTH_PRICE_SUN", "1000"))
-
-
 class InsufficientBalanceError(ValueError):
     """余额不足异常，用于在交易构建前拦截必死交易"""
     
@@ -182,6 +177,7 @@ def check_sender_balance(
     from_address: str,
     amount: float,
     token: str,
+    to_address: Optional[str] = None,
 ) -> dict:
     """
     检查发送方余额是否充足，拦截必死交易
@@ -192,7 +188,8 @@ def check_sender_balance(
     Args:
         from_address: 发送方地址
         amount: 转账金额
-        token: 代币类型 (USDT 或 TRX)
+        token: 代币类型（TRX、TRC20 代币符号或合约地址，见 token_registry）
+        to_address: 接收方地址（可选，用于按接收方状态预估能量 / 激活费）
     
     Returns:
         包含检查结果的字典:
@@ -200,11 +197,14 @@ def check_sender_balance(
         - sufficient: 余额是否充足
         - errors: 错误列表（如果余额不足）
         - balances: 当前余额信息
+        - fee_estimate: 手续费预估明细（见 fee_estimator.estimate_fee）
     
     Raises:
         InsufficientBalanceError: 余额明确不足时抛出，阻止交易构建
+        ValueError: 不支持的代币类型
     """
-    token_upper = token.upper()
+    token_info = token_registry.resolve(token)
+    symbol = token_info["symbol"]
     errors = []
     
     try:
@@ -222,12 +222,18 @@ def check_sender_balance(
             "balances": None,
         }
     
-    if token_upper == "USDT":
-        # USDT 转账检查
+    if not token_registry.is_native(token_info):
+        # TRC20 转账检查
+        is_usdt = token_info["contract"] == _config.get_usdt_contract()
         try:
-            usdt_balance = tron_client.get_usdt_balance(from_address)
+            if is_usdt:
+                token_balance = tron_client.get_usdt_balance(from_address)
+            else:
+                token_balance = tron_client.get_trc20_balance(
+                    from_address, token_info["contract"], token_info["decimals"],
+                )
         except Exception as e:
-            logger.warning(f"检查发送方 USDT 余额失败 ({from_address}): {e}")
+            logger.warning(f"检查发送方 {symbol} 余额失败 ({from_address}): {e}")
             return {
                 "checked": False,
                 "sufficient": None,
@@ -236,25 +242,19 @@ def check_sender_balance(
                 "balances": {"trx": trx_balance},
             }
         
-        # 检查 USDT 余额是否充足
-        if usdt_balance < amount:
+        # 检查代币余额是否充足
+        if token_balance < amount:
             errors.append({
-                "code": "insufficient_usdt",
-                "message": f"USDT 余额不足: 需要 {amount} USDT，当前余额 {usdt_balance} USDT",
+                "code": "insufficient_usdt" if is_usdt else "insufficient_token",
+                "message": f"{symbol} 余额不足: 需要 {amount} {symbol}，当前余额 {token_balance} {symbol}",
                 "severity": "error",
                 "required": amount,
-                "available": usdt_balance,
+                "available": token_balance,
             })
         
-        # 检查 TRX 是否足够支付 Gas（Energy 费 + 带宽费，免费带宽仅抵扣带宽部分）
-        # 能量费用：固定消耗，免费带宽无法抵扣
-        energy_fee_sun = ESTIMATED_USDT_ENERGY * ENERGY_PRICE_SUN
-        # 带宽费用：每笔 USDT 转账消耗约 350 字节
-        # 每地址每天 600 免费带宽点，1 点 = 1 字节
-        # 若免费带宽足够覆盖，带宽部分费用为 0
-        free_bw_coverage = min(USDT_BANDWIDTH_BYTES, FREE_BANDWIDTH_DAILY)
-        actual_bw_fee_sun = max(0, (USDT_BANDWIDTH_BYTES - free_bw_coverage) * BANDWIDTH_PRICE_SUN)
-        estimated_fee_sun = energy_fee_sun + actual_bw_fee_sun
+        # 检查 TRX 是否足够支付 Gas（能量 + 带宽中资源无法抵扣、需要燃烧 TRX 的部分）
+        fee_estimate = fee_estimator.estimate_fee(from_address, to_address, amount, token_info["contract"])
+        estimated_fee_sun = fee_estimate["total_burn_sun"]
         estimated_fee_trx = estimated_fee_sun / SUN_PER_TRX
         
         if trx_balance_sun < estimated_fee_sun:
@@ -269,7 +269,7 @@ def check_sender_balance(
             })
         
         balances = {
-            "usdt": usdt_balance,
+            "usdt" if is_usdt else symbol.lower(): token_balance,
             "trx": trx_balance,
             "trx_sun": trx_balance_sun,
         }
@@ -277,14 +277,16 @@ def check_sender_balance(
     else:
         # TRX 转账检查
         amount_sun = int(amount * SUN_PER_TRX)
-        # TRX 转账需要的总金额 = 转账金额 + Gas 费用
-        total_required_sun = amount_sun + MIN_TRX_TRANSFER_FEE
+        # TRX 转账需要的总金额 = 转账金额 + Gas 费用（带宽燃烧 + 激活费）
+        fee_estimate = fee_estimator.estimate_fee(from_address, to_address, amount, "TRX")
+        fee_sun = fee_estimate["total_burn_sun"]
+        total_required_sun = amount_sun + fee_sun
         
         if trx_balance_sun < total_required_sun:
             total_required_trx = total_required_sun / SUN_PER_TRX
             errors.append({
                 "code": "insufficient_trx",
-                "message": f"TRX 余额不足: 需要 {amount} TRX + {MIN_TRX_TRANSFER_FEE / SUN_PER_TRX:.2f} TRX (Gas)，当前余额 {trx_balance:.6f} TRX",
+                "message": f"TRX 余额不足: 需要 {amount} TRX + {fee_sun / SUN_PER_TRX:.2f} TRX (Gas)，当前余额 {trx_balance:.6f} TRX",
                 "severity": "error",
                 "required": total_required_trx,
                 "available": trx_balance,
@@ -308,6 +310,7 @@ def check_sender_balance(
             details={
                 "errors": errors,
                 "balances": balances,
+                "fee_estimate": fee_estimate,
             }
         )
     
@@ -317,6 +320,7 @@ def check_sender_balance(
         "errors": [],
         "error_message": None,
         "balances": balances,
+        "fee_estimate": fee_estimate,
     }
 
 
@@ -444,7 +448,7 @@ def build_unsigned_tx(
         from_address: 发送方地址
         to_address: 接收方地址
         amount: 转账金额
-        token: 代币类型 (USDT 或 TRX)
+        token: 代币类型（TRX、TRC20 代币符号或合约地址，见 token_registry）
         check_recipient: 是否检查接收方账户状态 (默认 True)
         check_balance: 是否预先检查发送方余额 (默认 True)
             启用后会在构建交易前检查余额，拒绝必死交易以节省 Gas
@@ -468,9 +472,9 @@ def build_unsigned_tx(
     if not validators.is_positive_amount(amount):
         raise ValueError(f"金额必须为正数: {amount}")
 
-    token_upper = token.upper()
-    if token_upper not in ("USDT", "TRX"):
-        raise ValueError(f"不支持的代币类型: {token}")
+    # 未知代币抛出 token_registry.UnknownTokenError (ValueError)
+    token_info = token_registry.resolve(token)
+    is_trc20 = not token_registry.is_native(token_info)
 
     # Phase 2: 安全性检查 - 检查接收方地址是否被标记为恶意
     security_check = None
@@ -507,15 +511,15 @@ def build_unsigned_tx(
     sender_check = None
     if check_balance:
         # 如果余额不足，check_sender_balance 会抛出 InsufficientBalanceError
-        sender_check = check_sender_balance(from_address, amount, token_upper)
+        sender_check = check_sender_balance(from_address, amount, token, to_address)
 
     # 对于 TRC20 转账，检查接收方账户状态
     recipient_check = None
-    if token_upper == "USDT" and check_recipient:
+    if is_trc20 and check_recipient:
         recipient_check = check_recipient_status(to_address)
 
-    if token_upper == "USDT":
-        result = _trigger_smart_contract(to_address, amount, from_address, token_upper)
+    if is_trc20:
+        result = _trigger_smart_contract(to_address, amount, from_address, token_info)
     else:
         result = _build_trx_transfer(from_address, to_address, amount)
     
@@ -0,0 +1,521 @@
+"""预签名交易队列 — 提前构建并签名转账，到点广播
+
+定时发放等场景：queue_transfer 在登记时完成安全检查、构建与签名，到达 broadcast_at 时
+后台调度线程只需一次广播请求。
+
+- 持久化: 队列保存在本地 JSON 文件（TRON_TX_QUEUE_PATH，默认 ~/.tron_mcp/tx_queue.json，原子替换），
+  进程重启后继续调度；只处理当前 TRON_NETWORK 的交易
+- 有效期: TronGrid 构建的交易有效期较短（expiration，通常 1 分钟）。签名前把 raw_data 的 expiration
+  改写为广播时间之后 tx_builder.TX_EXPIRATION_MS，登记时的签名即广播的签名。引用区块（ref_block）
+  只在最近 65536 个区块（约 54 小时）内有效，提前超过 REF_BLOCK_MAX_AGE 登记的交易、或已临近过期的交易
+  在目标时间前 TRON_TX_QUEUE_REBUILD_MARGIN 秒内重新构建并签名（新 txID）；同一次检查中需要重建的多笔交易
+  经 signer.sign_many 并行签名
+- 重建失败: 按 REBUILD_BACKOFF_BASE 秒起指数退避（最长 REBUILD_BACKOFF_MAX 秒）后重试；签名后端地址与
+  登记时的发送方不一致时直接标记为 failed
+- 最大延迟: 超过 broadcast_at + TRON_TX_QUEUE_MAX_DELAY 秒（默认 300）仍未广播的交易标记为 failed，
+  上游长时间故障或进程停机后不会无限期地迟发
+- 调度: 首次登记时启动后台线程，每 TRON_TX_QUEUE_INTERVAL 秒检查一次；服务启动时队列中
+  仍有待广播交易也会启动
+- 安全: 已发起广播的交易不会再重建，广播失败标记为 failed、不自动重试，避免同一笔转账以两个 txID 上链；
+  广播过程中进程退出的交易重启后标记为 failed，请用 txID 查询实际状态
+
+状态: pending（待广播）/ broadcasting（广播中）/ broadcast（已广播）/ failed / cancelled。
+已结束的交易只保留最近 TRON_TX_QUEUE_HISTORY 条。队列为单进程设计（内存副本 + 单个调度线程）：
+多 worker 部署（MCP_WORKERS > 1）时各 worker 会各自持有文件副本并重复广播，因此队列动作与调度线程一律禁用。
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from . import config
+from . import transaction
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ("pending", "broadcasting", "broadcast", "failed", "cancelled")
+_FINISHED = ("broadcast", "failed", "cancelled")
+
+# 引用区块的最长可用时间（秒）：节点只接受最近 65536 个区块（约 54 小时）内的 ref_block，留出余量
+REF_BLOCK_MAX_AGE = 48 * 3600
+# 重建失败后的重试间隔（秒）：REBUILD_BACKOFF_BASE * 2^(失败次数-1)，最长 REBUILD_BACKOFF_MAX
+REBUILD_BACKOFF_BASE = 5.0
+REBUILD_BACKOFF_MAX = 60.0
+
+
+class QueueError(Exception):
+    """队列操作失败（id 重复、不可取消等）"""
+
+
+class QueueUnavailableError(QueueError):
+    """当前部署方式不支持预签名队列（多 worker）"""
+
+
+class SignerMismatchError(ValueError):
+    """当前签名后端的地址与登记时的发送方不一致（重试无法恢复）"""
+
+
+def unavailable_reason() -> Optional[str]:
+    """队列不可用的原因；可用时返回 None"""
+    try:
+        workers = int(os.getenv("MCP_WORKERS", "").strip() or 1)
+    except ValueError:
+        workers = 1
+    if workers > 1:
+        return (f"预签名队列为单进程设计，当前为多 worker 部署（MCP_WORKERS={workers}），"
+                "请在单 worker 实例中使用 queue_transfer")
+    return None
+
+
+def _check_available() -> None:
+    reason = unavailable_reason()
+    if reason:
+        raise QueueUnavailableError(reason)
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name, "").strip()
+    return float(value) if value else default
+
+
+def _storage_path() -> Path:
+    custom_path = os.getenv("TRON_TX_QUEUE_PATH")
+    if custom_path:
+        return Path(custom_path)
+    return Path.home() / ".tron_mcp" / "tx_queue.json"
+
+
+_entries: Dict[str, dict] = {}
+_loaded_path: Optional[Path] = None
+_lock = threading.RLock()
+_run_lock = threading.Lock()
+_scheduler: Optional["TxScheduler"] = None
+_scheduler_lock = threading.Lock()
+
+
+# ============ 持久化 ============
+
+def _load() -> Dict[str, dict]:
+    """当前路径的队列（首次使用或路径变化时读取文件），调用方需持有 _lock"""
+    global _entries, _loaded_path
+    path = _storage_path()
+    if path == _loaded_path:
+        return _entries
+    entries = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for entry in data.get("entries", []):
+            entries[entry["id"]] = entry
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+        logger.warning(f"读取交易队列 {path} 失败，按空队列处理: {e}")
+    for entry in entries.values():
+        if entry.get("status") == "broadcasting":
+            entry["status"] = "failed"
+            entry["last_error"] = "广播过程中进程退出，请用 txID 查询实际状态"
+    _entries, _loaded_path = entries, path
+    return _entries
+
+
+def _save() -> None:
+    """写回队列文件（原子替换），调用方需持有 _lock；失败只记录日志"""
+    path = _loaded_path
+    finished = sorted((e for e in _entries.values() if e["status"] in _FINISHED),
+                      key=lambda e: e.get("finished_at") or 0)
+    history = int(_env_float("TRON_TX_QUEUE_HISTORY", 100))
+    for entry in finished[:max(0, len(finished) - history)]:
+        del _entries[entry["id"]]
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"entries": list(_entries.values())}, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+    except OSError as e:
+        logger.warning(f"保存交易队列 {path} 失败: {e}")
+
+
+# ============ 构建与签名 ============
+
+def _build_unsigned(entry: dict, now: float) -> transaction.Transaction:
+    """通过 TronGrid 构建登记时的转账（txID 已校验，未签名），有效期延长到广播时间之后"""
+    from . import trongrid_client
+    from . import tx_builder
+
+    memo_hex = entry["memo"].encode("utf-8").hex() if entry["memo"] else None
+    if entry["contract"]:
+        unsigned = trongrid_client.build_trc20_transfer(
+            entry["from"], entry["to"], entry["amount"],
+            contract_address=entry["contract"], decimals=entry["decimals"], extra_data=memo_hex,
+        )
+    else:
+        unsigned = trongrid_client.build_trx_transfer(entry["from"], entry["to"], entry["amount"], extra_data=memo_hex)
+    tx = transaction.Transaction.from_json(unsigned)
+    expiration = int(max(entry["broadcast_at"], now) * 1000) + tx_builder.TX_EXPIRATION_MS
+    if not tx.verified or expiration <= ((tx.raw_data_json or {}).get("expiration") or 0):
+        return tx
+    try:
+        return tx.with_expiration(expiration)
+    except transaction.InvalidTransactionError as e:
+        logger.warning(f"预签名交易 {entry['id']} 无法延长有效期，将在广播前重建: {e}")
+        return tx
+
+
+def _check_signer(entry: dict) -> None:
+    from . import signer
+
+    if signer.get_address() != entry["from"]:
+        raise SignerMismatchError("当前签名后端的地址与登记时的发送方地址不一致")
+
+
+def _build_signed(entry: dict, now: float) -> transaction.Transaction:
+    """构建交易并用当前签名后端签名"""
+    from . import signer
+
+    _check_signer(entry)
+    tx = _build_unsigned(entry, now)
+    tx.add_signature(signer.sign(tx.txid))
+    return tx
+
+
+def _needs_rebuild(entry: dict, now: float, margin: float) -> bool:
+    """交易在 margin 秒内将过期，或引用区块即将失效"""
+    built_at = entry.get("built_at") or entry["created_at"]
+    return (now * 1000 >= (entry.get("expiration") or 0) - margin * 1000
+            or now >= built_at + REF_BLOCK_MAX_AGE - margin)
+
+
+def _finish(entry: dict, status: str, error: Optional[str]) -> None:
+    """标记为已结束（调用方需持有 _lock 并负责 _save）"""
+    entry["status"] = status
+    entry["last_error"] = error
+    entry["finished_at"] = time.time()
+
+
+def _rebuild(entries: List[dict], stats: Dict[str, int], now: float) -> set:
+    """
+    重新构建并签名即将过期的交易，签名经 signer.sign_many 批量并行执行
+
+    返回重建失败的条目 id：签名后端地址不符的标记为 failed，其余按指数退避后重试（过期交易不会被广播）。
+    """
+    from . import signer
+
+    failed = set()
+
+    def record_error(entry: dict, error: Exception) -> None:
+        failed.add(entry["id"])
+        with _lock:
+            if isinstance(error, SignerMismatchError):
+                _finish(entry, "failed", f"重建失败: {error}")
+                stats["failed"] += 1
+            else:
+                entry["rebuild_failures"] = entry.get("rebuild_failures", 0) + 1
+                delay = min(REBUILD_BACKOFF_BASE * 2 ** (entry["rebuild_failures"] - 1), REBUILD_BACKOFF_MAX)
+                entry["next_attempt_at"] = now + delay
+                entry["last_error"] = f"重建失败: {error}"
+                stats["errors"] += 1
+            _save()
+        logger.warning(f"预签名交易 {entry['id']} 重建失败: {error}")
+
+    built = []
+    for entry in entries:
+        try:
+            _check_signer(entry)
+            built.append((entry, _build_unsigned(entry, now)))
+        except Exception as e:
+            record_error(entry, e)
+    if not built:
+        return failed
+    try:
+        signatures = signer.sign_many([tx.txid for _, tx in built])
+    except Exception as e:
+        for entry, _ in built:
+            record_error(entry, e)
+        return failed
+
+    with _lock:
+        for (entry, tx), signature in zip(built, signatures):
+            if entry["status"] != "pending":
+                continue
+            tx.add_signature(signature)
+            _set_tx(entry, tx, now)
+            entry["rebuilds"] += 1
+            entry["rebuild_failures"] = 0
+            entry["next_attempt_at"] = None
+            entry["last_error"] = None
+            stats["rebuilt"] += 1
+        _save()
+    return failed
+
+
+def _set_tx(entry: dict, tx: transaction.Transaction, now: float) -> None:
+    entry["tx"] = tx.to_json()
+    entry["txid"] = tx.txid_hex
+    entry["expiration"] = (tx.raw_data_json or {}).get("expiration")
+    entry["built_at"] = now
+
+
+def _public(entry: dict) -> dict:
+    """对外展示的条目（不含签名交易本身）"""
+    return {k: v for k, v in entry.items() if k != "tx"}
+
+
+# ============ 队列操作 ============
+
+def enqueue(from_addr: str, to_addr: str, amount: float, token_info: dict, memo: str = "",
+            broadcast_at: Optional[float] = None, entry_id: Optional[str] = None) -> dict:
+    """
+    构建、签名并登记一笔转账，到 broadcast_at（Unix 秒，默认立即）时广播
+
+    Args:
+        token_info: token_registry 解析结果
+        entry_id: 自定义 id（可选，用于幂等登记），默认自动生成
+
+    Raises:
+        QueueUnavailableError: 多 worker 部署
+        QueueError: id 已存在
+        ValueError: 私钥 / 构建 / 签名失败
+    """
+    _check_available()
+    now = time.time()
+    entry_id = entry_id or f"q-{uuid.uuid4().hex[:12]}"
+    with _lock:
+        if entry_id in _load():
+            raise QueueError(f"队列中已存在 id 为 {entry_id} 的交易")
+    entry = {
+        "id": entry_id,
+        "network": config.get_network(),
+        "from": from_addr,
+        "to": to_addr,
+        "amount": amount,
+        "token": token_info["symbol"],
+        "contract": token_info["contract"],
+        "decimals": token_info["decimals"],
+        "memo": memo,
+        "broadcast_at": float(broadcast_at) if broadcast_at is not None else now,
+        "created_at": now,
+        "status": "pending",
+        "rebuilds": 0,
+        "rebuild_failures": 0,
+        "next_attempt_at": None,
+        "last_error": None,
+        "finished_at": None,
+    }
+    _set_tx(entry, _build_signed(entry, now), now)
+    with _lock:
+        entries = _load()
+        if entry_id in entries:
+            raise QueueError(f"队列中已存在 id 为 {entry_id} 的交易")
+        entries[entry_id] = entry
+        _save()
+    start_scheduler()
+    return _public(entry)
+
+
+def cancel(entry_id: str) -> Optional[dict]:
+    """
+    取消待广播的交易，不存在时返回 None
+
+    Raises:
+        QueueUnavailableError: 多 worker 部署
+        QueueError: 交易已在广播或已结束
+    """
+    _check_available()
+    with _lock:
+        entry = _load().get(entry_id)
+        if entry is None:
+            return None
+        if entry["status"] != "pending":
+            raise QueueError(f"交易 {entry_id} 当前状态为 {entry['status']}，无法取消")
+        _finish(entry, "cancelled", None)
+        _save()
+        return _public(entry)
+
+
+def queue_status(status: Optional[str] = None, limit: int = 50) -> dict:
+    """当前网络的队列概况：各状态数量、下一笔待广播时间、调度线程状态与条目列表（按广播时间排序）"""
+    network = config.get_network()
+    with _lock:
+        entries = [e for e in _load().values() if e["network"] == network]
+        counts = {s: 0 for s in STATUSES}
+        for e in entries:
+            counts[e["status"]] += 1
+        pending = [e["broadcast_at"] for e in entries if e["status"] == "pending"]
+        selected = sorted((e for e in entries if status is None or e["status"] == status),
+                          key=lambda e: e["broadcast_at"])
+        items = [_public(e) for e in selected[:limit]]
+    scheduler = _scheduler
+    return {
+        "network": network,
+        "counts": counts,
+        "next_broadcast_at": min(pending) if pending else None,
+        "scheduler": scheduler.status() if scheduler is not None else {"running": False},
+        "total": len(selected),
+        "items": items,
+    }
+
+
+def run_due(now: Optional[float] = None) -> Dict[str, int]:
+    """
+    处理一次到期交易：超过最大延迟的交易标记为 failed，即将过期且临近目标时间的交易重建
+    （重建失败的在退避期内跳过），到达目标时间的交易广播
+
+    返回本次 {"rebuilt", "broadcast", "failed", "errors"} 计数。同一时刻只有一次处理在执行。
+    """
+    from . import trongrid_client
+
+    with _run_lock:
+        now = time.time() if now is None else now
+        margin = _env_float("TRON_TX_QUEUE_REBUILD_MARGIN", 30.0)
+        max_delay = _env_float("TRON_TX_QUEUE_MAX_DELAY", 300.0)
+        network = config.get_network()
+        stats = {"rebuilt": 0, "broadcast": 0, "failed": 0, "errors": 0}
+        with _lock:
+            work = []
+            for e in _load().values():
+                if e["status"] != "pending" or e["network"] != network or now < e["broadcast_at"] - margin:
+                    continue
+                if now > e["broadcast_at"] + max_delay:
+                    _finish(e, "failed", f"超过最大延迟 {max_delay:g} 秒仍未广播（{e.get('last_error') or '调度未运行'}）")
+                    stats["failed"] += 1
+                    logger.warning(f"预签名交易 {e['id']} 超过最大延迟，已标记为 failed")
+                    continue
+                work.append(e)
+            if stats["failed"]:
+                _save()
+        stale = [e for e in work if _needs_rebuild(e, now, margin)]
+        waiting = {e["id"] for e in stale if now < (e.get("next_attempt_at") or 0)}
+        retry = [e for e in stale if e["id"] not in waiting]
+        failed = _rebuild(sorted(retry, key=lambda e: e["broadcast_at"]), stats, now) if retry else set()
+        for entry in sorted(work, key=lambda e: e["broadcast_at"]):
+            if entry["id"] in failed or entry["id"] in waiting or now < entry["broadcast_at"]:
+                continue
+
+            with _lock:
+                if entry["status"] != "pending":
+                    continue
+                entry["status"] = "broadcasting"
+                _save()
+            try:
+                trongrid_client.broadcast_transaction(transaction.Transaction.from_json(entry["tx"]))
+                status, error = "broadcast", None
+                stats["broadcast"] += 1
+            except Exception as e:
+                status, error = "failed", str(e)
+                stats["failed"] += 1
+                logger.warning(f"预签名交易 {entry['id']} 广播失败: {e}")
+            with _lock:
+                _finish(entry, status, error)
+                _save()
+        return stats
+
+
+# ============ 调度线程 ============
+
+class TxScheduler:
+    """后台调度线程：每 interval 秒调用一次 run_due"""
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats: Dict[str, int] = {"rebuilt": 0, "broadcast": 0, "failed": 0, "errors": 0}
+        self.last_error: Optional[str] = None
+
+    def status(self) -> dict:
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "interval": self.interval,
+            "last_error": self.last_error,
+            **self.stats,
+        }
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                for key, value in run_due().items():
+                    self.stats[key] += value
+                self.last_error = None
+            except Exception as e:
+                self.stats["errors"] += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.warning(f"交易队列调度失败: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self) -> "TxScheduler":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="tron-tx-queue", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> bool:
+        """停止调度，等待当前一轮处理结束；超时仍未退出返回 False"""
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
+
+def start_scheduler() -> TxScheduler:
+    """
+    启动进程级调度线程（已启动时直接返回）
+
+    Raises:
+        QueueUnavailableError: 多 worker 部署
+    """
+    global _scheduler
+    _check_available()
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = TxScheduler(_env_float("TRON_TX_QUEUE_INTERVAL", 1.0))
+        return _scheduler.start()
+
+
+def start_from_env() -> Optional[TxScheduler]:
+    """队列中有当前网络的待广播交易时启动调度线程（服务启动时调用；多 worker 部署时不启动）"""
+    reason = unavailable_reason()
+    if reason:
+        logger.info(f"交易队列调度未启动: {reason}")
+        return None
+    network = config.get_network()
+    with _lock:
+        pending = sum(1 for e in _load().values() if e["status"] == "pending" and e["network"] == network)
+    if not pending:
+        return None
+    scheduler = start_scheduler()
+    logger.info(f"交易队列调度已启动（{pending} 笔待广播）")
+    return scheduler
+
+
+def stop(timeout: float = 5.0) -> bool:
+    """停止并丢弃进程级调度线程（等待进行中的广播完成）；超时仍未退出返回 False"""
+    global _scheduler
+    with _scheduler_lock:
+        scheduler, _scheduler = _scheduler, None
+    if scheduler is not None:
+        return scheduler.stop(timeout)
+    return True
+
+
+def _reset() -> None:
+    """测试用：停止调度线程并丢弃内存中的队列"""
+    global _entries, _loaded_path
+    stop()
+    with _lock:
+        _entries, _loaded_path = {}, None
@@ -0,0 +1,255 @@
+"""地址监听 — 基于区块跟随器推送转入通知
+
+Agent 监听充值地址时不必反复调用 get_transaction_history / get_usdt_balance：
+watch_address 登记地址后，由进程内唯一的区块跟随器（block_follower）逐块扫描交易，
+发现转入监听地址的 TRX / TRC20 转账时记录事件，并通知已注册的推送回调：
+
+- MCP 推送: server.py 把每个监听地址暴露为资源 tron://watch/{address}，
+  订阅了该资源的会话（resources/subscribe）会收到 notifications/resources/updated，
+  再读取资源即可拿到最新事件
+- 拉取: 不支持订阅的客户端调用 get_watch_events，用 since 游标增量获取
+
+N 个 Agent × M 次轮询变为每个区块一次上游请求。
+监听登记与事件保存在当前进程内：多 worker 部署时推送需要使用单进程（stdio / SSE / 有状态 HTTP）。
+只记录开始监听之后、执行成功的转账；区块跟随器断档（落后超过 TRON_BLOCK_FOLLOWER_MAX_CATCHUP）
+时跳过的区块不会产生事件，此时应以余额查询为准。
+
+仅依赖标准库。
+"""
+
+import collections
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from . import block_follower
+from . import config
+from . import token_registry
+
+logger = logging.getLogger(__name__)
+
+URI_PREFIX = "tron://watch/"
+TOKENS = ("ALL", "TRX", "USDT", "TRC20")
+
+_MAX_WATCHES = int(os.getenv("TRON_WATCH_MAX", "1000") or 1000)
+_HISTORY = int(os.getenv("TRON_WATCH_HISTORY", "100") or 100)
+
+
+class WatchLimitError(Exception):
+    """监听地址数超过 TRON_WATCH_MAX"""
+
+
+class _Watch:
+    __slots__ = ("address", "token", "refs", "since_block", "created_at", "events", "seq")
+
+    def __init__(self, address: str, token: str, since_block: Optional[int]):
+        self.address = address
+        self.token = token
+        self.refs = 1
+        self.since_block = since_block
+        self.created_at = time.time()
+        self.events = collections.deque(maxlen=_HISTORY)
+        self.seq = 0
+
+    def summary(self) -> dict:
+        return {
+            "address": self.address,
+            "token": self.token,
+            "subscribers": self.refs,
+            "since_block": self.since_block,
+            "events": self.seq,
+            "uri": resource_uri(self.address),
+        }
+
+
+_watches: Dict[str, _Watch] = {}
+_notifiers: List[Callable[[str, dict], None]] = []
+_lock = threading.Lock()
+
+
+def resource_uri(address: str) -> str:
+    return f"{URI_PREFIX}{address}"
+
+
+def add_notifier(notifier: Callable[[str, dict], None]) -> None:
+    """注册推送回调 notifier(address, event)，在区块跟随器线程中调用"""
+    with _lock:
+        if notifier not in _notifiers:
+            _notifiers.append(notifier)
+
+
+def remove_notifier(notifier: Callable[[str, dict], None]) -> None:
+    with _lock:
+        if notifier in _notifiers:
+            _notifiers.remove(notifier)
+
+
+def watch(address: str, token: str = "ALL") -> dict:
+    """
+    登记监听地址（重复登记累加订阅数），必要时启动区块跟随器
+
+    Raises:
+        ValueError: token 不支持
+        WatchLimitError: 监听地址数已达上限
+    """
+    token = token.upper()
+    if token not in TOKENS:
+        raise ValueError(f"不支持的 token: {token}（可选: {', '.join(TOKENS)}）")
+    follower = block_follower.start()
+    follower.add_listener(_on_block)
+    if follower.last_block is None:
+        # 后台线程尚未完成首次轮询：立即确定起点，之后出块的转账都会被记录
+        try:
+            follower.poll_once()
+        except Exception as e:
+            logger.warning(f"获取监听起始区块失败: {e}")
+    with _lock:
+        existing = _watches.get(address)
+        if existing is not None:
+            existing.refs += 1
+            if existing.token != token:
+                existing.token = "ALL"
+            return existing.summary()
+        if len(_watches) >= _MAX_WATCHES:
+            raise WatchLimitError(f"监听地址数已达上限 {_MAX_WATCHES}（TRON_WATCH_MAX）")
+        entry = _Watch(address, token, follower.last_block)
+        _watches[address] = entry
+        return entry.summary()
+
+
+def unwatch(address: str) -> Optional[dict]:
+    """取消一次监听；订阅数归零时删除该地址，返回剩余状态（未监听时返回 None）"""
+    with _lock:
+        entry = _watches.get(address)
+        if entry is None:
+            return None
+        entry.refs -= 1
+        if entry.refs <= 0:
+            del _watches[address]
+        return entry.summary()
+
+
+def list_watches() -> List[dict]:
+    with _lock:
+        return [entry.summary() for entry in _watches.values()]
+
+
+def events(address: str, since: int = 0, limit: int = 20) -> Optional[dict]:
+    """返回序号大于 since 的事件（最多 limit 条，按时间先后），未监听时返回 None"""
+    with _lock:
+        entry = _watches.get(address)
+        if entry is None:
+            return None
+        items = [e for e in entry.events if e["seq"] > since][:limit]
+        return {**entry.summary(), "cursor": items[-1]["seq"] if items else max(since, 0), "items": items}
+
+
+def _reset() -> None:
+    """清空监听与推送回调（测试使用）"""
+    with _lock:
+        _watches.clear()
+        _notifiers.clear()
+
+
+# ============ 区块扫描 ============
+
+
+def _succeeded(transaction: dict) -> bool:
+    ret = transaction.get("ret") or []
+    return not ret or ret[0].get("contractRet", "SUCCESS") == "SUCCESS"
+
+
+def _trc20_amount(contract_hex: str, raw_amount: int):
+    """按代币注册表中的精度换算 TRC20 金额；不在注册表中的代币返回原始整数"""
+    info = token_registry.lookup(contract_hex, fetch=False)
+    return raw_amount / (10 ** info["decimals"]) if info else raw_amount
+
+
+def _incoming_transfers(transaction: dict):
+    """
+    交易中的转账，产出 (token, to_hex, from_hex, amount, contract_hex)
+
+    TRC20 识别 transfer(address,uint256) 与 transferFrom(address,address,uint256)，
+    金额按代币注册表中的精度换算（不查询上游，未登记的代币保留原始整数）。
+    """
+    try:
+        contracts = transaction["raw_data"]["contract"]
+    except (KeyError, TypeError):
+        return
+    for contract in contracts or ():
+        try:
+            value = contract["parameter"]["value"]
+        except (KeyError, TypeError):
+            continue
+        kind = contract.get("type")
+        data = value.get("data") or ""
+        if kind == "TransferContract" and value.get("to_address"):
+            yield "TRX", value["to_address"], value.get("owner_address", ""), int(value.get("amount", 0)) / 1_000_000, ""
+            continue
+        if data.startswith("a9059cbb") and len(data) >= 136:
+            from_hex, to_hex, raw_hex = value.get("owner_address", ""), "41" + data[32:72], data[72:136]
+        elif data.startswith("23b872dd") and len(data) >= 200:
+            from_hex, to_hex, raw_hex = "41" + data[32:72], "41" + data[96:136], data[136:200]
+        else:
+            continue
+        contract_hex = (value.get("contract_address") or "").lower()
+        token = "USDT" if contract_hex == config.get_usdt_contract_hex().lower() else "TRC20"
+        try:
+            raw_amount = int(raw_hex, 16)
+        except ValueError:
+            continue
+        yield token, to_hex, from_hex, _trc20_amount(contract_hex, raw_amount), contract_hex
+
+
+def _base58(hex_address: str) -> str:
+    from . import tron_client
+
+    if not hex_address:
+        return ""
+    try:
+        return tron_client._normalize_address(hex_address)
+    except ValueError:
+        return ""
+
+
+def _on_block(number: int, transactions: list) -> None:
+    """区块跟随器回调：记录转入监听地址的转账并推送"""
+    if not _watches:
+        return
+
+    found = []
+    for transaction in transactions:
+        if not _succeeded(transaction):
+            continue
+        for token, to_hex, from_hex, amount, contract_hex in _incoming_transfers(transaction):
+            to_address = _base58(to_hex)
+            if to_address not in _watches:
+                continue
+            with _lock:
+                entry = _watches.get(to_address)
+                if entry is None or (entry.token != "ALL" and entry.token != token):
+                    continue
+                entry.seq += 1
+                event = {
+                    "seq": entry.seq,
+                    "txid": transaction.get("txID", ""),
+                    "block": number,
+                    "token": token,
+                    "amount": amount,
+                    "from": _base58(from_hex),
+                    "to": to_address,
+                    "contract": _base58(contract_hex),
+                    "time": time.time(),
+                }
+                entry.events.append(event)
+                notifiers = list(_notifiers)
+            found.append((to_address, event, notifiers))
+
+    for address, event, notifiers in found:
+        for notifier in notifiers:
+            try:
+                notifier(address, event)
+            except Exception:
+                logger.exception(f"推送 {address} 的转入通知失败")